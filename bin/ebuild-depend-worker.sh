@@ -0,0 +1,51 @@
+#!/usr/bin/env bash
+# Copyright 2026 Gentoo Authors
+# Distributed under the terms of the GNU General Public License v2
+
+# Runs the "depend" phase of many ebuilds, for FEATURES="metadata-workers".
+# The worker sources isolated-functions.sh once, and then reads requests from
+# its control pipe, one per line, each naming a file with the exported
+# environment of the request. A request is served by a subshell, which
+# replaces the exported environment with the one of the request before it
+# sources ebuild.sh, so that nothing an ebuild or eclass does survives the
+# request. The metadata is written to the result pipe, followed by a NUL byte
+# and the exit status of the subshell on a line of its own.
+
+read -r ___depend_worker_ctl ___depend_worker_res <<< "${PORTAGE_DEPEND_WORKER_FDS:?}"
+unset -v PORTAGE_DEPEND_WORKER_FDS
+
+source "${PORTAGE_BIN_PATH:?}/isolated-functions.sh" || exit
+
+# The sandbox keeps logging to the file it was started with.
+___depend_worker_sandbox_log=${SANDBOX_LOG}
+
+while read -r ___depend_worker_request <&"${___depend_worker_ctl}"; do
+	(
+		# Readonly variables of bash can not be unset, and are never part
+		# of a request.
+		unset -v $(compgen -e) 2>/dev/null
+		source "${___depend_worker_request}" || exit
+		if [[ -n ${___depend_worker_sandbox_log} ]]; then
+			export SANDBOX_LOG=${___depend_worker_sandbox_log}
+		fi
+
+		if ___eapi_has_version_functions; then
+			source "${PORTAGE_BIN_PATH}/version-functions.sh" || exit 1
+		else
+			unset -f ver_cut ver_rs ver_test
+		fi
+		if [[ -v PORTAGE_EBUILD_EXTRA_SOURCE ]]; then
+			source "${PORTAGE_EBUILD_EXTRA_SOURCE}" || exit 1
+		fi
+		__init_isolated_functions
+
+		exec {PORTAGE_PIPE_FD}>&"${___depend_worker_res}"
+		exec {___depend_worker_ctl}<&- {___depend_worker_res}>&-
+		unset -v ___depend_worker_ctl ___depend_worker_res \
+			___depend_worker_request ___depend_worker_sandbox_log
+
+		___depend_worker=1
+		source "${PORTAGE_BIN_PATH}/ebuild.sh" depend
+	)
+	printf '\0%d\n' "$?" >&"${___depend_worker_res}" || exit
+done
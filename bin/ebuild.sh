@@ -10,7 +10,12 @@ unalias -a
 unset BASH_COMPAT
 declare -F ___in_portage_iuse >/dev/null && export -n -f ___in_portage_iuse
 
-source "${PORTAGE_BIN_PATH:?}/isolated-functions.sh" || exit
+# ebuild-depend-worker.sh has already sourced isolated-functions.sh.
+if [[ -v ___depend_worker ]]; then
+	unset -v ___depend_worker
+else
+	source "${PORTAGE_BIN_PATH:?}/isolated-functions.sh" || exit
+fi
 
 __check_bash_version() {
 	local IFS compat_maj compat_min dependent maj min
@@ -138,7 +138,7 @@ die() {
 	# __dump_trace is useless when the main script is a helper binary
 	local main_index
 	(( main_index = ${#BASH_SOURCE[@]} - 1 ))
-	if [[ ${BASH_SOURCE[main_index]##*/} == @(ebuild|misc-functions).sh ]]; then
+	if [[ ${BASH_SOURCE[main_index]##*/} == @(ebuild|ebuild-depend-worker|misc-functions).sh ]]; then
 	__dump_trace 2 "${filespacing}" "${linespacing}"
 	eerror "  $(printf "%${filespacing}s" "${BASH_SOURCE[1]##*/}"), line $(printf "%${linespacing}s" "${BASH_LINENO[0]}"):  Called die"
 	eerror "The specific snippet of code:"
@@ -394,40 +394,45 @@ __set_colors() {
 
 RC_ENDCOL="yes"
 
-if [[ -z ${NO_COLOR} ]] ; then
-	case ${NOCOLOR:-false} in
-	yes|true)
+# Sets up the colours and the USERLAND and XARGS variables according to the
+# environment. ebuild-depend-worker.sh calls it again for every request.
+__init_isolated_functions() {
+	if [[ -z ${NO_COLOR} ]] ; then
+		case ${NOCOLOR:-false} in
+		yes|true)
+			__unset_colors
+			;;
+		no|false)
+			__set_colors
+			;;
+		esac
+	else
 		__unset_colors
-		;;
-	no|false)
-		__set_colors
-		;;
-	esac
-else
-	__unset_colors
-fi
-
+	fi
 
-if [[ -z ${USERLAND} ]] ; then
-	case $(uname -s) in
-	*BSD|DragonFly)
-		export USERLAND="BSD"
-		;;
-	*)
-		export USERLAND="GNU"
-		;;
-	esac
-fi
+	if [[ -z ${USERLAND} ]] ; then
+		case $(uname -s) in
+		*BSD|DragonFly)
+			export USERLAND="BSD"
+			;;
+		*)
+			export USERLAND="GNU"
+			;;
+		esac
+	fi
 
-if [[ -z ${XARGS} ]] ; then
-	if XARGS=$(type -P gxargs); then
-		export XARGS+=" -r"
-	elif : | xargs -r 2>/dev/null; then
-		export XARGS="xargs -r"
-	else
-		export XARGS="xargs"
+	if [[ -z ${XARGS} ]] ; then
+		if XARGS=$(type -P gxargs); then
+			export XARGS+=" -r"
+		elif : | xargs -r 2>/dev/null; then
+			export XARGS="xargs -r"
+		else
+			export XARGS="xargs"
+		fi
 	fi
-fi
+}
+
+__init_isolated_functions
 
 ___makeopts_jobs() {
 	local LC_ALL LC_COLLATE=C ere jobs
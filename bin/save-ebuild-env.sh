@@ -213,6 +213,7 @@ __save_ebuild_env() (
 		__hasg
 		__hasgq
 		__helpers_die
+		__init_isolated_functions
 		__preprocess_ebuild_env
 		__qa_call
 		__qa_source
@@ -10,8 +10,10 @@ from urllib.parse import urlparse as urllib_parse_urlparse
 import portage
 from portage.binpkg import get_binpkg_format
 from portage.exception import FileNotFound
+from portage.package.ebuild.fetch import _hide_url_passwd
 from portage.util._async.AsyncTaskFuture import AsyncTaskFuture
 from portage.util._async.FileCopier import FileCopier
+from portage.util._http_pool import HttpFetchError, builtin_fetch_supported, get_pool
 from portage.util._pty import _create_pty_or_pipe
 
 from _emerge.AsynchronousLock import AsynchronousLock
@@ -115,8 +117,13 @@ class BinpkgFetcher(CompositeTask):
                 finally:
                     if copier.isAlive():
                         copier.cancel()
-                if copier.returncode == os.EX_OK:
-                    fetcher.sync_timestamp()
+                returncode = copier.returncode
+            elif (
+                not self.pretend
+                and remote_metadata.get("FETCHCOMMAND") is None
+                and builtin_fetch_supported(bintree.settings, uri)
+            ):
+                returncode = await self._builtin_fetch(uri)
             else:
                 fetcher.start()
                 try:
@@ -124,14 +131,45 @@ class BinpkgFetcher(CompositeTask):
                 finally:
                     if fetcher.isAlive():
                         fetcher.cancel()
+                returncode = fetcher.returncode
 
-                if not self.pretend and fetcher.returncode == os.EX_OK:
-                    fetcher.sync_timestamp()
+            if not self.pretend and returncode == os.EX_OK:
+                fetcher.sync_timestamp()
         finally:
             if fetcher.locked:
                 await fetcher.async_unlock()
 
-        return fetcher.returncode if copier is None else copier.returncode
+        return returncode
+
+    async def _builtin_fetch(self, uri) -> int:
+        """
+        Download uri to self.pkg_path with the built-in downloader of
+        FEATURES=builtin-fetch.
+
+        @rtype: int
+        @return: Exit status, like that of FETCHCOMMAND.
+        """
+        bintree = self.pkg.root_config.trees["bintree"]
+        resume = (
+            os.path.exists(self.pkg_path)
+            and os.path.basename(self.pkg_path) in bintree.invalids
+        )
+        if not resume:
+            # Remove existing file or broken symlink.
+            try:
+                os.unlink(self.pkg_path)
+            except OSError:
+                pass
+        try:
+            await get_pool(bintree.settings).fetch(uri, self.pkg_path, resume=resume)
+        except (HttpFetchError, OSError) as e:
+            await self.scheduler.async_output(
+                f"!!! {_hide_url_passwd(str(e))}\n",
+                log_file=self.logfile,
+                background=self.background,
+            )
+            return 1
+        return os.EX_OK
 
     def _main_exit(self, main_task):
         if not main_task.cancelled:
@@ -15,12 +15,20 @@ from portage.checksum import (
 from portage.output import EOutput
 from portage.package.ebuild.fetch import _checksum_failure_temp_file
 from portage.util._async.FileDigester import FileDigester
+from portage.util._digest_cache import get_digest_cache
 
 from _emerge.CompositeTask import CompositeTask
 
 
 class BinpkgVerifier(CompositeTask):
-    __slots__ = ("_digests", "_pkg_path", "logfile", "pkg")
+    __slots__ = (
+        "_digest_cache",
+        "_digests",
+        "_pkg_path",
+        "_pkg_stat",
+        "logfile",
+        "pkg",
+    )
 
     def _start(self):
         bintree = self.pkg.root_config.trees["bintree"]
@@ -38,7 +46,8 @@ class BinpkgVerifier(CompositeTask):
         self._digests = digests
 
         try:
-            size = os.stat(self._pkg_path).st_size
+            self._pkg_stat = os.stat(self._pkg_path)
+            size = self._pkg_stat.st_size
         except OSError as e:
             if e.errno not in (errno.ENOENT, errno.ESTALE):
                 raise
@@ -69,10 +78,21 @@ class BinpkgVerifier(CompositeTask):
                 self._async_wait()
                 return
 
+        hash_names = [k for k in digests if k != "size"]
+        self._digest_cache = get_digest_cache(bintree.settings, bintree.pkgdir)
+        if self._digest_cache is not None:
+            confirmed = self._digest_cache.get(self._pkg_path, self._pkg_stat)
+            if hash_names and all(confirmed.get(k) == digests[k] for k in hash_names):
+                if self.pkg.root_config.settings.get("PORTAGE_QUIET") != "1":
+                    self._display_success()
+                self.returncode = os.EX_OK
+                self._async_wait()
+                return
+
         self._start_task(
             FileDigester(
                 file_path=self._pkg_path,
-                hash_names=[k for k in digests if k != "size"],
+                hash_names=hash_names,
                 background=self.background,
                 logfile=self.logfile,
                 scheduler=self.scheduler,
@@ -94,6 +114,10 @@ class BinpkgVerifier(CompositeTask):
                 self.wait()
                 return
 
+        if self._digest_cache is not None:
+            self._digest_cache.add(self._pkg_path, self._pkg_stat, digester.digests)
+            self._digest_cache.flush()
+
         if self.pkg.root_config.settings.get("PORTAGE_QUIET") != "1":
             self._display_success()
 
@@ -20,6 +20,7 @@ from portage.package.ebuild.fetch import (
 )
 from portage.util._async.AsyncTaskFuture import AsyncTaskFuture
 from portage.util._async.ForkProcess import ForkProcess
+from portage.util._digest_cache import get_digest_cache
 from portage.util._pty import _create_pty_or_pipe
 from portage.util.futures import asyncio
 
@@ -164,6 +165,7 @@ class _EbuildFetcherProcess(ForkProcess):
         hash_filter = _hash_filter(settings.get("PORTAGE_CHECKSUM_FILTER", ""))
         if hash_filter.transparent:
             hash_filter = None
+        digest_cache = get_digest_cache(settings, distdir)
         stdout_orig = sys.stdout
         stderr_orig = sys.stderr
         global_havecolor = portage.output.havecolor
@@ -190,6 +192,7 @@ class _EbuildFetcherProcess(ForkProcess):
                     eout,
                     show_errors=False,
                     hash_filter=hash_filter,
+                    digest_cache=digest_cache,
                 )
                 if not ok:
                     success = False
@@ -201,6 +204,8 @@ class _EbuildFetcherProcess(ForkProcess):
             sys.stdout = stdout_orig
             sys.stderr = stderr_orig
             portage.output.havecolor = global_havecolor
+            if digest_cache is not None:
+                digest_cache.flush()
 
         if success:
             # When returning unsuccessfully, no messages are produced, since
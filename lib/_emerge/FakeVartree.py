@@ -257,24 +257,39 @@ class FakeVartree(vartree):
         slot_counters = {}
         root_config = self._pkg_root_config
         validation_keys = ["COUNTER", "_mtime_"]
+        pkgs = {}
         for cpv in current_cpv_set:
             pkg_hash_key = Package._gen_hash_key(
                 cpv=cpv, installed=True, root_config=root_config, type_name="installed"
             )
-            pkg = pkg_vardb.get(pkg_hash_key)
-            if pkg is not None:
-                counter, mtime = real_vardb.aux_get(cpv, validation_keys)
-                try:
-                    counter = int(counter)
-                except ValueError:
-                    counter = 0
+            pkgs[cpv] = pkg_vardb.get(pkg_hash_key)
 
-                if counter != pkg.counter or mtime != pkg.mtime:
-                    self.cpv_discard(pkg)
-                    pkg = None
+        validation = real_vardb.aux_get_many(
+            [cpv for cpv, pkg in pkgs.items() if pkg is not None], validation_keys
+        )
+        for cpv, pkg in pkgs.items():
+            if pkg is None:
+                continue
+            counter, mtime = validation.get(cpv, ("", None))
+            try:
+                counter = int(counter)
+            except ValueError:
+                counter = 0
 
+            if counter != pkg.counter or mtime != pkg.mtime:
+                self.cpv_discard(pkg)
+                pkgs[cpv] = None
+
+        # Load all new or changed packages in one batch.
+        metadata = real_vardb.aux_get_many(
+            [cpv for cpv, pkg in pkgs.items() if pkg is None], self._db_keys
+        )
+        for cpv, pkg in pkgs.items():
             if pkg is None:
-                pkg = self._pkg(cpv)
+                if cpv not in metadata:
+                    # Uninstalled since cpv_all() was called.
+                    continue
+                pkg = self._pkg(cpv, metadata=metadata[cpv])
 
             other_counter = slot_counters.get(pkg.slot_atom)
             if other_counter is not None:
@@ -284,19 +299,24 @@ class FakeVartree(vartree):
             slot_counters[pkg.slot_atom] = pkg.counter
             pkg_vardb.cpv_inject(pkg)
 
-    def _pkg(self, cpv):
+    def _pkg(self, cpv, metadata=None):
         """
         The RootConfig instance that will become the Package.root_config
         attribute can be overridden by the FakeVartree pkg_root_config
         constructory argument, since we want to be consistent with the
         depgraph._pkg() method which uses a specially optimized
         RootConfig that has a FakeVartree instead of a real vartree.
+
+        metadata holds the values of self._db_keys when the caller has
+        already fetched them.
         """
+        if metadata is None:
+            metadata = self._real_vardb.aux_get(cpv, self._db_keys)
         pkg = Package(
             cpv=cpv,
             built=True,
             installed=True,
-            metadata=zip(self._db_keys, self._real_vardb.aux_get(cpv, self._db_keys)),
+            metadata=zip(self._db_keys, metadata),
             root_config=self._pkg_root_config,
             type_name="installed",
         )
@@ -1,7 +1,8 @@
-# Copyright 1999-2021 Gentoo Authors
+# Copyright 1999-2026 Gentoo Authors
 # Distributed under the terms of the GNU General Public License v2
 
 import warnings
+import weakref
 from itertools import chain
 
 import portage
@@ -52,6 +53,7 @@ class Package(Task):
         "_invalid",
         "_masks",
         "_metadata",
+        "_metadata_store",
         "_provided_cps",
         "_raw_metadata",
         "_provides",
@@ -102,11 +104,6 @@ class Package(Task):
         # the SlotObject constructor assigns self.root_config from keyword args
         # and is an instance of a '_emerge.RootConfig.RootConfig class
         self.root = self.root_config.root
-        self._raw_metadata = metadata
-        self._metadata = _PackageMetadataWrapper(self, metadata)
-        if not self.built:
-            self._metadata["CHOST"] = self.root_config.settings.get("CHOST", "")
-        eapi_attrs = _get_eapi_attrs(self.eapi)
 
         try:
             db = self.cpv._db
@@ -118,6 +115,14 @@ class Package(Task):
                 raise
             db = self.root_config.trees["porttree"].dbapi
 
+        store = self._metadata_store = _PackageMetadataStore.get(db)
+        store.intern_metadata(metadata)
+        self._raw_metadata = metadata
+        self._metadata = _PackageMetadataWrapper(self, metadata)
+        if not self.built:
+            self._metadata["CHOST"] = self.root_config.settings.get("CHOST", "")
+        eapi_attrs = _get_eapi_attrs(self.eapi)
+
         if self.type_name == "binary":
             self.remote = db.bintree.isremote(self.cpv)
         else:
@@ -142,7 +147,11 @@ class Package(Task):
 
         implicit_match = db._iuse_implicit_cnstr(self.cpv, self._metadata)
         self.iuse = self._iuse(
-            self, self._metadata["IUSE"].split(), implicit_match, self.eapi
+            self,
+            None,
+            implicit_match,
+            self.eapi,
+            parsed=store.iuse(self._metadata["IUSE"]),
         )
 
         if (self.iuse.enabled or self.iuse.disabled) and not eapi_attrs.iuse_defaults:
@@ -332,14 +341,7 @@ class Package(Task):
             if not v:
                 continue
             try:
-                atoms = use_reduce(
-                    v,
-                    eapi=dep_eapi,
-                    matchall=True,
-                    is_valid_flag=dep_valid_flag,
-                    token_class=Atom,
-                    flat=True,
-                )
+                atoms = self._metadata_store.dep_atoms(v, dep_eapi, dep_valid_flag)
             except InvalidDependString as e:
                 self._metadata_exception(k, e)
             else:
@@ -648,15 +650,16 @@ class Package(Task):
             self._expand_hidden = None
             self._force = None
             self._mask = None
-            self.enabled = frozenset(enabled_flags)
+            enabled = frozenset(enabled_flags)
             if pkg.built:
                 # Use IUSE to validate USE settings for built packages,
                 # in case the package manager that built this package
                 # failed to do that for some reason (or in case of
                 # data corruption).
-                missing_iuse = pkg.iuse.get_missing_iuse(self.enabled)
+                missing_iuse = pkg.iuse.get_missing_iuse(enabled)
                 if missing_iuse:
-                    self.enabled = self.enabled.difference(missing_iuse)
+                    enabled = enabled.difference(missing_iuse)
+            self.enabled = pkg._metadata_store.frozenset(enabled)
 
         def _init_force_mask(self):
             pkgsettings = self._pkg._get_pkgsettings()
@@ -760,10 +763,20 @@ class Package(Task):
             "tokens",
         )
 
-        def __init__(self, pkg, tokens, iuse_implicit_match, eapi):
+        def __init__(self, pkg, tokens, iuse_implicit_match, eapi, parsed=None):
+            """
+            @param parsed: the result of _parse for tokens, which may be
+                shared with other instances, in which case tokens is ignored
+            """
             self._pkg = pkg
-            self.tokens = tuple(tokens)
             self._iuse_implicit_match = iuse_implicit_match
+            if parsed is None:
+                parsed = self._parse(tokens)
+            self.tokens, self.enabled, self.disabled, self.all = parsed
+
+        @staticmethod
+        def _parse(tokens):
+            tokens = tuple(tokens)
             enabled = []
             disabled = []
             other = []
@@ -775,9 +788,12 @@ class Package(Task):
                     disabled.append(x[1:])
                 else:
                     other.append(x)
-            self.enabled = frozenset(enabled)
-            self.disabled = frozenset(disabled)
-            self.all = frozenset(chain(enabled, disabled, other))
+            return (
+                tokens,
+                frozenset(enabled),
+                frozenset(disabled),
+                frozenset(chain(enabled, disabled, other)),
+            )
 
         def is_valid_flag(self, flags):
             """
@@ -830,40 +846,44 @@ class Package(Task):
     def __lt__(self, other):
         if other.cp != self.cp:
             return self.cp < other.cp
-        result = portage.vercmp(self.version, other.version)
-        if result < 0:
+        key = self.cpv.version_key
+        other_key = other.cpv.version_key
+        if key < other_key:
             return True
-        if result == 0 and self.built and other.built:
+        if key == other_key and self.built and other.built:
             return self.build_time < other.build_time
         return False
 
     def __le__(self, other):
         if other.cp != self.cp:
             return self.cp <= other.cp
-        result = portage.vercmp(self.version, other.version)
-        if result <= 0:
+        key = self.cpv.version_key
+        other_key = other.cpv.version_key
+        if key <= other_key:
             return True
-        if result == 0 and self.built and other.built:
+        if key == other_key and self.built and other.built:
             return self.build_time <= other.build_time
         return False
 
     def __gt__(self, other):
         if other.cp != self.cp:
             return self.cp > other.cp
-        result = portage.vercmp(self.version, other.version)
-        if result > 0:
+        key = self.cpv.version_key
+        other_key = other.cpv.version_key
+        if key > other_key:
             return True
-        if result == 0 and self.built and other.built:
+        if key == other_key and self.built and other.built:
             return self.build_time > other.build_time
         return False
 
     def __ge__(self, other):
         if other.cp != self.cp:
             return self.cp >= other.cp
-        result = portage.vercmp(self.version, other.version)
-        if result >= 0:
+        key = self.cpv.version_key
+        other_key = other.cpv.version_key
+        if key >= other_key:
             return True
-        if result == 0 and self.built and other.built:
+        if key == other_key and self.built and other.built:
             return self.build_time >= other.build_time
         return False
 
@@ -997,3 +1017,122 @@ class _PackageMetadataWrapper(_PackageMetadataWrapperBase):
         if s:
             return s.split()
         return EBUILD_PHASES
+
+
+class _PackageMetadataStore:
+    """
+    Metadata values shared by the Package instances of one dbapi. The
+    packages of a dbapi, and especially the versions of one package,
+    commonly have identical KEYWORDS, LICENSE, IUSE and dependency
+    strings. The store keeps a single copy of each of those strings, and
+    of the IUSE sets, USE sets and dependency atoms parsed from them, so
+    that the memory that packages use grows with the number of distinct
+    values rather than with the number of packages.
+    """
+
+    __slots__ = ("__weakref__", "_atoms", "_frozensets", "_iuse", "_values")
+
+    # Keys that have a distinct value for nearly every package, which
+    # would only grow the store.
+    _distinct_keys = frozenset(
+        ("BUILD_ID", "BUILD_TIME", "COUNTER", "MD5", "SIZE", "_mtime_")
+    )
+
+    _stores = weakref.WeakKeyDictionary()
+
+    def __init__(self):
+        self._atoms = {}
+        self._frozensets = {}
+        self._iuse = {}
+        self._values = {}
+
+    @classmethod
+    def get(cls, db):
+        """
+        Return the store for the packages of db.
+        """
+        try:
+            return cls._stores[db]
+        except KeyError:
+            store = cls._stores[db] = cls()
+            return store
+        except TypeError:
+            # db does not support weak references.
+            return cls()
+
+    def intern_metadata(self, metadata):
+        """
+        Replace the values of metadata by equal values of the store.
+        """
+        values = self._values
+        distinct_keys = self._distinct_keys
+        for k, v in list(metadata.items()):
+            if k not in distinct_keys and isinstance(v, str):
+                metadata[k] = values.setdefault(v, v)
+
+    def frozenset(self, s):
+        """
+        Return a frozenset of the store which is equal to s.
+        """
+        return self._frozensets.setdefault(s, s)
+
+    def iuse(self, iuse_str):
+        """
+        Return Package._iuse._parse() of the tokens of iuse_str.
+        """
+        try:
+            return self._iuse[iuse_str]
+        except KeyError:
+            pass
+        tokens, enabled, disabled, all_flags = Package._iuse._parse(iuse_str.split())
+        result = self._iuse[iuse_str] = (
+            tokens,
+            self.frozenset(enabled),
+            self.frozenset(disabled),
+            self.frozenset(all_flags),
+        )
+        return result
+
+    def dep_atoms(self, depstr, eapi, is_valid_flag):
+        """
+        Return use_reduce(depstr, matchall=True, flat=True) with Atom
+        tokens, where the atoms are shared by all packages with the same
+        depstr and eapi. Raises InvalidDependString like use_reduce does
+        for the given is_valid_flag.
+        """
+        key = (depstr, eapi)
+        try:
+            atoms, flags = self._atoms[key]
+        except KeyError:
+            try:
+                atoms = use_reduce(
+                    depstr, eapi=eapi, matchall=True, token_class=Atom, flat=True
+                )
+            except InvalidDependString:
+                # Let use_reduce report the error for is_valid_flag, since
+                # it validates flags differently without is_valid_flag.
+                atoms = None
+            else:
+                flags = {
+                    token[:-1].lstrip("!")
+                    for token in depstr.split()
+                    if token.endswith("?")
+                }
+                for atom in atoms:
+                    if isinstance(atom, Atom) and atom.use and atom.use.conditional:
+                        for conditional_flags in atom.use.conditional.values():
+                            flags.update(conditional_flags)
+                atoms = tuple(atoms)
+                flags = tuple(sorted(flags))
+                self._atoms[key] = (atoms, flags)
+
+        if atoms is None or (is_valid_flag is not None and not is_valid_flag(flags)):
+            return use_reduce(
+                depstr,
+                eapi=eapi,
+                matchall=True,
+                is_valid_flag=is_valid_flag,
+                token_class=Atom,
+                flat=True,
+            )
+        return list(atoms)
@@ -37,8 +37,10 @@ from portage.util.path import first_existing
 from portage.util.SlotObject import SlotObject
 
 import _emerge
+from _emerge._build_history import BuildHistory, emerge_log_durations, mem_available
 from _emerge._find_deep_system_runtime_deps import _find_deep_system_runtime_deps
 from _emerge._flush_elog_mod_echo import _flush_elog_mod_echo
+from _emerge._merge_plan import resume_data
 from _emerge._observability import ObservabilityMonitor, format_resources
 from _emerge.BinpkgFetcher import BinpkgFetcher
 from _emerge.BinpkgPrefetcher import BinpkgPrefetcher
@@ -240,6 +242,22 @@ class Scheduler(PollScheduler):
                 settings["PORTAGE_CGROUP_ROOT"] = cg.emerge_root
                 settings.backup_changes("PORTAGE_CGROUP_ROOT")
                 settings.lock()
+        # id(task) -> BuildCost estimated for each running source build.
+        self._running_costs = {}
+        self._build_history = None
+        self._mem_budget = None
+        self._record_build_history = "build-history" in settings.features
+        self._critical_path_schedule = myopts.get("--schedule") == "critical-path"
+        # Package -> expected build time of the package and of the longest
+        # chain of packages that wait for it, for --schedule=critical-path.
+        self._critical_path = {}
+        if self._record_build_history or self._critical_path_schedule:
+            self._build_history = BuildHistory(
+                os.path.join(
+                    settings["EROOT"], portage.const.CACHE_PATH, "build_history"
+                )
+            )
+            self._mem_budget = mem_available()
         self._max_load = myopts.get("--load-average")
         max_jobs = myopts.get("--jobs", 1)
         self._set_max_jobs(max_jobs)
@@ -407,9 +425,12 @@ class Scheduler(PollScheduler):
         self._observability.note_phase(cpv, phase)
 
     def _cgroup_finish(self, build):
-        """Log the final cgroup resource summary for a build and remove it."""
+        """Log the final cgroup resource summary for a build and remove it.
+
+        Returns the counters that were logged, or None.
+        """
         if self._cgroup is None:
-            return
+            return None
         cpv = build.pkg.cpv
         # The only read of these counters: the cgroup goes away below, and
         # what the monitor keeps is what the merge goes on reporting. Log
@@ -424,6 +445,7 @@ class Scheduler(PollScheduler):
             self._sched_iface.output(f"{msg}\n", log_path=log_path)
             self._logger.log(f" {msg}")
         self._cgroup.destroy(cpv)
+        return resources
 
     def _init_graph(self, graph_config):
         """
@@ -548,6 +570,7 @@ class Scheduler(PollScheduler):
             self._mergelist = []
             self._world_atoms = None
             self._deep_system_deps.clear()
+            self._critical_path = {}
             return
 
         self._graph_config = graph_config
@@ -576,13 +599,18 @@ class Scheduler(PollScheduler):
             graph_config.graph = None
             graph_config.pkg_cache.clear()
             self._deep_system_deps.clear()
+            self._critical_path = {}
             for pkg in self._mergelist:
                 self._pkg_cache[pkg] = pkg
             return
 
+        # _prune_digraph() asks for the root nodes after every job.
+        self._digraph.enable_index()
         self._find_system_deps()
         self._prune_digraph()
         self._prevent_builddir_collisions()
+        if self._critical_path_schedule:
+            self._critical_path = self._critical_path_lengths()
         if "--debug" in self.myopts:
             writemsg("\nscheduler digraph:\n\n", noiselevel=-1)
             self._digraph.debug_print()
@@ -631,6 +659,66 @@ class Scheduler(PollScheduler):
                 break
             removed_nodes.clear()
 
+    def _critical_path_lengths(self):
+        """
+        For --schedule=critical-path, weight each package in the digraph
+        by its expected build time, and return the length of the longest
+        path from each package through the packages that depend on it.
+        Edges that close a cycle are ignored.
+        @rtype: dict
+        @return: Package -> seconds
+        """
+        graph = self._digraph
+        weights = {}
+        unknown = []
+        for node in graph:
+            if not isinstance(node, Package) or node.operation != "merge" or node.built:
+                continue
+            cost = self._build_history.estimate(node.cpv)
+            if cost is not None and cost.elapsed:
+                weights[node] = cost.elapsed
+            else:
+                unknown.append(node)
+
+        if unknown:
+            durations = emerge_log_durations(
+                os.path.join(_emerge.emergelog._emerge_log_dir, "emerge.log"),
+                {node.cp for node in unknown},
+            )
+            guessed = []
+            for node in unknown:
+                if node.cp in durations:
+                    weights[node] = durations[node.cp]
+                else:
+                    guessed.append(node)
+            # Packages built for the first time count as a typical build,
+            # or as one unit, so that the longest chain of builds wins.
+            default = sorted(weights.values())[len(weights) // 2] if weights else 1
+            for node in guessed:
+                weights[node] = default
+
+        lengths = {}
+        for start in graph:
+            if start in lengths:
+                continue
+            stack = [(start, iter(graph.parent_nodes(start)))]
+            on_stack = {start}
+            while stack:
+                node, parents = stack[-1]
+                for parent in parents:
+                    if parent not in lengths and parent not in on_stack:
+                        on_stack.add(parent)
+                        stack.append((parent, iter(graph.parent_nodes(parent))))
+                        break
+                else:
+                    stack.pop()
+                    on_stack.discard(node)
+                    lengths[node] = weights.get(node, 0) + max(
+                        (lengths.get(parent, 0) for parent in graph.parent_nodes(node)),
+                        default=0,
+                    )
+        return lengths
+
     def _prevent_builddir_collisions(self):
         """
         When building stages, sometimes the same exact cpv needs to be merged
@@ -838,6 +926,7 @@ class Scheduler(PollScheduler):
 
         if self._parallel_fetch:
             prefetchers = self._prefetchers
+            created = []
 
             for pkg in self._mergelist:
                 # mergelist can contain solved Blocker instances
@@ -845,13 +934,28 @@ class Scheduler(PollScheduler):
                     continue
                 prefetcher = self._create_prefetcher(pkg)
                 if prefetcher is not None:
-                    # This will start the first prefetcher immediately, so that
-                    # self._task() won't discard it. This avoids a case where
-                    # the first prefetcher is discarded, causing the second
-                    # prefetcher to occupy the fetch queue before the first
-                    # fetcher has an opportunity to execute.
-                    prefetchers[pkg] = prefetcher
-                    self._task_queues.fetch.add(prefetcher)
+                    created.append(prefetcher)
+
+            total = len(created)
+            for prefetcher in created:
+                if self._observability.enabled:
+                    prefetcher.addStartListener(
+                        lambda task: self._observability.note_fetch(
+                            task.pkg, total=total
+                        )
+                    )
+                    prefetcher.addExitListener(
+                        lambda task: self._observability.note_fetch(
+                            task.pkg, task.returncode, total
+                        )
+                    )
+                # This will start the first prefetcher immediately, so that
+                # self._task() won't discard it. This avoids a case where
+                # the first prefetcher is discarded, causing the second
+                # prefetcher to occupy the fetch queue before the first
+                # fetcher has an opportunity to execute.
+                prefetchers[prefetcher.pkg] = prefetcher
+                self._task_queues.fetch.add(prefetcher)
 
     def _create_prefetcher(self, pkg):
         """
@@ -1320,6 +1424,8 @@ class Scheduler(PollScheduler):
             self._observability.close()
             if self._cgroup is not None:
                 self._cgroup.close()
+            if self._build_history is not None:
+                self._build_history.save()
 
         # Cleanup any callbacks that have been registered with the global
         # event loop by calls to the terminate method.
@@ -1604,7 +1710,8 @@ class Scheduler(PollScheduler):
     def _build_exit(self, build):
         self._running_tasks.pop(id(build), None)
         self._observability.note_task_finished(build)
-        self._cgroup_finish(build)
+        resources = self._cgroup_finish(build)
+        self._running_costs.pop(id(build), None)
         self._release_job_token(id(build))
         if build.returncode == os.EX_OK and self._terminated_tasks:
             # We've been interrupted, so we won't
@@ -1614,6 +1721,12 @@ class Scheduler(PollScheduler):
             self._deallocate_config(build.settings)
         elif build.returncode == os.EX_OK:
             self.curval += 1
+            if self._record_build_history and not build.pkg.built:
+                self._build_history.record(
+                    build.pkg.cpv,
+                    self._observability.build_elapsed(build.pkg.cpv),
+                    resources,
+                )
             merge = PackageMerge(
                 is_system_pkg=(build.pkg in self._deep_system_deps),
                 merge=build,
@@ -1819,7 +1932,7 @@ class Scheduler(PollScheduler):
                 return None
             return self._pkg_queue.pop(0)
 
-        if not self._is_work_scheduled():
+        if not self._is_work_scheduled() and not self._critical_path:
             return self._pkg_queue.pop(0)
 
         self._prune_digraph()
@@ -1834,12 +1947,27 @@ class Scheduler(PollScheduler):
                 break
 
         if chosen_pkg is None:
+            ready = []
             later = set(self._pkg_queue)
             for pkg in self._pkg_queue:
                 later.remove(pkg)
                 if not self._dependent_on_scheduled_merges(pkg, later):
-                    chosen_pkg = pkg
-                    break
+                    ready.append(pkg)
+                    if self._build_history is None or len(ready) >= (
+                        self._critical_path_candidates
+                        if self._critical_path
+                        else self._history_candidates
+                    ):
+                        break
+            if self._build_history is None:
+                chosen_pkg = ready[0] if ready else None
+            else:
+                chosen_pkg = self._choose_by_history(ready)
+
+        if chosen_pkg is None and not self._is_work_scheduled():
+            # Ensure there is forward progress, as when the queue is not
+            # searched at all.
+            chosen_pkg = self._pkg_queue[0]
 
         if chosen_pkg is not None:
             self._pkg_queue.remove(chosen_pkg)
@@ -1852,6 +1980,56 @@ class Scheduler(PollScheduler):
 
         return chosen_pkg
 
+    # How many packages that are ready to build _choose_by_history() picks
+    # from. Looking further down the queue costs a dependency traversal per
+    # package, for builds that will mostly be started soon anyway.
+    # --schedule=critical-path looks further, since a long chain may start
+    # anywhere in the merge list.
+    _history_candidates = 8
+    _critical_path_candidates = 64
+
+    def _choose_by_history(self, ready):
+        """
+        Choose among packages that are ready to build, using the costs
+        recorded by FEATURES="build-history". Packages whose peak memory
+        would not fit next to that of the running builds are skipped, and
+        of the others the longest build is started first, so that it does
+        not end up running alone at the tail of the merge list. With
+        --schedule=critical-path, the build with the longest chain of
+        builds waiting for it is started first instead. Without estimates
+        this is the first ready package.
+        @param ready: packages that are ready to build, in merge list order
+        @type ready: list
+        @rtype: Package
+        @return: the chosen package, or None if none of them fits
+        """
+        history = self._build_history
+        running_mem = sum(cost.mem_peak or 0 for cost in self._running_costs.values())
+        candidates = []
+        for pkg in ready:
+            cost = None
+            if not pkg.built and not pkg.installed:
+                cost = history.estimate(pkg.cpv)
+            if (
+                cost is not None
+                and cost.mem_peak
+                and self._mem_budget is not None
+                and self._running_costs
+                and running_mem + cost.mem_peak > self._mem_budget
+            ):
+                continue
+            candidates.append((pkg, cost))
+        if not candidates:
+            return None
+        # max() returns the first of equal elements, so merge list order
+        # decides between packages with the same (or no) estimate.
+        if self._critical_path:
+            return max(candidates, key=lambda x: self._critical_path.get(x[0], 0))[0]
+        return max(
+            candidates,
+            key=lambda x: (x[1].elapsed or 0) if x[1] is not None else 0,
+        )[0]
+
     def _dependent_on_scheduled_merges(self, pkg, later):
         """
         Traverse the subgraph of the given packages deep dependencies
@@ -1964,7 +2142,14 @@ class Scheduler(PollScheduler):
                     def scale_to_jobs(num, p90):
                         # The newly started job is fully taken into account.
                         res = num
-                        res += running_job_count * p90
+                        # Running builds with recorded costs take what they
+                        # wrote last time, the others the 90th percentile.
+                        known = 0
+                        for cost in self._running_costs.values():
+                            if cost.io_write_bytes is not None:
+                                res += cost.io_write_bytes
+                                known += 1
+                        res += (running_job_count - known) * p90
                         return res
 
                     if (
@@ -2288,6 +2473,10 @@ class Scheduler(PollScheduler):
                 self._jobserver_tokens[id(task)] = token
                 self._running_tasks[id(task)] = task
                 self._observability.note_task_started(task)
+                if self._build_history is not None and not pkg.built:
+                    cost = self._build_history.estimate(pkg.cpv)
+                    if cost is not None:
+                        self._running_costs[id(task)] = cost
                 task.scheduler = self._sched_iface
                 self._task_queues.jobs.add(task)
 
@@ -2402,34 +2591,7 @@ class Scheduler(PollScheduler):
         a non-essential package with a broken digest.
         """
         mtimedb = self._mtimedb
-
-        mtimedb["resume"] = {}
-        # Stored as a dict starting with portage-2.1.6_rc1, and supported
-        # by >=portage-2.1.3_rc8. Versions <portage-2.1.3_rc8 only support
-        # a list type for options.
-        mtimedb["resume"]["myopts"] = self.myopts.copy()
-
-        # Convert Atom instances to plain str.
-        mtimedb["resume"]["favorites"] = [str(x) for x in self._favorites]
-        mtimedb["resume"]["mergelist"] = [
-            list(x)
-            for x in self._mergelist
-            if isinstance(x, Package) and x.operation == "merge"
-        ]
-        # Store binpkgs using the same keys as $PKGDIR/Packages plus EROOT.
-        mtimedb["resume"]["binpkgs"] = [
-            {
-                "CPV": str(x.cpv),
-                "BUILD_ID": x.cpv.build_id,
-                "BUILD_TIME": x.cpv.build_time,
-                "MTIME": x.cpv.mtime,
-                "SIZE": x.cpv.file_size,
-                "EROOT": x.root,
-            }
-            for x in self._mergelist
-            if isinstance(x, Package) and x.type_name == "binary"
-        ]
-
+        mtimedb["resume"] = resume_data(self.myopts, self._favorites, self._mergelist)
         mtimedb.commit()
 
     def _calc_resume_list(self):
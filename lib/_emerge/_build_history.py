@@ -0,0 +1,194 @@
+# Copyright 2026 Gentoo Authors
+# Distributed under the terms of the GNU General Public License v2
+
+"""
+Per-package build costs recorded across emerge runs.
+
+When FEATURES="build-history" is enabled, the Scheduler records the wall
+clock duration of every successful source build, along with the cgroup
+counters read by FEATURES="cgroup" (CPU time, peak memory and bytes
+written), in a JSON file under /var/cache/edb. The next emerge uses these
+estimates to decide which job to start and whether another one fits.
+
+Nothing here is required for a merge to succeed: an unreadable or
+unwritable file just means that there are no estimates.
+"""
+
+import json
+import logging
+import time
+from collections import namedtuple
+
+from portage import os
+from portage.exception import PortageException
+from portage.util import ensure_dirs, write_atomic, writemsg_level
+from portage.versions import catpkgsplit, cpv_getkey, cpv_getversion
+
+_FORMAT_VERSION = 1
+
+
+class BuildCost(namedtuple("BuildCost", "elapsed cpu_usec mem_peak io_write_bytes")):
+    """Recorded cost of building one package; unknown fields are None."""
+
+    __slots__ = ()
+
+
+class BuildHistory:
+    """Build costs by cp and version, loaded from and saved to path."""
+
+    # Versions kept per cp. Older ones are unlikely to be built again and
+    # the most recent one is what an unknown version is estimated from.
+    _max_versions = 4
+
+    def __init__(self, path):
+        self._path = path
+        self._packages = self._load(path)
+        # What this process recorded, merged into the file by save().
+        self._recorded = {}
+
+    @staticmethod
+    def _load(path):
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get("format") != _FORMAT_VERSION:
+            return {}
+        packages = data.get("packages")
+        if not isinstance(packages, dict):
+            return {}
+        return packages
+
+    def estimate(self, cpv):
+        """Return the BuildCost expected for cpv, or None if unknown.
+
+        A version that was never built is estimated from the most recently
+        built version of the same package.
+        """
+        versions = self._packages.get(cpv_getkey(cpv))
+        if not versions:
+            return None
+        entry = versions.get(cpv_getversion(cpv))
+        if entry is None:
+            entry = max(versions.values(), key=lambda x: x.get("time", 0))
+        return BuildCost(
+            entry.get("elapsed"),
+            entry.get("cpu_usec"),
+            entry.get("mem_peak"),
+            entry.get("io_write_bytes"),
+        )
+
+    def record(self, cpv, elapsed, resources=None):
+        """Record the cost of a successful build of cpv.
+
+        @param elapsed: wall clock duration of the build in seconds, or None
+        @param resources: final cgroup counters of the build, or None
+        """
+        entry = {"time": int(time.time())}
+        if elapsed is not None:
+            entry["elapsed"] = round(elapsed, 1)
+        if resources:
+            for k in BuildCost._fields[1:]:
+                if resources.get(k) is not None:
+                    entry[k] = resources[k]
+        if len(entry) == 1:
+            return
+        key = (cpv_getkey(cpv), cpv_getversion(cpv))
+        self._recorded[key] = entry
+        self._add(self._packages, key, entry)
+
+    def _add(self, packages, key, entry):
+        cp, version = key
+        versions = packages.setdefault(cp, {})
+        versions[version] = entry
+        if len(versions) > self._max_versions:
+            for old in sorted(versions, key=lambda v: versions[v].get("time", 0))[
+                : len(versions) - self._max_versions
+            ]:
+                del versions[old]
+
+    def save(self):
+        """Merge what was recorded into the file, if anything was."""
+        if not self._recorded:
+            return
+
+        # Another emerge may have saved its own records meanwhile.
+        packages = self._load(self._path)
+        for key, entry in self._recorded.items():
+            self._add(packages, key, entry)
+        content = json.dumps(
+            {"format": _FORMAT_VERSION, "packages": packages},
+            sort_keys=True,
+            separators=(",", ":"),
+        )
+        try:
+            ensure_dirs(os.path.dirname(self._path))
+            write_atomic(self._path, content + "\n", mode="w", encoding="utf-8")
+        except (OSError, PortageException) as e:
+            writemsg_level(
+                f"!!! Unable to save build history: {e}\n",
+                level=logging.WARNING,
+                noiselevel=-1,
+            )
+            return
+        self._packages = packages
+        self._recorded.clear()
+
+
+def emerge_log_durations(path, cps):
+    """Return how long the last emerge of each of cps took, from emerge.log.
+
+    The time between the ">>> emerge" and "::: completed emerge" lines
+    includes fetching and merging, and any wait for a job slot in between,
+    so it is only worth using for packages that have no recorded cost.
+
+    @param path: path of emerge.log
+    @param cps: cps to look for
+    @rtype: dict
+    @return: cp -> seconds
+    """
+    started = {}
+    durations = {}
+    try:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            for line in f:
+                if "emerge (" not in line:
+                    continue
+                timestamp, _, msg = line.partition(": ")
+                words = msg.split()
+                if len(words) < 6 or words[-2] != "to":
+                    continue
+                if words[:2] == [">>>", "emerge"]:
+                    done = False
+                elif words[:3] == [":::", "completed", "emerge"]:
+                    done = True
+                else:
+                    continue
+                split = catpkgsplit(words[-3])
+                if split is None or f"{split[0]}/{split[1]}" not in cps:
+                    continue
+                try:
+                    timestamp = int(timestamp)
+                except ValueError:
+                    continue
+                key = (words[-3], words[-1])
+                if not done:
+                    started[key] = timestamp
+                elif key in started:
+                    durations[f"{split[0]}/{split[1]}"] = timestamp - started.pop(key)
+    except OSError:
+        pass
+    return durations
+
+
+def mem_available():
+    """Return MemAvailable from /proc/meminfo in bytes, or None."""
+    try:
+        with open("/proc/meminfo", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
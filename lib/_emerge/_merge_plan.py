@@ -0,0 +1,300 @@
+# Copyright 2026 Gentoo Authors
+# Distributed under the terms of the GNU General Public License v2
+
+"""
+Merge plans for emerge --export-plan and --import-plan.
+
+A merge plan is the merge list of a resolved depgraph, serialized in the
+same form as the --resume data in the mtimedb, together with a
+fingerprint of the inputs that the resolution depended on: the command
+(action, arguments and options that affect resolution), the portage
+version, the user configuration in /etc/portage, the configuration
+variables set in the environment, the profiles, the repositories, the
+world file, the installed packages and the index timestamps of the
+binhosts. Each part of the fingerprint is a digest.
+
+A host whose fingerprint matches can load the plan the way emerge
+--resume loads its resume list, without resolving dependencies. Any
+difference, or a plan that can not be loaded, falls back to a normal
+resolution.
+
+Installed packages are identified by their version, SLOT, USE and
+repository rather than by the COUNTER of the vdb, so that hosts which
+installed the same packages at different times share a fingerprint.
+Repositories are identified by their metadata/timestamp.chk or
+metadata/timestamp.commit file where they have one (as synced
+repositories do), and by the sizes and modification times of their
+ebuilds and eclasses otherwise.
+"""
+
+import hashlib
+import json
+import os
+
+import portage
+from portage.const import INCREMENTALS, USER_CONFIG_PATH, WORLD_FILE, WORLD_SETS_FILE
+from portage.util import write_atomic
+
+from _emerge.Package import Package
+
+MERGE_PLAN_VERSION = 1
+
+# Options that do not affect the result of dependency resolution.
+_neutral_opts = frozenset(
+    (
+        "--alert",
+        "--ask",
+        "--ask-enter-invalid",
+        "--color",
+        "--columns",
+        "--export-plan",
+        "--fail-clean",
+        "--import-plan",
+        "--jobs",
+        "--keep-going",
+        "--load-average",
+        "--nospinner",
+        "--pretend",
+        "--quiet",
+        "--quiet-build",
+        "--quiet-fail",
+        "--quiet-repo-display",
+        "--tree",
+        "--unordered-display",
+        "--verbose",
+        "--verbose-conflicts",
+    )
+)
+
+# Variables that override the configuration when they are set in the
+# environment, besides INCREMENTALS and the USE_EXPAND variables.
+_env_vars = (
+    "ACCEPT_LICENSE",
+    "ACCEPT_PROPERTIES",
+    "ACCEPT_RESTRICT",
+    "EMERGE_DEFAULT_OPTS",
+)
+
+# Entries of a profile directory that are subprofiles rather than profile
+# data are not part of the profile.
+_profile_dir_prefixes = ("package.", "use.")
+
+_repo_timestamp_files = ("metadata/timestamp.chk", "metadata/timestamp.commit")
+
+
+def resume_data(myopts, favorites, mergelist):
+    """
+    Return the --resume data for mergelist, in the form that
+    Scheduler._save_resume_list stores in the mtimedb and that
+    depgraph._loadResumeCommand loads.
+    """
+    data = {}
+    # Stored as a dict starting with portage-2.1.6_rc1, and supported
+    # by >=portage-2.1.3_rc8. Versions <portage-2.1.3_rc8 only support
+    # a list type for options.
+    data["myopts"] = {
+        k: v for k, v in myopts.items() if k not in ("--export-plan", "--import-plan")
+    }
+
+    # Convert Atom instances to plain str.
+    data["favorites"] = [str(x) for x in favorites]
+    data["mergelist"] = [
+        list(x) for x in mergelist if isinstance(x, Package) and x.operation == "merge"
+    ]
+    # Store binpkgs using the same keys as $PKGDIR/Packages plus EROOT.
+    data["binpkgs"] = [
+        {
+            "CPV": str(x.cpv),
+            "BUILD_ID": x.cpv.build_id,
+            "BUILD_TIME": x.cpv.build_time,
+            "MTIME": x.cpv.mtime,
+            "SIZE": x.cpv.file_size,
+            "EROOT": x.root,
+        }
+        for x in mergelist
+        if isinstance(x, Package) and x.type_name == "binary"
+    ]
+    return data
+
+
+def _digest(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(json.dumps(part, sort_keys=True, default=str).encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _file_content(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read().decode("utf-8", "replace")
+    except OSError:
+        return None
+
+
+def _tree_contents(top, recursive=True, skip=()):
+    """Return (relative path, content) of the files below top, in order."""
+    result = []
+    try:
+        entries = sorted(os.listdir(top))
+    except OSError:
+        return result
+    for name in entries:
+        if name in skip or name.startswith("."):
+            continue
+        path = os.path.join(top, name)
+        if os.path.isdir(path):
+            if recursive or name.startswith(_profile_dir_prefixes):
+                result.extend(
+                    (os.path.join(name, relpath), content)
+                    for relpath, content in _tree_contents(path)
+                )
+        else:
+            result.append((name, _file_content(path)))
+    return result
+
+
+def _repo_state(repo):
+    for name in _repo_timestamp_files:
+        content = _file_content(os.path.join(repo.location, name))
+        if content is not None:
+            return [name, content]
+    files = []
+    for dirpath, dirnames, filenames in os.walk(repo.location):
+        dirnames[:] = sorted(x for x in dirnames if not x.startswith("."))
+        for name in sorted(filenames):
+            if name.endswith((".ebuild", ".eclass")):
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                files.append(
+                    [
+                        os.path.relpath(path, repo.location),
+                        st.st_size,
+                        st.st_mtime_ns,
+                    ]
+                )
+    return files
+
+
+def _env_overrides(settings):
+    """
+    Return the configuration variables that are set in the environment
+    of settings, as sorted (name, value) pairs.
+    """
+    env = settings.configdict["env"]
+    names = set(INCREMENTALS).union(_env_vars)
+    names.update(settings.get("USE_EXPAND", "").split())
+    names.update(settings.get("USE_EXPAND_UNPREFIXED", "").split())
+    return sorted((k, env[k]) for k in names if k in env)
+
+
+def merge_plan_fingerprint(settings, trees, myopts, myaction, myfiles):
+    """
+    Return the fingerprint of the inputs of a dependency resolution, as
+    a dict of the digests of its parts.
+    """
+    opts = sorted((k, v) for k, v in myopts.items() if k not in _neutral_opts)
+    fingerprint = {
+        "command": _digest(myaction, sorted(myfiles), opts, sorted(trees)),
+        "portage": str(portage.VERSION),
+    }
+
+    config_root = settings["PORTAGE_CONFIGROOT"]
+    fingerprint["config"] = _digest(
+        _tree_contents(
+            os.path.join(config_root, USER_CONFIG_PATH),
+            skip=("gnupg", "make.profile"),
+        )
+    )
+
+    environment = []
+    profiles = []
+    world = []
+    installed = []
+    binhosts = []
+    for root in sorted(trees):
+        root_settings = trees[root]["vartree"].settings
+        environment.append(_env_overrides(root_settings))
+        profiles.append(
+            [
+                [path, _tree_contents(path, recursive=False)]
+                for path in root_settings.profiles
+            ]
+        )
+        world.append(
+            [
+                _file_content(os.path.join(root, WORLD_FILE)),
+                _file_content(os.path.join(root, WORLD_SETS_FILE)),
+            ]
+        )
+        vardb = trees[root]["vartree"].dbapi
+        installed.append(
+            sorted(
+                [cpv] + vardb.aux_get(cpv, ["SLOT", "USE", "repository"])
+                for cpv in vardb.cpv_all()
+            )
+        )
+        binhosts.append(sorted(trees[root]["bintree"]._remote_timestamps.items()))
+    fingerprint["environment"] = _digest(environment)
+    fingerprint["profile"] = _digest(profiles)
+    fingerprint["world"] = _digest(world)
+    fingerprint["installed"] = _digest(installed)
+    fingerprint["binhost"] = _digest(binhosts)
+
+    fingerprint["repositories"] = _digest(
+        sorted(
+            [repo.name, repo.location, _repo_state(repo)]
+            for repo in settings.repositories
+        )
+    )
+    return fingerprint
+
+
+def export_merge_plan(
+    plan_file, settings, trees, myopts, myaction, myfiles, favorites, mergelist
+):
+    """
+    Write the merge plan of a resolved depgraph to plan_file. Raises
+    the errors of write_atomic if the file can not be written.
+    """
+    plan = {
+        "version": MERGE_PLAN_VERSION,
+        "fingerprint": merge_plan_fingerprint(
+            settings, trees, myopts, myaction, myfiles
+        ),
+        "resume": resume_data(myopts, favorites, mergelist),
+    }
+    write_atomic(plan_file, json.dumps(plan, indent=1, sort_keys=True) + "\n")
+
+
+def load_merge_plan(plan_file):
+    """
+    Read a merge plan. Raises OSError if the file can not be read, and
+    ValueError if it is not a merge plan that this version can load.
+    """
+    with open(plan_file, encoding="utf-8") as f:
+        plan = json.load(f)
+    if not isinstance(plan, dict) or plan.get("version") != MERGE_PLAN_VERSION:
+        raise ValueError(f"{plan_file}: unsupported merge plan format")
+    if not isinstance(plan.get("fingerprint"), dict) or not isinstance(
+        plan.get("resume"), dict
+    ):
+        raise ValueError(f"{plan_file}: invalid merge plan")
+    return plan
+
+
+def merge_plan_differences(plan, fingerprint):
+    """
+    Return the sorted names of the parts of fingerprint that differ from
+    the fingerprint of plan, which is empty if the plan applies.
+    """
+    expected = plan["fingerprint"]
+    return sorted(
+        k
+        for k in set(expected).union(fingerprint)
+        if expected.get(k) != fingerprint.get(k)
+    )
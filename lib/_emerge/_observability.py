@@ -11,12 +11,19 @@ under PORTAGE_RUN_PATH (e.g. /run/portage/emerge-<pid>.json).  External
 consumers can poll this file (see ``portageq jobs`` / ``emerge --status``).
 
 A Unix-domain socket at /run/portage/emerge-<pid>.sock additionally streams
-newline-delimited JSON snapshots: the current snapshot on connect, then one
-line per update.
-
-Every object carries a "type" field naming its kind ("snapshot" today).
-Consumers must dispatch on it and ignore kinds they do not know, so that
-other kinds can be added later without breaking them.
+newline-delimited JSON: the current snapshot on connect, then one snapshot
+per update, interleaved with one event per state change as it happens
+(job_started, phase_changed, job_finished, merge_finished, fetch_progress,
+resolver_phase_timing). Events carry a per-emerge sequence number, wall
+clock and monotonic timestamps, and the cgroup counters of the package
+they concern when FEATURES="cgroup" is enabled, so that phases shorter than
+the snapshot refresh interval are not missed. With
+PORTAGE_OBSERVABILITY_EVENT_LOG_SIZE set, events are also appended to a
+size-bounded log next to emerge.log, for replay after the fact.
+
+Every object carries a "type" field naming its kind ("snapshot" or the
+name of an event). Consumers must dispatch on it and ignore kinds they do
+not know, so that other kinds can be added later without breaking them.
 
 Everything here degrades silently: if the runtime directory is not
 writable (e.g. unprivileged, no /run) emerge proceeds unaffected.
@@ -37,10 +44,29 @@ from portage.util import atomic_ofstream, ensure_dirs, writemsg_level
 from portage.util.futures import asyncio
 from portage.util.human_readable import bytes_to_human
 
+import _emerge.emergelog
 from _emerge.PackageMerge import PackageMerge as _PackageMerge
 
 _SCHEMA_VERSION = 1
 
+EVENT_LOG_NAME = "emerge-events.ndjson"
+
+# Resolver timings reported before the Scheduler, and so the monitor that
+# publishes them, exists. See note_resolver_phase().
+_resolver_timings = []
+
+
+def note_resolver_phase(phase, elapsed, **fields):
+    """Record how long a stage of dependency resolution took.
+
+    The resolver runs before there is anything to publish to, so the
+    timings are kept here and emitted as resolver_phase_timing events by
+    the first ObservabilityMonitor that is enabled.
+    """
+    timing = {"phase": phase, "elapsed": elapsed}
+    timing.update(fields)
+    _resolver_timings.append(timing)
+
 
 def _task_pkg(task):
     """Return the Package associated with a running task, or None."""
@@ -288,6 +314,80 @@ def read_snapshots(eprefix=""):
     return [by_pid[pid] for pid in sorted(by_pid)]
 
 
+class EventLog:
+    """Append-only NDJSON file whose size is bounded by rotation.
+
+    When the file would grow past half of max_bytes it is renamed to
+    path + ".1", replacing the previous one, so that the two together hold
+    the most recent events and never much more than max_bytes. Each event
+    is one write to a file opened for appending, so concurrent emerge
+    processes may share the log. Before each write the open file is
+    compared with the one at path, and reopened if another process has
+    rotated it away in the meantime.
+    """
+
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self._segment_bytes = max(max_bytes // 2, 1)
+        self._file = None
+        self._file_id = None
+
+    def _current(self):
+        """Return whether the open file is still the one at path."""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        return (st.st_dev, st.st_ino) == self._file_id
+
+    def append(self, line):
+        """Append line, which must end with a newline. Raises OSError."""
+        if self._file is not None and not self._current():
+            self.close()
+        if self._file is None:
+            ensure_dirs(os.path.dirname(self.path))
+            self._file = open(self.path, "a", encoding="utf_8")
+            st = os.fstat(self._file.fileno())
+            self._file_id = (st.st_dev, st.st_ino)
+        self._file.write(line)
+        self._file.flush()
+        # The size of the file rather than tell(), which does not count
+        # what other processes have appended.
+        if os.fstat(self._file.fileno()).st_size >= self._segment_bytes:
+            current = self._current()
+            self.close()
+            if current:
+                _os.replace(self.path, self.path + ".1")
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._file_id = None
+
+
+def read_event_log(path):
+    """Return the events in the log at path, oldest first.
+
+    Lines that cannot be parsed, such as one cut short by a crash, are
+    skipped.
+    """
+    events = []
+    for segment in (path + ".1", path):
+        try:
+            with open(segment, encoding="utf_8", errors="replace") as f:
+                for line in f:
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        continue
+                    if isinstance(event, dict):
+                        events.append(event)
+        except OSError:
+            pass
+    return events
+
+
 def _pid_alive(pid):
     if pid <= 0:
         return False
@@ -445,6 +545,11 @@ class ObservabilityMonitor:
         self._phases = {}
         # str(cpv) -> _BuildTimes
         self._build_times = {}
+        # str(cpv) -> monotonic time at which the current phase began
+        self._phase_start = {}
+        self._event_seq = 0
+        self._event_log = None
+        self._fetches_done = 0
 
         self._status_path = None
         self._socket_path = None
@@ -464,30 +569,135 @@ class ObservabilityMonitor:
         self._status_path = os.path.join(run_dir, f"emerge-{pid}.json")
         self._socket_path = os.path.join(run_dir, f"emerge-{pid}.sock")
 
+        try:
+            # KiB, like the other size settings in make.conf.
+            event_log_size = int(
+                settings.get("PORTAGE_OBSERVABILITY_EVENT_LOG_SIZE") or 0
+            )
+        except ValueError:
+            event_log_size = 0
+        if event_log_size > 0:
+            self._event_log = EventLog(
+                os.path.join(_emerge.emergelog._emerge_log_dir, EVENT_LOG_NAME),
+                event_log_size * 1024,
+            )
+
+        for timing in _resolver_timings:
+            self.emit("resolver_phase_timing", **timing)
+        del _resolver_timings[:]
+
     def note_task_started(self, task):
         now = time.time()
         if self.enabled:
             self._task_start[id(task)] = now
         # Build timing is recorded either way: FEATURES="cgroup" reports a
         # build's average parallelism from it.
-        if not isinstance(task, _PackageMerge):
-            pkg = _task_pkg(task)
-            if pkg is not None:
-                self._build_times[str(pkg.cpv)] = _BuildTimes(now)
+        pkg = _task_pkg(task)
+        if pkg is None:
+            return
+        is_merge = isinstance(task, _PackageMerge)
+        if not is_merge:
+            self._build_times[str(pkg.cpv)] = _BuildTimes(now)
+        self.emit(
+            "job_started",
+            cpv=str(pkg.cpv),
+            kind="merge" if is_merge else "build",
+            binary=bool(getattr(pkg, "built", False)),
+        )
 
     def note_task_finished(self, task):
-        self._task_start.pop(id(task), None)
+        start = self._task_start.pop(id(task), None)
         pkg = _task_pkg(task)
         if pkg is None:
             return
         cpv = str(pkg.cpv)
         if isinstance(task, _PackageMerge):
+            if self.enabled:
+                times = self._build_times.get(cpv)
+                self.emit(
+                    "merge_finished",
+                    cpv=cpv,
+                    returncode=getattr(task, "returncode", None),
+                    elapsed=time.time() - start if start is not None else None,
+                    build_elapsed=self.build_elapsed(cpv),
+                    resources=times.resources if times is not None else None,
+                )
             self._phases.pop(cpv, None)
+            self._phase_start.pop(cpv, None)
             self._build_times.pop(cpv, None)
         else:
             times = self._build_times.get(cpv)
             if times is not None:
                 times.finished = time.time()
+            if self.enabled:
+                # The cgroup is still there: it is destroyed after this.
+                self.emit(
+                    "job_finished",
+                    cpv=cpv,
+                    kind="build",
+                    returncode=getattr(task, "returncode", None),
+                    elapsed=self.build_elapsed(cpv),
+                    **self._phase_ended(cpv),
+                    resources=self._live_resources(cpv),
+                )
+
+    def note_fetch(self, pkg, returncode=None, total=None):
+        """Record that a parallel fetch for pkg started, or finished with
+        returncode, out of total fetches queued for the merge list."""
+        if returncode is not None:
+            self._fetches_done += 1
+        self.emit(
+            "fetch_progress",
+            cpv=str(pkg.cpv),
+            state="started" if returncode is None else "finished",
+            returncode=returncode,
+            completed=self._fetches_done,
+            total=total,
+        )
+
+    def _live_resources(self, cpv):
+        cgroup = getattr(self._scheduler, "_cgroup", None)
+        if cgroup is None:
+            return None
+        return cgroup.read_stats(cpv) or None
+
+    def _phase_ended(self, cpv):
+        """Fields describing the phase of cpv that ends now, if any."""
+        phase = self._phases.get(cpv)
+        start = self._phase_start.pop(cpv, None)
+        if phase is None or start is None:
+            return {}
+        return {"phase": phase, "phase_elapsed": time.monotonic() - start}
+
+    def emit(self, event_type, **fields):
+        """Publish an event of the given type to socket clients and the
+        event log. Fields that are None are left out."""
+        if not self.enabled:
+            return
+        self._event_seq += 1
+        event = {
+            "type": event_type,
+            "schema": _SCHEMA_VERSION,
+            "emerge_pid": _os.getpid(),
+            "seq": self._event_seq,
+            "timestamp": time.time(),
+            "monotonic": time.monotonic(),
+        }
+        event.update((k, v) for k, v in fields.items() if v is not None)
+        line = json.dumps(event, sort_keys=True) + "\n"
+        if self._writers:
+            self._send_line(line.encode("utf_8"))
+        if self._event_log is not None:
+            try:
+                self._event_log.append(line)
+            except OSError as e:
+                writemsg_level(
+                    f"!!! observability: cannot write {self._event_log.path}: {e}\n",
+                    level=30,
+                    noiselevel=-1,
+                )
+                self._event_log.close()
+                self._event_log = None
 
     def note_build_resources(self, cpv, stats):
         """Keep the final cgroup counters for the build of cpv, and return them.
@@ -527,11 +737,23 @@ class ObservabilityMonitor:
             cpv = str(pkg.cpv)
             self._build_times.pop(cpv, None)
             self._phases.pop(cpv, None)
+            self._phase_start.pop(cpv, None)
 
     def note_phase(self, cpv, phase):
         if not self.enabled:
             return
-        self._phases[str(cpv)] = phase
+        cpv = str(cpv)
+        previous = self._phase_ended(cpv)
+        self._phases[cpv] = phase
+        self._phase_start[cpv] = time.monotonic()
+        self.emit(
+            "phase_changed",
+            cpv=cpv,
+            phase=phase,
+            previous_phase=previous.get("phase"),
+            previous_phase_elapsed=previous.get("phase_elapsed"),
+            resources=self._live_resources(cpv),
+        )
         self.update()
 
     def update(self, force=False):
@@ -665,7 +887,9 @@ class ObservabilityMonitor:
     def _broadcast(self, snapshot):
         if not self._writers:
             return
-        data = (json.dumps(snapshot, sort_keys=True) + "\n").encode("utf_8")
+        self._send_line((json.dumps(snapshot, sort_keys=True) + "\n").encode("utf_8"))
+
+    def _send_line(self, data):
         for writer in list(self._writers):
             if not self._send(writer, data):
                 self._writers.remove(writer)
@@ -686,6 +910,8 @@ class ObservabilityMonitor:
         # Nothing may publish after this: a later update() would re-arm the
         # timer and recreate the status file unlinked below.
         self.enabled = False
+        if self._event_log is not None:
+            self._event_log.close()
         if self._refresh_handle is not None:
             self._refresh_handle.cancel()
             self._refresh_handle = None
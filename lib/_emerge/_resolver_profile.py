@@ -0,0 +1,214 @@
+# Copyright 2026 Gentoo Authors
+# Distributed under the terms of the GNU General Public License v2
+
+"""
+Per-stage profile of dependency resolution.
+
+With emerge --profile-resolver, or PORTAGE_RESOLVER_PROFILE set in the
+environment or make.conf, every depgraph times a fixed set of its
+methods (the stages), counts how often each one runs, and counts hits and
+misses of its memoization dicts. One profile covers every depgraph of the
+process, so backtracking retries add up rather than replace each other.
+
+The totals are written as one JSON object when emerge exits: to the file
+named by PORTAGE_RESOLVER_PROFILE if that is an absolute path, otherwise
+to stderr. They are also handed to FEATURES="observability" as
+resolver_phase_timing events before the merge starts.
+
+Stage times are inclusive: a stage that calls another one counts the time
+spent in it too. A stage that recurses into itself is timed once, from
+its outermost call.
+
+When profiling is disabled, nothing is wrapped and the caches are plain
+dicts, so the resolver runs exactly as before.
+"""
+
+import json
+import logging
+import sys
+import time
+
+from portage import os
+from portage.exception import PortageException
+from portage.process import atexit_register
+from portage.util import write_atomic, writemsg_level
+
+from _emerge._observability import note_resolver_phase
+
+_FORMAT_VERSION = 1
+
+# depgraph methods timed as stages.
+STAGES = (
+    "select_files",
+    "_set_args",
+    "_create_graph",
+    "_add_pkg",
+    "_add_pkg_deps",
+    "_select_pkg_highest_available",
+    "_select_atoms_highest_available",
+    "_process_slot_conflicts",
+    "_solve_non_slot_operator_slot_conflicts",
+    "_complete_graph",
+    "_validate_blockers",
+    "_serialize_tasks",
+    "display",
+)
+
+# The profile of this process, created by get_profile().
+_profile = None
+
+
+class _Stage:
+    __slots__ = ("calls", "elapsed", "depth")
+
+    def __init__(self):
+        self.calls = 0
+        self.elapsed = 0.0
+        self.depth = 0
+
+
+class _CountingDict(dict):
+    """A dict that counts the hits and misses of its lookups."""
+
+    __slots__ = ("_counts",)
+
+    def __init__(self, counts):
+        super().__init__()
+        # [hits, misses], shared by every dict profiled under one name.
+        self._counts = counts
+
+    def get(self, key, default=None):
+        try:
+            value = dict.__getitem__(self, key)
+        except KeyError:
+            self._counts[1] += 1
+            return default
+        self._counts[0] += 1
+        return value
+
+    def __getitem__(self, key):
+        try:
+            value = dict.__getitem__(self, key)
+        except KeyError:
+            self._counts[1] += 1
+            raise
+        self._counts[0] += 1
+        return value
+
+
+class ResolverProfile:
+    def __init__(self):
+        self._start = time.monotonic()
+        # name -> _Stage
+        self._stages = {}
+        # name -> [hits, misses]
+        self._caches = {}
+        self._published = False
+
+    def instrument(self, obj, names=STAGES):
+        """Shadow each of the named methods of obj with a timed wrapper.
+
+        The wrappers are instance attributes, so this must be done before
+        any of the methods is stored elsewhere.
+        """
+        for name in names:
+            setattr(obj, name, self._wrap(name, getattr(obj, name)))
+
+    def _wrap(self, name, func):
+        stage = self._stages.get(name)
+        if stage is None:
+            stage = self._stages[name] = _Stage()
+
+        def wrapper(*args, **kwargs):
+            stage.calls += 1
+            if stage.depth:
+                return func(*args, **kwargs)
+            stage.depth += 1
+            start = time.monotonic()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stage.depth -= 1
+                stage.elapsed += time.monotonic() - start
+
+        return wrapper
+
+    def cache(self, name):
+        """Return an empty dict whose lookups count towards name."""
+        counts = self._caches.get(name)
+        if counts is None:
+            counts = self._caches[name] = [0, 0]
+        return _CountingDict(counts)
+
+    def results(self):
+        stages = {
+            name: {"calls": stage.calls, "elapsed": round(stage.elapsed, 6)}
+            for name, stage in self._stages.items()
+            if stage.calls
+        }
+        caches = {}
+        for name, (hits, misses) in self._caches.items():
+            lookups = hits + misses
+            caches[name] = {
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": round(hits / lookups, 4) if lookups else None,
+            }
+        return {
+            "format": _FORMAT_VERSION,
+            "elapsed": round(time.monotonic() - self._start, 6),
+            "stages": stages,
+            "caches": caches,
+        }
+
+    def publish(self):
+        """Hand the totals so far to FEATURES="observability", once."""
+        if self._published:
+            return
+        self._published = True
+        results = self.results()
+        for name, stage in results["stages"].items():
+            note_resolver_phase(name, stage["elapsed"], calls=stage["calls"])
+        note_resolver_phase(
+            "total", results["elapsed"], caches=results["caches"] or None
+        )
+
+    def write(self, path=None):
+        """Write the totals as JSON to path, or to stderr if path is None."""
+        content = json.dumps(self.results(), sort_keys=True) + "\n"
+        if path is None:
+            sys.stderr.write(content)
+            sys.stderr.flush()
+            return
+        try:
+            write_atomic(path, content, mode="w", encoding="utf-8")
+        except (OSError, PortageException) as e:
+            writemsg_level(
+                f"!!! Unable to write resolver profile: {e}\n",
+                level=logging.WARNING,
+                noiselevel=-1,
+            )
+
+
+def get_profile(myopts, settings):
+    """Return the profile of this process, or None if profiling is off.
+
+    The first call that finds profiling enabled creates the profile and
+    arranges for it to be written when emerge exits.
+    """
+    global _profile
+    output = settings.get("PORTAGE_RESOLVER_PROFILE")
+    if "--profile-resolver" not in myopts and not output:
+        return None
+    if _profile is None:
+        _profile = ResolverProfile()
+        atexit_register(
+            _profile.write, output if output and os.path.isabs(output) else None
+        )
+    return _profile
+
+
+def publish_profile():
+    """Publish the profile of this process, if there is one."""
+    if _profile is not None:
+        _profile.publish()
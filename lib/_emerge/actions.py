@@ -76,10 +76,23 @@ from portage.util.digraph import digraph
 from portage.util.path import first_existing
 from portage.util.SlotObject import SlotObject
 
+from _emerge._merge_plan import (
+    export_merge_plan,
+    load_merge_plan,
+    merge_plan_differences,
+    merge_plan_fingerprint,
+)
+from _emerge._observability import note_resolver_phase
+from _emerge._resolver_profile import publish_profile
 from _emerge.clear_caches import clear_caches
 from _emerge.create_depgraph_params import create_depgraph_params
 from _emerge.Dependency import Dependency
-from _emerge.depgraph import backtrack_depgraph, depgraph, resume_depgraph
+from _emerge.depgraph import (
+    backtrack_depgraph,
+    depgraph,
+    plan_depgraph,
+    resume_depgraph,
+)
 from _emerge.emergelog import emergelog
 from _emerge.is_valid_package_atom import is_valid_package_atom
 from _emerge.main import profile_check
@@ -288,6 +301,12 @@ def action_build(
             writemsg(f"{prefix}{line}\n")
         writemsg(prefix + "\n")
 
+    plan_graph = None
+    if not resume and "--resume" not in myopts and "--import-plan" in myopts:
+        plan_graph = _import_merge_plan(
+            settings, trees, myopts, myparams, myaction, myfiles, spinner
+        )
+
     if resume:
         favorites = mtimedb["resume"].get("favorites")
         if not isinstance(favorites, list):
@@ -303,10 +322,12 @@ def action_build(
 
         success = False
         mydepgraph = None
+        resolve_start = time.monotonic()
         try:
             success, mydepgraph, dropped_tasks = resume_depgraph(
                 settings, trees, mtimedb, myopts, myparams, spinner
             )
+            note_resolver_phase("resume", time.monotonic() - resolve_start)
         except (portage.exception.PackageNotFound, depgraph.UnsatisfiedResumeDep) as e:
             if isinstance(e, depgraph.UnsatisfiedResumeDep):
                 mydepgraph = e.depgraph
@@ -401,15 +422,19 @@ def action_build(
                 mtimedb.commit()
 
             return 1
+    elif plan_graph is not None:
+        mydepgraph, favorites = plan_graph
     else:
         if "--resume" in myopts:
             print(darkgreen("emerge: It seems we have nothing to resume..."))
             return os.EX_OK
 
+        resolve_start = time.monotonic()
         try:
             success, mydepgraph, favorites = backtrack_depgraph(
                 settings, trees, myopts, myparams, myaction, myfiles, spinner
             )
+            note_resolver_phase("calculate", time.monotonic() - resolve_start)
         except portage.exception.CorruptionKeyError:
             return 1
         except portage.exception.PackageSetNotFound as e:
@@ -461,6 +486,26 @@ def action_build(
             mydepgraph.display_problems()
             return 1
 
+        if "--export-plan" in myopts:
+            try:
+                export_merge_plan(
+                    myopts["--export-plan"],
+                    settings,
+                    trees,
+                    myopts,
+                    myaction,
+                    myfiles,
+                    favorites,
+                    mydepgraph.altlist(),
+                )
+            except (OSError, portage.exception.PortageException) as e:
+                writemsg_level(
+                    f"!!! Unable to write merge plan: {e}\n",
+                    level=logging.ERROR,
+                    noiselevel=-1,
+                )
+                return 1
+
     mergecount = None
     if (
         "--pretend" not in myopts
@@ -676,6 +721,7 @@ def action_build(
         if mergecount == 0:
             retval = os.EX_OK
         else:
+            publish_profile()
             mergetask = Scheduler(
                 settings,
                 trees,
@@ -708,6 +754,55 @@ def action_build(
             gpg.stop()
 
 
+def _import_merge_plan(settings, trees, myopts, myparams, myaction, myfiles, spinner):
+    """
+    Load the merge plan given with --import-plan, if it was exported for
+    the same inputs as the current command has. Return a tuple of the
+    depgraph and favorites of the plan, or None if dependencies have to
+    be resolved.
+    """
+    plan_file = myopts["--import-plan"]
+    try:
+        plan = load_merge_plan(plan_file)
+    except (OSError, ValueError) as e:
+        writemsg_level(
+            f"!!! Unable to read merge plan: {e}\n",
+            level=logging.ERROR,
+            noiselevel=-1,
+        )
+        return None
+
+    differences = merge_plan_differences(
+        plan, merge_plan_fingerprint(settings, trees, myopts, myaction, myfiles)
+    )
+    if differences:
+        writemsg_level(
+            f">>> Merge plan {plan_file} does not apply, since "
+            f"{', '.join(differences)} differ. Resolving dependencies.\n",
+            noiselevel=-1,
+        )
+        return None
+
+    resolve_start = time.monotonic()
+    success, mydepgraph = plan_depgraph(
+        settings, trees, plan["resume"], myopts, myparams, spinner
+    )
+    note_resolver_phase("import-plan", time.monotonic() - resolve_start)
+    if not success:
+        writemsg_level(
+            f">>> Merge plan {plan_file} contains packages that are "
+            "unavailable, masked or have unsatisfied dependencies. "
+            "Resolving dependencies.\n",
+            noiselevel=-1,
+        )
+        return None
+
+    favorites = plan["resume"].get("favorites")
+    if not isinstance(favorites, list):
+        favorites = []
+    return mydepgraph, favorites
+
+
 def action_config(settings, trees, myopts, myfiles):
     enter_invalid = "--ask-enter-invalid" in myopts
     uq = UserQuery(myopts)
@@ -1710,6 +1805,7 @@ def _calc_depclean(
             ignore_priority_range.extend(
                 range(UnmergeDepPriority.MIN, UnmergeDepPriority.MAX + 1)
             )
+            graph.enable_index(ignore_priority_range[1:])
             while graph:
                 for ignore_priority in ignore_priority_range:
                     nodes = graph.root_nodes(ignore_priority=ignore_priority)
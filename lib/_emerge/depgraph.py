@@ -77,6 +77,7 @@ from portage.util.portage_lru_cache import show_lru_cache_info
 from portage.versions import _pkg_str, catpkgsplit
 
 from _emerge._find_deep_system_runtime_deps import _find_deep_system_runtime_deps
+from _emerge._resolver_profile import get_profile as get_resolver_profile
 from _emerge._serialize_frontier import _FrontierDigraph, _SerializeFrontier
 from _emerge.AbstractDepPriority import AbstractDepPriority
 from _emerge.AtomArg import AtomArg
@@ -104,6 +105,10 @@ from _emerge.resolver.circular_dependency import circular_dependency_handler
 from _emerge.resolver.DbapiProvidesIndex import DbapiProvidesIndex
 from _emerge.resolver.output import Display, format_unmatched_atom
 from _emerge.resolver.package_tracker import PackageTracker, PackageTrackerDbapiWrapper
+from _emerge.resolver.parallel_backtracking import (
+    BacktrackSpeculator,
+    parallel_backtracking_supported,
+)
 from _emerge.resolver.slot_collision import slot_conflict_handler
 from _emerge.RootConfig import RootConfig
 from _emerge.search import search
@@ -313,8 +318,9 @@ class _frozen_depgraph_config:
         self.trees = {}
         self._trees_orig = trees
         self.roots = {}
+        self.profile = get_resolver_profile(myopts, settings)
         # All Package instances
-        self._pkg_cache = {}
+        self._pkg_cache = {} if self.profile is None else self.profile.cache("pkg")
         self._highest_license_masked = {}
         # We can't know that an soname dep is unsatisfied if there are
         # any unbuilt ebuilds in the graph, since unbuilt ebuilds have
@@ -688,9 +694,14 @@ class _dynamic_depgraph_config:
         self._unsatisfied_deps = []
         self._initially_unsatisfied_deps = []
         self._ignored_deps = []
-        self._highest_pkg_cache = {}
+        profile = depgraph._frozen_config.profile
+        if profile is None:
+            self._highest_pkg_cache = {}
+            self._flatten_atoms_cache = {}
+        else:
+            self._highest_pkg_cache = profile.cache("highest_pkg")
+            self._flatten_atoms_cache = profile.cache("flatten_atoms")
         self._highest_pkg_cache_cp_map = {}
-        self._flatten_atoms_cache = {}
         self._changed_deps_pkgs = {}
 
         # Binary packages that have been rejected because their USE
@@ -855,6 +866,9 @@ class depgraph:
         )
         self._rebuild = _rebuild_config(frozen_config, backtrack_parameters)
 
+        if frozen_config.profile is not None:
+            frozen_config.profile.instrument(self)
+
         self._select_atoms = self._select_atoms_highest_available
         self._select_package = self._select_pkg_highest_available
 
@@ -880,8 +894,19 @@ class depgraph:
                 # don't repeat this when backtracking
                 continue
             root_config = self._frozen_config.roots[root]
-            for cpv in self._frozen_config._trees_orig[root]["bintree"].dbapi.cpv_all():
-                bindb._provides_inject(self._pkg(cpv, "binary", root_config))
+            orig_bindb = self._frozen_config._trees_orig[root]["bintree"].dbapi
+            cpvs = orig_bindb.cpv_all()
+            db_keys = list(orig_bindb._aux_cache_keys)
+            # Load the metadata of every binary package in one batch, rather
+            # than through one aux_get() call per package.
+            all_metadata = bindb.aux_get_many(cpvs, db_keys)
+            for cpv in cpvs:
+                metadata = all_metadata.get(cpv)
+                if metadata is not None:
+                    metadata = zip(db_keys, metadata)
+                bindb._provides_inject(
+                    self._pkg(cpv, "binary", root_config, _metadata=metadata)
+                )
 
     def _load_vdb(self):
         """
@@ -8795,13 +8820,22 @@ class depgraph:
         return 1
 
     def _pkg(
-        self, cpv, type_name, root_config, installed=False, onlydeps=False, myrepo=None
+        self,
+        cpv,
+        type_name,
+        root_config,
+        installed=False,
+        onlydeps=False,
+        myrepo=None,
+        _metadata=None,
     ):
         """
         Get a package instance from the cache, or create a new
         one if necessary. Raises PackageNotFound from aux_get if it
         failures for some reason (package does not exist or is
-        corrupt).
+        corrupt). A caller that has already loaded the metadata, with
+        aux_get_many() for example, passes it as _metadata to skip the
+        aux_get() call.
         """
 
         # Ensure that we use the specially optimized RootConfig instance
@@ -8841,7 +8875,10 @@ class depgraph:
             )
 
             try:
-                metadata = zip(db_keys, db.aux_get(cpv, db_keys, myrepo=myrepo))
+                if _metadata is not None:
+                    metadata = _metadata
+                else:
+                    metadata = zip(db_keys, db.aux_get(cpv, db_keys, myrepo=myrepo))
             except CorruptionKeyError as e:
                 portage.writemsg(
                     colorize(
@@ -11803,7 +11840,8 @@ class _dep_check_composite_db(dbapi):
         dbapi.__init__(self)
         self._depgraph = depgraph
         self._root = root
-        self._match_cache = {}
+        profile = depgraph._frozen_config.profile
+        self._match_cache = {} if profile is None else profile.cache("dep_check_match")
         self._cpv_pkg_map = {}
 
     def _clear_cache(self):
@@ -12196,23 +12234,7 @@ def _backtrack_depgraph(
             settings, trees, myopts, myparams, spinner
         )
 
-    while backtracker:
-        if debug and mydepgraph is not None:
-            writemsg_level(
-                f"\n\nbacktracking try {backtracked} \n\n",
-                noiselevel=-1,
-                level=logging.DEBUG,
-            )
-            mydepgraph.display_problems()
-
-        backtrack_parameters = backtracker.get()
-        if debug and backtrack_parameters.runtime_pkg_mask:
-            writemsg_level(
-                f"\n\nruntime_pkg_mask: {backtrack_parameters.runtime_pkg_mask} \n\n",
-                noiselevel=-1,
-                level=logging.DEBUG,
-            )
-
+    def run(backtrack_parameters):
         mydepgraph = depgraph(
             settings,
             trees,
@@ -12224,19 +12246,78 @@ def _backtrack_depgraph(
             backtrack_parameters=backtrack_parameters,
         )
         success, favorites = mydepgraph.select_files(myfiles)
+        return mydepgraph, success, favorites
+
+    speculator = None
+    backtrack_jobs = myopts.get("--backtrack-jobs", 1)
+    if (
+        allow_backtracking
+        and backtrack_jobs > 1
+        and not debug
+        and parallel_backtracking_supported()
+    ):
+        speculator = BacktrackSpeculator(
+            lambda backtrack_parameters: run(backtrack_parameters)[:2],
+            backtrack_jobs,
+            frozen_config,
+        )
 
-        if (
-            success
-            or mydepgraph.need_config_change()
-            or not allow_backtracking
-            or backtracked >= max_retries
-        ):
-            break
-        elif mydepgraph.need_restart():
-            backtracked += 1
-            backtracker.feedback(mydepgraph.get_backtrack_infos())
-        elif backtracker:
-            backtracked += 1
+    try:
+        while backtracker:
+            if debug and mydepgraph is not None:
+                writemsg_level(
+                    f"\n\nbacktracking try {backtracked} \n\n",
+                    noiselevel=-1,
+                    level=logging.DEBUG,
+                )
+                mydepgraph.display_problems()
+
+            backtrack_parameters = backtracker.get()
+            if debug and backtrack_parameters.runtime_pkg_mask:
+                writemsg_level(
+                    f"\n\nruntime_pkg_mask: {backtrack_parameters.runtime_pkg_mask} \n\n",
+                    noiselevel=-1,
+                    level=logging.DEBUG,
+                )
+
+            outcome = None
+            if speculator is not None:
+                outcome = speculator.evaluate(backtracker, backtrack_parameters)
+            if outcome is not None:
+                success, need_config_change, need_restart, infos = outcome
+                if not (success or need_config_change or backtracked >= max_retries):
+                    # The depgraph of this node is discarded, as it would
+                    # be in serial mode, unless it is the last node.
+                    if need_restart:
+                        backtracked += 1
+                        backtracker.feedback(infos)
+                    elif backtracker:
+                        backtracked += 1
+                    if backtracker:
+                        mydepgraph = None
+                        continue
+
+            mydepgraph, success, favorites = run(backtrack_parameters)
+
+            if (
+                success
+                or mydepgraph.need_config_change()
+                or not allow_backtracking
+                or backtracked >= max_retries
+            ):
+                break
+            elif outcome is not None:
+                # The outcome of this node was fed back already, and it
+                # was only run again since it is the last one.
+                pass
+            elif mydepgraph.need_restart():
+                backtracked += 1
+                backtracker.feedback(mydepgraph.get_backtrack_infos())
+            elif backtracker:
+                backtracked += 1
+    finally:
+        if speculator is not None:
+            speculator.close()
 
     if backtracked and not success and not mydepgraph.need_display_problems():
         if debug:
@@ -12406,6 +12487,44 @@ def _resume_depgraph(
     return (success, mydepgraph, dropped_tasks)
 
 
+def plan_depgraph(
+    settings: portage.package.ebuild.config.config,
+    trees: portage._trees_dict,
+    resume_data: dict,
+    myopts: dict[str, Union[str, int, bool]],
+    myparams: dict[str, Union[str, bool]],
+    spinner: "_emerge.stdout_spinner.stdout_spinner",
+):
+    """
+    Construct a depgraph for the resume data of a merge plan that was
+    written by emerge --export-plan, without resolving its dependencies
+    again. Unlike with --resume, no task is dropped: if any package of
+    the plan is unavailable, masked or has unsatisfied dependencies, the
+    plan is rejected, so that the caller can resolve dependencies instead.
+    @rtype: tuple
+    @return: (success, depgraph)
+    """
+    start_time = time.monotonic()
+    _start_resolution_display(spinner, myopts)
+    try:
+        frozen_config = _frozen_depgraph_config(
+            settings, trees, myopts, myparams, spinner
+        )
+        mydepgraph = depgraph(
+            settings, trees, myopts, myparams, spinner, frozen_config=frozen_config
+        )
+        try:
+            success = mydepgraph._loadResumeCommand(
+                resume_data, skip_masked=False, skip_missing=False
+            )
+        except (portage.exception.PackageNotFound, depgraph.UnsatisfiedResumeDep):
+            success = False
+        return (success, mydepgraph)
+    finally:
+        if spinner is not None and spinner.end_notice():
+            _show_resolution_report(start_time)
+
+
 def get_mask_info(
     root_config,
     cpv,
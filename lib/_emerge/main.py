@@ -38,6 +38,7 @@ options = [
     "--oneshot",
     "--onlydeps",
     "--pretend",
+    "--profile-resolver",
     "--quiet-repo-display",
     "--quiet-unmerge-warn",
     "--resume",
@@ -387,6 +388,11 @@ def parse_opts(tmpcmdline, silent=False):
             + "calculation fails ",
             "action": "store",
         },
+        "--backtrack-jobs": {
+            "help": "Specifies the number of backtracking candidates "
+            + "to evaluate concurrently",
+            "action": "store",
+        },
         "--binpkg-changed-deps": {
             "help": ("reject binary packages with outdated " "dependencies"),
             "choices": true_y_or_n,
@@ -459,6 +465,12 @@ def parse_opts(tmpcmdline, silent=False):
             + "matches any of the given package atoms.",
             "action": "append",
         },
+        "--export-plan": {
+            "help": "write the resolved merge list, together with a "
+            + "fingerprint of the inputs of the resolution, to the given "
+            + "file for use with --import-plan",
+            "action": "store",
+        },
         "--fail-clean": {
             "help": "clean temp files after build failure",
             "choices": true_y_or_n,
@@ -467,6 +479,12 @@ def parse_opts(tmpcmdline, silent=False):
             "help": "Enable or disable fuzzy search",
             "choices": true_y_or_n,
         },
+        "--import-plan": {
+            "help": "use the merge list of a file written by --export-plan "
+            + "instead of resolving dependencies, if its fingerprint "
+            + "matches this system",
+            "action": "store",
+        },
         "--ignore-built-slot-operator-deps": {
             "help": "Ignore the slot/sub-slot := operator parts of dependencies that have "
             "been recorded when packages where built. This option is intended "
@@ -677,6 +695,10 @@ def parse_opts(tmpcmdline, silent=False):
             "help": "modify interpretation of dependencies",
             "choices": ("True", "rdeps"),
         },
+        "--schedule": {
+            "help": "order in which to start parallel builds",
+            "choices": ("merge-order", "critical-path"),
+        },
         "--search-index": {
             "help": "Enable or disable indexed search (enabled by default)",
             "choices": y_or_n,
@@ -1003,6 +1025,21 @@ def parse_opts(tmpcmdline, silent=False):
 
         myoptions.backtrack = backtrack
 
+    if myoptions.backtrack_jobs is not None:
+        try:
+            backtrack_jobs = int(myoptions.backtrack_jobs)
+        except (OverflowError, ValueError):
+            backtrack_jobs = 0
+
+        if backtrack_jobs < 1:
+            backtrack_jobs = None
+            if not silent:
+                parser.error(
+                    f"Invalid --backtrack-jobs parameter: '{myoptions.backtrack_jobs}'\n"
+                )
+
+        myoptions.backtrack_jobs = backtrack_jobs
+
     if myoptions.deep is not None:
         deep = None
         if myoptions.deep == "True":
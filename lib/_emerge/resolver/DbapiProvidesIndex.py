@@ -23,6 +23,7 @@ class DbapiProvidesIndex:
 
     _copy_attrs = (
         "aux_get",
+        "aux_get_many",
         "aux_update",
         "categories",
         "cpv_all",
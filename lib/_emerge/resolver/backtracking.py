@@ -1,4 +1,4 @@
-# Copyright 2010-2012 Gentoo Foundation
+# Copyright 2010-2026 Gentoo Authors
 # Distributed under the terms of the GNU General Public License v2
 
 import copy
@@ -138,6 +138,24 @@ class Backtracker:
             return copy.deepcopy(node.parameter)
         return None
 
+    def current_node(self):
+        """
+        Returns an opaque handle for the node whose parameter get() returned last.
+        """
+        return self._current_node
+
+    def upcoming(self, count):
+        """
+        Returns (handle, parameter) for up to count unexplored nodes, in the order in
+        which get() returns them unless feedback() adds nodes in between.
+        """
+        if count <= 0:
+            return []
+        return [
+            (node, copy.deepcopy(node.parameter))
+            for node in reversed(self._unexplored_nodes[-count:])
+        ]
+
     def __len__(self):
         return len(self._unexplored_nodes)
 
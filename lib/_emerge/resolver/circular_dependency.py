@@ -63,6 +63,7 @@ class circular_dependency_handler:
         """
         display_order = []
         tempgraph = self.graph.copy()
+        tempgraph.enable_index()
         while tempgraph:
             nodes = tempgraph.leaf_nodes()
             if not nodes:
@@ -302,6 +303,7 @@ class circular_dependency_handler:
         and call the debug_print() method.
         """
         graph = self.graph.copy()
+        graph.enable_index((DepPrioritySatisfiedRange.ignore_medium_soft,))
         while True:
             root_nodes = graph.root_nodes(
                 ignore_priority=DepPrioritySatisfiedRange.ignore_medium_soft
@@ -4,15 +4,21 @@
 import bisect
 import collections
 
+from portage import versions
 from portage.dep import Atom, match_from_list
-from portage.util import cmp_sort_key
-from portage.versions import vercmp
 
 _PackageConflict = collections.namedtuple(
     "_PackageConflict", ["root", "pkgs", "atom", "description"]
 )
 
 
+def _version_key(pkg):
+    try:
+        return pkg.cpv.version_key
+    except AttributeError:
+        return versions._version_key(pkg.version)
+
+
 class PackageConflict(_PackageConflict):
     """
     Class to track the reason for a conflict and the conflicting packages.
@@ -252,7 +258,7 @@ class PackageTracker:
                     candidates.append(installed)
 
         ret = match_from_list(atom, candidates)
-        ret.sort(key=cmp_sort_key(lambda x, y: vercmp(x.version, y.version)))
+        ret.sort(key=_version_key)
         self._match_cache[cp_key][cache_key] = ret
 
         return iter(ret)
@@ -379,7 +385,7 @@ class PackageTrackerDbapiWrapper:
 
         ret = sorted(
             self._package_tracker.match(self._root, atom),
-            key=cmp_sort_key(lambda x, y: vercmp(x.version, y.version)),
+            key=_version_key,
         )
         return ret
 
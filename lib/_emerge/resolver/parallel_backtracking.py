@@ -0,0 +1,162 @@
+# Copyright 2026 Gentoo Authors
+# Distributed under the terms of the GNU General Public License v2
+
+import copy
+import io
+import multiprocessing
+import os
+import pickle
+
+import portage
+from portage.dbapi import dbapi
+from portage.package.ebuild.config import config
+from portage.util.futures import asyncio
+from portage.util.futures.executor.fork import ForkExecutor
+
+from _emerge.Package import Package
+from _emerge.RootConfig import RootConfig
+
+
+def parallel_backtracking_supported():
+    """
+    Workers share the state of the resolver copy-on-write, which requires
+    the fork start method of multiprocessing.
+    """
+    return hasattr(os, "fork") and multiprocessing.get_start_method() == "fork"
+
+
+class _ResultPickler(pickle.Pickler):
+    """
+    Pickle the result of a worker, referring to packages and root
+    configs by their keys rather than by value, since the resolver
+    in the parent process already has equal instances of them.
+    """
+
+    def persistent_id(self, obj):
+        if isinstance(obj, Package):
+            return ("package", obj._hash_key)
+        if isinstance(obj, RootConfig):
+            return ("root_config", obj.root)
+        if isinstance(obj, (config, dbapi)):
+            raise pickle.PicklingError(f"unable to pickle {obj!r}")
+        return None
+
+
+class _ResultUnpickler(pickle.Unpickler):
+    def __init__(self, file, frozen_config):
+        super().__init__(file)
+        self._frozen_config = frozen_config
+        self._packages = None
+
+    def persistent_load(self, pid):
+        kind, key = pid
+        if kind == "root_config":
+            return self._frozen_config.roots[key]
+        if self._packages is None:
+            self._packages = {
+                pkg._hash_key: pkg for pkg in self._frozen_config._pkg_cache
+            }
+        try:
+            return self._packages[key]
+        except KeyError:
+            # The worker created a package that this process has not
+            # seen yet, so the caller has to run the candidate itself.
+            raise pickle.UnpicklingError(f"unknown package {key!r}")
+
+
+def _run_candidate(run, backtrack_parameters):
+    # Anything that the depgraph of a candidate displays is displayed
+    # again by the parent process if it decides to keep the result.
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    os.dup2(devnull, 2)
+    os.close(devnull)
+    portage.util.noiselimit = -2
+
+    mydepgraph, success = run(backtrack_parameters)
+    need_restart = mydepgraph.need_restart()
+    result = (
+        success,
+        mydepgraph.need_config_change(),
+        need_restart,
+        mydepgraph.get_backtrack_infos() if need_restart else None,
+    )
+    buf = io.BytesIO()
+    _ResultPickler(buf, protocol=pickle.HIGHEST_PROTOCOL).dump(result)
+    return buf.getvalue()
+
+
+class BacktrackSpeculator:
+    """
+    Evaluate backtrack candidates ahead of time in forked workers, for
+    emerge --backtrack-jobs. When the serial backtracking loop takes the
+    next node from the Backtracker, the node and the nodes that the
+    Backtracker would hand out after it are run concurrently, and the
+    loop receives the outcome of its node as if it had run the depgraph
+    itself: whether it succeeded, whether it needs a config change, and
+    the backtrack infos that it would feed back. The nodes are consumed
+    in the same order as in serial mode, so the result is the same.
+
+    The loop still runs a node itself if its depgraph is kept, that is
+    if it ends the loop, since a depgraph can not be passed between
+    processes, or if the outcome could not be passed.
+    """
+
+    def __init__(self, run, jobs, frozen_config):
+        """
+        @param run: function that returns a tuple of the depgraph for the
+            given backtrack parameters and its select_files success
+        @param jobs: maximum number of concurrent workers
+        @param frozen_config: the _frozen_depgraph_config shared by the
+            depgraphs of run
+        """
+        self._run = run
+        self._jobs = jobs
+        self._frozen_config = frozen_config
+        self._loop = asyncio._safe_loop()
+        self._executor = ForkExecutor(max_workers=jobs, loop=self._loop)
+        # Futures by the id of their node. The node is kept along with
+        # its future, so that its id is not reused while it is pending.
+        self._futures = {}
+
+    def _submit(self, node, backtrack_parameters):
+        if id(node) not in self._futures:
+            self._futures[id(node)] = (
+                node,
+                self._executor.submit(
+                    _run_candidate, self._run, copy.deepcopy(backtrack_parameters)
+                ),
+            )
+
+    def evaluate(self, backtracker, backtrack_parameters):
+        """
+        Return the outcome of the node that backtracker.get() returned
+        last, which has the given parameters, as a tuple of success,
+        need_config_change, need_restart and backtrack infos. Return None
+        if the caller has to run the node itself.
+        """
+        node = backtracker.current_node()
+        upcoming = backtracker.upcoming(self._jobs - 1)
+        if id(node) not in self._futures and not upcoming:
+            # Nothing would run concurrently with this node.
+            return None
+        self._submit(node, backtrack_parameters)
+        for upcoming_node, parameters in upcoming:
+            self._submit(upcoming_node, parameters)
+
+        _, future = self._futures.pop(id(node))
+        try:
+            data = self._loop.run_until_complete(future)
+        except Exception:
+            return None
+        try:
+            return _ResultUnpickler(io.BytesIO(data), self._frozen_config).load()
+        except (pickle.UnpicklingError, AttributeError, EOFError, ImportError):
+            return None
+
+    def close(self):
+        """Cancel the evaluation of nodes that were not needed."""
+        for _, future in self._futures.values():
+            future.cancel()
+        self._futures.clear()
+        self._executor.shutdown(wait=True)
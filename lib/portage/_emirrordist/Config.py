@@ -1,4 +1,4 @@
-# Copyright 2013-2021 Gentoo Authors
+# Copyright 2013-2026 Gentoo Authors
 # Distributed under the terms of the GNU General Public License v2
 
 import copy
@@ -9,6 +9,7 @@ import time
 
 from portage.package.ebuild.fetch import MirrorLayoutConfig
 from portage.util import grabdict, grablines
+from portage.util.shelve import SqliteShelf, is_sqlite_shelf
 
 from .ContentDB import ContentDB
 
@@ -120,6 +121,8 @@ class Config:
 
         if dry_run and not os.path.exists(db_file):
             db = {}
+        elif is_sqlite_shelf(db_file):
+            db = SqliteShelf(db_file, flag=open_flag)
         else:
             try:
                 db = shelve.open(db_file, flag=open_flag)
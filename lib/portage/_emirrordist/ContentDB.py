@@ -1,4 +1,4 @@
-# Copyright 2021 Gentoo Authors
+# Copyright 2021-2026 Gentoo Authors
 # Distributed under the terms of the GNU General Public License v2
 
 import logging
@@ -7,6 +7,7 @@ import shelve
 import typing
 
 from portage.package.ebuild.fetch import DistfileName
+from portage.util.shelve import SqliteShelf
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +28,33 @@ class ContentDB:
 
     def __init__(self, shelve_instance: shelve.Shelf):
         self._shelve = shelve_instance
+        self._sqlite = isinstance(shelve_instance, SqliteShelf)
+
+    def _add_member(self, key, member):
+        if self._sqlite:
+            # Add a single row, instead of rewriting the whole set.
+            self._shelve.add_member(key, member)
+            return
+        try:
+            members = self._shelve[key]
+        except KeyError:
+            members = set()
+        members.add(member)
+        self._shelve[key] = members
+
+    def _discard_member(self, key, member):
+        if self._sqlite:
+            self._shelve.discard_member(key, member)
+            return
+        try:
+            members = self._shelve[key]
+        except KeyError:
+            return
+        members.discard(member)
+        if members:
+            self._shelve[key] = members
+        else:
+            del self._shelve[key]
 
     def add(self, filename: DistfileName):
         """
@@ -41,17 +69,7 @@ class ContentDB:
         distfile_key = f"filename:{distfile_str}"
         for k, v in filename.digests.items():
             if k != "size":
-                digest_key = f"digest:{k.upper()}:{v.lower()}"
-                try:
-                    digest_files = self._shelve[digest_key]
-                except KeyError:
-                    digest_files = set()
-                digest_files.add(distfile_str)
-                self._shelve[digest_key] = digest_files
-        try:
-            content_revisions = self._shelve[distfile_key]
-        except KeyError:
-            content_revisions = set()
+                self._add_member(f"digest:{k.upper()}:{v.lower()}", distfile_str)
 
         revision_key = tuple(
             sorted(
@@ -63,8 +81,7 @@ class ContentDB:
                 key=operator.itemgetter(0),
             )
         )
-        content_revisions.add(revision_key)
-        self._shelve[distfile_key] = content_revisions
+        self._add_member(distfile_key, revision_key)
 
     def remove(self, filename: DistfileName):
         """
@@ -92,28 +109,12 @@ class ContentDB:
                     remaining.add(revision_key)
                     continue
                 for k, v in revision_key:
-                    digest_key = f"digest:{k}:{v}"
-                    try:
-                        digest_files = self._shelve[digest_key]
-                    except KeyError:
-                        digest_files = set()
-
-                    try:
-                        digest_files.remove(filename)
-                    except KeyError:
-                        pass
-
-                    if digest_files:
-                        self._shelve[digest_key] = digest_files
-                    else:
-                        try:
-                            del self._shelve[digest_key]
-                        except KeyError:
-                            pass
+                    self._discard_member(f"digest:{k}:{v}", str(filename))
 
             if remaining:
                 logger.debug(f"drop '{filename}' revision(s) from content db")
-                self._shelve[distfile_key] = remaining
+                for revision_key in content_revisions - remaining:
+                    self._discard_member(distfile_key, revision_key)
             else:
                 logger.debug(f"drop '{filename}' from content db")
                 try:
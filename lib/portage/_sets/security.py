@@ -1,4 +1,4 @@
-# Copyright 2007-2020 Gentoo Authors
+# Copyright 2007-2026 Gentoo Authors
 # Distributed under the terms of the GNU General Public License v2
 
 from portage import glsa
@@ -33,6 +33,11 @@ class SecuritySet(PackageSet):
 
     def load(self):
         glsaindexlist = self.getGlsaList(self._skip_applied)
+        # Only the GLSAs that affect installed packages can contribute to
+        # the merge list.
+        glsaindexlist = glsa.GlsaIndex(self._settings).affected(
+            self._vardbapi, glsaindexlist, match_arch=False
+        )
         atomlist = []
         for glsaid in glsaindexlist:
             myglsa = glsa.Glsa(glsaid, self._settings, self._vardbapi, self._portdbapi)
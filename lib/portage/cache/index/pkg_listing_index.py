@@ -0,0 +1,237 @@
+# Copyright 2026 Gentoo Authors
+# Distributed under the terms of the GNU General Public License v2
+
+"""
+Index of the category and package directories of a repository.
+
+portdbapi lists a package directory for every cp_list() of it, and the
+category directories of every repository for cp_all() and for the
+repository lookups of _better_cache. The index records those listings
+together with the mtime of each directory, so that a stat() can stand in
+for the listdir() while the directory is unchanged. Entries whose
+directory has changed since are ignored, and the directory is listed as
+before, so a stale index is slow but never wrong.
+
+The index is kept at metadata/pkg_listing_index, in the repository or,
+when that is not writable, under the same path in the depcachedir, like
+metadata/pkg_desc_index. egencache --update-pkg-listing-index writes it,
+and emerge --sync updates the depcachedir copy after each sync. Updates
+only list the directories whose mtime changed.
+"""
+
+import json
+import time
+
+from portage import os
+from portage.const import VCS_DIRS
+from portage.dep import Atom
+from portage.exception import InvalidAtom
+from portage.util import write_atomic
+from portage.versions import pkgsplit, ver_regexp
+
+PKG_LISTING_INDEX = os.path.join("metadata", "pkg_listing_index")
+
+_FORMAT_VERSION = 1
+
+# Directories modified this shortly (in nanoseconds) before an update are
+# not recorded, since a second change within the same mtime tick would go
+# unnoticed.
+_racy_ns = 2 * 10**9
+
+
+def pkg_listing_index_paths(location, depcachedir):
+    """Return the paths where the index of the repository at location
+    may be, the one inside the repository first."""
+    return (
+        os.path.join(location, PKG_LISTING_INDEX),
+        os.path.join(depcachedir, location.lstrip(os.sep), PKG_LISTING_INDEX),
+    )
+
+
+def _mtime_ns(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+class PkgListingIndex:
+    """
+    Directory listings of one repository. category() and package() return
+    None whenever the answer is not known to be current, in which case the
+    caller lists the directory itself.
+    """
+
+    __slots__ = ("location", "_root", "_absent", "_categories", "_packages")
+
+    def __init__(self, location, root=None, absent=(), categories=None, packages=None):
+        self.location = location
+        # mtime of the repository directory, which vouches for absent.
+        self._root = root
+        # Categories that have no directory in the repository.
+        self._absent = frozenset(absent)
+        # cat -> [mtime_ns, [pn, ...]]
+        self._categories = {} if categories is None else categories
+        # cp -> [mtime_ns, [pf, ...]]
+        self._packages = {} if packages is None else packages
+
+    def category(self, cat):
+        """Return the package names in cat, or None if unknown."""
+        entry = self._categories.get(cat)
+        if entry is None:
+            if (
+                cat in self._absent
+                and self._root is not None
+                and _mtime_ns(self.location) == self._root
+            ):
+                return []
+            return None
+        if _mtime_ns(os.path.join(self.location, cat)) != entry[0]:
+            return None
+        return entry[1]
+
+    def package(self, cp):
+        """Return the PFs of the ebuilds of cp, or None if unknown."""
+        entry = self._packages.get(cp)
+        if entry is None or _mtime_ns(os.path.join(self.location, cp)) != entry[0]:
+            return None
+        return entry[1]
+
+    @classmethod
+    def load(cls, location, paths):
+        """Load the most recently written of the indexes at paths that
+        belongs to location. Return None if there is none."""
+        newest = None
+        for path in paths:
+            mtime = _mtime_ns(path)
+            if mtime is not None and (newest is None or mtime > newest[0]):
+                newest = (mtime, path)
+        if newest is None:
+            return None
+        try:
+            with open(newest[1], encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if (
+            not isinstance(data, dict)
+            or data.get("format") != _FORMAT_VERSION
+            or data.get("location") != location
+        ):
+            return None
+        return cls(
+            location,
+            root=data.get("root"),
+            absent=data.get("absent", ()),
+            categories=data.get("categories"),
+            packages=data.get("packages"),
+        )
+
+    def write(self, path):
+        """Write the index to path. Raises OSError or PortageException."""
+        content = json.dumps(
+            {
+                "format": _FORMAT_VERSION,
+                "location": self.location,
+                "root": self._root,
+                "absent": sorted(self._absent),
+                "categories": self._categories,
+                "packages": self._packages,
+            },
+            sort_keys=True,
+            separators=(",", ":"),
+        )
+        write_atomic(path, content + "\n", mode="w", encoding="utf-8")
+
+
+def _list_category(cat_dir, cat):
+    pns = []
+    with os.scandir(cat_dir) as it:
+        for entry in it:
+            name = entry.name
+            if name in VCS_DIRS or name[:2] == ".#":
+                continue
+            try:
+                if not entry.is_dir():
+                    continue
+                atom = Atom(f"{cat}/{name}")
+            except (OSError, InvalidAtom):
+                continue
+            if atom == atom.cp:
+                pns.append(name)
+    pns.sort()
+    return pns
+
+
+def _list_package(pkg_dir, pn):
+    """Return the PFs of the ebuilds in pkg_dir that cp_list() accepts."""
+    pfs = []
+    for name in os.listdir(pkg_dir):
+        if name[-7:] != ".ebuild":
+            continue
+        pf = name[:-7]
+        ps = pkgsplit(pf)
+        if not ps or ps[0] != pn:
+            continue
+        ver_match = ver_regexp.match("-".join(ps[1:]))
+        if ver_match is None or not ver_match.groups():
+            continue
+        pfs.append(pf)
+    pfs.sort()
+    return pfs
+
+
+def update_pkg_listing_index(location, categories, old=None):
+    """
+    Index the given categories of the repository at location. Directories
+    whose mtime is unchanged since old, a previous PkgListingIndex of the
+    same repository, are not listed again.
+
+    @rtype: PkgListingIndex
+    """
+    racy = time.time_ns() - _racy_ns
+    if old is None:
+        old = PkgListingIndex(location)
+
+    def recordable(mtime):
+        return mtime is not None and mtime < racy
+
+    root = _mtime_ns(location)
+    absent = []
+    cat_entries = {}
+    pkg_entries = {}
+    for cat in sorted(categories):
+        cat_dir = os.path.join(location, cat)
+        mtime = _mtime_ns(cat_dir)
+        if mtime is None:
+            absent.append(cat)
+            continue
+        entry = old._categories.get(cat)
+        if entry is None or entry[0] != mtime:
+            try:
+                entry = [mtime, _list_category(cat_dir, cat)]
+            except OSError:
+                continue
+        if recordable(mtime):
+            cat_entries[cat] = entry
+
+        for pn in entry[1]:
+            cp = f"{cat}/{pn}"
+            pkg_dir = os.path.join(location, cp)
+            mtime = _mtime_ns(pkg_dir)
+            pkg_entry = old._packages.get(cp)
+            if pkg_entry is None or pkg_entry[0] != mtime:
+                try:
+                    pkg_entry = [mtime, _list_package(pkg_dir, pn)]
+                except OSError:
+                    continue
+            if recordable(mtime):
+                pkg_entries[cp] = pkg_entry
+
+    return PkgListingIndex(
+        location,
+        root=root if recordable(root) else None,
+        absent=absent,
+        categories=cat_entries,
+        packages=pkg_entries,
+    )
@@ -0,0 +1,386 @@
+# Copyright 2026 Gentoo Authors
+# Distributed under the terms of the GNU General Public License v2
+
+import json
+import mmap
+import os
+import struct
+import zlib
+
+from portage.cache import cache_errors, fs_template
+from portage.exception import InvalidData
+from portage.versions import _pkg_str
+
+_MAGIC = b"PORTMMAP"
+_FORMAT_VERSION = 1
+
+# magic, version, nfields, ntokens, nvalues, nentries, nslots,
+# fields_off, fields_len, tokens_idx, values_idx, entries_off,
+# columns_off, slots_off, size
+_HEADER = struct.Struct("<8sIIIIII" + "Q" * 8)
+_U32 = struct.Struct("<I")
+_OFFSET = struct.Struct("<Q")
+
+# The separator a value is split on before its pieces are interned.
+_SEP_SPACE = b"\0"
+_SEP_TAB = b"\1"
+
+
+class database(fs_template.FsBased):
+    """
+    Metadata cache of a whole repository in a single file, which is
+    memory-mapped and read in place, so that a lookup costs no syscalls
+    once the file is open.
+
+    The file is columnar: every cache field has a column holding one
+    value id per entry. Values are interned, and so are the space (or,
+    for _eclasses_, tab) separated pieces they are made of, which keeps
+    repeated KEYWORDS, LICENSE, EAPI and eclass names and digests down
+    to one copy each. Entries are found through an open addressing hash
+    table keyed on the crc32 of the cpv. The layout is:
+
+      header, JSON list of field names,
+      token offsets (ntokens + 1) and token bytes,
+      value offsets (nvalues + 1) and values, each a separator byte
+          followed by u32 token ids (value 0 is the empty value),
+      u32 cpv token id per entry,
+      u32 value id per entry, for each field in turn,
+      u32 hash slots holding entry number + 1, or 0 if empty.
+
+    The file is never modified in place. Writes are kept in memory and
+    commit() writes a new file atomically, so it suits generation by
+    egencache better than frequent small updates.
+    """
+
+    autocommits = False
+
+    def __init__(self, *args, **config):
+        super().__init__(*args, **config)
+        self.location = (
+            os.path.join(
+                self.location, self.label.lstrip(os.path.sep).rstrip(os.path.sep)
+            )
+            + ".mmap"
+        )
+        write_keys = set(self._known_keys)
+        write_keys.add("_eclasses_")
+        write_keys.add(f"_{self.validation_chf}_")
+        self._write_keys = sorted(write_keys)
+        self._pending = {}
+        self._buf = None
+        self._header = None
+        # Every commit rewrites the whole file, so never commit from
+        # __setitem__ or __delitem__.
+        self.sync_rate = float("inf")
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # The mapping is not picklable, so it is reopened after unpickling.
+        state["_buf"] = None
+        state["_header"] = None
+        return state
+
+    def _load(self):
+        self._header = False
+        self._token_cache = {}
+        self._value_cache = {}
+        try:
+            with open(self.location, "rb") as f:
+                buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return
+        try:
+            header = self._parse_header(buf)
+        except (struct.error, ValueError):
+            header = None
+        if header is None:
+            buf.close()
+            return
+        self._buf = buf
+        self._header = header
+
+    @staticmethod
+    def _parse_header(buf):
+        if len(buf) < _HEADER.size:
+            return None
+        (
+            magic,
+            version,
+            nfields,
+            ntokens,
+            nvalues,
+            nentries,
+            nslots,
+            fields_off,
+            fields_len,
+            tokens_idx,
+            values_idx,
+            entries_off,
+            columns_off,
+            slots_off,
+            size,
+        ) = _HEADER.unpack_from(buf, 0)
+        if magic != _MAGIC or version != _FORMAT_VERSION or size != len(buf):
+            return None
+        if slots_off + nslots * _U32.size != size or nslots & (nslots - 1):
+            return None
+        fields = json.loads(buf[fields_off : fields_off + fields_len])
+        if not isinstance(fields, list) or len(fields) != nfields:
+            return None
+        return {
+            "fields": fields,
+            "nentries": nentries,
+            "nslots": nslots,
+            "tokens_idx": tokens_idx,
+            "values_idx": values_idx,
+            "entries_off": entries_off,
+            "columns_off": columns_off,
+            "slots_off": slots_off,
+        }
+
+    def _get_header(self):
+        if self._header is None:
+            self._load()
+        return self._header
+
+    def _token(self, token_id):
+        token = self._token_cache.get(token_id)
+        if token is None:
+            start, end = struct.unpack_from(
+                "<QQ", self._buf, self._header["tokens_idx"] + token_id * _OFFSET.size
+            )
+            token = self._buf[start:end].decode("utf-8", "replace")
+            self._token_cache[token_id] = token
+        return token
+
+    def _value(self, value_id):
+        value = self._value_cache.get(value_id)
+        if value is None:
+            start, end = struct.unpack_from(
+                "<QQ", self._buf, self._header["values_idx"] + value_id * _OFFSET.size
+            )
+            if start == end:
+                value = ""
+            else:
+                sep = "\t" if self._buf[start : start + 1] == _SEP_TAB else " "
+                ids = struct.unpack_from(
+                    f"<{(end - start - 1) // _U32.size}I", self._buf, start + 1
+                )
+                value = sep.join(self._token(i) for i in ids)
+            self._value_cache[value_id] = value
+        return value
+
+    def _find(self, cpv):
+        """Return the entry number of cpv in the file, or None."""
+        header = self._get_header()
+        if not header:
+            return None
+        buf = self._buf
+        mask = header["nslots"] - 1
+        slots_off = header["slots_off"]
+        entries_off = header["entries_off"]
+        slot = zlib.crc32(cpv.encode("utf-8")) & mask
+        while True:
+            entry = _U32.unpack_from(buf, slots_off + slot * _U32.size)[0]
+            if not entry:
+                return None
+            entry -= 1
+            token_id = _U32.unpack_from(buf, entries_off + entry * _U32.size)[0]
+            if self._token(token_id) == cpv:
+                return entry
+            slot = (slot + 1) & mask
+
+    def _read_entry(self, entry):
+        header = self._header
+        buf = self._buf
+        columns_off = header["columns_off"]
+        column_len = header["nentries"] * _U32.size
+        d = {}
+        for i, k in enumerate(header["fields"]):
+            value_id = _U32.unpack_from(
+                buf, columns_off + i * column_len + entry * _U32.size
+            )[0]
+            if value_id:
+                d[k] = self._value(value_id)
+        return d
+
+    def _iter_file(self):
+        header = self._get_header()
+        if not header:
+            return
+        entries_off = header["entries_off"]
+        for entry in range(header["nentries"]):
+            yield entry, self._token(
+                _U32.unpack_from(self._buf, entries_off + entry * _U32.size)[0]
+            )
+
+    def _getitem(self, cpv):
+        if cpv in self._pending:
+            d = self._pending[cpv]
+            if d is None:
+                raise KeyError(cpv)
+            return dict(d)
+        entry = self._find(cpv)
+        if entry is None:
+            raise KeyError(cpv)
+        return self._read_entry(entry)
+
+    def _setitem(self, cpv, values):
+        d = {}
+        for k in self._write_keys:
+            v = values.get(k)
+            if v:
+                d[k] = v
+        self._pending[cpv] = d
+
+    def _delitem(self, cpv):
+        if cpv not in self:
+            raise KeyError(cpv)
+        self._pending[cpv] = None
+
+    def __contains__(self, cpv):
+        if cpv in self._pending:
+            return self._pending[cpv] is not None
+        return self._find(cpv) is not None
+
+    def __iter__(self):
+        pending = self._pending
+        cpvs = [cpv for _entry, cpv in self._iter_file() if cpv not in pending]
+        cpvs.extend(cpv for cpv, d in pending.items() if d is not None)
+        for cpv in cpvs:
+            try:
+                yield _pkg_str(cpv)
+            except InvalidData:
+                continue
+
+    def sync(self, rate=0):
+        self.commit()
+
+    def commit(self):
+        if not self._pending:
+            return
+        entries = {}
+        for entry, cpv in self._iter_file():
+            if cpv not in self._pending:
+                entries[cpv] = self._read_entry(entry)
+        for cpv, d in self._pending.items():
+            if d is not None:
+                entries[cpv] = d
+
+        from portage.util import ensure_dirs, write_atomic
+
+        try:
+            ensure_dirs(os.path.dirname(self.location))
+            write_atomic(self.location, _serialize(entries), mode="wb")
+        except OSError as e:
+            raise cache_errors.CacheCorruption(self.location, e)
+        self._ensure_access(self.location)
+        self._pending.clear()
+        if self._buf is not None:
+            self._buf.close()
+            self._buf = None
+        self._header = None
+
+    def __del__(self):
+        # Guard against a failed __init__.
+        if getattr(self, "_pending", None):
+            super().__del__()
+
+
+def _serialize(entries):
+    """Return the file content for entries, a dict of cpv -> values."""
+    fields = sorted({k for d in entries.values() for k in d})
+    tokens = {}
+    token_list = []
+
+    def intern_token(token):
+        token_id = tokens.get(token)
+        if token_id is None:
+            token_id = tokens[token] = len(token_list)
+            token_list.append(token.encode("utf-8", "backslashreplace"))
+        return token_id
+
+    values = {"": 0}
+    value_list = [b""]
+
+    def intern_value(value):
+        value_id = values.get(value)
+        if value_id is None:
+            if "\t" in value and " " not in value:
+                sep, pieces = _SEP_TAB, value.split("\t")
+            else:
+                sep, pieces = _SEP_SPACE, value.split(" ")
+            ids = [intern_token(x) for x in pieces]
+            value_id = values[value] = len(value_list)
+            value_list.append(sep + struct.pack(f"<{len(ids)}I", *ids))
+        return value_id
+
+    cpvs = sorted(entries)
+    entry_tokens = [intern_token(cpv) for cpv in cpvs]
+    columns = [[intern_value(entries[cpv].get(k, "")) for cpv in cpvs] for k in fields]
+
+    nslots = 1
+    while nslots < 2 * len(cpvs):
+        nslots *= 2
+    mask = nslots - 1
+    slots = [0] * nslots
+    for entry, cpv in enumerate(cpvs):
+        slot = zlib.crc32(cpv.encode("utf-8")) & mask
+        while slots[slot]:
+            slot = (slot + 1) & mask
+        slots[slot] = entry + 1
+
+    fields_blob = json.dumps(fields).encode("utf-8")
+    parts = [b"", fields_blob]
+    pos = _HEADER.size + len(fields_blob)
+
+    def add_blobs(blobs):
+        nonlocal pos
+        idx = pos
+        start = idx + (len(blobs) + 1) * _OFFSET.size
+        offsets = [start]
+        for blob in blobs:
+            offsets.append(offsets[-1] + len(blob))
+        parts.append(struct.pack(f"<{len(offsets)}Q", *offsets))
+        parts.extend(blobs)
+        pos = offsets[-1]
+        return idx
+
+    def add_u32s(ids):
+        nonlocal pos
+        off = pos
+        parts.append(struct.pack(f"<{len(ids)}I", *ids))
+        pos += len(ids) * _U32.size
+        return off
+
+    tokens_idx = add_blobs(token_list)
+    values_idx = add_blobs(value_list)
+    entries_off = add_u32s(entry_tokens)
+    columns_off = pos
+    for column in columns:
+        add_u32s(column)
+    slots_off = add_u32s(slots)
+
+    parts[0] = _HEADER.pack(
+        _MAGIC,
+        _FORMAT_VERSION,
+        len(fields),
+        len(token_list),
+        len(value_list),
+        len(cpvs),
+        nslots,
+        _HEADER.size,
+        len(fields_blob),
+        tokens_idx,
+        values_idx,
+        entries_off,
+        columns_off,
+        slots_off,
+        pos,
+    )
+    return b"".join(parts)
+
+
+class md5_database(database):
+    validation_chf = "md5"
+    store_eclass_paths = False
@@ -375,7 +375,7 @@ def _apply_hash_filter(digests, hash_filter):
     return digests
 
 
-def verify_all(filename, mydict, strict=0):
+def verify_all(filename, mydict, strict=0, digest_cache=None):
     """
     Verify all checksums against a file.
 
@@ -383,6 +383,10 @@ def verify_all(filename, mydict, strict=0):
     @type filename: String
     @param strict: Enable/Disable strict checking (which stops exactly at a checksum failure and throws an exception)
     @type strict: Integer
+    @param digest_cache: Digests confirmed earlier for unchanged files, which
+            are used instead of hashing the file, and which the digests are
+            recorded in if they match
+    @type digest_cache: portage.util._digest_cache.DigestCache
     @rtype: Tuple
     @return: Result of the checks and possible message:
             1) If size fails, False, and a tuple containing a message, the given size, and the actual size
@@ -395,7 +399,8 @@ def verify_all(filename, mydict, strict=0):
     file_is_ok = True
     reason = "Reason unknown"
     try:
-        mysize = os.stat(filename)[stat.ST_SIZE]
+        st = os.stat(filename)
+        mysize = st[stat.ST_SIZE]
         if mydict.get("size") is not None and mydict["size"] != mysize:
             return False, (
                 _("Filesize does not match recorded size"),
@@ -422,7 +427,13 @@ def verify_all(filename, mydict, strict=0):
         got = " ".join(got)
         return False, (_("Insufficient data for checksum verification"), got, expected)
 
-    mychecksums = perform_multiple_checksums(filename, verifiable_hash_types)
+    confirmed = {}
+    if digest_cache is not None:
+        confirmed = digest_cache.get(filename, st)
+    if verifiable_hash_types.issubset(confirmed):
+        mychecksums = confirmed
+    else:
+        mychecksums = perform_multiple_checksums(filename, verifiable_hash_types)
 
     for x in sorted(verifiable_hash_types):
         myhash = mychecksums[x]
@@ -436,6 +447,9 @@ def verify_all(filename, mydict, strict=0):
                 reason = (f"Failed on {x} verification", myhash, mydict[x])
                 break
 
+    if file_is_ok and digest_cache is not None and mychecksums is not confirmed:
+        digest_cache.add(filename, st, mychecksums)
+
     return file_is_ok, reason
 
 
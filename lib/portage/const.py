@@ -166,10 +166,13 @@ SUPPORTED_FEATURES = frozenset(
         "binpkg-multi-instance",
         "binpkg-request-signature",
         "binpkg-signing",
+        "binpkg-stream-extract",
+        "build-history",
         "buildpkg",
         "buildpkg-live",
         "buildpkg-proactive",
         "buildsyspkg",
+        "builtin-fetch",
         "candy",
         "case-insensitive-fs",
         "ccache",
@@ -182,7 +185,9 @@ SUPPORTED_FEATURES = frozenset(
         "compress-index",
         "config-protect-if-modified",
         "dedupdebug",
+        "delta-index",
         "digest",
+        "digest-cache",
         "distcc",
         "distlocks",
         "downgrade-backup",
@@ -205,6 +210,7 @@ SUPPORTED_FEATURES = frozenset(
         "merge-use-vdb",
         "merge-wait",
         "metadata-transfer",
+        "metadata-workers",
         "mirror",
         "mount-sandbox",
         "multilib-strict",
@@ -219,6 +225,7 @@ SUPPORTED_FEATURES = frozenset(
         "nostrip",
         "notitles",
         "observability",
+        "owners-index",
         "packdebug",
         "parallel-fetch",
         "parallel-install",
@@ -253,6 +260,7 @@ SUPPORTED_FEATURES = frozenset(
         "userpriv",
         "usersandbox",
         "usersync",
+        "vdb-index",
         "warn-on-large-env",
         "webrsync-gpg",
         "xattr",
@@ -271,6 +271,7 @@ class MergeProcess(ForkProcess):
                 mylink.lockdb()
                 try:
                     mylink.delete()
+                    mylink._refresh_vdb_indexes()
                 finally:
                     mylink.unlockdb()
                 rval = os.EX_OK
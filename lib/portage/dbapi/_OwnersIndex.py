@@ -0,0 +1,280 @@
+# Copyright 2026 Gentoo Authors
+# Distributed under the terms of the GNU General Public License v2
+
+import json
+import mmap
+import struct
+
+_MAGIC = b"PORTOWNS"
+_FORMAT_VERSION = 1
+_FLAG_CASE_INSENSITIVE = 1
+
+# magic, version, flags, npkgs, npaths, nnames,
+# pkgs_off, pkgs_len, paths_idx_off, names_idx_off, size
+_HEADER = struct.Struct("<8sIIIIIQQQQQ")
+_PKG_ID = struct.Struct("<I")
+_OFFSET = struct.Struct("<Q")
+
+
+def _encode(path):
+    return path.encode("utf-8", "surrogateescape")
+
+
+def _decode(path):
+    return path.decode("utf-8", "surrogateescape")
+
+
+class OwnersIndex:
+    """
+    Sorted, mmap-able map of installed file paths to the packages that
+    own them, so that owner lookups are a binary search instead of a
+    read of every candidate package's CONTENTS.
+
+    Paths are stored the way CONTENTS records them, relative to ROOT
+    with a leading slash. With FEATURES=case-insensitive-fs the lookup
+    key is lowercased and the case-preserved path is kept alongside it.
+
+    The file holds a header, a JSON table of package stamps indexed by
+    package id, the path records sorted by (key, package id) and an
+    array of their offsets, then the basename records sorted by
+    (basename, path record number) and an array of their offsets:
+
+      path record:     key \\0 path-if-different-from-key \\0 <u32 pkg id>
+      basename record: basename \\0 <u32 path record number>
+
+    A package stamp is (cpv, COUNTER, mtime), and a package's records
+    are only trusted while its stamp matches the VDB. Anything else is
+    reindexed by update(), which carries the records of still valid
+    packages over without reading their CONTENTS again.
+    """
+
+    def __init__(self, buf, packages, npaths, nnames, paths_idx, names_idx, flags):
+        self._buf = buf
+        self.packages = packages
+        self._npaths = npaths
+        self._nnames = nnames
+        self._paths_idx = paths_idx
+        self._names_idx = names_idx
+        self.case_insensitive = bool(flags & _FLAG_CASE_INSENSITIVE)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Map an index file, or return None if it is missing or not in a
+        format this portage version writes.
+        """
+        try:
+            with open(path, "rb") as f:
+                buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        index = cls._from_buffer(buf)
+        if index is None:
+            buf.close()
+        return index
+
+    @classmethod
+    def _from_buffer(cls, buf):
+        if len(buf) < _HEADER.size:
+            return None
+        (
+            magic,
+            version,
+            flags,
+            npkgs,
+            npaths,
+            nnames,
+            pkgs_off,
+            pkgs_len,
+            paths_idx,
+            names_idx,
+            size,
+        ) = _HEADER.unpack_from(buf, 0)
+        if magic != _MAGIC or version != _FORMAT_VERSION or size != len(buf):
+            return None
+        if (
+            paths_idx + npaths * _OFFSET.size > size
+            or names_idx + nnames * _OFFSET.size > size
+        ):
+            return None
+        try:
+            packages = [
+                tuple(x) for x in json.loads(buf[pkgs_off : pkgs_off + pkgs_len])
+            ]
+        except ValueError:
+            return None
+        if len(packages) != npkgs:
+            return None
+        return cls(buf, packages, npaths, nnames, paths_idx, names_idx, flags)
+
+    @classmethod
+    def build(cls, packages, records, case_insensitive=False):
+        """
+        Serialize an index. packages is the list of package stamps and
+        records an iterable of (key, path, pkg id), key and path being
+        bytes and path empty when it equals key. Returns the index,
+        backed by the serialized bytes, which write() can store.
+        """
+        records = sorted(records)
+        names = sorted(
+            (key.rpartition(b"/")[2], i) for i, (key, _path, _id) in enumerate(records)
+        )
+        pkgs_blob = json.dumps(packages, separators=(",", ":")).encode("utf-8")
+
+        parts = [b"", pkgs_blob]
+        pos = _HEADER.size + len(pkgs_blob)
+        path_offsets = []
+        for key, path, pkg_id in records:
+            record = b"".join((key, b"\0", path, b"\0", _PKG_ID.pack(pkg_id)))
+            path_offsets.append(pos)
+            parts.append(record)
+            pos += len(record)
+        paths_idx = pos
+        parts.append(struct.pack(f"<{len(path_offsets)}Q", *path_offsets))
+        pos += len(path_offsets) * _OFFSET.size
+        name_offsets = []
+        for name, i in names:
+            record = b"".join((name, b"\0", _PKG_ID.pack(i)))
+            name_offsets.append(pos)
+            parts.append(record)
+            pos += len(record)
+        names_idx = pos
+        parts.append(struct.pack(f"<{len(name_offsets)}Q", *name_offsets))
+        pos += len(name_offsets) * _OFFSET.size
+
+        flags = _FLAG_CASE_INSENSITIVE if case_insensitive else 0
+        parts[0] = _HEADER.pack(
+            _MAGIC,
+            _FORMAT_VERSION,
+            flags,
+            len(packages),
+            len(records),
+            len(names),
+            _HEADER.size,
+            len(pkgs_blob),
+            paths_idx,
+            names_idx,
+            pos,
+        )
+        return cls._from_buffer(b"".join(parts))
+
+    def write(self, path):
+        from portage.util import write_atomic
+
+        write_atomic(path, bytes(self._buf), mode="wb")
+
+    def _key_at(self, idx, i):
+        off = _OFFSET.unpack_from(self._buf, idx + i * _OFFSET.size)[0]
+        end = self._buf.find(b"\0", off)
+        return off, end
+
+    def _path_record(self, i):
+        off, end = self._key_at(self._paths_idx, i)
+        path_end = self._buf.find(b"\0", end + 1)
+        return (
+            self._buf[off:end],
+            self._buf[end + 1 : path_end],
+            _PKG_ID.unpack_from(self._buf, path_end + 1)[0],
+        )
+
+    def _search(self, idx, n, key):
+        """Return the first record number in idx whose key is >= key."""
+        buf = self._buf
+        lo, hi = 0, n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            off, end = self._key_at(idx, mid)
+            if buf[off:end] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def lookup(self, key):
+        """
+        Return a list of (path, pkg id) for the records whose key is the
+        given ROOT-relative path.
+        """
+        key = _encode(key)
+        result = []
+        i = self._search(self._paths_idx, self._npaths, key)
+        while i < self._npaths:
+            rec_key, path, pkg_id = self._path_record(i)
+            if rec_key != key:
+                break
+            result.append((_decode(path or rec_key), pkg_id))
+            i += 1
+        return result
+
+    def lookup_name(self, name):
+        """
+        Return a list of (path, pkg id) for the records whose key has the
+        given basename.
+        """
+        name = _encode(name)
+        buf = self._buf
+        result = []
+        i = self._search(self._names_idx, self._nnames, name)
+        while i < self._nnames:
+            off, end = self._key_at(self._names_idx, i)
+            if buf[off:end] != name:
+                break
+            key, path, pkg_id = self._path_record(_PKG_ID.unpack_from(buf, end + 1)[0])
+            result.append((_decode(path or key), pkg_id))
+            i += 1
+        return result
+
+    def iter_records(self):
+        """Yield every (key, path, pkg id), as build() takes them."""
+        for i in range(self._npaths):
+            yield self._path_record(i)
+
+    def is_current(self, stamps, case_insensitive=False):
+        """
+        True if the index covers exactly the packages of stamps, a dict
+        of cpv -> stamp.
+        """
+        return (
+            self.case_insensitive == case_insensitive
+            and len(self.packages) == len(stamps)
+            and all(stamps.get(stamp[0]) == stamp for stamp in self.packages)
+        )
+
+    @classmethod
+    def update(cls, index, stamps, get_contents, root, case_insensitive=False):
+        """
+        Return an index covering exactly the packages of stamps, a dict
+        of cpv -> stamp, reusing the records of index (which may be None)
+        for every package whose stamp is unchanged. get_contents(cpv)
+        returns the CONTENTS keys of a package that has to be reindexed.
+        """
+        kept = {}
+        if index is not None and index.case_insensitive == case_insensitive:
+            for pkg_id, stamp in enumerate(index.packages):
+                if stamps.get(stamp[0]) == stamp:
+                    kept[pkg_id] = stamp
+
+        packages = list(kept.values())
+        id_map = {old_id: new_id for new_id, old_id in enumerate(kept)}
+        records = []
+        if id_map:
+            for key, path, pkg_id in index.iter_records():
+                new_id = id_map.get(pkg_id)
+                if new_id is not None:
+                    records.append((key, path, new_id))
+
+        indexed = {stamp[0] for stamp in packages}
+        root_len = len(root) - 1
+        for cpv, stamp in stamps.items():
+            if cpv in indexed:
+                continue
+            pkg_id = len(packages)
+            packages.append(stamp)
+            for x in get_contents(cpv):
+                path = x[root_len:]
+                key = path.lower() if case_insensitive else path
+                records.append(
+                    (_encode(key), b"" if key == path else _encode(path), pkg_id)
+                )
+
+        return cls.build(packages, records, case_insensitive=case_insensitive)
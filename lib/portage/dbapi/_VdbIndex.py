@@ -0,0 +1,278 @@
+# Copyright 2026 Gentoo Authors
+# Distributed under the terms of the GNU General Public License v2
+
+import errno
+import json
+import os
+import stat
+
+from portage import _encodings
+from portage.exception import PortageException
+
+_FORMAT_VERSION = 2
+_FORMAT_PREFIX = "#format="
+
+
+def _header():
+    """
+    The first line of the index file. Besides the version of the index
+    format itself it carries the version and field set of the
+    per-package metadata file that the snapshots follow, so that an
+    index written by a portage that cached other fields is rebuilt
+    rather than served.
+    """
+    from portage.dbapi.vartree import (
+        _METADATA_FILE_FIELDS,
+        _METADATA_FILE_FORMAT_VERSION,
+    )
+
+    return (
+        f"{_FORMAT_PREFIX}{_FORMAT_VERSION}"
+        f" metadata={_METADATA_FILE_FORMAT_VERSION}"
+        f" fields={','.join(sorted(_METADATA_FILE_FIELDS))}"
+    )
+
+
+class VdbIndex:
+    """
+    Single-file snapshot of the VDB directory tree and the fields of
+    _METADATA_FILE_FIELDS for every installed package, so that a cold
+    vardbapi can list categories and packages and answer aux_get()
+    without opening one file per package.
+
+    Every piece of the snapshot carries the st_mtime_ns of the directory
+    it was taken from, recorded *before* that directory was listed or
+    read, and is only served while the directory still has that mtime:
+
+    - the category list, against the VDB root
+    - the entries of a category, against the category directory
+    - the metadata of a package, against the package directory
+
+    A concurrent change to a directory therefore leaves the index stale
+    for that directory, never wrong, and a stale part is simply not used.
+    Merges and unmerges call refresh() once they are done, which
+    re-reads only the directories whose mtime has moved.
+
+    The file lives under CACHE_PATH rather than inside the VDB root,
+    since writing it there would change the root mtime it is validated
+    against.
+    """
+
+    def __init__(self, dbroot, path):
+        self._dbroot = dbroot
+        self._path = path
+        self._data = None
+        self._file_mtime = None
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self):
+        """
+        Read the index file into memory. A missing, unreadable or
+        unrecognized file loads as an empty index, which the next
+        refresh() rebuilds from scratch.
+        """
+        data = {"root_mtime": None, "categories": {}}
+        file_mtime = None
+        try:
+            with open(
+                self._path, encoding=_encodings["repo.content"], errors="replace"
+            ) as f:
+                file_mtime = os.fstat(f.fileno()).st_mtime_ns
+                header = f.readline().rstrip("\n")
+                if header == _header():
+                    loaded = json.load(f)
+                    if isinstance(loaded, dict) and isinstance(
+                        loaded.get("categories"), dict
+                    ):
+                        data = loaded
+        except (OSError, ValueError):
+            pass
+        self._data = data
+        self._file_mtime = file_mtime
+
+    def _reload_if_changed(self):
+        """
+        Reload the index if another process has rewritten it since it was
+        loaded. Returns True if it was reloaded.
+        """
+        try:
+            file_mtime = os.stat(self._path).st_mtime_ns
+        except OSError:
+            file_mtime = None
+        if file_mtime == self._file_mtime:
+            return False
+        self._load()
+        return True
+
+    def _get_data(self):
+        if self._data is None:
+            self._load()
+        return self._data
+
+    def categories(self, root_mtime):
+        """
+        Return the category directory names of the VDB root, or None if
+        the index does not hold a listing taken at root_mtime.
+        """
+        data = self._get_data()
+        if data["root_mtime"] != root_mtime and not (
+            self._reload_if_changed() and self._data["root_mtime"] == root_mtime
+        ):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return list(self._data["categories"])
+
+    def _category(self, cat, cat_mtime):
+        entry = self._get_data()["categories"].get(cat)
+        if entry is None or entry[0] != cat_mtime:
+            if not self._reload_if_changed():
+                return None
+            entry = self._data["categories"].get(cat)
+            if entry is None or entry[0] != cat_mtime:
+                return None
+        return entry[1]
+
+    def entries(self, cat, cat_mtime, dirsonly=False):
+        """
+        Return the entry names of category cat, or None if the index does
+        not hold a listing taken at cat_mtime. With dirsonly, only names
+        of directories are returned.
+        """
+        pkgs = self._category(cat, cat_mtime)
+        if pkgs is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if dirsonly:
+            return [k for k, v in pkgs.items() if v is not None]
+        return list(pkgs)
+
+    def metadata(self, cpv, pkg_mtime):
+        """
+        Return a dict of the _METADATA_FILE_FIELDS values of cpv, empty
+        ones included, or None if the index does not hold a snapshot
+        taken at pkg_mtime. A field missing from the dict is unknown to
+        the index, and callers must read it from the package directory.
+        """
+        cat, _, pf = cpv.partition("/")
+        entry = None
+        pkgs = self._get_data()["categories"].get(cat)
+        if pkgs is not None:
+            entry = pkgs[1].get(pf)
+        if entry is None or entry[0] != pkg_mtime:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[1]
+
+    def refresh(self, excluded_re, full=False):
+        """
+        Bring the index up to date with the VDB and write it out
+        atomically. Directories whose mtime still matches the index are
+        not re-read. Packages in unchanged categories are not stat()ed
+        unless full is True, since every VDB writer bumps the category
+        mtime; a package changed behind portage's back is still never
+        served stale, because metadata() validates the package mtime.
+
+        The caller is expected to hold the vardbapi lock.
+        """
+        from portage.util import write_atomic
+
+        # Pick up a refresh done by another process so its work is reused.
+        self._reload_if_changed()
+        old_categories = self._get_data()["categories"]
+
+        try:
+            root_mtime = os.stat(self._dbroot).st_mtime_ns
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+            root_mtime = None
+
+        categories = {}
+        if root_mtime is not None:
+            for cat_entry in os.scandir(self._dbroot):
+                if excluded_re.match(cat_entry.name) is not None:
+                    continue
+                try:
+                    if not cat_entry.is_dir():
+                        continue
+                    cat_mtime = os.stat(cat_entry.path).st_mtime_ns
+                except OSError:
+                    continue
+                old = old_categories.get(cat_entry.name)
+                old_pkgs = old[1] if old is not None else {}
+                if old is not None and old[0] == cat_mtime and not full:
+                    categories[cat_entry.name] = old
+                    continue
+                categories[cat_entry.name] = [
+                    cat_mtime,
+                    self._refresh_category(cat_entry.path, old_pkgs, excluded_re),
+                ]
+
+        self._data = {"root_mtime": root_mtime, "categories": categories}
+        content = f"{_header()}\n"
+        content += json.dumps(self._data, separators=(",", ":"), sort_keys=True)
+        content += "\n"
+        write_atomic(self._path, content, mode="w", encoding=_encodings["repo.content"])
+        try:
+            self._file_mtime = os.stat(self._path).st_mtime_ns
+        except OSError:
+            self._file_mtime = None
+
+    def _refresh_category(self, catdir, old_pkgs, excluded_re):
+        pkgs = {}
+        for pkg_entry in os.scandir(catdir):
+            if excluded_re.match(pkg_entry.name) is not None:
+                continue
+            try:
+                st = os.stat(pkg_entry.path)
+            except OSError:
+                continue
+            if not stat.S_ISDIR(st.st_mode):
+                pkgs[pkg_entry.name] = None
+                continue
+            old = old_pkgs.get(pkg_entry.name)
+            if old is not None and old[0] == st.st_mtime_ns:
+                pkgs[pkg_entry.name] = old
+                continue
+            try:
+                metadata = self._read_package(pkg_entry.path, st)
+            except (OSError, PortageException):
+                continue
+            pkgs[pkg_entry.name] = [st.st_mtime_ns, metadata]
+        return pkgs
+
+    @staticmethod
+    def _read_package(pkgdir, st):
+        """
+        Read the _METADATA_FILE_FIELDS values of one package, from its
+        metadata file when that validates and from the individual files
+        otherwise. Every field is returned, as an empty string if the
+        package has no value for it.
+        """
+        from portage.dbapi.vartree import (
+            _METADATA_FILE,
+            _METADATA_FILE_FIELDS,
+            _read_metadata_file,
+        )
+
+        try:
+            metadata = _read_metadata_file(
+                os.path.join(pkgdir, _METADATA_FILE), dir_st=st
+            )
+        except OSError:
+            metadata = None
+        if metadata is None:
+            metadata = {}
+            for k in _METADATA_FILE_FIELDS:
+                try:
+                    with open(
+                        os.path.join(pkgdir, k), encoding="utf-8", errors="replace"
+                    ) as f:
+                        metadata[k] = " ".join(f.read().split())
+                except OSError:
+                    pass
+        return {k: metadata.get(k, "") for k in _METADATA_FILE_FIELDS}
@@ -1,4 +1,4 @@
-# Copyright 1998-2024 Gentoo Authors
+# Copyright 1998-2026 Gentoo Authors
 # Distributed under the terms of the GNU General Public License v2
 
 __all__ = ["dbapi"]
@@ -56,14 +56,14 @@ class dbapi:
 
     @staticmethod
     def _cmp_cpv(cpv1, cpv2) -> int:
-        from portage.versions import vercmp
+        key1 = dbapi._cpv_sort_key(cpv1)
+        key2 = dbapi._cpv_sort_key(cpv2)
+        return (key1 > key2) - (key1 < key2)
 
-        result = vercmp(cpv1.version, cpv2.version)
-        if result == 0 and cpv1.build_time is not None and cpv2.build_time is not None:
-            result = (cpv1.build_time > cpv2.build_time) - (
-                cpv1.build_time < cpv2.build_time
-            )
-        return result
+    @staticmethod
+    def _cpv_sort_key(cpv) -> tuple[bytes, int]:
+        build_time = cpv.build_time
+        return (cpv.version_key, 0 if build_time is None else build_time)
 
     @staticmethod
     def _cpv_sort_ascending(cpv_list: Sequence[Any]) -> None:
@@ -71,13 +71,11 @@ class dbapi:
         Use this to sort self.cp_list() results in ascending
         order. It sorts in place and returns None.
         """
-        from portage.util import cmp_sort_key
-
         if len(cpv_list) > 1:
             # If the cpv includes explicit -r0, it has to be preserved
             # for consistency in findname and aux_get calls, so use a
             # dict to map strings back to their original values.
-            cpv_list.sort(key=cmp_sort_key(dbapi._cmp_cpv))
+            cpv_list.sort(key=dbapi._cpv_sort_key)
 
     def cpv_all(self) -> list[str]:
         """Return all CPVs in the db
@@ -119,6 +117,45 @@ class dbapi:
         """
         raise NotImplementedError
 
+    def aux_get_many(
+        self, cpvs: Sequence[str], wants: Sequence[str], myrepo: Optional[str] = None
+    ) -> dict[str, list[str]]:
+        """Return the metadata keys in wants for each cpv in cpvs
+        Args:
+                cpvs - ["sys-apps/foo-1.0", "sys-apps/bar-2.0"]
+                wants - ["SLOT","DEPEND","HOMEPAGE"]
+                myrepo - The repository name.
+        Returns:
+                a dict mapping each cpv that was found to a list of results, in
+                order of keys in wants, like aux_get returns. A cpv that is not
+                found is left out instead of raising KeyError, but
+                CorruptionKeyError is still raised.
+
+        Subclasses override this where a batch can be served more cheaply
+        than one aux_get call per cpv.
+        """
+        results = {}
+        for cpv in cpvs:
+            try:
+                results[cpv] = self.aux_get(cpv, wants, myrepo=myrepo)
+            except CorruptionKeyError:
+                raise
+            except KeyError:
+                pass
+        return results
+
+    async def async_aux_get_many(
+        self,
+        cpvs: Sequence[str],
+        wants: Sequence[str],
+        myrepo: Optional[str] = None,
+        loop=None,
+    ) -> dict[str, list[str]]:
+        """
+        Asynchronous form of aux_get_many.
+        """
+        return self.aux_get_many(cpvs, wants, myrepo=myrepo)
+
     def aux_update(self, cpv: str, metadata_updates: dict[str, Any]) -> None:
         """
         Args:
@@ -392,14 +429,12 @@ class dbapi:
         @type onUpdate: a callable that takes 2 integer arguments:
                 maxval and curval
         """
-        from portage.update import update_dbentries
+        from portage.update import _dep_cp_candidates, _update_cmd_cp, update_dbentries
         from portage.versions import _pkg_str
 
         cpv_all = self.cpv_all()
         cpv_all.sort()
         maxval = len(cpv_all)
-        aux_get = self.aux_get
-        aux_update = self.aux_update
         update_keys = Package._dep_keys
         meta_keys = update_keys + self._pkg_str_aux_keys
         repo_dict = None
@@ -409,9 +444,27 @@ class dbapi:
             onUpdate(maxval, 0)
         if onProgress:
             onProgress(maxval, 0)
+
+        # Index the packages that share a list of updates by the package
+        # keys that their dependencies refer to, so that each update
+        # command only visits the packages that it may affect, rather
+        # than every package.
+        groups = {}
+        try:
+            all_metadata = self.aux_get_many(cpv_all, meta_keys)
+        except CorruptionKeyError:
+            # Skip corrupt packages rather than all packages.
+            all_metadata = {}
+            for cpv in cpv_all:
+                try:
+                    all_metadata[cpv] = self.aux_get(cpv, meta_keys)
+                except KeyError:
+                    pass
         for i, cpv in enumerate(cpv_all):
+            if onProgress:
+                onProgress(maxval, i + 1)
             try:
-                metadata = dict(zip(meta_keys, aux_get(cpv, meta_keys)))
+                metadata = dict(zip(meta_keys, all_metadata[cpv]))
             except KeyError:
                 continue
             try:
@@ -433,18 +486,58 @@ class dbapi:
             if not updates_list:
                 continue
 
-            metadata_updates = update_dbentries(updates_list, metadata, parent=pkg)
-            if metadata_updates:
-                try:
-                    aux_update(cpv, metadata_updates)
-                except (InvalidBinaryPackageFormat, CorruptionKeyError) as e:
-                    logging.warning(
-                        f"{e.__class__.__name__}: {e}", exc_info=sys.exc_info()
-                    )
-                if onUpdate:
+            try:
+                _, index, packages = groups[id(updates_list)]
+            except KeyError:
+                index = {}
+                packages = {}
+                groups[id(updates_list)] = (updates_list, index, packages)
+            packages[cpv] = (pkg, metadata, dict(metadata))
+            for v in metadata.values():
+                for cp in _dep_cp_candidates(v):
+                    index.setdefault(cp, set()).add(cpv)
+
+        metadata_updates = {}
+        for updates_list, index, packages in groups.values():
+            for update_cmd in updates_list:
+                cp = _update_cmd_cp(update_cmd)
+                if cp is None:
+                    continue
+                for cpv in list(index.get(cp, ())):
+                    pkg, metadata, orig_metadata = packages[cpv]
+                    updated = update_dbentries([update_cmd], metadata, parent=pkg)
+                    if not updated:
+                        continue
+                    metadata.update(updated)
+                    if update_cmd[0] == "move":
+                        # Later commands may apply to the new package key.
+                        index.setdefault(str(update_cmd[2]), set()).add(cpv)
+
+            for cpv, (pkg, metadata, orig_metadata) in packages.items():
+                updated = {k: v for k, v in metadata.items() if v != orig_metadata[k]}
+                if updated:
+                    metadata_updates[cpv] = updated
+
+        self._aux_update_many(
+            [(cpv, metadata_updates[cpv]) for cpv in cpv_all if cpv in metadata_updates]
+        )
+        if onUpdate:
+            for i, cpv in enumerate(cpv_all):
+                if cpv in metadata_updates:
                     onUpdate(maxval, i + 1)
-            if onProgress:
-                onProgress(maxval, i + 1)
+
+    def _aux_update_many(self, updates):
+        """
+        Call aux_update for each (cpv, metadata_updates) pair of updates,
+        and log a warning for the packages that can not be updated.
+        Subclasses override this where packages can be updated in
+        parallel.
+        """
+        for cpv, metadata_updates in updates:
+            try:
+                self.aux_update(cpv, metadata_updates)
+            except (InvalidBinaryPackageFormat, CorruptionKeyError) as e:
+                logging.warning(f"{e.__class__.__name__}: {e}", exc_info=sys.exc_info())
 
     def move_slot_ent(self, mylist, repo_match=None):
         """This function takes a sequence:
@@ -5,8 +5,10 @@ __all__ = ["binarytree", "bindbapi"]
 
 import codecs
 import errno
+import hashlib
 import io
 import json
+import logging
 import os
 import shlex
 import stat
@@ -250,13 +252,92 @@ class bindbapi(fakedbapi):
 
         return [mydata.get(x, "") for x in wants]
 
+    def aux_get_many(self, cpvs, wants, myrepo=None):
+        """
+        Like aux_get() for each of cpvs. When wants only holds keys of the
+        Packages index, values are sliced directly out of the index entries
+        instead of going through aux_get() one package at a time.
+        """
+        if self.bintree and not self.bintree.populated:
+            self.bintree.populate()
+        if self._known_keys.intersection(wants).difference(self._aux_cache_keys):
+            return super().aux_get_many(cpvs, wants, myrepo=myrepo)
+        results = {}
+        for cpv in cpvs:
+            try:
+                aux_cache = self.cpvdict[self._instance_key(cpv, support_string=True)]
+            except KeyError:
+                continue
+            if aux_cache is None:
+                try:
+                    results[cpv] = self.aux_get(cpv, wants)
+                except CorruptionKeyError:
+                    raise
+                except KeyError:
+                    pass
+            else:
+                results[cpv] = [aux_cache.get(x, "") for x in wants]
+        return results
+
     def aux_update(self, cpv, values):
-        from portage.util import writemsg
+        if not self.bintree.populated:
+            self.bintree.populate()
+        cpv = self._aux_update_cpv(cpv)
+        if self._update_binpkg(cpv, values):
+            # inject will clear stale caches via cpv_inject.
+            self.bintree.inject(cpv)
+        else:
+            self._remove_signed(cpv)
 
+    def _aux_update_many(self, updates):
+        """
+        Update the binary packages in parallel, since each of them is
+        rewritten, and then update $PKGDIR/Packages once for all of them.
+        """
+        if not updates:
+            return
         if not self.bintree.populated:
             self.bintree.populate()
+        updates = [(self._aux_update_cpv(cpv), values) for cpv, values in updates]
+
+        loop = asyncio._safe_loop()
+        executor = ForkExecutor(loop=loop)
+        futures = [
+            executor.submit(self._update_binpkg, cpv, values) for cpv, values in updates
+        ]
+        error = None
         try:
-            build_id = cpv.build_id
+            try:
+                loop.run_until_complete(asyncio.wait(futures))
+            finally:
+                executor.shutdown(wait=True)
+        finally:
+            # Record the packages that were rewritten even if others
+            # failed, since their files no longer match $PKGDIR/Packages.
+            updated = []
+            for (cpv, values), future in zip(updates, futures):
+                if not future.done() or future.cancelled():
+                    continue
+                try:
+                    if future.result():
+                        updated.append(cpv)
+                    else:
+                        self._remove_signed(cpv)
+                except (InvalidBinaryPackageFormat, CorruptionKeyError) as e:
+                    logging.warning(f"{e.__class__.__name__}: {e}", exc_info=e)
+                except Exception as e:
+                    if error is None:
+                        error = e
+
+            # _inject_many will clear stale caches via cpv_inject.
+            self.bintree._inject_many(updated)
+
+        if error is not None:
+            raise error
+
+    def _aux_update_cpv(self, cpv):
+        try:
+            cpv.build_id
         except AttributeError:
             if self.bintree._multi_instance:
                 # The cpv.build_id attribute is required if we are in
@@ -265,11 +346,17 @@ class bindbapi(fakedbapi):
                 raise
             else:
                 cpv = self._instance_key(cpv, support_string=True)[0]
-                build_id = cpv.build_id
+        return cpv
 
+    def _update_binpkg(self, cpv, values):
+        """
+        Write the metadata updates in values to the binary package file
+        of cpv. Return False without writing if the package is signed,
+        since its signature would become invalid.
+        """
         cpv_str = str(cpv)
-        if build_id is not None:
-            cpv_str += f"-{build_id}"
+        if cpv.build_id is not None:
+            cpv_str += f"-{cpv.build_id}"
 
         binpkg_path = self.bintree.getname(cpv)
         try:
@@ -290,15 +377,7 @@ class bindbapi(fakedbapi):
             except SignatureException:
                 signature_exist = True
             if signature_exist:
-                writemsg(
-                    colorize(
-                        "WARN",
-                        f"Binpkg update ignored for signed package: {binpkg_path}, "
-                        "the file will be removed.\n",
-                    )
-                )
-                self.bintree.remove(cpv)
-                return
+                return False
             encoding_key = False
         else:
             raise InvalidBinaryPackageFormat(
@@ -322,9 +401,19 @@ class bindbapi(fakedbapi):
             raise InvalidBinaryPackageFormat(
                 f"Unknown binary package format {binpkg_path}"
             )
+        return True
 
-        # inject will clear stale caches via cpv_inject.
-        self.bintree.inject(cpv)
+    def _remove_signed(self, cpv):
+        from portage.util import writemsg
+
+        writemsg(
+            colorize(
+                "WARN",
+                f"Binpkg update ignored for signed package: {self.bintree.getname(cpv)}, "
+                "the file will be removed.\n",
+            )
+        )
+        self.bintree.remove(cpv)
 
     async def unpack_metadata(self, pkg, dest_dir, loop=None):
         """
@@ -537,6 +626,7 @@ class binarytree:
         self._binrepos_conf = None
         self._remote_has_index = False
         self._remotepkgs = None  # remote metadata indexed by cpv
+        self._remote_timestamps = {}  # remote index TIMESTAMP by binrepo name
         self._additional_pkgs = {}
         self.invalids = []
         self.invalid_paths: dict[str, list[str]] = {}
@@ -546,7 +636,11 @@ class binarytree:
         self._all_directory = os.path.isdir(os.path.join(self.pkgdir, "All"))
         self._pkgindex_version = 0
         self._pkgindex_hashes = ["MD5", "SHA1"]
+        self._pkgindex_max_deltas = 64
         self._pkgindex_file = os.path.join(self.pkgdir, "Packages")
+        # For FEATURES=delta-index, the stat() key of the Packages file
+        # that was last loaded or written, and a copy of its contents.
+        self._pkgindex_loaded = None
         self._pkgindex_keys = self.dbapi._aux_cache_keys.copy()
         self._pkgindex_keys.update(["CPV", "SIZE"])
         self._pkgindex_aux_keys = [
@@ -1396,6 +1490,7 @@ class binarytree:
 
         self._remote_has_index = False
         self._remotepkgs = {}
+        self._remote_timestamps = {}
 
         need_trust_helper = "binpkg-request-signature" in self.settings.features or any(
             repo.verify_signature for repo in self._binrepos_conf.values()
@@ -1544,7 +1639,16 @@ class binarytree:
                 ):
                     raise UseCachedCopyOfRemoteIndex("within TTL")
 
-            for remote_pkgindex_file in ("Packages.gz", "Packages"):
+            remote_pkgindex_files = ("Packages.gz", "Packages")
+            if local_timestamp and pkgindex.header.get("DELTA_INDEX"):
+                delta_idx = self._fetch_pkgindex_deltas(
+                    repo, pkgindex, binrepo_name, verbose
+                )
+                if delta_idx is not None:
+                    pkgindex = rmt_idx = delta_idx
+                    remote_pkgindex_files = ()
+
+            for remote_pkgindex_file in remote_pkgindex_files:
                 # urlparse.urljoin() only works correctly with recognized
                 # protocols and requires the base url to have a trailing
                 # slash, so join manually...
@@ -1822,6 +1926,7 @@ class binarytree:
                 # The current user doesn't have permission to cache the
                 # file, but that's alright.
         if pkgindex:
+            self._remote_timestamps[repo.name] = pkgindex.header.get("TIMESTAMP")
             have_getbinpkg_exclude = not getbinpkg_exclude.isEmpty()
             have_getbinpkg_include = not getbinpkg_include.isEmpty()
             remote_base_uri = pkgindex.header.get("URI", base_url)
@@ -1895,6 +2000,80 @@ class binarytree:
             self._remote_has_index = True
             self._merge_pkgindex_header(pkgindex.header, self._pkgindex_header)
 
+    def _fetch_pkgindex_deltas(self, repo, pkgindex, binrepo_name, verbose):
+        """
+        Bring pkgindex, the local copy of the index of a binhost with
+        FEATURES=delta-index, up to date by applying the deltas listed in
+        its Packages.delta file. Raises UseCachedCopyOfRemoteIndex if the
+        copy is current. Returns the updated index, or None if the full
+        index has to be fetched instead.
+        """
+        from portage.util import writemsg
+        from portage.util._urlopen import have_pep_476 as _have_pep_476
+        from portage.util._urlopen import urlopen as _urlopen
+
+        base_url = repo.sync_uri
+        parsed_url = urlparse(base_url)
+        if not (
+            (repo.fetchcommand is None or parsed_url.scheme in ("", "file"))
+            and (parsed_url.scheme not in ("https",) or _have_pep_476())
+            and (parsed_url.scheme not in ("ssh",))
+        ):
+            return None
+
+        proxies = {}
+        for proto in ("http", "https"):
+            value = self.settings.get(proto + "_proxy")
+            if value is not None:
+                proxies[proto] = value
+
+        def fetch(name):
+            if parsed_url.scheme in ("", "file"):
+                f = open(f"{parsed_url.path.rstrip('/')}/{name}", "rb")
+            else:
+                f = _urlopen(base_url.rstrip("/") + "/" + name, proxies=proxies)
+            try:
+                return f.read()
+            finally:
+                f.close()
+
+        try:
+            deltas = portage.getbinpkg.PackageIndexDeltas()
+            deltas.read(io.StringIO(fetch("Packages.delta").decode("utf-8", "replace")))
+            if deltas.header.get("TIMESTAMP") == pkgindex.header["TIMESTAMP"]:
+                raise UseCachedCopyOfRemoteIndex("up-to-date")
+            chain = deltas.chain(pkgindex.header["TIMESTAMP"])
+            if not chain:
+                return None
+
+            rmt_idx = self._new_pkgindex()
+            rmt_idx.header.update(pkgindex.header)
+            rmt_idx.packages = list(pkgindex.packages)
+            for d in chain:
+                path = d["PATH"]
+                if os.path.isabs(path) or ".." in path.split("/"):
+                    return None
+                data = fetch(path)
+                if (
+                    str(len(data)) != d["SIZE"]
+                    or hashlib.sha256(data).hexdigest() != d["SHA256"]
+                ):
+                    return None
+                with GzipFile(fileobj=io.BytesIO(data), mode="rb") as f:
+                    rmt_idx.readDelta(codecs.iterdecode(f, "utf-8", errors="replace"))
+        except (OSError, EOFError, ValueError) as e:
+            if verbose:
+                writemsg(
+                    _("[%s] Binhost index deltas are unusable: %s\n")
+                    % (binrepo_name, e),
+                    noiselevel=-1,
+                )
+            return None
+
+        if not self._pkgindex_version_supported(rmt_idx):
+            return None
+        return rmt_idx
+
     def _populate_additional(self, repos):
         from portage.versions import _pkg_str
 
@@ -1909,8 +2088,7 @@ class binarytree:
 
     def inject(self, cpv, current_pkg_path=None, allocated_pkg_path=None):
         from portage.locks import lockfile, unlockfile
-        from portage.util import writemsg
-        from portage.versions import _pkg_str, catsplit
+        from portage.versions import catsplit
 
         """Add a freshly built package to the database.  This updates
         $PKGDIR/Packages with the new package metadata (including MD5).
@@ -1933,6 +2111,57 @@ class binarytree:
             full_path = self.getname(cpv)
         else:
             full_path = current_pkg_path
+        cpv = self._inject_metadata(cpv, full_path)
+        if cpv is None:
+            return
+
+        # Reread the Packages index (in case it's been changed by another
+        # process) and then updated it, all while holding a lock.
+        pkgindex_lock = None
+        try:
+            os.makedirs(self.pkgdir, exist_ok=True)
+            pkgindex_lock = lockfile(self._pkgindex_file, wantnewlockfile=1)
+            if current_pkg_path is not None:
+                if allocated_pkg_path is not None:
+                    new_path = allocated_pkg_path
+                else:
+                    new_path = self.getname(cpv, allocate_new=True)
+                try:
+                    samefile = os.path.samefile(current_pkg_path, new_path)
+                except OSError:
+                    samefile = False
+                if not samefile:
+                    self._ensure_dir(os.path.dirname(new_path))
+                    _movefile(current_pkg_path, new_path, mysettings=self.settings)
+                full_path = new_path
+
+            pkgindex = self._load_pkgindex()
+            if not self._pkgindex_version_supported(pkgindex):
+                pkgindex = self._new_pkgindex()
+
+            d = self._inject_entry(pkgindex, cpv, full_path)
+            self._update_pkgindex_header(pkgindex.header)
+            self._pkgindex_write(pkgindex)
+
+        finally:
+            if pkgindex_lock:
+                unlockfile(pkgindex_lock)
+
+        # This is used to record BINPKGMD5 in the installed package
+        # database, for a package that has just been built.
+        cpv._metadata["MD5"] = d["MD5"]
+
+        return cpv
+
+    def _inject_metadata(self, cpv, full_path):
+        """
+        Read the metadata of the package file for inject, and discard the
+        existing instance of cpv. Return a _pkg_str instance with the new
+        metadata, or None if the package is invalid.
+        """
+        from portage.util import writemsg
+        from portage.versions import _pkg_str
+
         try:
             s = os.stat(full_path)
         except OSError as e:
@@ -1943,7 +2172,7 @@ class binarytree:
                 f"!!! Binary package does not exist: '{full_path}'\n",
                 noiselevel=-1,
             )
-            return
+            return None
 
         try:
             metadata = self._read_metadata(full_path, s)
@@ -1952,7 +2181,7 @@ class binarytree:
                 f"!!! Invalid binary package: '{full_path}', {e}\n",
                 noiselevel=-1,
             )
-            return
+            return None
 
         try:
             binpkg_format = get_binpkg_format(full_path)
@@ -1961,7 +2190,7 @@ class binarytree:
                 f"!!! Invalid binary package: '{full_path}'\n",
                 noiselevel=-1,
             )
-            return
+            return None
 
         invalid_depend = False
         try:
@@ -1970,7 +2199,7 @@ class binarytree:
             invalid_depend = True
         if invalid_depend or not metadata.get("SLOT"):
             writemsg(_("!!! Invalid binary package: '%s'\n") % full_path, noiselevel=-1)
-            return
+            return None
 
         fetched = False
         try:
@@ -1991,49 +2220,60 @@ class binarytree:
 
         cpv = _pkg_str(cpv, metadata=metadata, settings=self.settings, db=self.dbapi)
 
-        # Reread the Packages index (in case it's been changed by another
-        # process) and then updated it, all while holding a lock.
+        return cpv
+
+    def _inject_many(self, cpvs):
+        """
+        Like inject for each of cpvs, which are already in the locations
+        returned by getname(), but update $PKGDIR/Packages only once.
+        """
+        from portage.locks import lockfile, unlockfile
+
+        if not self.populated:
+            self.populate()
+        injected = []
+        for cpv in cpvs:
+            full_path = self.getname(cpv)
+            cpv = self._inject_metadata(cpv, full_path)
+            if cpv is not None:
+                injected.append((cpv, full_path))
+        if not injected:
+            return
+
         pkgindex_lock = None
         try:
             os.makedirs(self.pkgdir, exist_ok=True)
             pkgindex_lock = lockfile(self._pkgindex_file, wantnewlockfile=1)
-            if current_pkg_path is not None:
-                if allocated_pkg_path is not None:
-                    new_path = allocated_pkg_path
-                else:
-                    new_path = self.getname(cpv, allocate_new=True)
-                try:
-                    samefile = os.path.samefile(current_pkg_path, new_path)
-                except OSError:
-                    samefile = False
-                if not samefile:
-                    self._ensure_dir(os.path.dirname(new_path))
-                    _movefile(current_pkg_path, new_path, mysettings=self.settings)
-                full_path = new_path
-
-            self._file_permissions(full_path)
             pkgindex = self._load_pkgindex()
             if not self._pkgindex_version_supported(pkgindex):
                 pkgindex = self._new_pkgindex()
 
-            d = self._inject_file(pkgindex, cpv, full_path)
-            repo_revisions = (
-                json.loads(d["REPO_REVISIONS"]) if d.get("REPO_REVISIONS") else None
-            )
-            if repo_revisions:
-                self._inject_repo_revisions(pkgindex.header, repo_revisions)
+            entries = [
+                (cpv, self._inject_entry(pkgindex, cpv, full_path))
+                for cpv, full_path in injected
+            ]
             self._update_pkgindex_header(pkgindex.header)
             self._pkgindex_write(pkgindex)
-
         finally:
             if pkgindex_lock:
                 unlockfile(pkgindex_lock)
 
-        # This is used to record BINPKGMD5 in the installed package
-        # database, for a package that has just been built.
-        cpv._metadata["MD5"] = d["MD5"]
+        for cpv, d in entries:
+            cpv._metadata["MD5"] = d["MD5"]
 
-        return cpv
+    def _inject_entry(self, pkgindex, cpv, full_path):
+        """
+        Add the package file of cpv to pkgindex and internal data structures,
+        while the Packages index is locked, and return its entry.
+        """
+        self._file_permissions(full_path)
+        d = self._inject_file(pkgindex, cpv, full_path)
+        repo_revisions = (
+            json.loads(d["REPO_REVISIONS"]) if d.get("REPO_REVISIONS") else None
+        )
+        if repo_revisions:
+            self._inject_repo_revisions(pkgindex.header, repo_revisions)
+        return d
 
     def remove(self, cpv: portage.versions._pkg_str) -> None:
         """
@@ -2252,8 +2492,19 @@ class binarytree:
     def _pkgindex_write(self, pkgindex):
         from portage.util import atomic_ofstream
 
+        delta_index = "delta-index" in self.settings.features
+        previous = None
+        if delta_index:
+            previous = self._pkgindex_previous()
+            pkgindex.header["DELTA_INDEX"] = "1"
+        else:
+            pkgindex.header.pop("DELTA_INDEX", None)
+
         contents = codecs.getwriter("utf-8")(io.BytesIO())
-        pkgindex.write(contents)
+        pkgindex.write(
+            contents,
+            after=None if previous is None else previous.header.get("TIMESTAMP"),
+        )
         contents = contents.getvalue()
         atime = mtime = int(pkgindex.header["TIMESTAMP"])
         output_files = [
@@ -2286,6 +2537,157 @@ class binarytree:
             # some seconds might have elapsed since TIMESTAMP
             os.utime(fname, (atime, mtime))
 
+        if delta_index:
+            self._pkgindex_write_deltas(
+                previous,
+                pkgindex,
+                min(os.stat(fname).st_size for f, fname, f_close in output_files),
+            )
+            self._pkgindex_loaded = (
+                self._pkgindex_stat_key(),
+                self._pkgindex_copy(pkgindex),
+            )
+        else:
+            self._pkgindex_remove_deltas()
+
+    def _pkgindex_stat_key(self, st=None):
+        if st is None:
+            try:
+                st = os.stat(self._pkgindex_file)
+            except OSError:
+                return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns, st.st_ctime_ns)
+
+    def _pkgindex_copy(self, pkgindex):
+        copy = self._new_pkgindex()
+        copy.header = pkgindex.header.copy()
+        copy.packages = [d.copy() for d in pkgindex.packages]
+        return copy
+
+    def _pkgindex_previous(self):
+        """
+        Return the index that _pkgindex_write() is about to replace. That
+        is the copy kept by the last _load_pkgindex() or
+        _pkgindex_write() while the Packages file is unchanged since,
+        which it is when the caller has loaded it under the lock, and
+        otherwise the file itself.
+        """
+        loaded = self._pkgindex_loaded
+        if loaded is not None and loaded[0] is not None:
+            if self._pkgindex_stat_key() == loaded[0]:
+                return loaded[1]
+        return self._load_pkgindex()
+
+    def _pkgindex_write_deltas(self, previous, pkgindex, index_size):
+        """
+        Add the delta from previous, the index that pkgindex replaces, to
+        the chain listed in Packages.delta, which lets binhost clients
+        update their copy of the index without fetching all of it. The
+        oldest deltas are dropped once fetching them would take more than
+        fetching the index itself.
+        """
+        from portage.util import atomic_ofstream
+
+        deltas_file = self._pkgindex_file + ".delta"
+        deltas_dir = self._pkgindex_file + ".deltas"
+        deltas = portage.getbinpkg.PackageIndexDeltas()
+        try:
+            with open(deltas_file, encoding="utf-8", errors="replace") as f:
+                deltas.read(f)
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+
+        timestamp = pkgindex.header["TIMESTAMP"]
+        previous_timestamp = previous.header.get("TIMESTAMP")
+        try:
+            extend = int(previous_timestamp) < int(timestamp)
+        except (TypeError, ValueError):
+            extend = False
+        chain = []
+        if extend:
+            # An index that was rewritten with an unchanged TIMESTAMP, or
+            # replaced without updating Packages.delta, breaks the chain.
+            if deltas.header.get("TIMESTAMP") == previous_timestamp:
+                chain.extend(deltas.deltas)
+
+            contents = codecs.getwriter("utf-8")(io.BytesIO())
+            pkgindex.writeDelta(contents, previous)
+            compressed = io.BytesIO()
+            with GzipFile(
+                filename="", mode="wb", fileobj=compressed, mtime=int(timestamp)
+            ) as f:
+                f.write(contents.getvalue())
+            compressed = compressed.getvalue()
+
+            path = f"{os.path.basename(deltas_dir)}/{previous_timestamp}.gz"
+            delta_file = os.path.join(self.pkgdir, path)
+            self._ensure_dir(deltas_dir)
+            f = atomic_ofstream(delta_file, mode="wb")
+            f.write(compressed)
+            f.close()
+            self._file_permissions(delta_file)
+            chain.append(
+                {
+                    "FROM": previous_timestamp,
+                    "TO": timestamp,
+                    "PATH": path,
+                    "SIZE": str(len(compressed)),
+                    "SHA256": hashlib.sha256(compressed).hexdigest(),
+                }
+            )
+        elif (
+            timestamp == previous_timestamp
+            and deltas.header.get("TIMESTAMP") == timestamp
+        ):
+            # Rewritten without modifications, which leaves the chain
+            # valid.
+            chain.extend(deltas.deltas)
+
+        kept = []
+        size = 0
+        for d in reversed(chain):
+            size += int(d["SIZE"])
+            if size > index_size or len(kept) == self._pkgindex_max_deltas:
+                break
+            kept.append(d)
+        kept.reverse()
+        deltas.header = {"TIMESTAMP": timestamp}
+        deltas.deltas = kept
+
+        f = atomic_ofstream(deltas_file, encoding="utf-8")
+        deltas.write(f)
+        f.close()
+        self._file_permissions(deltas_file)
+        os.utime(deltas_file, (int(timestamp), int(timestamp)))
+
+        referenced = {os.path.basename(d["PATH"]) for d in kept}
+        try:
+            names = os.listdir(deltas_dir)
+        except OSError:
+            names = []
+        for name in names:
+            if name not in referenced:
+                try:
+                    os.unlink(os.path.join(deltas_dir, name))
+                except OSError:
+                    pass
+
+    def _pkgindex_remove_deltas(self):
+        deltas_dir = self._pkgindex_file + ".deltas"
+        try:
+            os.unlink(self._pkgindex_file + ".delta")
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+        try:
+            names = os.listdir(deltas_dir)
+        except OSError:
+            return
+        for name in names:
+            os.unlink(os.path.join(deltas_dir, name))
+        os.rmdir(deltas_dir)
+
     def _pkgindex_entry(self, cpv):
         from portage.checksum import perform_multiple_checksums
 
@@ -2835,9 +3237,15 @@ class binarytree:
             pass
         else:
             try:
+                st = os.fstat(f.fileno())
                 pkgindex.read(f)
             finally:
                 f.close()
+            if "delta-index" in self.settings.features:
+                self._pkgindex_loaded = (
+                    self._pkgindex_stat_key(st),
+                    self._pkgindex_copy(pkgindex),
+                )
         return pkgindex
 
     def _get_digests(self, pkg):
@@ -2887,11 +3295,12 @@ class binarytree:
     def digestCheck(self, pkg):
         from portage.checksum import (
             _apply_hash_filter,
-            _check_distfile,
             _hash_filter,
             verify_all,
         )
         from portage.output import EOutput
+        from portage.package.ebuild.fetch import _check_distfile
+        from portage.util._digest_cache import get_digest_cache
 
         """
         Verify digests for the given package and raise DigestException
@@ -2916,11 +3325,18 @@ class binarytree:
             digests = _apply_hash_filter(digests, hash_filter)
         eout = EOutput()
         eout.quiet = self.settings.get("PORTAGE_QUIET") == "1"
-        ok, st = _check_distfile(pkg_path, digests, eout, show_errors=0)
-        if not ok:
-            ok, reason = verify_all(pkg_path, digests)
+        digest_cache = get_digest_cache(self.settings, self.pkgdir)
+        try:
+            ok, st = _check_distfile(
+                pkg_path, digests, eout, show_errors=0, digest_cache=digest_cache
+            )
             if not ok:
-                raise portage.exception.DigestException((pkg_path,) + tuple(reason))
+                ok, reason = verify_all(pkg_path, digests, digest_cache=digest_cache)
+                if not ok:
+                    raise portage.exception.DigestException((pkg_path,) + tuple(reason))
+        finally:
+            if digest_cache is not None:
+                digest_cache.flush()
 
         return True
 
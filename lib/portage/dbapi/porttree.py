@@ -22,9 +22,14 @@ import portage
 from portage import _eapi_is_deprecated, eapi_is_supported, eclass_cache
 from portage.cache import volatile
 from portage.cache.cache_errors import CacheError
+from portage.cache.index.pkg_listing_index import (
+    PkgListingIndex,
+    pkg_listing_index_paths,
+)
 from portage.cache.mappings import Mapping
 from portage.dbapi import dbapi
 from portage.exception import (
+    CorruptionKeyError,
     FileNotFound,
     InvalidAtom,
     InvalidData,
@@ -34,6 +39,7 @@ from portage.exception import (
     PortageKeyError,
 )
 from portage.localization import _
+from portage.util._digest_cache import get_digest_cache
 from portage.util.futures import asyncio
 from portage.util.futures.iter_completed import iter_gather
 from portage.versions import pkgsplit
@@ -120,9 +126,12 @@ class _better_cache:
     Portage.
     """
 
-    def __init__(self, repositories):
+    def __init__(self, repositories, listing_index=None):
         self._items = collections.defaultdict(list)
         self._scanned_cats = set()
+        # Optional callable returning the PkgListingIndex of a repository
+        # location, or None.
+        self._listing_index = listing_index
 
         # ordered list of all portree locations we'll scan:
         self._repo_list = [
@@ -145,6 +154,13 @@ class _better_cache:
         from portage.dep import Atom
 
         for repo in self._repo_list:
+            if self._listing_index is not None:
+                index = self._listing_index(repo.location)
+                pns = None if index is None else index.category(cat)
+                if pns is not None:
+                    for pn in pns:
+                        self._items[f"{cat}/{pn}"].append(repo)
+                    continue
             cat_dir = repo.location + "/" + cat
             try:
                 pkg_list = os.listdir(cat_dir)
@@ -349,6 +365,8 @@ class portdbapi(dbapi):
         self._aux_cache = {}
         self._better_cache = None
         self._broken_ebuilds = set()
+        # repo location -> PkgListingIndex or None
+        self._listing_indexes = {}
 
     def __getstate__(self):
         state = self.__dict__.copy()
@@ -675,6 +693,97 @@ class portdbapi(dbapi):
             self.async_aux_get(mycpv, mylist, mytree=mytree, myrepo=myrepo, loop=loop)
         )
 
+    def aux_get_many(
+        self,
+        cpvs: Sequence[str],
+        mylist: Sequence[str],
+        mytree: Optional[str] = None,
+        myrepo: Optional[str] = None,
+    ) -> dict[str, list[str]]:
+        """
+        Return a dict mapping each cpv of cpvs to its values for mylist,
+        like aux_get(). A cpv without a usable ebuild is left out. The
+        whole batch runs in a single run_until_complete call.
+        """
+        loop = self._event_loop
+        return loop.run_until_complete(
+            self.async_aux_get_many(
+                cpvs, mylist, mytree=mytree, myrepo=myrepo, loop=loop
+            )
+        )
+
+    async def async_aux_get_many(
+        self, cpvs, mylist, mytree=None, myrepo=None, loop=None
+    ):
+        """
+        Asynchronous form of aux_get_many. Entries in the aux cache of a
+        frozen portdbapi are answered directly. The other cpvs are looked
+        up in the metadata caches in one synchronous pass, in sorted order
+        so that the cache entries of a category are read together. Only
+        then do the metadata phases run, for the ebuilds whose cache entry
+        is missing or stale.
+
+        @param cpvs: cpvs of ebuilds
+        @type cpvs: iterable
+        @param mylist: list of metadata keys
+        @type mylist: list
+        @param mytree: The canonical path of the tree in which the ebuilds
+                are located, or None for automatic lookup
+        @type mytree: str
+        @param myrepo: name of the repo in which the ebuilds are located,
+                or None for automatic lookup
+        @type myrepo: str
+        @param loop: event loop (defaults to global event loop)
+        @type loop: EventLoop
+        @return: dict of cpv -> list of metadata values
+        @rtype: dict
+        """
+        loop = asyncio._wrap_loop(loop)
+        results = {}
+        pending = []
+        aux_cache = None
+        if (
+            mytree is None
+            and myrepo is None
+            and not self._known_keys.intersection(mylist).difference(
+                self._aux_cache_keys
+            )
+        ):
+            aux_cache = self._aux_cache
+        for cpv in cpvs:
+            cached = None if aux_cache is None else aux_cache.get(cpv)
+            if cached is None:
+                pending.append(cpv)
+            else:
+                results[cpv] = [cached.get(x, "") for x in mylist]
+
+        # Answer everything that the metadata caches can in a single
+        # synchronous pass, and only then run the metadata phases.
+        pending.sort()
+        regen = []
+        for cpv in pending:
+            try:
+                values, state = self._aux_get_cached(
+                    cpv, mylist, mytree=mytree, myrepo=myrepo
+                )
+            except CorruptionKeyError:
+                raise
+            except PortageKeyError:
+                continue
+            if values is None:
+                regen.append((cpv, state))
+            else:
+                results[cpv] = values
+
+        for cpv, state in regen:
+            try:
+                results[cpv] = await self._aux_get_regen(cpv, mylist, state, loop)
+            except CorruptionKeyError:
+                raise
+            except PortageKeyError:
+                pass
+        return results
+
     async def async_aux_get(self, mycpv, mylist, mytree=None, myrepo=None, loop=None):
         """
         Asynchronous form form of aux_get.
@@ -694,14 +803,28 @@ class portdbapi(dbapi):
         @return: list of metadata values
         @rtype: asyncio.Future (or compatible)
         """
-        from portage.util import writemsg
-
         # Don't default to self._event_loop here, since that creates a
         # local event loop for thread safety, and that could easily lead
         # to simultaneous instantiation of multiple event loops here.
         # Callers of this method certainly want the same event loop to
         # be used for all calls.
         loop = asyncio._wrap_loop(loop)
+        values, state = self._aux_get_cached(
+            mycpv, mylist, mytree=mytree, myrepo=myrepo
+        )
+        if values is not None:
+            return values
+        return await self._aux_get_regen(mycpv, mylist, state, loop)
+
+    def _aux_get_cached(self, mycpv, mylist, mytree=None, myrepo=None):
+        """
+        The part of async_aux_get that does not run the metadata phase.
+        Returns a tuple of the values of mylist, from the aux cache or a
+        valid metadata cache entry, and None, or else a tuple of None and
+        the state that _aux_get_regen needs to run the metadata phase.
+        """
+        from portage.util import writemsg
+
         cache_me = False
         if myrepo is not None:
             mytree = self.treemap.get(myrepo)
@@ -725,7 +848,7 @@ class portdbapi(dbapi):
         ):
             aux_cache = self._aux_cache.get(mycpv)
             if aux_cache is not None:
-                return [aux_cache.get(x, "") for x in mylist]
+                return [aux_cache.get(x, "") for x in mylist], None
             cache_me = True
 
         try:
@@ -744,40 +867,58 @@ class portdbapi(dbapi):
             raise PortageKeyError(mycpv)
 
         mydata, ebuild_hash = self._pull_valid_cache(mycpv, myebuild, mylocation)
-
-        proc = None
         if mydata is None:
-            if myebuild in self._broken_ebuilds:
-                raise PortageKeyError(mycpv)
+            return None, (myebuild, mylocation, ebuild_hash, cache_me)
+        return (
+            self._aux_get_return(
+                mycpv,
+                mylist,
+                myebuild,
+                ebuild_hash,
+                mydata,
+                mylocation,
+                cache_me,
+            ),
+            None,
+        )
 
-            # Retry for an intermittent unexpected returncode which
-            # occurs in CI runs with forkserver (bug 965132). In CI
-            # the unexpected returncode tends to be 255 which indicates
-            # that the forkserver exited unexpectedly.
-            tries = 3
-            while tries > 0:
-                tries -= 1
-                proc = await self._run_metadata_phase(
-                    mycpv, mylocation, ebuild_hash, loop
-                )
+    async def _aux_get_regen(self, mycpv, mylist, state, loop):
+        """
+        Run the metadata phase for the ebuild that _aux_get_cached found
+        no valid cache entry for, and return the values of mylist.
+        """
+        from portage.util import writemsg
 
-                if proc.returncode != os.EX_OK:
-                    if proc.returncode != 1:
-                        writemsg(
-                            _(
-                                "!!! aux_get(): metadata phase for package '%(pkg)s' failed with unexpected returncode %(returncode)s\n"
-                            )
-                            % {"pkg": mycpv, "returncode": proc.returncode},
-                            noiselevel=-1,
+        myebuild, mylocation, ebuild_hash, cache_me = state
+        if myebuild in self._broken_ebuilds:
+            raise PortageKeyError(mycpv)
+
+        # Retry for an intermittent unexpected returncode which
+        # occurs in CI runs with forkserver (bug 965132). In CI
+        # the unexpected returncode tends to be 255 which indicates
+        # that the forkserver exited unexpectedly.
+        tries = 3
+        while tries > 0:
+            tries -= 1
+            proc = await self._run_metadata_phase(mycpv, mylocation, ebuild_hash, loop)
+
+            if proc.returncode != os.EX_OK:
+                if proc.returncode != 1:
+                    writemsg(
+                        _(
+                            "!!! aux_get(): metadata phase for package '%(pkg)s' failed with unexpected returncode %(returncode)s\n"
                         )
-                        # Only retry for an unexpected returncode.
-                        if tries > 0:
-                            continue
-                    self._broken_ebuilds.add(myebuild)
-                    raise PortageKeyError(mycpv)
+                        % {"pkg": mycpv, "returncode": proc.returncode},
+                        noiselevel=-1,
+                    )
+                    # Only retry for an unexpected returncode.
+                    if tries > 0:
+                        continue
+                self._broken_ebuilds.add(myebuild)
+                raise PortageKeyError(mycpv)
 
-                mydata = proc.metadata
-                break
+            mydata = proc.metadata
+            break
 
         return self._aux_get_return(
             mycpv,
@@ -846,8 +987,6 @@ class portdbapi(dbapi):
             raise
 
         if proc.returncode == 2:
-            from portage.exception import CorruptionKeyError
-
             raise CorruptionKeyError(mycpv)
 
         return proc
@@ -1095,6 +1234,7 @@ class portdbapi(dbapi):
         )
         mf = mf.load_manifest(pkgdir, self.settings["DISTDIR"])
         mysums = mf.getDigests()
+        digest_cache = get_digest_cache(self.settings, self.settings["DISTDIR"])
 
         failures = {}
         for x in myfiles:
@@ -1104,13 +1244,17 @@ class portdbapi(dbapi):
             else:
                 try:
                     ok, reason = portage.checksum.verify_all(
-                        os.path.join(self.settings["DISTDIR"], x), mysums[x]
+                        os.path.join(self.settings["DISTDIR"], x),
+                        mysums[x],
+                        digest_cache=digest_cache,
                     )
                 except FileNotFound as e:
                     ok = False
                     reason = _("File Not Found: '%s'") % (e,)
             if not ok:
                 failures[x] = reason
+        if digest_cache is not None:
+            digest_cache.flush()
         if failures:
             return False
         return True
@@ -1128,6 +1272,21 @@ class portdbapi(dbapi):
             return 1
         return 0
 
+    def _listing_index(self, location):
+        """
+        Return the PkgListingIndex of the repository at location, or None
+        if it has none.
+        """
+        try:
+            return self._listing_indexes[location]
+        except KeyError:
+            pass
+        index = PkgListingIndex.load(
+            location, pkg_listing_index_paths(location, self.depcachedir)
+        )
+        self._listing_indexes[location] = index
+        return index
+
     def cp_all(self, categories=None, trees=None, reverse=False, sort=True):
         """
         This returns a list of all keys in our tree or trees
@@ -1147,8 +1306,14 @@ class portdbapi(dbapi):
             categories = self.settings.categories
         if trees is None:
             trees = self.porttrees
+        indexes = [self._listing_index(oroot) for oroot in trees]
         for x in categories:
-            for oroot in trees:
+            for oroot, index in zip(trees, indexes):
+                pns = None if index is None else index.category(x)
+                if pns is not None:
+                    for y in pns:
+                        d[f"{x}/{y}"] = None
+                    continue
                 for y in listdir(oroot + "/" + x, ignorecvs=1, dirsonly=1):
                     try:
                         atom = Atom(f"{x}/{y}")
@@ -1211,6 +1376,14 @@ class portdbapi(dbapi):
         mylist = []
         for repo in repos:
             oroot = repo.location
+            index = self._listing_index(oroot)
+            pfs = None if index is None else index.package(mycp)
+            if pfs is not None:
+                mylist.extend(
+                    _pkg_str(mysplit[0] + "/" + pf, db=self, repo=repo.name)
+                    for pf in pfs
+                )
+                continue
             try:
                 file_list = os.listdir(os.path.join(oroot, mycp))
             except OSError:
@@ -1282,7 +1455,7 @@ class portdbapi(dbapi):
         ):
             self.xcache[x] = {}
         self.frozen = 1
-        self._better_cache = _better_cache(self.repositories)
+        self._better_cache = _better_cache(self.repositories, self._listing_index)
 
     def melt(self):
         self.xcache = {}
@@ -57,12 +57,15 @@ from portage.exception import (
     InvalidLocation,
     InvalidPackageName,
     PermissionDenied,
+    PortageException,
     UnsupportedAPIException,
 )
 from portage.localization import _
 from portage.util.futures import asyncio
 from portage.util.futures.executor.fork import ForkExecutor
 from ._ContentsCaseSensitivityManager import ContentsCaseSensitivityManager
+from ._OwnersIndex import OwnersIndex
+from ._VdbIndex import VdbIndex
 
 _METADATA_FILE = "metadata"
 # The exact set of fields the consolidated metadata file carries, and the set
@@ -434,6 +437,11 @@ class vardbapi(dbapi):
         self._aux_cache_keys = set(_METADATA_FILE_FIELDS)
         self._aux_cache_obj = None
         self._counter_path = os.path.join(self._eroot, CACHE_PATH, "counter")
+        self._vdb_index = None
+        if "vdb-index" in settings.features:
+            self._vdb_index = VdbIndex(
+                self._dbroot, os.path.join(self._eroot, CACHE_PATH, "vdb_index")
+            )
 
         self._plib_registry = PreservedLibsRegistry(
             settings["ROOT"],
@@ -602,6 +610,22 @@ class vardbapi(dbapi):
         except OSError:
             ensure_dirs(catdir)
 
+    def _vdb_index_refresh(self, full=False):
+        """
+        Bring the VDB index up to date after a change to the VDB. The index
+        is only an accelerator, so a failure to write it is not an error;
+        readers fall back to the directories for whatever it lacks.
+        """
+        if self._vdb_index is None:
+            return
+        self.lock()
+        try:
+            self._vdb_index.refresh(self._excluded_dirs, full=full)
+        except (OSError, PortageException):
+            pass
+        finally:
+            self.unlock()
+
     def cpv_exists(self, mykey, myrepo=None):
         "Tells us whether an actual ebuild exists on disk (no masking)"
         return os.path.exists(self.getpath(mykey))
@@ -728,12 +752,15 @@ class vardbapi(dbapi):
             cpc = self.cpcache[mycp]
             if cpc[0] == mystat:
                 return cpc[1][:]
+        dir_list = None
         if cat_missing:
             # The stat() above already reported ENOENT, so listdir() can only
             # report it again. Any other stat() failure falls through, since
             # listdir() is what turns EACCES into PermissionDenied.
             dir_list = []
-        else:
+        elif self._vdb_index is not None and mystat:
+            dir_list = self._vdb_index.entries(mysplit[0], mystat)
+        if dir_list is None:
             try:
                 dir_list = os.listdir(cat_dir)
             except OSError as e:
@@ -787,7 +814,15 @@ class vardbapi(dbapi):
                 stacklevel=2,
             )
 
-        catdirs = listdir(basepath, ignorecvs=1, dirsonly=1)
+        vdb_index = self._vdb_index
+        catdirs = None
+        if vdb_index is not None:
+            try:
+                catdirs = vdb_index.categories(os.stat(basepath).st_mtime_ns)
+            except OSError:
+                pass
+        if catdirs is None:
+            catdirs = listdir(basepath, ignorecvs=1, dirsonly=1)
         if sort:
             catdirs.sort()
 
@@ -797,7 +832,16 @@ class vardbapi(dbapi):
             if not self._category_re.match(x):
                 continue
 
-            pkgdirs = listdir(basepath + x, dirsonly=1)
+            pkgdirs = None
+            if vdb_index is not None:
+                try:
+                    pkgdirs = vdb_index.entries(
+                        x, os.stat(basepath + x).st_mtime_ns, dirsonly=True
+                    )
+                except OSError:
+                    pass
+            if pkgdirs is None:
+                pkgdirs = listdir(basepath + x, dirsonly=1)
             if sort:
                 pkgdirs.sort()
 
@@ -927,20 +971,47 @@ class vardbapi(dbapi):
         by package directory mtime. Metadata is re-read from the VDB when the
         directory mtime changes (e.g. after a merge or aux_update).
         """
-        from portage.eapi import _get_eapi_attrs
-        from portage.versions import _get_slot_re
+        return self._aux_get_cached(mycpv, wants, self._aux_cache_these(wants))
+
+    def aux_get_many(self, cpvs, wants, myrepo=None):
+        """Like aux_get() for each of cpvs, leaving out those that are not
+        installed. The set of keys to cache is worked out once for the
+        batch, and packages are visited in VDB order, one category
+        directory (and one VDB index category) after another. Each
+        package still costs one stat() of its directory, which is what
+        validates both the aux cache and the VDB index snapshot.
+        """
+        cache_these = self._aux_cache_these(wants)
+        results = {}
+        for cpv in sorted(cpvs):
+            try:
+                results[cpv] = self._aux_get_cached(cpv, wants, cache_these)
+            except KeyError:
+                pass
+        return results
 
+    def _aux_cache_these(self, wants):
+        """Return the keys to store in the aux cache when wants is
+        requested, or None if wants holds no cacheable key."""
         cache_these_wants = self._aux_cache_keys.intersection(wants)
         for x in wants:
             if self._aux_cache_keys_re.match(x) is not None:
                 cache_these_wants.add(x)
 
         if not cache_these_wants:
-            mydata = self._aux_get(mycpv, wants)
-            return [mydata[x] for x in wants]
+            return None
 
         cache_these = set(self._aux_cache_keys)
         cache_these.update(cache_these_wants)
+        return cache_these
+
+    def _aux_get_cached(self, mycpv, wants, cache_these):
+        from portage.eapi import _get_eapi_attrs
+        from portage.versions import _get_slot_re
+
+        if cache_these is None:
+            mydata = self._aux_get(mycpv, wants)
+            return [mydata[x] for x in wants]
 
         mydir = self.getpath(mycpv)
         mydir_stat = None
@@ -1006,12 +1077,21 @@ class vardbapi(dbapi):
             raise KeyError(mycpv)
 
         metadata_data = None
-        try:
-            metadata_data = _read_metadata_file(
-                os.path.join(mydir, _METADATA_FILE), dir_st=st
-            )
-        except OSError:
-            pass
+        if self._vdb_index is not None:
+            metadata_data = self._vdb_index.metadata(mycpv, st.st_mtime_ns)
+            # The index keeps empty values too, so a field it lacks is a
+            # miss rather than an empty value.
+            if metadata_data is not None and any(
+                _in_metadata_file(x) and x not in metadata_data for x in wants
+            ):
+                metadata_data = None
+        if metadata_data is None:
+            try:
+                metadata_data = _read_metadata_file(
+                    os.path.join(mydir, _METADATA_FILE), dir_st=st
+                )
+            except OSError:
+                pass
 
         results = {}
         env_keys = []
@@ -1029,7 +1109,8 @@ class vardbapi(dbapi):
             # version matches, and such a file is a complete snapshot of the
             # matching fields. A field missing from it therefore had no
             # individual file either, so serve it as empty instead of paying
-            # an open() that would just fail.
+            # an open() that would just fail. A dict from the index was
+            # checked above to hold every wanted field.
             if metadata_data is not None and _in_metadata_file(x):
                 results[x] = metadata_data.get(x, "")
                 continue
@@ -1588,11 +1669,26 @@ class vardbapi(dbapi):
     class _owners_db:
         def __init__(self, vardb):
             self._vardb = vardb
+            self._index = None
 
         def populate(self):
             self._populate()
 
+        def _pkg_stamp(self, cpv):
+            counter, mtime = self._vardb.aux_get(cpv, ["COUNTER", "_mtime_"])
+            try:
+                counter = int(counter)
+            except ValueError:
+                counter = 0
+            return (str(cpv), counter, mtime)
+
+        def _use_index(self):
+            return "owners-index" in self._vardb.settings.features
+
         def _populate(self):
+            if self._use_index():
+                return self._populate_index()
+
             owners_cache = vardbapi._owners_cache(self._vardb)
             cached_hashes = set()
             base_names = self._vardb._aux_cache["owners"]["base_names"]
@@ -1629,6 +1725,56 @@ class vardbapi(dbapi):
 
             return owners_cache
 
+        def _populate_index(self):
+            """
+            Return an OwnersIndex covering exactly the installed packages.
+            The index file is reused when it is current, and otherwise
+            updated by reindexing only the packages whose stamp changed,
+            then written back for the next process. Failing to write it
+            is not an error, the updated index is still used in memory.
+            """
+            from portage.util import ensure_dirs
+
+            vardb = self._vardb
+            case_insensitive = "case-insensitive-fs" in vardb.settings.features
+            stamps = {}
+            for cpv in vardb.cpv_all():
+                try:
+                    stamps[str(cpv)] = self._pkg_stamp(cpv)
+                except KeyError:
+                    # Removed concurrently.
+                    continue
+
+            index = self._index
+            if index is not None and index.is_current(stamps, case_insensitive):
+                return index
+
+            # Another process, such as the one that just merged a package,
+            # may already have brought the file up to date.
+            index_path = os.path.join(vardb._eroot, CACHE_PATH, "owners_index")
+            loaded = OwnersIndex.load(index_path)
+            if loaded is not None and (
+                index is None or loaded.is_current(stamps, case_insensitive)
+            ):
+                index = loaded
+
+            if index is None or not index.is_current(stamps, case_insensitive):
+                index = OwnersIndex.update(
+                    index,
+                    stamps,
+                    lambda cpv: vardb._dblink(cpv).getcontents(),
+                    vardb.settings["ROOT"],
+                    case_insensitive=case_insensitive,
+                )
+                try:
+                    ensure_dirs(os.path.dirname(index_path))
+                    index.write(index_path)
+                except (OSError, PortageException):
+                    pass
+
+            self._index = index
+            return index
+
         def get_owners(self, path_iter):
             """
             @return the owners as a dblink -> set(files) mapping.
@@ -1662,8 +1808,99 @@ class vardbapi(dbapi):
             call. Therefore, to maximize reuse of resources when searching
             for multiple files, it's best to search for them all in a single
             call.
+
+            With FEATURES=owners-index, owners are looked up in the
+            persistent owners index, so no CONTENTS file is read unless a
+            package changed since the index was last updated.
             """
+            if self._use_index():
+                yield from self._iter_owners_index(path_iter)
+            else:
+                yield from self._iter_owners_cache(path_iter)
+
+        def _iter_owners_index(self, path_iter):
+            from portage.util import normalize_path
+
+            if not isinstance(path_iter, list):
+                path_iter = list(path_iter)
+            index = self._populate_index()
+            vardb = self._vardb
+            root = vardb.settings["ROOT"]
+            root_prefix = root[:-1]
+            eroot_len = len(vardb._eroot)
+            case_insensitive = index.case_insensitive
+            packages = index.packages
+
+            dblink_cache = {}
+
+            def dblink(pkg_id):
+                x = dblink_cache.get(pkg_id)
+                if x is None:
+                    x = vardb._dblink(packages[pkg_id][0])
+                    dblink_cache[pkg_id] = x
+                return x
+
+            parent_keys = {}
+
+            def parent_key(path):
+                # Use stat rather than lstat since we want to follow
+                # any symlinks to the real parent directory.
+                x = parent_keys.get(path, False)
+                if x is False:
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        x = None
+                    else:
+                        x = (st.st_dev, st.st_ino)
+                    parent_keys[path] = x
+                return x
+
+            while path_iter:
+                path = path_iter.pop()
+                if case_insensitive:
+                    path = path.lower()
+                is_basename = os.sep != path[:1]
+                if is_basename:
+                    name = path
+                else:
+                    name = os.path.basename(path.rstrip(os.path.sep))
 
+                if not name:
+                    continue
+
+                if is_basename:
+                    for p, pkg_id in index.lookup_name(name):
+                        yield (dblink(pkg_id), (root_prefix + p)[eroot_len:])
+                    continue
+
+                destfile = normalize_path(os.path.join(root, path.lstrip(os.sep)))
+                if case_insensitive:
+                    destfile = destfile.lower()
+                owners = {}
+                for p, pkg_id in index.lookup(destfile[len(root_prefix) :]):
+                    owners.setdefault(pkg_id, p)
+
+                # Like dblink._match_contents(), also match an entry whose
+                # parent is the same directory reached through a symlink.
+                candidates = [
+                    (p, pkg_id)
+                    for p, pkg_id in index.lookup_name(os.path.basename(destfile))
+                    if pkg_id not in owners
+                ]
+                if candidates:
+                    dest_parent = parent_key(os.path.dirname(destfile))
+                    if dest_parent is not None:
+                        for p, pkg_id in candidates:
+                            if pkg_id not in owners and dest_parent == parent_key(
+                                os.path.dirname(root_prefix + p)
+                            ):
+                                owners[pkg_id] = p
+
+                for pkg_id, p in owners.items():
+                    yield (dblink(pkg_id), (root_prefix + p)[eroot_len:])
+
+        def _iter_owners_cache(self, path_iter):
             if not isinstance(path_iter, list):
                 path_iter = list(path_iter)
             owners_cache = self._populate()
@@ -2198,6 +2435,15 @@ class dblink:
 
         self._post_merge_sync()
 
+    def _refresh_vdb_indexes(self):
+        """
+        Bring the persistent VDB index up to date after this package was
+        merged, or unmerged and deleted. Done once at the end rather than
+        from delete(), which a merge calls several times. The owners index
+        is brought up to date lazily, by the next owner lookup.
+        """
+        self.vartree.dbapi._vdb_index_refresh()
+
     def clearcontents(self):
         """
         For a given db entry (self), erase the CONTENTS values.
@@ -6248,6 +6494,7 @@ class dblink:
             else:
                 self.vartree.dbapi._linkmap._clear_cache()
             self.vartree.dbapi._bump_mtime(self.mycpv)
+            self._refresh_vdb_indexes()
             if not parallel_install:
                 self.unlockdb()
 
@@ -6560,6 +6807,7 @@ def unmerge(
                 mylink.lockdb()
                 try:
                     mylink.delete()
+                    mylink._refresh_vdb_indexes()
                 finally:
                     mylink.unlockdb()
             return retval
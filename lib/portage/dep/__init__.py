@@ -49,7 +49,6 @@ from portage.versions import (
     _vr,
     catpkgsplit,
     cpv_getversion,
-    vercmp,
     ververify,
 )
 
@@ -452,7 +451,7 @@ def cpvequal(cpv1: Union[str, _pkg_str], cpv2: Union[str, _pkg_str]) -> bool:
     if split1[0] != split2[0] or split1[1] != split2[1]:
         return False
 
-    return vercmp(cpv1.version, cpv2.version) == 0
+    return cpv1.version_key == cpv2.version_key
 
 
 def strip_empty(myarr):
@@ -2866,14 +2865,11 @@ def best_match_to_list(mypkg: Union[str, Atom], mylist: list) -> Optional[Atom]:
                 # Sort the cpvs to find the one closest to mypkg_cpv
                 cpv_list = [bestm.cpv, mypkg_cpv, x.cpv]
 
-                def cmp_cpv(cpv1, cpv2):
-                    v1 = getattr(cpv1, "version", None) or cpv_getversion(str(cpv1))
-                    v2 = getattr(cpv2, "version", None) or cpv_getversion(str(cpv2))
-                    return vercmp(v1, v2)
+                def cpv_key(cpv):
+                    v = getattr(cpv, "version", None) or cpv_getversion(str(cpv))
+                    return portage.versions._version_key(v)
 
-                from portage.util import cmp_sort_key
-
-                cpv_list.sort(key=cmp_sort_key(cmp_cpv))
+                cpv_list.sort(key=cpv_key)
                 if cpv_list[0] is mypkg_cpv or cpv_list[-1] is mypkg_cpv:
                     if cpv_list[1] is x.cpv:
                         bestm = x
@@ -3075,6 +3071,10 @@ def match_from_list(mydep: Union[str, Atom], candidate_list):
             mylist.append(x)
 
     elif operator in (">", ">=", "<", "<="):
+        # Compare precomputed version keys rather than calling vercmp for
+        # every candidate.
+        version_key = portage.versions._version_key
+        mydep_key = version_key(mydep.version)
         for x in candidate_list:
             if hasattr(x, "cp"):
                 pkg = x
@@ -3087,25 +3087,22 @@ def match_from_list(mydep: Union[str, Atom], candidate_list):
             if pkg.cp != mydep.cp:
                 continue
             try:
-                result = vercmp(pkg.version, mydep.version)
-            except ValueError:  # pkgcmp may return ValueError during int() conversion
-                from portage.util import writemsg
-
-                writemsg(_("\nInvalid package name: %s\n") % x, noiselevel=-1)
-                raise
-            if result is None:
+                pkg_key = pkg.cpv.version_key
+            except AttributeError:
+                pkg_key = version_key(pkg.version)
+            if pkg_key is None:
                 continue
             elif operator == ">":
-                if result > 0:
+                if pkg_key > mydep_key:
                     mylist.append(x)
             elif operator == ">=":
-                if result >= 0:
+                if pkg_key >= mydep_key:
                     mylist.append(x)
             elif operator == "<":
-                if result < 0:
+                if pkg_key < mydep_key:
                     mylist.append(x)
             elif operator == "<=":
-                if result <= 0:
+                if pkg_key <= mydep_key:
                     mylist.append(x)
             else:
                 raise KeyError(_("Unknown operator: %s") % mydep)
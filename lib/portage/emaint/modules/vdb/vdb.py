@@ -24,9 +24,13 @@ def _has_usable_metadata(pkgdir):
         return False
 
 
+def _vardb(settings):
+    return portage.db[settings.get("EROOT", "/")]["vartree"].dbapi
+
+
 def _iter_pkg_dirs(settings):
     """Yield (cpv, package directory) for every installed package."""
-    vardb = portage.db[settings.get("EROOT", "/")]["vartree"].dbapi
+    vardb = _vardb(settings)
     for cpv in sorted(vardb.cpv_all()):
         yield cpv, vardb.getpath(cpv)
 
@@ -80,6 +84,10 @@ class VdbMetadata:
             except Exception as e:
                 errors.append(f"{cpv}: {e}")
 
+        # Writing metadata files changed the package directories, so the
+        # FEATURES=vdb-index snapshot is re-read in full to match.
+        _vardb(settings)._vdb_index_refresh(full=True)
+
         if errors:
             return (False, errors)
         return (True, None)
@@ -101,6 +109,8 @@ class VdbMetadata:
             except Exception as e:
                 errors.append(f"{cpv}: {e}")
 
+        _vardb(settings)._vdb_index_refresh(full=True)
+
         if errors:
             return (False, errors)
         if restored:
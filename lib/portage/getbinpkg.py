@@ -1,5 +1,5 @@
 # getbinpkg.py -- Portage binary-package helper functions
-# Copyright 2003-2020 Gentoo Authors
+# Copyright 2003-2026 Gentoo Authors
 # Distributed under the terms of the GNU General Public License v2
 
 import os
@@ -59,6 +59,11 @@ def file_get(
     return 1
 
 
+def _pkg_instance(d):
+    """Return the key that identifies a package instance in an index."""
+    return (str(d["CPV"]), d.get("BUILD_ID", ""), d.get("PATH", ""))
+
+
 def _cmp_cpv(d1, d2):
     cpv1 = d1["CPV"]
     cpv2 = d2["CPV"]
@@ -70,6 +75,21 @@ def _cmp_cpv(d1, d2):
 
 
 class PackageIndex:
+    # Keys that have a distinct value for nearly every entry.
+    _distinct_pkg_keys = frozenset(
+        (
+            "BUILD_ID",
+            "BUILD_TIME",
+            "CPV",
+            "MD5",
+            "MTIME",
+            "PATH",
+            "SHA1",
+            "SIZE",
+            "_mtime_",
+        )
+    )
+
     def __init__(
         self,
         allowed_pkg_keys=None,
@@ -96,9 +116,15 @@ class PackageIndex:
         self.packages = []
         self.modified = True
 
-    def _readpkgindex(self, pkgfile, pkg_entry=True):
+    def _readpkgindex(self, pkgfile, pkg_entry=True, values=None):
+        """
+        Read one stanza. If values is a dict, values of keys that recur
+        across entries are replaced by equal values from it, and added
+        to it, so that the entries of an index share those strings.
+        """
         d = {}
         allowed_keys = self._allowed_pkg_keys if pkg_entry else None
+        distinct_keys = self._distinct_pkg_keys
 
         for line in pkgfile:
             line = line.rstrip("\n")
@@ -117,6 +143,8 @@ class PackageIndex:
             # that entries share those strings, rather than each retaining its
             # own strings produced by split().
             k = sys.intern(k)
+            if values is not None and k not in distinct_keys:
+                v = values.setdefault(v, v)
             d[k] = v
         return d
 
@@ -132,46 +160,201 @@ class PackageIndex:
     def readHeader(self, pkgfile):
         self.header.update(self._readpkgindex(pkgfile, pkg_entry=False))
 
+    def _fill_entry(self, d, header):
+        if self._default_pkg_data:
+            for k, v in self._default_pkg_data.items():
+                d.setdefault(k, v)
+        if self._inherited_keys:
+            for k in self._inherited_keys:
+                v = header.get(k)
+                if v:
+                    d.setdefault(k, v)
+
     def readBody(self, pkgfile):
+        # Identical KEYWORDS, LICENSE, IUSE and dependency strings are
+        # common among the entries of large indexes.
+        values = {}
         while True:
-            d = self._readpkgindex(pkgfile)
+            d = self._readpkgindex(pkgfile, values=values)
             if not d:
                 break
             mycpv = d.get("CPV")
             if not mycpv:
                 continue
-            if self._default_pkg_data:
-                for k, v in self._default_pkg_data.items():
-                    d.setdefault(k, v)
-            if self._inherited_keys:
-                for k in self._inherited_keys:
-                    v = self.header.get(k)
-                    if v:
-                        d.setdefault(k, v)
+            self._fill_entry(d, self.header)
             self.packages.append(d)
 
-    def write(self, pkgfile):
+    def _header_items(self):
+        return [(k, self.header[k]) for k in sorted(self.header) if self.header[k]]
+
+    def _entry_items(self, metadata):
+        """Return the (key, value) pairs that write() records for the
+        package described by metadata."""
+        metadata = metadata.copy()
+        if self._inherited_keys:
+            for k in self._inherited_keys:
+                v = self.header.get(k)
+                if v and v == metadata.get(k):
+                    del metadata[k]
+        if self._default_pkg_data:
+            for k, v in self._default_pkg_data.items():
+                if metadata.get(k) == v:
+                    metadata.pop(k, None)
+        return [(k, str(metadata[k])) for k in sorted(metadata) if metadata[k]]
+
+    def write(self, pkgfile, after=None):
+        """
+        Write the index to pkgfile. If it was modified, its TIMESTAMP is
+        set to the current time, or to one second past the TIMESTAMP
+        given by after if that is not earlier, so that successive
+        versions of an index always have distinct TIMESTAMPs.
+        """
         if self.modified:
-            self.header["TIMESTAMP"] = str(int(time.time()))
+            timestamp = int(time.time())
+            if after is not None:
+                try:
+                    timestamp = max(timestamp, int(after) + 1)
+                except ValueError:
+                    pass
+            self.header["TIMESTAMP"] = str(timestamp)
             self.header["PACKAGES"] = str(len(self.packages))
-        keys = list(self.header)
-        keys.sort()
-        self._writepkgindex(
-            pkgfile, [(k, self.header[k]) for k in keys if self.header[k]]
-        )
+        self._writepkgindex(pkgfile, self._header_items())
         for metadata in sorted(self.packages, key=portage.util.cmp_sort_key(_cmp_cpv)):
-            metadata = metadata.copy()
-            if self._inherited_keys:
-                for k in self._inherited_keys:
-                    v = self.header.get(k)
-                    if v and v == metadata.get(k):
-                        del metadata[k]
-            if self._default_pkg_data:
-                for k, v in self._default_pkg_data.items():
-                    if metadata.get(k) == v:
-                        metadata.pop(k, None)
-            keys = list(metadata)
-            keys.sort()
+            self._writepkgindex(pkgfile, self._entry_items(metadata))
+
+    def writeDelta(self, pkgfile, previous):
+        """
+        Write the changes from previous, an earlier PackageIndex of the
+        same binhost, to this one, in the format that readDelta() reads.
+        This has to follow write(), which sets the TIMESTAMP of this index.
+
+        A delta starts with the header of this index, with a DELTA_FROM
+        key holding the TIMESTAMP of previous. Then follow the entries of
+        added or changed packages, which replace any entry of the same
+        package instance, and stanzas holding only the CPV, BUILD_ID and
+        PATH of removed package instances and a REMOVED key.
+        """
+        removed = {}
+        for metadata in previous.packages:
+            removed[_pkg_instance(metadata)] = self._entry_items(metadata)
+        changed = []
+        for metadata in sorted(self.packages, key=portage.util.cmp_sort_key(_cmp_cpv)):
+            items = self._entry_items(metadata)
+            if removed.pop(_pkg_instance(metadata), None) != items:
+                changed.append(items)
+
+        header_items = self._header_items()
+        header_items.append(("DELTA_FROM", previous.header["TIMESTAMP"]))
+        header_items.sort()
+        self._writepkgindex(pkgfile, header_items)
+        for items in changed:
+            self._writepkgindex(pkgfile, items)
+        for cpv, build_id, path in sorted(removed):
             self._writepkgindex(
-                pkgfile, ((k, metadata[k]) for k in keys if metadata[k])
+                pkgfile,
+                [
+                    (k, v)
+                    for k, v in (
+                        ("BUILD_ID", build_id),
+                        ("CPV", cpv),
+                        ("PATH", path),
+                        ("REMOVED", "1"),
+                    )
+                    if v
+                ],
             )
+
+    def readDelta(self, pkgfile):
+        """
+        Apply a delta written by writeDelta() to this index. Raises
+        ValueError, and leaves the index unchanged, if the delta does not
+        start at the TIMESTAMP of this index or does not result in the
+        number of packages that it records.
+        """
+        header = self._readpkgindex(pkgfile, pkg_entry=False)
+        timestamp = self.header.get("TIMESTAMP")
+        if not timestamp or header.pop("DELTA_FROM", None) != timestamp:
+            raise ValueError(_("delta does not apply to TIMESTAMP %s") % timestamp)
+        new_header = {}
+        if self._default_header_data:
+            new_header.update(self._default_header_data)
+        new_header.update(header)
+
+        removed = set()
+        changed = {}
+        while True:
+            d = self._readpkgindex(pkgfile, pkg_entry=False)
+            if not d:
+                break
+            if not d.get("CPV"):
+                continue
+            if d.pop("REMOVED", None):
+                removed.add(_pkg_instance(d))
+                continue
+            if self._allowed_pkg_keys is not None:
+                d = {k: v for k, v in d.items() if k in self._allowed_pkg_keys}
+            self._fill_entry(d, new_header)
+            changed[_pkg_instance(d)] = d
+
+        packages = [
+            d
+            for d in self.packages
+            if _pkg_instance(d) not in removed and _pkg_instance(d) not in changed
+        ]
+        packages.extend(changed.values())
+        if new_header.get("PACKAGES") != str(len(packages)):
+            raise ValueError(
+                _("delta results in %d packages instead of %s")
+                % (len(packages), new_header.get("PACKAGES"))
+            )
+        self.header = new_header
+        self.packages = packages
+
+
+class PackageIndexDeltas:
+    """
+    The Packages.delta file of a binhost, which lists the deltas that
+    lead from earlier versions of its Packages index to the current one.
+    Its header holds the TIMESTAMP of the current index, and each of the
+    following stanzas describes one delta file by the TIMESTAMP it
+    applies to (FROM), the TIMESTAMP it results in (TO), and its PATH,
+    SIZE and SHA256. Delta files are gzip compressed and written by
+    PackageIndex.writeDelta().
+    """
+
+    def __init__(self):
+        self.header = {}
+        self.deltas = []
+
+    def read(self, pkgfile):
+        reader = PackageIndex()
+        self.header = reader._readpkgindex(pkgfile, pkg_entry=False)
+        self.deltas = []
+        while True:
+            d = reader._readpkgindex(pkgfile, pkg_entry=False)
+            if not d:
+                break
+            if all(d.get(k) for k in ("FROM", "TO", "PATH", "SIZE", "SHA256")):
+                self.deltas.append(d)
+
+    def write(self, pkgfile):
+        writer = PackageIndex()
+        writer._writepkgindex(pkgfile, sorted(self.header.items()))
+        for d in self.deltas:
+            writer._writepkgindex(pkgfile, sorted(d.items()))
+
+    def chain(self, timestamp):
+        """
+        Return the deltas that lead from the index with the given TIMESTAMP
+        to the current one, in the order they have to be applied, or None
+        if there is no such chain.
+        """
+        by_from = {d["FROM"]: d for d in self.deltas}
+        chain = []
+        while timestamp != self.header.get("TIMESTAMP"):
+            d = by_from.pop(timestamp, None)
+            if d is None:
+                return None
+            chain.append(d)
+            timestamp = d["TO"]
+        return chain
@@ -1,21 +1,23 @@
-# Copyright 2003-2022 Gentoo Authors
+# Copyright 2003-2026 Gentoo Authors
 # Distributed under the terms of the GNU General Public License v2
 
 import codecs
+import json
 import operator
 import os
 import re
 import sys
+import time
 import xml.dom.minidom
 from functools import reduce
 from io import StringIO
 from urllib.request import urlopen as urllib_request_urlopen
 
 import portage
-from portage.const import PRIVATE_PATH
+from portage.const import CACHE_PATH, PRIVATE_PATH
 from portage.dep import _slot_separator
 from portage.localization import _
-from portage.util import grabfile
+from portage.util import atomic_ofstream, ensure_dirs, grabfile
 from portage.versions import pkgsplit, vercmp
 
 # Note: the space for rgt and rlt is important !!
@@ -35,6 +37,12 @@ NEWLINE_ESCAPE = "!;\\n"  # some random string to mark newlines that should be p
 SPACE_ESCAPE = "!;_"  # some random string to mark spaces that should be preserved
 # See PMS 3.1.7 "Keyword names"
 ARCH_REGEX = re.compile(r"^\*$|^[-_a-z0-9 ]+$")
+# Version of the GlsaIndex file format
+GLSA_INDEX_VERSION = 1
+# A GLSA directory modified this shortly (in nanoseconds) before the index
+# is compiled may change again within the same mtime tick, so the index is
+# not written then.
+_GLSA_INDEX_RACY_NS = 2 * 10**9
 
 
 def get_applied_glsas(settings):
@@ -100,6 +108,21 @@ def wrap(text, width, caption=""):
     return rValue
 
 
+def get_glsa_dir(myconfig):
+    """
+    Returns the directory containing the GLSAs of the given config.
+
+    @type	myconfig: portage.config
+    @param	myconfig: Portage settings instance
+
+    @rtype:		String
+    @return:	the GLSA directory
+    """
+    if "GLSA_DIR" in myconfig:
+        return myconfig["GLSA_DIR"]
+    return os.path.join(myconfig["PORTDIR"], "metadata", "glsa")
+
+
 def get_glsa_list(myconfig):
     """
     Returns a list of all available GLSAs in the given repository
@@ -113,9 +136,7 @@ def get_glsa_list(myconfig):
     @return:	a list of GLSA IDs in this repository
     """
 
-    repository = os.path.join(myconfig["PORTDIR"], "metadata", "glsa")
-    if "GLSA_DIR" in myconfig:
-        repository = myconfig["GLSA_DIR"]
+    repository = get_glsa_dir(myconfig)
 
     if not os.access(repository, os.R_OK):
         return []
@@ -836,3 +857,145 @@ class Glsa:
                 if update:
                     systemAffection.extend(update)
         return systemAffection
+
+
+class GlsaIndex:
+    """
+    A compiled index of the packages affected by the GLSAs in the GLSA
+    directory, which allows to find the GLSAs affecting a system without
+    parsing every GLSA. It holds the affected package, arch list and the
+    vulnerable and unaffected atoms of each GLSA, and is stored in
+    $EROOT/var/cache/edb/glsa_index.json, where it is used for as long as
+    the mtime of the GLSA directory is unchanged.
+    """
+
+    def __init__(self, myconfig):
+        """
+        Loads the index for the GLSA directory of I{myconfig}, compiling
+        it from the GLSA files if it is missing or out of date.
+
+        @type	myconfig: portage.config
+        @param	myconfig: the config that should be used for this object.
+        """
+        self.config = myconfig
+        self.directory = get_glsa_dir(myconfig)
+        self.filename = os.path.join(myconfig["EROOT"], CACHE_PATH, "glsa_index.json")
+        self.glsas = self._load()
+
+    def _load(self):
+        try:
+            mtime = os.stat(self.directory).st_mtime_ns
+        except OSError:
+            return {}
+        try:
+            with open(self.filename, encoding="utf-8") as f:
+                d = json.load(f)
+        except (OSError, ValueError):
+            d = None
+        if (
+            isinstance(d, dict)
+            and d.get("version") == GLSA_INDEX_VERSION
+            and d.get("directory") == self.directory
+            and d.get("mtime") == mtime
+            and isinstance(d.get("glsas"), dict)
+        ):
+            return d["glsas"]
+
+        glsas = self._compile()
+        if time.time_ns() - mtime >= _GLSA_INDEX_RACY_NS:
+            self._write(
+                {
+                    "version": GLSA_INDEX_VERSION,
+                    "directory": self.directory,
+                    "mtime": mtime,
+                    "glsas": glsas,
+                }
+            )
+        return glsas
+
+    def _compile(self):
+        """
+        Parses all GLSAs in the GLSA directory. GLSAs that cannot be parsed
+        are recorded as None, so that they are handed to L{Glsa} again,
+        which reports the error.
+        """
+        glsas = {}
+        for glsa_id in get_glsa_list(self.config):
+            try:
+                myglsa = Glsa(glsa_id, self.config, None, None)
+            except Exception:
+                glsas[glsa_id] = None
+                continue
+            glsas[glsa_id] = [
+                [cp, path["arch"], path["vul_atoms"], path["unaff_atoms"]]
+                for cp, paths in myglsa.packages.items()
+                for path in paths
+            ]
+        return glsas
+
+    def _write(self, d):
+        try:
+            ensure_dirs(os.path.dirname(self.filename))
+            f = atomic_ofstream(self.filename, mode="wb")
+        except (OSError, portage.exception.PortageException):
+            return
+        f.write(json.dumps(d, sort_keys=True).encode("utf-8", "strict"))
+        try:
+            f.close()
+        except OSError:
+            pass
+
+    def affected(self, vardbapi, glsa_ids=None, match_arch=True):
+        """
+        Returns the GLSAs of I{glsa_ids} that affect installed packages,
+        in the same order. The index is intersected with the installed
+        packages in a single pass, and only the GLSAs whose affected
+        packages are installed are matched against I{vardbapi}. GLSAs that
+        are not in the index or that could not be parsed are always
+        returned, so that the caller handles them as a L{Glsa}.
+
+        @type	vardbapi: portage.dbapi.vartree.vardbapi
+        @param	vardbapi: installed package repository
+        @type	glsa_ids: List of Strings
+        @param	glsa_ids: the GLSA IDs to check, all indexed GLSAs if None
+        @type	match_arch: Boolean
+        @param	match_arch: False to ignore the affected architectures, like
+                            L{Glsa.getMergeList} does
+        @rtype:		List of Strings
+        @return:	the IDs of the (possibly) affecting GLSAs
+        """
+        if glsa_ids is None:
+            glsa_ids = list(self.glsas)
+        installed = set(vardbapi.cp_all())
+        arch = self.config["ARCH"]
+        matches = {}
+
+        def installed_matches(atoms):
+            rValue = set()
+            for atom in atoms:
+                if atom not in matches:
+                    matches[atom] = match(atom, vardbapi)
+                rValue.update(matches[atom])
+            return rValue
+
+        rValue = []
+        for glsa_id in glsa_ids:
+            packages = self.glsas.get(glsa_id)
+            if packages is None:
+                rValue.append(glsa_id)
+                continue
+            for cp, arches, vul_atoms, unaff_atoms in packages:
+                if not ARCH_REGEX.match(arches):
+                    # Let Glsa.isVulnerable report the invalid arch list.
+                    rValue.append(glsa_id)
+                    break
+                if cp not in installed:
+                    continue
+                if match_arch and arches != "*" and arch not in arches.split():
+                    continue
+                if installed_matches(vul_atoms).difference(
+                    installed_matches(unaff_atoms)
+                ):
+                    rValue.append(glsa_id)
+                    break
+        return rValue
@@ -659,6 +659,43 @@ class checksum_helper:
             raise InvalidSignature("GnuPG verification failed")
 
 
+class checksum_reader:
+    """
+    File-like object that reads a file inside of a tar container, and
+    passes everything that is read through a checksum helper, so that a
+    file can be checked while it is processed.
+
+    reader = checksum_reader(
+            fileobj,             # the fileobj from tarfile.extractfile(f)
+            checksum_helper,     # checksum helper
+    )
+
+    reader.read()
+    reader.close()
+    """
+
+    def __init__(self, fileobj, checksum_info):
+        self.fileobj = fileobj
+        self.checksum_info = checksum_info
+
+    def read(self, bufsize=-1):
+        data = self.fileobj.read(bufsize)
+        if data:
+            self.checksum_info.update(data)
+        return data
+
+    def drain(self):
+        """
+        Read the rest of the file, which the consumer of the data did not
+        need.
+        """
+        while self.read(HASHING_BLOCKSIZE):
+            pass
+
+    def close(self):
+        self.fileobj.close()
+
+
 class tar_safe_extract:
     """
     A safer version of TarFile's extractall that performs a sanity check.
@@ -1071,6 +1108,11 @@ class gpkg:
     def decompress(self, decompress_dir):
         """
         Decompress current gpkg to decompress_dir
+
+        With FEATURES="binpkg-stream-extract", the image is extracted to a
+        staging directory while it is verified, so that the package is
+        only read once, and it is only moved to decompress_dir once the
+        whole package has been verified.
         """
         decompress_dir = normalize_path(
             decompress_dir.decode("utf-8", "strict")
@@ -1078,29 +1120,59 @@ class gpkg:
             else decompress_dir
         )
 
-        self._verify_binpkg()
+        if "binpkg-stream-extract" not in self.settings.features:
+            self._verify_binpkg()
+            os.makedirs(decompress_dir, mode=0o755, exist_ok=True)
+
+            with tarfile.open(self.gpkg_file, "r") as container:
+                image_tarinfo, image_comp = self._get_inner_tarinfo(container, "image")
+                self._extract_image(
+                    container.extractfile(image_tarinfo), image_comp, decompress_dir
+                )
+            return
+
         os.makedirs(decompress_dir, mode=0o755, exist_ok=True)
+        staging_dir = tempfile.TemporaryDirectory(dir=decompress_dir)
+        extracted = []
 
-        with tarfile.open(self.gpkg_file, "r") as container:
-            image_tarinfo, image_comp = self._get_inner_tarinfo(container, "image")
-
-            with (
-                tar_stream_reader(
-                    container.extractfile(image_tarinfo),
-                    self._get_decompression_cmd(image_comp),
-                ) as image_tar,
-                tarfile.open(mode="r|", fileobj=image_tar) as image,
-            ):
-                try:
-                    image_safe = tar_safe_extract(image, "image")
-                    image_safe.extractall(decompress_dir)
-                    image_tar.close()
-                except Exception:
-                    writemsg(colorize("BAD", "!!!Extract failed.\n"))
-                    raise
-                finally:
-                    if not image_tar.closed:
-                        image_tar.kill()
+        def extract_image(image_io, image_comp):
+            extracted.append(image_comp)
+            self._extract_image(image_io, image_comp, staging_dir.name)
+
+        try:
+            self._verify_binpkg(image_consumer=extract_image)
+            if not extracted:
+                raise FileNotFound("File Not found: image")
+            for file in os.listdir(staging_dir.name):
+                shutil.move(
+                    os.path.join(staging_dir.name, file),
+                    os.path.join(decompress_dir, file),
+                )
+        finally:
+            staging_dir.cleanup()
+
+    def _extract_image(self, image_io, image_comp, dest_dir):
+        """
+        Extract the image from image_io, with the given compression, to
+        dest_dir.
+        """
+        with (
+            tar_stream_reader(
+                image_io,
+                self._get_decompression_cmd(image_comp),
+            ) as image_tar,
+            tarfile.open(mode="r|", fileobj=image_tar) as image,
+        ):
+            try:
+                image_safe = tar_safe_extract(image, "image")
+                image_safe.extractall(dest_dir)
+                image_tar.close()
+            except Exception:
+                writemsg(colorize("BAD", "!!!Extract failed.\n"))
+                raise
+            finally:
+                if not image_tar.closed:
+                    image_tar.kill()
 
     def update_metadata(self, metadata, new_basename=None, force=False):
         """
@@ -1623,9 +1695,15 @@ class gpkg:
 
         signature.close()
 
-    def _verify_binpkg(self, metadata_only=False):
+    def _verify_binpkg(self, metadata_only=False, image_consumer=None):
         """
         Verify current GPKG file.
+
+        image_consumer is an optional function that is called with a
+        file-like object for the image and its compression, when the image
+        is verified. Everything it reads from the object is checked, and
+        any exception that it raises is raised after the checksums of the
+        image, which take precedence, have been checked.
         """
         # Check file path
         if self.gpkg_file is None:
@@ -1788,14 +1866,23 @@ class gpkg:
                     checksum_info = checksum_helper(self.settings)
 
                 # Verify current file checksum
-                f_io = container.extractfile(f)
-                while True:
-                    buffer = f_io.read(HASHING_BLOCKSIZE)
-                    if buffer:
-                        checksum_info.update(buffer)
-                    else:
-                        checksum_info.finish()
-                        break
+                f_io = checksum_reader(container.extractfile(f), checksum_info)
+                consumer_error = None
+                if image_consumer is not None and f_signature:
+                    try:
+                        f_name, f_comp = self._extract_filename_compression(f)
+                    except InvalidCompressionMethod:
+                        f_name = None
+                    if f_name == "image":
+                        try:
+                            image_consumer(f_io, f_comp)
+                        except Exception as e:
+                            consumer_error = e
+                        # Only the first image is extracted, like
+                        # _get_inner_tarinfo does.
+                        image_consumer = None
+                f_io.drain()
+                checksum_info.finish()
                 f_io.close()
 
                 # At least one supported checksum must be checked
@@ -1820,6 +1907,9 @@ class gpkg:
                         f"{f} no supported checksum found in {self.gpkg_file}"
                     )
 
+                if consumer_error is not None:
+                    raise consumer_error
+
                 # Current file verified
                 unverified_files.remove(f)
                 unverified_manifest.remove(manifest_record)
@@ -1872,6 +1962,17 @@ class gpkg:
         if mode not in compressor:
             raise InvalidCompressionMethod(f"{compression}: {mode}")
 
+        # Prefer a multi-threaded implementation when one is installed.
+        if mode + "_parallel" in compressor:
+            cmd = shlex.split(
+                compressor[mode + "_parallel"].replace(
+                    "{JOBS}",
+                    str(makeopts_to_job_count(self.settings.get("MAKEOPTS", "1"))),
+                )
+            )
+            if find_binary(cmd[0]):
+                return cmd
+
         if mode == "compress" and (
             self.settings.get(f"BINPKG_COMPRESS_FLAGS_{compression.upper()}", None)
             is not None
@@ -670,13 +670,21 @@ class Manifest:
         for t in MANIFEST2_IDENTIFIERS:
             self.checkTypeHashes(t, ignoreMissingFiles=ignoreMissingFiles)
 
-    def checkTypeHashes(self, idtype, ignoreMissingFiles=False, hash_filter=None):
+    def checkTypeHashes(
+        self, idtype, ignoreMissingFiles=False, hash_filter=None, digest_cache=None
+    ):
         for f in self.fhashdict[idtype]:
             self.checkFileHashes(
-                idtype, f, ignoreMissing=ignoreMissingFiles, hash_filter=hash_filter
+                idtype,
+                f,
+                ignoreMissing=ignoreMissingFiles,
+                hash_filter=hash_filter,
+                digest_cache=digest_cache,
             )
 
-    def checkFileHashes(self, ftype, fname, ignoreMissing=False, hash_filter=None):
+    def checkFileHashes(
+        self, ftype, fname, ignoreMissing=False, hash_filter=None, digest_cache=None
+    ):
         from portage.checksum import (
             _apply_hash_filter,
             _filter_unaccelarated_hashes,
@@ -687,7 +695,9 @@ class Manifest:
         if hash_filter is not None:
             digests = _apply_hash_filter(digests, hash_filter)
         try:
-            ok, reason = verify_all(self._getAbsname(ftype, fname), digests)
+            ok, reason = verify_all(
+                self._getAbsname(ftype, fname), digests, digest_cache=digest_cache
+            )
             if not ok:
                 raise DigestException(
                     tuple([self._getAbsname(ftype, fname)] + list(reason))
@@ -14,9 +14,12 @@ __all__ = [
 ]
 
 import fnmatch
+import json
 import logging
 import os
 import re
+import stat
+import time
 from collections import OrderedDict
 from re import Match, Pattern
 from typing import TYPE_CHECKING, Any, Optional
@@ -25,13 +28,15 @@ if TYPE_CHECKING:
     import portage.dbapi.vartree
     import portage.package.ebuild.config
 
-from portage.const import NEWS_LIB_PATH
+from portage.const import CACHE_PATH, NEWS_LIB_PATH, VDB_PATH
 from portage.data import portage_gid
-from portage.dep import isvalidatom
+from portage.dep import Atom, isvalidatom
 from portage.exception import (
+    InvalidAtom,
     InvalidLocation,
     OperationNotPermitted,
     PermissionDenied,
+    PortageException,
     ReadOnlyFileSystem,
 )
 from portage.localization import _
@@ -46,6 +51,13 @@ from portage.util import (
     writemsg_level,
 )
 
+# Version of the news cache file format
+_NEWS_CACHE_VERSION = 1
+# Files modified this shortly (in nanoseconds) before the news cache is
+# written may change again within the same mtime tick, so the result of
+# the evaluation is not cached then.
+_NEWS_CACHE_RACY_NS = 2 * 10**9
+
 
 class NewsManager:
     """
@@ -58,6 +70,12 @@ class NewsManager:
     news_path - path to news items; usually $REPODIR/metadata/news
     unread_path - path to the news.repoid.unread file; this helps us track news items
 
+    The parsed restrictions of the news items of each repository are cached in
+    $EROOT/var/cache/edb/news, along with the state of the news directory,
+    the installed packages, the profile and the skip file under which they
+    were last evaluated. While that state is unchanged, there is nothing new
+    to evaluate. The state of the news directory is its mtime, which changes
+    when items are added or removed.
     """
 
     def __init__(
@@ -103,6 +121,41 @@ class NewsManager:
     def _skip_filename(self, repoid: str) -> str:
         return os.path.join(self.unread_path, f"news-{repoid}.skip")
 
+    def _cache_filename(self, repoid: str) -> str:
+        return os.path.join(
+            self.config["EROOT"], CACHE_PATH, "news", f"news-{repoid}.json"
+        )
+
+    @staticmethod
+    def _stat_key(path: str) -> Optional[list[int]]:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return [st.st_mtime_ns, st.st_size]
+
+    def _load_cache(self, cache_filename: str) -> dict[str, Any]:
+        try:
+            with open(cache_filename, encoding="utf-8") as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if (
+            not isinstance(cache, dict)
+            or cache.get("version") != _NEWS_CACHE_VERSION
+            or not isinstance(cache.get("items"), dict)
+        ):
+            return {}
+        return cache
+
+    def _write_cache(self, cache_filename: str, cache: dict[str, Any]) -> None:
+        # The cache only saves work, so failure to write it is not an error.
+        try:
+            ensure_dirs(os.path.dirname(cache_filename))
+            write_atomic(cache_filename, json.dumps(cache, sort_keys=True))
+        except (OSError, PortageException):
+            pass
+
     def _news_dir(self, repoid: str) -> str:
         repo_path: Optional[str] = self.portdb.getRepositoryPath(repoid)
         if repo_path is None:
@@ -116,6 +169,28 @@ class NewsManager:
         items into the news.repoid.unread file.
         """
 
+        news_dir: str = self._news_dir(repoid)
+        news_mtime: int = os.stat(news_dir).st_mtime_ns
+        skip_filename: str = self._skip_filename(repoid)
+        unread_filename: str = self._unread_filename(repoid)
+        cache_filename: str = self._cache_filename(repoid)
+        vdb_key: Optional[list[int]] = self._stat_key(
+            os.path.join(self.config["EROOT"], VDB_PATH)
+        )
+        state: Optional[list[Any]] = [
+            news_dir,
+            news_mtime,
+            self.language_id,
+            self._profile_path,
+            self.config.get("ARCH", ""),
+            vdb_key,
+            self._stat_key(skip_filename),
+        ]
+        cache: dict[str, Any] = self._load_cache(cache_filename)
+        if cache.get("state") == state:
+            # Nothing changed since the last evaluation.
+            return
+
         # Ensure that the unread path exists and is writable.
 
         try:
@@ -132,14 +207,11 @@ class NewsManager:
         if not os.access(self.unread_path, os.W_OK):
             return
 
-        news_dir: str = self._news_dir(repoid)
         news: list[str] = os.listdir(news_dir)
 
         if not news:
             return
 
-        skip_filename: str = self._skip_filename(repoid)
-        unread_filename: str = self._unread_filename(repoid)
         unread_lock: Optional[bool] = lockfile(unread_filename, wantnewlockfile=1)
         try:
             try:
@@ -150,6 +222,13 @@ class NewsManager:
             except PermissionDenied:
                 return
 
+            racy: int = time.time_ns() - _NEWS_CACHE_RACY_NS
+            cached_items: dict[str, Any] = cache.get("items", {})
+            items: dict[str, Any] = {}
+            installed = _InstalledPackages(self.vdb)
+            # Items with errors are not cached, so that the errors are
+            # reported each time.
+            complete: bool = True
             for itemid in news:
                 try:
                     if isinstance(itemid, bytes):
@@ -162,6 +241,7 @@ class NewsManager:
                         level=logging.ERROR,
                         noiselevel=-1,
                     )
+                    complete = False
                     continue
 
                 if itemid in skip:
@@ -169,13 +249,32 @@ class NewsManager:
                 filename = os.path.join(
                     news_dir, itemid, f"{itemid}.{self.language_id}.txt"
                 )
-                if not os.path.isfile(filename):
+                try:
+                    st = os.stat(filename)
+                except OSError:
                     continue
-                item = NewsItem(filename, itemid)
-                if not item.isValid():
+                if not stat.S_ISREG(st.st_mode):
                     continue
+                item_key = [st.st_mtime_ns, st.st_size]
+                item: Optional[NewsItem] = None
+                cached = cached_items.get(itemid)
+                if isinstance(cached, list) and cached[:1] == [item_key]:
+                    try:
+                        item = NewsItem._from_cache(filename, itemid, cached[1])
+                    except (IndexError, KeyError, TypeError, ValueError):
+                        pass
+                if item is None:
+                    item = NewsItem(filename, itemid)
+                    if not item.isValid():
+                        complete = False
+                        continue
+                if st.st_mtime_ns < racy:
+                    items[itemid] = [item_key, item._to_cache()]
                 if item.isRelevant(
-                    profile=self._profile_path, config=self.config, vardb=self.vdb
+                    profile=self._profile_path,
+                    config=self.config,
+                    vardb=self.vdb,
+                    installed=installed,
                 ):
                     unread.add(item.name)
                     skip.add(item.name)
@@ -200,6 +299,18 @@ class NewsManager:
                     mask=self._mode_mask,
                 )
 
+            # The skip file is part of the state, since items that are
+            # removed from it are evaluated again.
+            state[-1] = self._stat_key(skip_filename)
+            mtimes = [news_mtime]
+            mtimes.extend(key[0] for key in (vdb_key, state[-1]) if key is not None)
+            if not complete or max(mtimes) >= racy:
+                state = None
+            self._write_cache(
+                cache_filename,
+                {"version": _NEWS_CACHE_VERSION, "state": state, "items": items},
+            )
+
         finally:
             unlockfile(unread_lock)
 
@@ -266,11 +377,38 @@ class NewsItem:
         self._parsed = False
         self._valid = True
 
+    @classmethod
+    def _from_cache(cls, path: str, name: str, restrictions: list) -> "NewsItem":
+        """
+        Create a parsed item from restrictions returned by L{_to_cache}.
+        """
+        item = cls(path, name)
+        item.restrictions = {}
+        item._restriction_args = []
+        for class_name, value, news_format in restrictions:
+            restriction = _restriction_classes[class_name]
+            item.restrictions.setdefault(id(restriction), []).append(
+                restriction(value, news_format)
+            )
+            item._restriction_args.append((class_name, value, news_format))
+        item._parsed = True
+        return item
+
+    def _to_cache(self) -> list[list[str]]:
+        """
+        Return the restrictions of this item in a form that can be stored
+        in the news cache.
+        """
+        if not self._parsed:
+            self.parse()
+        return [list(args) for args in self._restriction_args]
+
     def isRelevant(
         self,
         vardb: "portage.dbapi.vartree.vardbapi",
         config: "portage.package.ebuild.config.config",
         profile: Optional[str],
+        installed: Optional["_InstalledPackages"] = None,
     ) -> bool:
         """
         This function takes a dict of keyword arguments; one should pass in any
@@ -282,6 +420,9 @@ class NewsItem:
         Restrictions of the form Display-X are OR'd with like-restrictions;
         otherwise restrictions are AND'd.  any_match is the ORing and
         all_match is the ANDing.
+
+        Installed packages are matched against installed, rather than
+        against vardb, when it is given.
         """
 
         if not self._parsed:
@@ -290,7 +431,12 @@ class NewsItem:
         if not len(self.restrictions):
             return True
 
-        kwargs: dict[str, Any] = {"vardb": vardb, "config": config, "profile": profile}
+        kwargs: dict[str, Any] = {
+            "vardb": vardb,
+            "config": config,
+            "profile": profile,
+            "installed": installed,
+        }
 
         all_match: bool = True
         for values in self.restrictions.values():
@@ -318,6 +464,7 @@ class NewsItem:
         ) as f:
             lines = f.readlines()
         self.restrictions = {}
+        self._restriction_args = []
         invalids = []
         news_format: Optional[str] = None
 
@@ -354,6 +501,13 @@ class NewsItem:
                             self.restrictions.setdefault(id(restriction), []).append(
                                 restrict
                             )
+                            self._restriction_args.append(
+                                (
+                                    restriction.__name__,
+                                    match.groups()[0].strip(),
+                                    news_format,
+                                )
+                            )
                         continue
 
         if invalids:
@@ -441,9 +595,53 @@ class DisplayInstalledRestriction(DisplayRestriction):
         return isvalidatom(self.atom)
 
     def checkRestriction(self, **kwargs) -> Optional[Match[str]]:
+        if kwargs.get("installed") is not None:
+            return kwargs["installed"].match(self.atom)
         return kwargs["vardb"].match(self.atom)
 
 
+_restriction_classes: dict[str, type[DisplayRestriction]] = {
+    restriction.__name__: restriction
+    for restriction in (
+        DisplayInstalledRestriction,
+        DisplayKeywordRestriction,
+        DisplayProfileRestriction,
+    )
+}
+
+
+class _InstalledPackages:
+    """
+    Matches the atoms of Display-If-Installed restrictions against the
+    installed packages. The atoms of packages that are not installed at all
+    are answered from the set of installed package names, without a
+    vardb.match() call, and the results are shared by all news items.
+    """
+
+    def __init__(self, vardb: "portage.dbapi.vartree.vardbapi") -> None:
+        self._vardb = vardb
+        self._cps: Optional[set[str]] = None
+        self._matches: dict[str, list[str]] = {}
+
+    def match(self, atom: str) -> list[str]:
+        try:
+            return self._matches[atom]
+        except KeyError:
+            pass
+        if self._cps is None:
+            self._cps = set(self._vardb.cp_all())
+        try:
+            cp: Optional[str] = Atom(atom).cp
+        except InvalidAtom:
+            cp = None
+        if cp is not None and cp not in self._cps:
+            result = []
+        else:
+            result = self._vardb.match(atom)
+        self._matches[atom] = result
+        return result
+
+
 def count_unread_news(
     portdb: "portage.dbapi.porttree.portdbapi",
     vardb: "portage.dbapi.vartree.vardbapi",
@@ -0,0 +1,341 @@
+# Copyright 2026 Gentoo Authors
+# Distributed under the terms of the GNU General Public License v2
+
+"""
+Cache of the state that config builds from the profile stack.
+
+Every config constructor parses the make.defaults of each profile and
+builds a UseManager, LicenseManager, KeywordsManager and MaskManager from
+the package.* and use.* files of the profiles, of the profiles directories
+of the repositories and of the user config. ProfileCache pickles that
+state, as it is right after parsing, to one file per component in
+$EROOT/var/cache/edb/profile_cache, so that the next config constructor
+for the same profile stack can load it instead.
+
+A cache file is only used when it was written for the same portage
+version, profile stack, repositories and parameters, and when the stat()
+of every file the component may have read, and of every file that might
+have been added since, is unchanged. Files modified shortly before the
+cache would be written are not trusted to stay that way, in which case
+nothing is written. Messages about problems in the profile files that
+are shown while they are parsed are stored along with the state, and
+shown again when it is loaded.
+
+Since the cache files are pickles, they are only loaded from a
+directory and files that are owned by root or by the current user and
+that no one else may write to.
+
+The cache is used only when PORTAGE_PROFILE_CACHE=1 is set in the
+environment or in make.conf.
+"""
+
+__all__ = ("ProfileCache", "manager_state", "recording", "restore_manager")
+
+import contextlib
+import hashlib
+import io
+import pickle
+import sys
+import tempfile
+import time
+
+import portage
+from portage import os
+from portage.exception import PortageException
+from portage.util import ensure_dirs, writemsg
+from portage.util.pickle import AllowedGlobalsUnpickler
+
+_FORMAT_VERSION = 2
+
+# Profile files, relative to a profile directory, to the profiles
+# directory of a repository or to the user config, that the cached
+# components read.
+_PROFILE_FILES = (
+    "eapi",
+    "license_groups",
+    "make.defaults",
+    "package.accept_keywords",
+    "package.keywords",
+    "package.license",
+    "package.mask",
+    "package.unmask",
+    "package.use",
+    "package.use.force",
+    "package.use.mask",
+    "package.use.stable",
+    "package.use.stable.force",
+    "package.use.stable.mask",
+    "use.force",
+    "use.mask",
+    "use.stable",
+    "use.stable.force",
+    "use.stable.mask",
+)
+
+# The only globals that a cache file may refer to.
+_ALLOWED_GLOBALS = (
+    ("builtins", "dict"),
+    ("builtins", "frozenset"),
+    ("builtins", "list"),
+    ("builtins", "set"),
+    ("builtins", "tuple"),
+    ("portage.dep", "Atom"),
+    ("portage.dep", "ExtendedAtomDict"),
+    ("portage.dep", "_use_dep"),
+    ("portage.eapi", "_eapi_attrs"),
+    ("portage.versions", "_pkg_str"),
+)
+
+# Files modified this shortly (in nanoseconds) before the cache is written
+# prevent it from being written, since a second change within the same
+# mtime tick would go unnoticed.
+_racy_ns = 2 * 10**9
+
+
+def _digest(obj):
+    return hashlib.sha256(repr(obj).encode("utf-8")).hexdigest()
+
+
+def _trusted(st):
+    """Whether only root or the current user may have written the file
+    or directory with stat result st."""
+    return st.st_uid in (0, os.geteuid()) and not st.st_mode & 0o022
+
+
+class _MessageRecorder(io.TextIOBase):
+    """Text stream that records what is written to it, as the stream
+    named name, and passes it on to stream."""
+
+    def __init__(self, stream, name, messages):
+        self._stream = stream
+        self._name = name
+        self._messages = messages
+
+    def write(self, s):
+        self._messages.append((self._name, s))
+        return self._stream.write(s)
+
+    def flush(self):
+        self._stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+@contextlib.contextmanager
+def recording(cache):
+    """
+    Record the messages written to stdout and stderr, for cache.store().
+    Yield the list they are recorded to, which stays empty when cache is
+    None.
+    """
+    messages = []
+    if cache is None:
+        yield messages
+        return
+    stdout, stderr = sys.stdout, sys.stderr
+    sys.stdout = _MessageRecorder(stdout, "stdout", messages)
+    sys.stderr = _MessageRecorder(stderr, "stderr", messages)
+    try:
+        yield messages
+    finally:
+        sys.stdout, sys.stderr = stdout, stderr
+
+
+def _stat_entry(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (path, st.st_mtime_ns, st.st_ctime_ns, st.st_size, st.st_ino)
+
+
+class ProfileCache:
+    """
+    Cache of the state built from one profile stack.
+
+    @param cache_dir: directory of the cache files
+    @type cache_dir: str
+    @param repositories: repositories of the config
+    @type repositories: RepoConfigLoader
+    @param locations_manager: locations of the profiles and user config
+    @type locations_manager: LocationsManager
+    @param user_config: whether the user config is read
+    @type user_config: bool
+    """
+
+    def __init__(self, cache_dir, repositories, locations_manager, user_config):
+        self._cache_dir = cache_dir
+        profiles = locations_manager.profiles_complex
+        abs_user_config = locations_manager.abs_user_config
+        repos = []
+        locations = []
+        for repo in repositories.repos_with_profiles():
+            repos.append(
+                (
+                    repo.name,
+                    repo.location,
+                    repo.eapi,
+                    repo.portage1_profiles,
+                    repo.portage1_profiles_compat,
+                    tuple(sorted(repo.profile_formats)),
+                    tuple(
+                        (master.name, master.location) for master in repo.masters or ()
+                    ),
+                )
+            )
+            for master in repo.masters or ():
+                locations.append(os.path.join(master.location, "profiles"))
+            locations.append(os.path.join(repo.location, "profiles"))
+        # license_groups are read from these.
+        locations.extend(locations_manager.profile_locations)
+        locations.extend(profile.location for profile in profiles)
+        locations.append(abs_user_config)
+        # Some profiles are the profiles directory of their repository.
+        self._locations = tuple(dict.fromkeys(locations))
+        self._key = (
+            portage.VERSION,
+            abs_user_config,
+            bool(user_config),
+            locations_manager.profile_locations,
+            tuple(
+                (
+                    profile.location,
+                    profile.portage1_directories,
+                    profile.user_config,
+                    tuple(sorted(profile.profile_formats)),
+                    profile.eapi,
+                    profile.allow_build_id,
+                    profile.show_deprecated_warning,
+                )
+                for profile in profiles
+            ),
+            tuple(repos),
+        )
+        self._name = _digest(
+            (abs_user_config, profiles[-1].location if profiles else None)
+        )[:16]
+        self._fingerprint = None
+
+    def _get_fingerprint(self):
+        """The stat() of every profile file that the components may read.
+        It is taken before the first component is parsed, so that changes
+        made while parsing show up as a mismatch later on."""
+        if self._fingerprint is None:
+            entries = []
+            for location in self._locations:
+                for name in _PROFILE_FILES:
+                    path = os.path.join(location, name)
+                    entry = _stat_entry(path)
+                    if entry is None:
+                        continue
+                    entries.append(entry)
+                    if not os.path.isdir(path):
+                        continue
+                    for parent, dirs, files in os.walk(path):
+                        dirs.sort()
+                        for entry_name in sorted(dirs + files):
+                            entry = _stat_entry(os.path.join(parent, entry_name))
+                            if entry is not None:
+                                entries.append(entry)
+            self._fingerprint = tuple(entries)
+        return self._fingerprint
+
+    def _path(self, component):
+        return os.path.join(self._cache_dir, f"{self._name}.{component}.pickle")
+
+    def load(self, component, params=()):
+        """
+        Return the state stored for component and params, or None if there
+        is none or if it is out of date. The messages that were recorded
+        with the state are shown again.
+        """
+        fingerprint = self._get_fingerprint()
+        try:
+            if not _trusted(os.stat(self._cache_dir)):
+                return None
+            with open(self._path(component), "rb") as f:
+                if not _trusted(os.fstat(f.fileno())):
+                    return None
+                data = AllowedGlobalsUnpickler(f, _ALLOWED_GLOBALS).load()
+        except (SystemExit, KeyboardInterrupt):
+            raise
+        except Exception:
+            return None
+        if (
+            not isinstance(data, dict)
+            or data.get("format") != _FORMAT_VERSION
+            or data.get("key") != _digest((self._key, component, params))
+            or data.get("fingerprint") != fingerprint
+            # Messages that were filtered out while the state was built
+            # might have to be shown now.
+            or data.get("noiselimit") != portage.util.noiselimit
+        ):
+            return None
+        for name, message in data.get("messages", ()):
+            writemsg(
+                message,
+                noiselevel=-1,
+                fd=sys.stdout if name == "stdout" else sys.stderr,
+            )
+        return data.get("state")
+
+    def store(self, component, state, params=(), messages=()):
+        """
+        Store state for component and params, along with the messages
+        recorded while it was built. The state is pickled right away, so
+        later changes to it are not stored. Failure to write the cache is
+        not an error, the profiles are simply parsed again.
+        """
+        fingerprint = self._get_fingerprint()
+        racy = time.time_ns() - _racy_ns
+        if any(max(entry[1], entry[2]) >= racy for entry in fingerprint):
+            return
+        try:
+            content = pickle.dumps(
+                {
+                    "format": _FORMAT_VERSION,
+                    "key": _digest((self._key, component, params)),
+                    "fingerprint": fingerprint,
+                    "noiselimit": portage.util.noiselimit,
+                    "messages": list(messages),
+                    "state": state,
+                },
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return
+        # atomic_ofstream would consult portage.data, which may construct
+        # the very config that is being constructed here.
+        path = self._path(component)
+        try:
+            ensure_dirs(self._cache_dir, mode=0o755)
+            if not _trusted(os.stat(self._cache_dir)):
+                return
+            fd, tmp_path = tempfile.mkstemp(
+                prefix=f".{os.path.basename(path)}.", dir=self._cache_dir
+            )
+            try:
+                with open(fd, "wb") as f:
+                    f.write(content)
+                os.chmod(tmp_path, 0o644)
+                os.rename(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except (OSError, PortageException):
+            pass
+
+
+def manager_state(manager, exclude=()):
+    """Return the attributes of manager, except those named in exclude."""
+    return {k: v for k, v in vars(manager).items() if k not in exclude}
+
+
+def restore_manager(cls, state, **attrs):
+    """Return an instance of cls with the attributes in state and attrs,
+    without calling its constructor."""
+    manager = cls.__new__(cls)
+    manager.__dict__.update(state)
+    manager.__dict__.update(attrs)
+    return manager
@@ -315,8 +315,11 @@ environ_filter = frozenset(
         "PORTAGE_GPG_KEY",
         "PORTAGE_GPG_SIGNING_COMMAND",
         "PORTAGE_IONICE_COMMAND",
+        "PORTAGE_OBSERVABILITY_EVENT_LOG_SIZE",
         "PORTAGE_PACKAGE_EMPTY_ABORT",
+        "PORTAGE_PROFILE_CACHE",
         "PORTAGE_REPO_DUPLICATE_WARN",
+        "PORTAGE_RESOLVER_PROFILE",
         "PORTAGE_RO_DISTDIRS",
         "PORTAGE_RSYNC_EXTRA_OPTS",
         "PORTAGE_RSYNC_OPTS",
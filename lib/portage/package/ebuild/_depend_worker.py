@@ -0,0 +1,369 @@
+# Copyright 2026 Gentoo Authors
+# Distributed under the terms of the GNU General Public License v2
+
+"""
+Long-lived bash processes that run the depend phase of many ebuilds, for
+FEATURES="metadata-workers". A worker (bin/ebuild-depend-worker.sh) sources
+isolated-functions.sh once, and then serves one request at a time in a
+subshell that starts from the exported environment of the request, so
+the cost of starting bash and of loading isolated-functions.sh is paid
+once per worker instead of once per ebuild.
+
+A request is a file with the exported environment of the phase, whose
+path is written to the control pipe of the worker. The worker writes the
+metadata to its result pipe, followed by a NUL byte and the exit status
+of the phase, and the metadata is then passed on to the PORTAGE_PIPE_FD
+of the request as if the phase had written it there itself.
+"""
+
+import errno
+import re
+import shlex
+import shutil
+import tempfile
+
+import portage
+from portage import os
+from portage.util.futures import asyncio
+from portage.util.futures._asyncio.streams import _writer
+
+_pool = None
+
+_var_name_re = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+# Variables that bash does not allow a script to assign.
+_bash_readonly_vars = frozenset(
+    ("BASHOPTS", "BASH_VERSINFO", "EUID", "PPID", "SHELLOPTS", "UID")
+)
+
+# Variables that belong to a single request rather than to a worker.
+_request_vars = (
+    "EAPI",
+    "PORTAGE_BUILDDIR",
+    "PORTAGE_EBUILD_EXTRA_SOURCE",
+    "PORTAGE_PIPE_FD",
+    "SANDBOX_LOG",
+)
+
+# The worker replaces its exported environment with the one of each
+# request, but the sandbox that it runs in, and the shell that sourced
+# isolated-functions.sh, took in these variables when it started. A
+# request is only served by a worker that was started with the same
+# values.
+_worker_var_prefixes = ("PORTAGE_", "SANDBOX_")
+
+# Keywords that differ between requests which a worker can serve alike.
+_request_keywords = ("fd_pipes", "opt_name", "returnproc")
+
+
+def spawn(spawn_func, env, keywords):
+    """
+    Pass the depend phase that doebuild.spawn would start with
+    spawn_func(..., env=env, **keywords) to a worker, and return an object
+    that stands in for its process. Return None if no worker can serve
+    the phase, in which case it has to be spawned as usual.
+    """
+    global _pool
+    if _pool is not None and _pool.loop.is_closed():
+        _pool.close()
+        _pool = None
+    if _pool is None:
+        _pool = DependWorkerPool()
+    return _pool.spawn(spawn_func, env, keywords)
+
+
+def _forget_pool():
+    # The workers belong to the parent process.
+    global _pool
+    _pool = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_pool)
+
+
+class _Request:
+    """
+    Stands in for the process of a depend phase that a worker serves,
+    with the pid of the worker. Terminating or killing the request
+    terminates or kills the worker.
+    """
+
+    def __init__(self, worker, future):
+        self._worker = worker
+        self._future = future
+        self.pid = worker.proc.pid
+        self.returncode = None
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} {self.pid}>"
+
+    async def wait(self):
+        if self.returncode is None:
+            self.returncode = await asyncio.shield(self._future)
+        return self.returncode
+
+    def terminate(self):
+        if self.returncode is None:
+            self._worker.proc.terminate()
+
+    def kill(self):
+        if self.returncode is None:
+            self._worker.proc.kill()
+
+
+class _Worker:
+    """A worker process, and the request that it currently serves."""
+
+    def __init__(self, pool, key, proc, ctl_fd, res_fd, sandbox_log):
+        self.pool = pool
+        self.key = key
+        self.proc = proc
+        self.ctl_fd = ctl_fd
+        self.res_fd = res_fd
+        self.sandbox_log = sandbox_log
+        self.request = None
+        self._buf = bytearray()
+
+    def submit(self, request_file, out_fd, sandbox_log):
+        """Start a request and return the future of its exit status."""
+        future = self.pool.loop.create_future()
+        self.request = (request_file, out_fd, sandbox_log, future)
+        try:
+            os.write(self.ctl_fd, os.fsencode(request_file) + b"\n")
+        except OSError:
+            self.died()
+        return future
+
+    def output_handler(self):
+        while True:
+            try:
+                buf = os.read(self.res_fd, 65536)
+            except OSError as e:
+                if e.errno == errno.EAGAIN:
+                    return
+                buf = b""
+            if not buf:
+                self.died()
+                return
+            self._buf += buf
+            end = self._buf.find(b"\0")
+            if end != -1 and self._buf.find(b"\n", end) != -1:
+                status = int(self._buf[end + 1 : self._buf.index(b"\n", end)])
+                metadata = bytes(self._buf[:end])
+                self._buf.clear()
+                request, self.request = self.request, None
+                self.pool.finish(self, request, metadata, status)
+
+    def died(self):
+        """Fail the current request, if any, and forget the worker."""
+        self.pool.remove(self)
+        request, self.request = self.request, None
+        if request is not None:
+            self.pool.finish(self, request, b"", None)
+
+
+class DependWorkerPool:
+    """
+    The workers of a process, grouped by the way they were spawned, so
+    that a request is only served by a worker that runs with the same
+    privileges, namespaces, standard file descriptors and sandbox and
+    portage settings as a process spawned for the request would.
+    """
+
+    def __init__(self):
+        self.loop = asyncio._safe_loop()
+        self._idle = {}
+        self._workers = set()
+        self._tmpdir = None
+        self._counter = 0
+
+    def spawn(self, spawn_func, env, keywords):
+        if spawn_func not in (
+            portage.process.spawn_bash,
+            portage.process.spawn_sandbox,
+        ) or keywords.get("debug"):
+            return None
+        fd_pipes = keywords.get("fd_pipes")
+        try:
+            pipe_fd = int(env["PORTAGE_PIPE_FD"])
+            stdio = tuple(os.fstat(fd_pipes[fd]) for fd in (0, 1, 2))
+        except (KeyError, OSError, TypeError, ValueError):
+            return None
+
+        key = self._key(spawn_func, env, keywords, stdio)
+        idle = self._idle.get(key)
+        if idle:
+            worker = idle.pop()
+        else:
+            worker = self._start_worker(key, spawn_func, env, keywords)
+
+        request_file = self._write_request(env, keywords)
+        out_fd = os.dup(fd_pipes.get(pipe_fd, pipe_fd))
+        return _Request(
+            worker, worker.submit(request_file, out_fd, env.get("SANDBOX_LOG"))
+        )
+
+    @staticmethod
+    def _key(spawn_func, env, keywords, stdio):
+        """
+        Return the key of the workers that can serve a request, given the
+        fstat() results of its standard file descriptors.
+        """
+        return (
+            spawn_func,
+            tuple(
+                sorted(
+                    (k, v)
+                    for k, v in env.items()
+                    if k.startswith(_worker_var_prefixes) and k not in _request_vars
+                )
+            ),
+            repr(
+                sorted(
+                    (k, v) for k, v in keywords.items() if k not in _request_keywords
+                )
+            ),
+            tuple((st.st_dev, st.st_ino) for st in stdio),
+        )
+
+    def _create_file(self, name, keywords):
+        """
+        Create a file that only the user that the phase runs as can read
+        and write, and return its path and file object.
+        """
+        if self._tmpdir is None:
+            self._tmpdir = tempfile.mkdtemp(prefix="portage-depend-workers-")
+            os.chmod(self._tmpdir, 0o755)
+            portage.process.atexit_register(self._close_at_exit)
+        self._counter += 1
+        path = os.path.join(self._tmpdir, f"{name}-{self._counter}")
+        f = open(path, "w", encoding="utf-8")
+        if keywords.get("uid") is not None:
+            os.fchown(f.fileno(), keywords["uid"], keywords.get("gid", -1))
+        return path, f
+
+    def _write_request(self, env, keywords):
+        request_file, f = self._create_file("request", keywords)
+        with f:
+            for name, value in env.items():
+                if _var_name_re.match(name) and name not in _bash_readonly_vars:
+                    f.write(f"export {name}={shlex.quote(value)}\n")
+        return request_file
+
+    def _start_worker(self, key, spawn_func, env, keywords):
+        sandbox_log, f = self._create_file("sandbox", keywords)
+        f.close()
+        worker_env = {k: v for k, v in env.items() if k not in _request_vars}
+        worker_env["SANDBOX_LOG"] = sandbox_log
+
+        ctl_r, ctl_w = os.pipe()
+        res_r, res_w = os.pipe()
+        os.set_blocking(res_r, False)
+        worker_env["PORTAGE_DEPEND_WORKER_FDS"] = f"{ctl_r} {res_w}"
+        fd_pipes = {fd: keywords["fd_pipes"][fd] for fd in (0, 1, 2)}
+        fd_pipes[ctl_r] = ctl_r
+        fd_pipes[res_w] = res_w
+        kwargs = {k: v for k, v in keywords.items() if k not in _request_keywords}
+        try:
+            proc = spawn_func(
+                shlex.quote(
+                    os.path.join(env["PORTAGE_BIN_PATH"], "ebuild-depend-worker.sh")
+                ),
+                env=worker_env,
+                opt_name="[depend-worker]",
+                fd_pipes=fd_pipes,
+                returnproc=True,
+                **kwargs,
+            )
+        except BaseException:
+            os.close(ctl_w)
+            os.close(res_r)
+            raise
+        finally:
+            os.close(ctl_r)
+            os.close(res_w)
+
+        worker = _Worker(self, key, proc, ctl_w, res_r, sandbox_log)
+        self._workers.add(worker)
+        self.loop.add_reader(res_r, worker.output_handler)
+        return worker
+
+    def finish(self, worker, request, metadata, status):
+        """
+        Pass the result of a request on to the process that waits for it,
+        and make the worker available for the next request.
+        """
+        request_file, out_fd, sandbox_log, future = request
+        try:
+            os.unlink(request_file)
+        except OSError:
+            pass
+        if status is not None:
+            self._idle.setdefault(worker.key, []).append(worker)
+
+        # The log of the worker is shared by all of its requests, so any
+        # violations are moved to the log of the request, where
+        # EbuildMetadataPhase looks for them.
+        try:
+            with open(worker.sandbox_log, "r+b") as f:
+                violations = f.read()
+                f.truncate(0)
+        except OSError:
+            violations = b""
+        if violations and sandbox_log:
+            with open(sandbox_log, "ab") as f:
+                f.write(violations)
+
+        asyncio.ensure_future(
+            self._finish(worker, out_fd, metadata, status, future), loop=self.loop
+        )
+
+    async def _finish(self, worker, out_fd, metadata, status, future):
+        with open(out_fd, "wb", buffering=0) as f:
+            os.set_blocking(out_fd, False)
+            try:
+                await _writer(f, metadata)
+            except OSError:
+                # The reader is gone, since the phase was cancelled.
+                pass
+        if status is None:
+            status = await worker.proc.wait()
+            if status == os.EX_OK:
+                status = 1
+        if not future.done():
+            future.set_result(status)
+
+    def remove(self, worker):
+        """Forget a worker that exited, and close its pipes."""
+        if worker not in self._workers:
+            return
+        self._workers.discard(worker)
+        idle = self._idle.get(worker.key)
+        if idle and worker in idle:
+            idle.remove(worker)
+        if not self.loop.is_closed():
+            self.loop.remove_reader(worker.res_fd)
+        os.close(worker.ctl_fd)
+        os.close(worker.res_fd)
+
+    async def _close_at_exit(self):
+        procs = [worker.proc for worker in self._workers]
+        self.close()
+        for proc in procs:
+            await proc.wait()
+
+    def close(self):
+        """
+        Stop all workers. They are terminated rather than left to exit
+        when their control pipe is closed, since processes forked in the
+        meantime, like the one that waits for a worker in its own pid
+        namespace, may still hold a copy of it.
+        """
+        for worker in list(self._workers):
+            self.remove(worker)
+            worker.proc.terminate()
+        self._idle.clear()
+        if self._tmpdir is not None:
+            shutil.rmtree(self._tmpdir, ignore_errors=True)
+            self._tmpdir = None
@@ -70,6 +70,12 @@ from portage.package.ebuild._config.LocationsManager import LocationsManager
 from portage.package.ebuild._config.MaskManager import MaskManager
 from portage.package.ebuild._config.UseManager import UseManager
 from portage.package.ebuild._config.VirtualsManager import VirtualsManager
+from portage.package.ebuild._config.profile_cache import (
+    ProfileCache,
+    manager_state,
+    recording,
+    restore_manager,
+)
 from portage.process import fakeroot_capable, sandbox_capable
 from portage.repository.config import (
     allow_profile_repo_deps,
@@ -275,6 +281,7 @@ class config:
         self._features_overrides = []
         self._make_defaults = None
         self._parent_stable = None
+        self._profile_cache = None
         self._soname_provided = None
 
         # _unknown_features records unknown features that
@@ -652,6 +659,18 @@ class config:
             self.profile_path = locations_manager.profile_path
             self.user_profile_dir = locations_manager.user_profile_dir
 
+            if (
+                env.get("PORTAGE_PROFILE_CACHE", make_conf.get("PORTAGE_PROFILE_CACHE"))
+                == "1"
+            ):
+                self._profile_cache = ProfileCache(
+                    os.path.join(eroot, CACHE_PATH, "profile_cache"),
+                    self.repositories,
+                    locations_manager,
+                    local_config,
+                )
+            profile_cache = self._profile_cache
+
             try:
                 packages_list = [
                     grabfile_package(
@@ -679,24 +698,41 @@ class config:
 
             mygcfg = {}
             if profiles_complex:
-                mygcfg_dlists = []
-                for x in profiles_complex:
-                    # Prevent accidents triggered by USE="${USE} ..." settings
-                    # at the top of make.defaults which caused parent profile
-                    # USE to override parent profile package.use settings.
-                    # It would be nice to guard USE_EXPAND variables like
-                    # this too, but unfortunately USE_EXPAND is not known
-                    # until after make.defaults has been evaluated, so that
-                    # will require some form of make.defaults preprocessing.
-                    expand_map.pop("USE", None)
-                    mygcfg_dlists.append(
-                        getconfig(
-                            os.path.join(x.location, "make.defaults"),
-                            tolerant=tolerant,
-                            expand=expand_map,
-                            recursive=x.portage1_directories,
+                make_defaults_params = (tolerant, tuple(sorted(expand_map.items())))
+                cached = None
+                if profile_cache is not None:
+                    cached = profile_cache.load("make.defaults", make_defaults_params)
+                if cached is not None:
+                    mygcfg_dlists, expand_after = cached
+                    expand_map.clear()
+                    expand_map.update(expand_after)
+                else:
+                    mygcfg_dlists = []
+                    with recording(profile_cache) as messages:
+                        for x in profiles_complex:
+                            # Prevent accidents triggered by USE="${USE} ..." settings
+                            # at the top of make.defaults which caused parent profile
+                            # USE to override parent profile package.use settings.
+                            # It would be nice to guard USE_EXPAND variables like
+                            # this too, but unfortunately USE_EXPAND is not known
+                            # until after make.defaults has been evaluated, so that
+                            # will require some form of make.defaults preprocessing.
+                            expand_map.pop("USE", None)
+                            mygcfg_dlists.append(
+                                getconfig(
+                                    os.path.join(x.location, "make.defaults"),
+                                    tolerant=tolerant,
+                                    expand=expand_map,
+                                    recursive=x.portage1_directories,
+                                )
+                            )
+                    if profile_cache is not None:
+                        profile_cache.store(
+                            "make.defaults",
+                            (mygcfg_dlists, expand_map),
+                            make_defaults_params,
+                            messages,
                         )
-                    )
                 self._make_defaults = mygcfg_dlists
                 mygcfg = stack_dicts(mygcfg_dlists, incrementals=self.incrementals)
                 if mygcfg is None:
@@ -818,13 +854,33 @@ class config:
                 self._repo_make_defaults[repo.name] = d
 
             # Read all USE related files from profiles and optionally from user config.
-            self._use_manager = UseManager(
-                self.repositories,
-                profiles_complex,
-                abs_user_config,
-                self._isStable,
-                user_config=local_config,
-            )
+            state = None
+            if profile_cache is not None:
+                state = profile_cache.load("use")
+            if state is not None:
+                self._use_manager = restore_manager(
+                    UseManager,
+                    state,
+                    _is_stable=self._isStable,
+                    repositories=self.repositories,
+                )
+            else:
+                with recording(profile_cache) as messages:
+                    self._use_manager = UseManager(
+                        self.repositories,
+                        profiles_complex,
+                        abs_user_config,
+                        self._isStable,
+                        user_config=local_config,
+                    )
+                if profile_cache is not None:
+                    profile_cache.store(
+                        "use",
+                        manager_state(
+                            self._use_manager, exclude=("_is_stable", "repositories")
+                        ),
+                        messages=messages,
+                    )
             # Initialize all USE related variables we track ourselves.
             self.usemask = self._use_manager.getUseMask()
             self.useforce = self._use_manager.getUseForce()
@@ -835,10 +891,23 @@ class config:
             )
 
             # Read license_groups and optionally license_groups and package.license from user config
-            self._license_manager = LicenseManager(
-                locations_manager,
-                user_config=local_config,
-            )
+            state = None
+            if profile_cache is not None:
+                state = profile_cache.load("license")
+            if state is not None:
+                self._license_manager = restore_manager(LicenseManager, state)
+            else:
+                with recording(profile_cache) as messages:
+                    self._license_manager = LicenseManager(
+                        locations_manager,
+                        user_config=local_config,
+                    )
+                if profile_cache is not None:
+                    profile_cache.store(
+                        "license",
+                        manager_state(self._license_manager),
+                        messages=messages,
+                    )
             # Extract '*/*' entries from package.license
             self.configdict["conf"]["ACCEPT_LICENSE"] = (
                 self._license_manager.extract_global_changes(
@@ -1310,26 +1379,55 @@ class config:
     @property
     def _keywords_manager(self):
         if self._keywords_manager_obj is None:
-            self._keywords_manager_obj = KeywordsManager(
-                self._locations_manager.profiles_complex,
-                self._locations_manager.abs_user_config,
-                self.local_config,
-                global_accept_keywords=self.configdict["defaults"].get(
-                    "ACCEPT_KEYWORDS", ""
-                ),
+            global_accept_keywords = self.configdict["defaults"].get(
+                "ACCEPT_KEYWORDS", ""
             )
+            profile_cache = self._profile_cache
+            state = None
+            if profile_cache is not None:
+                state = profile_cache.load("keywords", (global_accept_keywords,))
+            if state is not None:
+                self._keywords_manager_obj = restore_manager(KeywordsManager, state)
+            else:
+                with recording(profile_cache) as messages:
+                    self._keywords_manager_obj = KeywordsManager(
+                        self._locations_manager.profiles_complex,
+                        self._locations_manager.abs_user_config,
+                        self.local_config,
+                        global_accept_keywords=global_accept_keywords,
+                    )
+                if profile_cache is not None:
+                    profile_cache.store(
+                        "keywords",
+                        manager_state(self._keywords_manager_obj),
+                        (global_accept_keywords,),
+                        messages,
+                    )
         return self._keywords_manager_obj
 
     @property
     def _mask_manager(self):
         if self._mask_manager_obj is None:
-            self._mask_manager_obj = MaskManager(
-                self.repositories,
-                self._locations_manager.profiles_complex,
-                self._locations_manager.abs_user_config,
-                user_config=self.local_config,
-                strict_umatched_removal=self._unmatched_removal,
-            )
+            params = (bool(self._unmatched_removal),)
+            profile_cache = self._profile_cache
+            state = None
+            if profile_cache is not None:
+                state = profile_cache.load("mask", params)
+            if state is not None:
+                self._mask_manager_obj = restore_manager(MaskManager, state)
+            else:
+                with recording(profile_cache) as messages:
+                    self._mask_manager_obj = MaskManager(
+                        self.repositories,
+                        self._locations_manager.profiles_complex,
+                        self._locations_manager.abs_user_config,
+                        user_config=self.local_config,
+                        strict_umatched_removal=self._unmatched_removal,
+                    )
+                if profile_cache is not None:
+                    profile_cache.store(
+                        "mask", manager_state(self._mask_manager_obj), params, messages
+                    )
         return self._mask_manager_obj
 
     @property
@@ -11,6 +11,7 @@ from portage.exception import DigestException, FileNotFound
 from portage.localization import _
 from portage.output import EOutput
 from portage.util import writemsg
+from portage.util._digest_cache import get_digest_cache
 
 
 def digestcheck(myfiles, mysettings, strict=False, justmanifest=None, mf=None):
@@ -41,6 +42,7 @@ def digestcheck(myfiles, mysettings, strict=False, justmanifest=None, mf=None):
             os.path.dirname(os.path.dirname(pkgdir))
         )
         mf = mf.load_manifest(pkgdir, mysettings["DISTDIR"])
+    digest_cache = get_digest_cache(mysettings, mysettings["DISTDIR"])
     eout = EOutput()
     eout.quiet = mysettings.get("PORTAGE_QUIET", None) == "1"
     try:
@@ -68,7 +70,9 @@ def digestcheck(myfiles, mysettings, strict=False, justmanifest=None, mf=None):
                 eout.eend(1)
                 writemsg(_("\n!!! Missing digest for '%s'\n") % (f,), noiselevel=-1)
                 return 0
-            mf.checkFileHashes(ftype, f, hash_filter=hash_filter)
+            mf.checkFileHashes(
+                ftype, f, hash_filter=hash_filter, digest_cache=digest_cache
+            )
             eout.eend(0)
     except FileNotFound as e:
         eout.eend(1)
@@ -85,6 +89,9 @@ def digestcheck(myfiles, mysettings, strict=False, justmanifest=None, mf=None):
         writemsg(_("!!! Got: %s\n") % e.value[2], noiselevel=-1)
         writemsg(_("!!! Expected: %s\n") % e.value[3], noiselevel=-1)
         return 0
+    finally:
+        if digest_cache is not None:
+            digest_cache.flush()
     if mf.thin or mf.allow_missing:
         # In this case we ignore any missing digests that
         # would otherwise be detected below.
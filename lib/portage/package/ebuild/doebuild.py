@@ -86,6 +86,7 @@ from portage.exception import (
 )
 from portage.localization import _
 from portage.output import colormap
+from portage.package.ebuild import _depend_worker
 from portage.package.ebuild.prepare_build_dirs import prepare_build_dirs
 from portage.process import find_binary
 from portage.util import (
@@ -2320,6 +2321,14 @@ def spawn(
 
     try:
         if keywords.get("returnpid") or keywords.get("returnproc"):
+            if (
+                keywords.get("returnproc")
+                and mysettings.get("EBUILD_PHASE") == "depend"
+                and "metadata-workers" in mysettings.features
+            ):
+                proc = _depend_worker.spawn(spawn_func, env, keywords)
+                if proc is not None:
+                    return proc
             return spawn_func(mystring, env=env, **keywords)
 
         proc = EbuildSpawnProcess(
@@ -58,6 +58,8 @@ from portage.util import (
     writemsg_level,
     writemsg_stdout,
 )
+from portage.util._digest_cache import get_digest_cache
+from portage.util._http_pool import HttpFetchError, builtin_fetch_supported, get_pool
 from portage.util.futures import asyncio
 
 _download_suffix = ".__download__"
@@ -192,6 +194,58 @@ _async_spawn_fetch.__doc__ += """
     This function is a coroutine.
 """
 
+
+_builtin_fetch_userfetch_warned = False
+
+
+def _want_builtin_fetch(settings, uri):
+    """
+    Check if uri is to be fetched in-process for FEATURES=builtin-fetch,
+    which is not the case where _spawn_fetch would drop privileges or
+    FETCH_WRAPPER is to run the fetch command. The downloader runs in the
+    emerge process, so it cannot drop privileges for FEATURES=userfetch,
+    which is enabled by default: as root, distfiles are then fetched with
+    FETCHCOMMAND unless FEATURES=-userfetch is set as well. This is
+    reported once per process.
+    """
+    global _builtin_fetch_userfetch_warned
+    if not builtin_fetch_supported(settings, uri) or settings.get("FETCH_WRAPPER"):
+        return False
+    if (
+        "userfetch" in settings.features
+        and os.getuid() == 0
+        and portage_gid
+        and portage_uid
+    ):
+        if not _builtin_fetch_userfetch_warned:
+            _builtin_fetch_userfetch_warned = True
+            writemsg_level(
+                _(
+                    '!!! FEATURES="builtin-fetch" does not apply to distfiles '
+                    'while FEATURES="userfetch" drops privileges.\n'
+                    '!!! Set FEATURES="-userfetch" to fetch them with it as root.\n'
+                ),
+                level=logging.WARNING,
+                noiselevel=-1,
+            )
+        return False
+    return True
+
+
+async def _builtin_fetch(settings, uri, download_path, resume):
+    """
+    Download uri to download_path with the built-in downloader, and
+    return an exit status like that of FETCHCOMMAND. This function is a
+    coroutine.
+    """
+    try:
+        await get_pool(settings).fetch(uri, download_path, resume=resume)
+    except (HttpFetchError, OSError) as e:
+        writemsg(f"!!! {_hide_url_passwd(str(e))}\n", noiselevel=-1)
+        return 1
+    return os.EX_OK
+
+
 _userpriv_test_write_file_cache = {}
 _userpriv_test_write_cmd_script = (
     ">> %(file_path)s 2>/dev/null ; rval=$? ; " + "rm -f  %(file_path)s ; exit $rval"
@@ -338,12 +392,12 @@ def _checksum_failure_temp_file(settings, distdir, basename):
     return temp_filename
 
 
-def _check_digests(filename, digests, show_errors=1):
+def _check_digests(filename, digests, show_errors=1, digest_cache=None):
     """
     Check digests and display a message if an error occurs.
     @return True if all digests match, False otherwise.
     """
-    verified_ok, reason = verify_all(filename, digests)
+    verified_ok, reason = verify_all(filename, digests, digest_cache=digest_cache)
     if not verified_ok:
         if show_errors:
             writemsg(
@@ -358,8 +412,12 @@ def _check_digests(filename, digests, show_errors=1):
     return True
 
 
-def _check_distfile(filename, digests, eout, show_errors=1, hash_filter=None):
+def _check_distfile(
+    filename, digests, eout, show_errors=1, hash_filter=None, digest_cache=None
+):
     """
+    @param digest_cache: digests confirmed earlier for unchanged files, as
+            returned by portage.util._digest_cache.get_digest_cache()
     @return a tuple of (match, stat_obj) where match is True if filename
     matches all given digests (if any) and stat_obj is a stat result, or
     None if the file does not exist.
@@ -387,7 +445,9 @@ def _check_distfile(filename, digests, eout, show_errors=1, hash_filter=None):
         digests = _filter_unaccelarated_hashes(digests)
         if hash_filter is not None:
             digests = _apply_hash_filter(digests, hash_filter)
-        if _check_digests(filename, digests, show_errors=show_errors):
+        if _check_digests(
+            filename, digests, show_errors=show_errors, digest_cache=digest_cache
+        ):
             eout.ebegin(f"{os.path.basename(filename)} {' '.join(sorted(digests))} ;-)")
             eout.eend(0)
         else:
@@ -860,6 +920,41 @@ async def async_fetch(
     digests=None,
     allow_missing_digests=True,
     force=False,
+):
+    """
+    Asynchronous form of fetch(). This function is a coroutine.
+    """
+    try:
+        return await _async_fetch(
+            myuris,
+            mysettings,
+            listonly=listonly,
+            fetchonly=fetchonly,
+            locks_in_subdir=locks_in_subdir,
+            use_locks=use_locks,
+            try_mirrors=try_mirrors,
+            digests=digests,
+            allow_missing_digests=allow_missing_digests,
+            force=force,
+        )
+    finally:
+        # Write the digests confirmed by this fetch run.
+        digest_cache = get_digest_cache(mysettings, mysettings.get("DISTDIR"))
+        if digest_cache is not None:
+            digest_cache.flush()
+
+
+async def _async_fetch(
+    myuris,
+    mysettings,
+    listonly=0,
+    fetchonly=0,
+    locks_in_subdir=".locks",
+    use_locks=1,
+    try_mirrors=1,
+    digests=None,
+    allow_missing_digests=True,
+    force=False,
 ):
     from portage.package.ebuild.config import check_config_instance
 
@@ -1034,6 +1129,7 @@ async def async_fetch(
     hash_filter = _hash_filter(mysettings.get("PORTAGE_CHECKSUM_FILTER", ""))
     if hash_filter.transparent:
         hash_filter = None
+    digest_cache = get_digest_cache(mysettings, mysettings["DISTDIR"])
     skip_manifest = mysettings.get("EBUILD_SKIP_MANIFEST") == "1"
     if skip_manifest:
         allow_missing_digests = True
@@ -1334,7 +1430,11 @@ async def async_fetch(
                 eout = EOutput()
                 eout.quiet = mysettings.get("PORTAGE_QUIET") == "1"
                 match, mystat = _check_distfile(
-                    myfile_path, pruned_digests, eout, hash_filter=hash_filter
+                    myfile_path,
+                    pruned_digests,
+                    eout,
+                    hash_filter=hash_filter,
+                    digest_cache=digest_cache,
                 )
                 if match and not force:
                     # Skip permission adjustment for symlinks, since we don't
@@ -1573,7 +1673,9 @@ async def async_fetch(
                             digests = _filter_unaccelarated_hashes(mydigests[myfile])
                             if hash_filter is not None:
                                 digests = _apply_hash_filter(digests, hash_filter)
-                            verified_ok, reason = verify_all(download_path, digests)
+                            verified_ok, reason = verify_all(
+                                download_path, digests, digest_cache=digest_cache
+                            )
                             if not verified_ok:
                                 writemsg(
                                     _("!!! Previously fetched" " file: '%s'\n")
@@ -1823,7 +1925,12 @@ async def async_fetch(
 
                     myret = -1
                     try:
-                        myret = await _async_spawn_fetch(mysettings, myfetch)
+                        if _want_builtin_fetch(mysettings, loc):
+                            myret = await _builtin_fetch(
+                                mysettings, loc, download_path, fetched == 1
+                            )
+                        else:
+                            myret = await _async_spawn_fetch(mysettings, myfetch)
 
                     finally:
                         try:
@@ -1164,6 +1164,13 @@ def _exec(
             signal.signal(signum, handler)
         signal.pthread_sigmask(signal.SIG_SETMASK, signal_mask)
 
+        # This process only waits for the child, so close the file
+        # descriptors that it inherited from the caller. Otherwise, it
+        # would keep pipes open that the caller shares with other
+        # processes for as long as the child runs, which matters for
+        # long-lived children like the workers of FEATURES=metadata-workers.
+        os.closerange(3, max_fd_limit)
+
         # Wait for child, exit with same result
         pid, status = os.wait()
         ec = os.waitstatus_to_exitcode(status)
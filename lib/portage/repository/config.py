@@ -600,6 +600,11 @@ class RepoConfig:
                 from portage.cache.flat_hash import md5_database as database
 
                 name = "metadata/md5-cache"
+            elif fmt == "mmap-dict":
+                from portage.cache.mmap_dict import md5_database as database
+
+                # Stored in metadata/md5-cache.mmap.
+                name = "metadata/md5-cache"
 
             if name is not None:
                 yield database(self.location, name, auxdbkeys, readonly=readonly)
@@ -1568,8 +1573,11 @@ def parse_layout_conf(repo_location, repo_name=None):
         # default egencache format could eventually be changed to md5-dict
         # in portage-2.1.11.32. WARNING: Versions prior to portage-2.1.11.14
         # will NOT recognize md5-dict format unless it is explicitly
-        # listed in layout.conf.
+        # listed in layout.conf. The single-file mmap-dict cache is
+        # preferred over both when egencache has generated it.
         cache_formats = []
+        if os.path.isfile(os.path.join(repo_location, "metadata", "md5-cache.mmap")):
+            cache_formats.append("mmap-dict")
         if os.path.isdir(os.path.join(repo_location, "metadata", "md5-cache")):
             cache_formats.append("md5-dict")
         if os.path.isdir(os.path.join(repo_location, "metadata", "cache")):
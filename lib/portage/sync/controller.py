@@ -11,13 +11,19 @@ import warnings
 from _emerge.CompositeTask import CompositeTask
 
 import portage
+from portage.cache.index.pkg_listing_index import (
+    PkgListingIndex,
+    pkg_listing_index_paths,
+    update_pkg_listing_index,
+)
+from portage.exception import PortageException
 from portage.metadata import action_metadata
 from portage.output import create_color_func
 from portage.package.ebuild.doebuild import _check_temp_dir
 from portage.progress import ProgressBar
 
 # from portage.emaint.defaults import DEFAULT_OPTIONS
-from portage.util import writemsg, writemsg_level
+from portage.util import ensure_dirs, grabfile, writemsg, writemsg_level
 from portage.util._async.AsyncFunction import AsyncFunction
 from portage.util.hooks import get_hooks_from_dir
 
@@ -367,6 +373,9 @@ class SyncManager:
         if proc.returncode == os.EX_OK:
             exitcode, message, updatecache_flg, hooks_enabled = proc.result
 
+        if exitcode == os.EX_OK:
+            self._update_listing_index(repo)
+
         if updatecache_flg and "metadata-transfer" not in self.settings.features:
             updatecache_flg = False
 
@@ -382,6 +391,38 @@ class SyncManager:
                 porttrees=[repo.location],
             )
 
+    def _update_listing_index(self, repo):
+        """
+        Bring the package listing index of repo up to date after a sync,
+        so that the next emerge does not have to list every directory that
+        the sync did not touch. Only directories whose mtime changed are
+        listed again. Nothing is done unless the repository or the
+        depcachedir already has an index, since creating one means
+        listing the whole repository.
+        """
+        paths = pkg_listing_index_paths(repo.location, self.portdb.depcachedir)
+        old = PkgListingIndex.load(repo.location, paths)
+        if old is None:
+            return
+        categories = set(self.settings.categories)
+        categories.update(
+            grabfile(os.path.join(repo.location, "profiles", "categories"))
+        )
+        index = update_pkg_listing_index(
+            repo.location,
+            categories,
+            old=old,
+        )
+        try:
+            ensure_dirs(os.path.dirname(paths[1]))
+            index.write(paths[1])
+        except (OSError, PortageException) as e:
+            writemsg_level(
+                f"!!! Unable to update {paths[1]}: {e}\n",
+                level=logging.WARNING,
+                noiselevel=-1,
+            )
+
 
 class SyncRepo(CompositeTask):
     """
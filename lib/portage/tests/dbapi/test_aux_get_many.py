@@ -0,0 +1,94 @@
+# Copyright 2026 Gentoo Authors
+# Distributed under the terms of the GNU General Public License v2
+
+import os
+from unittest import mock
+
+from portage.const import CACHE_PATH
+from portage.dbapi._VdbIndex import VdbIndex
+from portage.dbapi.vartree import _read_metadata_file
+from portage.tests import TestCase
+from portage.tests.resolver.ResolverPlayground import ResolverPlayground
+
+
+class AuxGetManyTestCase(TestCase):
+    ebuilds = {
+        "dev-libs/A-1": {"EAPI": "8", "SLOT": "0", "KEYWORDS": "x86"},
+        "dev-libs/A-2": {"EAPI": "8", "SLOT": "0", "RDEPEND": "dev-libs/B"},
+        "dev-libs/B-1": {"EAPI": "7", "SLOT": "1"},
+        "app-misc/C-1": {"EAPI": "8", "IUSE": "foo"},
+    }
+
+    binpkgs = {
+        "dev-libs/A-1": {"EAPI": "8", "SLOT": "0"},
+        "dev-libs/B-1": {"EAPI": "7", "SLOT": "1", "RDEPEND": "dev-libs/A"},
+    }
+
+    installed = {
+        "dev-libs/A-1": {"EAPI": "8", "SLOT": "0", "USE": "bar"},
+        "app-misc/C-1": {"EAPI": "8", "SLOT": "0"},
+    }
+
+    def _check(self, db, wants):
+        cpvs = list(db.cpv_all())
+        expected = {cpv: db.aux_get(cpv, wants) for cpv in cpvs}
+        self.assertEqual(db.aux_get_many(cpvs + ["dev-libs/Z-1"], wants), expected)
+        self.assertEqual(db.aux_get_many([], wants), {})
+
+    def testAuxGetMany(self):
+        playground = ResolverPlayground(
+            ebuilds=self.ebuilds, binpkgs=self.binpkgs, installed=self.installed
+        )
+        try:
+            trees = playground.trees[playground.eroot]
+            for tree in ("porttree", "bintree", "vartree"):
+                db = trees[tree].dbapi
+                with self.subTest(tree=tree):
+                    self._check(db, ["EAPI", "SLOT", "RDEPEND", "repository"])
+                    # Keys outside of the aux caches.
+                    self._check(db, ["DESCRIPTION", "HOMEPAGE"])
+
+            portdb = trees["porttree"].dbapi
+            portdb.freeze()
+            try:
+                self._check(portdb, ["EAPI", "SLOT", "KEYWORDS"])
+            finally:
+                portdb.melt()
+
+            # With the VDB index, installed packages are served from its
+            # snapshots rather than read from their directories.
+            vardb = trees["vartree"].dbapi
+            vardb._vdb_index = VdbIndex(
+                vardb._dbroot, os.path.join(playground.eroot, CACHE_PATH, "vdb_index")
+            )
+            vardb._vdb_index_refresh()
+            vardb._aux_cache_obj = None
+            cpvs = vardb.cpv_all()
+            with mock.patch(
+                "portage.dbapi.vartree._read_metadata_file",
+                side_effect=_read_metadata_file,
+            ) as read_metadata_file:
+                self.assertEqual(
+                    set(vardb.aux_get_many(cpvs, ["SLOT", "USE"])),
+                    {"dev-libs/A-1", "app-misc/C-1"},
+                )
+                read_metadata_file.assert_not_called()
+            self.assertEqual(vardb._vdb_index.misses, 0)
+
+            # Cache hits do not go through the metadata phase.
+            portdb.aux_get_many(portdb.cpv_all(), ["EAPI"])
+            with mock.patch.object(portdb, "_aux_get_regen") as regen:
+                self._check(portdb, ["EAPI", "SLOT", "KEYWORDS"])
+                regen.assert_not_called()
+
+            loop = portdb._event_loop
+            self.assertEqual(
+                loop.run_until_complete(
+                    trees["vartree"].dbapi.async_aux_get_many(
+                        ["app-misc/C-1", "app-misc/D-1"], ["SLOT"]
+                    )
+                ),
+                {"app-misc/C-1": ["0"]},
+            )
+        finally:
+            playground.cleanup()
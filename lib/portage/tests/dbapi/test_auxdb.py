@@ -21,6 +21,10 @@ class AuxdbTestCase(TestCase):
     def test_flat_hash_md5(self):
         self._test_mod("portage.cache.flat_hash.md5_database")
 
+    def test_mmap_dict_md5(self):
+        # Writes are only visible to other processes after commit().
+        self._test_mod("portage.cache.mmap_dict.md5_database", multiproc=False)
+
     def test_volatile(self):
         self._test_mod("portage.cache.volatile.database", multiproc=False)
 
@@ -0,0 +1,170 @@
+# Copyright 2026 Gentoo Authors
+# Distributed under the terms of the GNU General Public License v2
+
+import io
+import os
+import time
+from unittest import mock
+
+from portage import getbinpkg
+from portage.dbapi.bintree import binarytree
+from portage.getbinpkg import PackageIndexDeltas
+from portage.tests import TestCase
+from portage.tests.resolver.ResolverPlayground import ResolverPlayground
+
+
+class BintreeDeltaIndexTestCase(TestCase):
+    binpkgs = {
+        "dev-libs/A-1": {"EAPI": "8"},
+        "dev-libs/B-1": {"EAPI": "8"},
+    }
+    # Deltas are only kept while they are smaller than the index.
+    binpkgs.update((f"app-misc/P{i}-1", {"EAPI": "8"}) for i in range(20))
+
+    def testPackageIndexDelta(self):
+        def entry(cpv, **kwargs):
+            d = {"CPV": cpv, "EAPI": "8", "SLOT": "0", "repository": "test_repo"}
+            d.update(kwargs)
+            return d
+
+        old = getbinpkg.PackageIndex(
+            default_pkg_data={"BUILD_ID": "", "PATH": "", "SLOT": "0"},
+            inherited_keys=["repository"],
+        )
+        old.header.update({"TIMESTAMP": "100", "repository": "test_repo"})
+        old.packages = [
+            entry("dev-libs/A-1"),
+            entry("dev-libs/B-1", BUILD_ID="1", PATH="dev-libs/B/B-1-1.gpkg.tar"),
+            entry("dev-libs/B-1", BUILD_ID="2", PATH="dev-libs/B/B-1-2.gpkg.tar"),
+        ]
+        new = getbinpkg.PackageIndex(
+            default_pkg_data={"BUILD_ID": "", "PATH": "", "SLOT": "0"},
+            inherited_keys=["repository"],
+        )
+        new.header.update({"repository": "test_repo", "CHOST": "x86_64-pc-linux-gnu"})
+        new.packages = [
+            entry("dev-libs/A-1", EAPI="7"),
+            entry("dev-libs/B-1", BUILD_ID="2", PATH="dev-libs/B/B-1-2.gpkg.tar"),
+            entry("dev-libs/C-1", repository="other"),
+        ]
+        with mock.patch.object(getbinpkg.time, "time", return_value=200):
+            full = io.StringIO()
+            new.write(full)
+        delta = io.StringIO()
+        new.writeDelta(delta, old)
+        # The unchanged package is not part of the delta.
+        self.assertNotIn("B-1-2", delta.getvalue())
+
+        client = getbinpkg.PackageIndex(
+            default_pkg_data={"BUILD_ID": "", "PATH": "", "SLOT": "0"},
+            inherited_keys=["repository"],
+        )
+        client.header.update(old.header)
+        client.packages = [d.copy() for d in old.packages]
+        client.readDelta(io.StringIO(delta.getvalue()))
+        client.modified = False
+        applied = io.StringIO()
+        client.write(applied)
+        self.assertEqual(applied.getvalue(), full.getvalue())
+
+        # A delta only applies to the index it was made from.
+        self.assertRaises(ValueError, client.readDelta, io.StringIO(delta.getvalue()))
+        self.assertEqual(client.header["TIMESTAMP"], "200")
+
+    def testDeltaIndex(self):
+        playground = ResolverPlayground(
+            binrepos={"test_binrepo": self.binpkgs},
+            user_config={
+                "make.conf": ('FEATURES="delta-index"',),
+                "binrepos.conf": ("[test_binrepo]", "frozen = no"),
+            },
+        )
+        try:
+            settings = playground.settings
+            server_dir = playground._get_binrepo_dir("test_binrepo")
+            server = binarytree(pkgdir=server_dir, settings=settings)
+            server.populate()
+            deltas_file = os.path.join(server_dir, "Packages.delta")
+            self.assertTrue(os.path.exists(deltas_file))
+
+            def client_cpvs():
+                client = binarytree(pkgdir=playground.pkgdir, settings=settings)
+                client.populate(getbinpkgs=True, getbinpkg_refresh=True)
+                return sorted(
+                    cpv for cpv in client.dbapi.cpv_all() if cpv.startswith("dev-libs/")
+                )
+
+            self.assertEqual(client_cpvs(), ["dev-libs/A-1", "dev-libs/B-1"])
+
+            # Update the binhost twice, then hide its full index, so that
+            # the client has to apply both deltas.
+            timestamp = time.time()
+            with mock.patch.object(getbinpkg.time, "time", return_value=timestamp + 10):
+                server.remove(server.dbapi.match("dev-libs/B-1")[0])
+            with mock.patch.object(getbinpkg.time, "time", return_value=timestamp + 20):
+                playground._create_binpkgs(server_dir, {"dev-libs/C-1": {"EAPI": "8"}})
+            with open(deltas_file, encoding="utf-8") as f:
+                deltas = PackageIndexDeltas()
+                deltas.read(f)
+            self.assertEqual(len(deltas.deltas), 2)
+            for name in ("Packages", "Packages.gz"):
+                path = os.path.join(server_dir, name)
+                os.rename(path, path + ".hidden")
+            self.assertEqual(client_cpvs(), ["dev-libs/A-1", "dev-libs/C-1"])
+            for name in ("Packages", "Packages.gz"):
+                path = os.path.join(server_dir, name)
+                os.rename(path + ".hidden", path)
+
+            # Without a chain from its copy, the client fetches the full
+            # index.
+            server = binarytree(pkgdir=server_dir, settings=settings)
+            server.populate()
+            with mock.patch.object(getbinpkg.time, "time", return_value=timestamp + 30):
+                server.remove(server.dbapi.match("dev-libs/A-1")[0])
+            with open(deltas_file, "w") as f:
+                f.write(f"TIMESTAMP: {int(timestamp) + 30}\n\n")
+            self.assertEqual(client_cpvs(), ["dev-libs/C-1"])
+        finally:
+            playground.cleanup()
+
+    def testSameSecond(self):
+        playground = ResolverPlayground(
+            binrepos={"test_binrepo": self.binpkgs},
+            user_config={
+                "make.conf": ('FEATURES="delta-index"',),
+                "binrepos.conf": ("[test_binrepo]", "frozen = no"),
+            },
+        )
+        try:
+            server_dir = playground._get_binrepo_dir("test_binrepo")
+            server = binarytree(pkgdir=server_dir, settings=playground.settings)
+            server.populate()
+            deltas_file = os.path.join(server_dir, "Packages.delta")
+            first = server._load_pkgindex().header["TIMESTAMP"]
+
+            # Updates within one second still extend the chain, and each
+            # of them reads the index only once.
+            timestamp = time.time() + 10
+            with (
+                mock.patch.object(getbinpkg.time, "time", return_value=timestamp),
+                mock.patch.object(
+                    binarytree,
+                    "_load_pkgindex",
+                    autospec=True,
+                    side_effect=binarytree._load_pkgindex,
+                ) as load_pkgindex,
+            ):
+                for cp in ("dev-libs/A", "dev-libs/B"):
+                    server.remove(server.dbapi.match(cp)[0])
+            self.assertEqual(load_pkgindex.call_count, 2)
+
+            with open(deltas_file, encoding="utf-8") as f:
+                deltas = PackageIndexDeltas()
+                deltas.read(f)
+            chain = deltas.chain(first)
+            self.assertEqual(
+                [d["TO"] for d in chain],
+                [str(int(timestamp)), str(int(timestamp) + 1)],
+            )
+        finally:
+            playground.cleanup()
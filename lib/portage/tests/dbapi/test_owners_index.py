@@ -0,0 +1,164 @@
+# Copyright 2026 Gentoo Authors
+# Distributed under the terms of the GNU General Public License v2
+
+import os
+
+from portage.const import CACHE_PATH
+from portage.dbapi._OwnersIndex import OwnersIndex
+from portage.tests import TestCase
+from portage.tests.resolver.ResolverPlayground import ResolverPlayground
+
+
+class OwnersIndexTestCase(TestCase):
+    installed = {
+        "dev-libs/A-1": {"EAPI": "8"},
+        "dev-libs/B-1": {"EAPI": "8"},
+        "app-misc/C-1": {"EAPI": "8"},
+    }
+
+    contents = {
+        "dev-libs/A-1": (
+            ("dir", "/usr"),
+            ("dir", "/usr/lib64"),
+            ("obj", "/usr/lib64/libA.so 0 0"),
+            ("obj", "/usr/bin/a 0 0"),
+        ),
+        "dev-libs/B-1": (
+            ("dir", "/usr"),
+            ("obj", "/usr/bin/b 0 0"),
+            ("sym", "/usr/bin/a.link -> a 0"),
+        ),
+        "app-misc/C-1": (),
+    }
+
+    def _write_contents(self, vardb, cpv, lines):
+        eprefix = vardb.settings["EPREFIX"]
+        with open(vardb.getpath(cpv, filename="CONTENTS"), "w") as f:
+            f.write("".join(f"{kind} {eprefix}{rest}\n" for kind, rest in lines))
+        # Like the atomic rename of a real CONTENTS update.
+        pkgdir = vardb.getpath(cpv)
+        st = os.stat(pkgdir)
+        os.utime(pkgdir, ns=(st.st_atime_ns, st.st_mtime_ns + 1000000000))
+
+    def _owners(self, vardb, paths):
+        # Absolute paths are relative to ROOT, so they include EPREFIX.
+        paths = [
+            vardb.settings["EPREFIX"] + p if p.startswith("/") else p for p in paths
+        ]
+        return {(owner.mycpv, path) for owner, path in vardb._owners.iter_owners(paths)}
+
+    def _playground(self, owners_index=True):
+        features = "owners-index" if owners_index else "-owners-index"
+        playground = ResolverPlayground(
+            installed=self.installed,
+            user_config={"make.conf": (f'FEATURES="{features}"',)},
+        )
+        vardb = playground.trees[playground.eroot]["vartree"].dbapi
+        for cpv, lines in self.contents.items():
+            self._write_contents(vardb, cpv, lines)
+        return playground, vardb
+
+    def testLookup(self):
+        for owners_index in (True, False):
+            with self.subTest(owners_index=owners_index):
+                self._testLookup(owners_index)
+
+    def _testLookup(self, owners_index):
+        playground, vardb = self._playground(owners_index)
+        try:
+            self.assertEqual(
+                self._owners(vardb, ["/usr/bin/a", "/usr/bin/nope", "a.link"]),
+                {("dev-libs/A-1", "usr/bin/a"), ("dev-libs/B-1", "usr/bin/a.link")},
+            )
+            self.assertEqual(
+                self._owners(vardb, ["/usr/"]),
+                {("dev-libs/A-1", "usr"), ("dev-libs/B-1", "usr")},
+            )
+            self.assertEqual(
+                set(
+                    vardb._owners.getFileOwnerMap(
+                        [vardb.settings["EPREFIX"] + "/usr/bin/b"]
+                    )
+                ),
+                {"usr/bin/b"},
+            )
+            index_path = os.path.join(playground.eroot, CACHE_PATH, "owners_index")
+            self.assertEqual(os.path.exists(index_path), owners_index)
+        finally:
+            playground.cleanup()
+
+    def testSymlinkedParent(self):
+        for owners_index in (True, False):
+            with self.subTest(owners_index=owners_index):
+                self._testSymlinkedParent(owners_index)
+
+    def _testSymlinkedParent(self, owners_index):
+        playground, vardb = self._playground(owners_index)
+        try:
+            eroot = playground.eroot
+            os.makedirs(os.path.join(eroot, "usr/lib64"))
+            open(os.path.join(eroot, "usr/lib64/libA.so"), "w").close()
+            os.symlink("lib64", os.path.join(eroot, "usr/lib"))
+            self.assertEqual(
+                self._owners(vardb, ["/usr/lib/libA.so"]),
+                {("dev-libs/A-1", "usr/lib64/libA.so")},
+            )
+        finally:
+            playground.cleanup()
+
+    def testPersistentAndIncremental(self):
+        playground, vardb = self._playground()
+        try:
+            vardb._owners.populate()
+            index_path = os.path.join(playground.eroot, CACHE_PATH, "owners_index")
+            self.assertIsNotNone(OwnersIndex.load(index_path))
+
+            # A fresh process reuses the file without reading any CONTENTS.
+            owners_db = vardb._owners_db(vardb)
+            dblink = vardb._dblink
+
+            def no_dblink(cpv):
+                raise AssertionError(f"CONTENTS of {cpv} read")
+
+            vardb._dblink = no_dblink
+            try:
+                owners_db.populate()
+            finally:
+                vardb._dblink = dblink
+
+            # A changed package is reindexed, the others are carried over.
+            self._write_contents(vardb, "app-misc/C-1", (("obj", "/usr/bin/a 0 0"),))
+            vardb._aux_cache_obj = None
+            read = []
+
+            def counting_dblink(cpv):
+                read.append(cpv)
+                return dblink(cpv)
+
+            vardb._dblink = counting_dblink
+            try:
+                owners_db.populate()
+            finally:
+                vardb._dblink = dblink
+            self.assertEqual(read, ["app-misc/C-1"])
+            self.assertEqual(
+                self._owners(vardb, ["/usr/bin/a"]),
+                {("dev-libs/A-1", "usr/bin/a"), ("app-misc/C-1", "usr/bin/a")},
+            )
+        finally:
+            playground.cleanup()
+
+    def testUnknownFormatIgnored(self):
+        playground, vardb = self._playground()
+        try:
+            index_path = os.path.join(playground.eroot, CACHE_PATH, "owners_index")
+            os.makedirs(os.path.dirname(index_path), exist_ok=True)
+            with open(index_path, "wb") as f:
+                f.write(b"garbage")
+            self.assertIsNone(OwnersIndex.load(index_path))
+            self.assertEqual(
+                self._owners(vardb, ["/usr/bin/b"]), {("dev-libs/B-1", "usr/bin/b")}
+            )
+            self.assertIsNotNone(OwnersIndex.load(index_path))
+        finally:
+            playground.cleanup()
@@ -0,0 +1,116 @@
+# Copyright 2026 Gentoo Authors
+# Distributed under the terms of the GNU General Public License v2
+
+import os
+from types import SimpleNamespace
+from unittest import mock
+
+from portage.cache.index import pkg_listing_index
+from portage.cache.index.pkg_listing_index import (
+    PkgListingIndex,
+    pkg_listing_index_paths,
+    update_pkg_listing_index,
+)
+from portage.sync.controller import SyncManager
+from portage.tests import TestCase
+from portage.tests.resolver.ResolverPlayground import ResolverPlayground
+from portage.util import ensure_dirs
+
+
+class PkgListingIndexTestCase(TestCase):
+    def testPkgListingIndex(self):
+        ebuilds = {
+            "dev-libs/A-1": {},
+            "dev-libs/A-2": {},
+            "sys-apps/B-1": {},
+            "app-misc/C-1": {},
+        }
+        playground = ResolverPlayground(ebuilds=ebuilds)
+        try:
+            portdb = playground.trees[playground.eroot]["porttree"].dbapi
+            location = portdb.repositories["test_repo"].location
+            categories = portdb.settings.categories
+            cps = portdb.cp_all()
+            cp_lists = {cp: portdb.cp_list(cp) for cp in cps}
+
+            paths = pkg_listing_index_paths(location, portdb.depcachedir)
+            with mock.patch.object(pkg_listing_index, "_racy_ns", 0):
+                index = update_pkg_listing_index(location, categories)
+            ensure_dirs(os.path.dirname(paths[1]))
+            index.write(paths[1])
+            # Another repository does not get to use it.
+            self.assertIsNone(PkgListingIndex.load("/elsewhere", paths))
+
+            portdb._listing_indexes.clear()
+            with mock.patch("os.listdir", wraps=os.listdir) as listdir:
+                self.assertEqual(portdb.cp_all(), cps)
+                for cp, cpvs in cp_lists.items():
+                    self.assertEqual(portdb.cp_list(cp), cpvs)
+                    self.assertEqual(
+                        [cpv.repo for cpv in portdb.cp_list(cp)],
+                        [cpv.repo for cpv in cpvs],
+                    )
+                portdb.freeze()
+                try:
+                    self.assertEqual(
+                        portdb.getRepositories("dev-libs/A"), ["test_repo"]
+                    )
+                    self.assertEqual(portdb.getRepositories("dev-libs/Z"), [])
+                finally:
+                    portdb.melt()
+                self.assertEqual(listdir.call_count, 0)
+
+            # A directory that changed is listed again.
+            with open(os.path.join(location, "dev-libs", "A", "A-3.ebuild"), "w") as f:
+                f.write("EAPI=8\nSLOT=0\nKEYWORDS=x86\n")
+            self.assertEqual(
+                portdb.cp_list("dev-libs/A"),
+                ["dev-libs/A-1", "dev-libs/A-2", "dev-libs/A-3"],
+            )
+
+            # Updates only list what changed.
+            with (
+                mock.patch.object(pkg_listing_index, "_racy_ns", 0),
+                mock.patch.object(
+                    pkg_listing_index,
+                    "_list_package",
+                    wraps=pkg_listing_index._list_package,
+                ) as list_package,
+            ):
+                index = update_pkg_listing_index(
+                    location, set(categories) | {"x11-misc"}, old=index
+                )
+            self.assertEqual(
+                [call.args[1] for call in list_package.call_args_list], ["A"]
+            )
+            self.assertEqual(index.package("dev-libs/A"), ["A-1", "A-2", "A-3"])
+            self.assertEqual(index.category("sys-apps"), ["B"])
+            self.assertEqual(index.category("x11-misc"), [])
+        finally:
+            playground.cleanup()
+
+    def testSyncUpdate(self):
+        playground = ResolverPlayground(ebuilds={"dev-libs/A-1": {}})
+        try:
+            portdb = playground.trees[playground.eroot]["porttree"].dbapi
+            repo = portdb.repositories["test_repo"]
+            paths = pkg_listing_index_paths(repo.location, portdb.depcachedir)
+            manager = SimpleNamespace(portdb=portdb, settings=portdb.settings)
+
+            # Without an index, a sync does not create one.
+            SyncManager._update_listing_index(manager, repo)
+            self.assertFalse(any(os.path.exists(path) for path in paths))
+
+            with mock.patch.object(pkg_listing_index, "_racy_ns", 0):
+                index = update_pkg_listing_index(repo.location, ["dev-libs"])
+            index.write(paths[0])
+            with open(
+                os.path.join(repo.location, "dev-libs", "A", "A-2.ebuild"), "w"
+            ) as f:
+                f.write("EAPI=8\nSLOT=0\n")
+            with mock.patch.object(pkg_listing_index, "_racy_ns", 0):
+                SyncManager._update_listing_index(manager, repo)
+            index = PkgListingIndex.load(repo.location, paths[1:])
+            self.assertEqual(index.package("dev-libs/A"), ["A-1", "A-2"])
+        finally:
+            playground.cleanup()
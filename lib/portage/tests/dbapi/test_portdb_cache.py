@@ -254,6 +254,58 @@ class PortdbCacheTestCase(TestCase):
 			        """),
                 ),
             ),
+            CommandStep(
+                returncode=os.EX_OK,
+                command=(BASH_BINARY,)
+                + (
+                    "-c",
+                    "echo %s > %s"
+                    % tuple(
+                        map(
+                            shlex.quote,
+                            (
+                                "cache-formats = mmap-dict md5-dict",
+                                layout_conf_path,
+                            ),
+                        )
+                    ),
+                ),
+            ),
+            CommandStep(
+                returncode=os.EX_OK,
+                command=egencache_cmd + ("--update",),
+            ),
+            FunctionStep(
+                function=lambda i: self.assertTrue(
+                    os.path.isfile(md5_cache_dir + ".mmap"), f"step {i}"
+                )
+            ),
+            # Test auto-detection and preference for the mmap-dict cache
+            # when layout.conf is absent.
+            CommandStep(
+                returncode=os.EX_OK,
+                command=(BASH_BINARY,) + ("-c", f"rm {shlex.quote(layout_conf_path)}"),
+            ),
+            CommandStep(
+                returncode=os.EX_OK,
+                command=python_cmd
+                + (
+                    textwrap.dedent("""
+					import os, sys, portage
+					from portage.cache.mmap_dict import md5_database
+					location = portage.portdb.repositories['test_repo'].location
+					cache = portage.portdb._pregen_auxdb[location]
+					if not isinstance(cache, md5_database):
+						sys.exit(1)
+					if sorted(cache) != sorted(portage.portdb.cpv_all()):
+						sys.exit(1)
+					if not cache["sys-apps/C-1"]["IDEPEND"]:
+						sys.exit(1)
+					if portage.portdb.aux_get("sys-apps/C-1", ["INHERITED"]) != ["bar baz foo"]:
+						sys.exit(1)
+			        """),
+                ),
+            ),
         )
 
         pythonpath = os.environ.get("PYTHONPATH")
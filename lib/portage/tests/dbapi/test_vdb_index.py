@@ -0,0 +1,146 @@
+# Copyright 2026 Gentoo Authors
+# Distributed under the terms of the GNU General Public License v2
+
+import os
+from unittest import mock
+
+from portage.const import CACHE_PATH
+from portage.dbapi import _VdbIndex
+from portage.dbapi._VdbIndex import VdbIndex
+from portage.tests import TestCase
+from portage.tests.resolver.ResolverPlayground import ResolverPlayground
+
+
+class VdbIndexTestCase(TestCase):
+    installed = {
+        "dev-libs/A-1": {"EAPI": "7", "RDEPEND": "dev-libs/B", "SLOT": "0"},
+        "dev-libs/A-2": {"EAPI": "8", "SLOT": "0", "USE": "foo bar"},
+        "dev-libs/B-1": {"EAPI": "8", "SLOT": "1"},
+        "app-misc/C-1": {"EAPI": "8", "KEYWORDS": "x86"},
+    }
+
+    _keys = ["EAPI", "RDEPEND", "SLOT", "USE", "KEYWORDS", "repository"]
+
+    def _snapshot(self, vardb):
+        vardb._aux_cache_obj = None
+        vardb.cpcache.clear()
+        return (
+            sorted(vardb.cpv_all()),
+            vardb.cp_list("dev-libs/A"),
+            {cpv: vardb.aux_get(cpv, self._keys) for cpv in vardb.cpv_all()},
+        )
+
+    def _attach(self, playground, vardb):
+        path = os.path.join(playground.eroot, CACHE_PATH, "vdb_index")
+        vardb._vdb_index = VdbIndex(vardb._dbroot, path)
+        vardb._vdb_index_refresh()
+        # A fresh instance, as a new process would load it.
+        vardb._vdb_index = VdbIndex(vardb._dbroot, path)
+        return vardb._vdb_index
+
+    def testServedFromIndex(self):
+        playground = ResolverPlayground(installed=self.installed)
+        try:
+            vardb = playground.trees[playground.eroot]["vartree"].dbapi
+            expected = self._snapshot(vardb)
+            vdb_index = self._attach(playground, vardb)
+            self.assertEqual(self._snapshot(vardb), expected)
+            self.assertEqual(vdb_index.misses, 0)
+            self.assertGreater(vdb_index.hits, 0)
+        finally:
+            playground.cleanup()
+
+    def testStaleFallsBack(self):
+        playground = ResolverPlayground(installed=self.installed)
+        try:
+            vardb = playground.trees[playground.eroot]["vartree"].dbapi
+            vdb_index = self._attach(playground, vardb)
+
+            # A changed package directory is read from disk.
+            pkgdir = vardb.getpath("dev-libs/A-2")
+            with open(os.path.join(pkgdir, "USE"), "w") as f:
+                f.write("baz\n")
+            os.utime(pkgdir, ns=(0, 0))
+            self.assertIsNone(
+                vdb_index.metadata("dev-libs/A-2", os.stat(pkgdir).st_mtime_ns)
+            )
+            vardb._aux_cache_obj = None
+            self.assertEqual(vardb.aux_get("dev-libs/A-2", ["USE"]), ["baz"])
+
+            # So is a changed category listing.
+            os.makedirs(vardb.getpath("dev-libs/A-3"))
+            vardb.cpcache.clear()
+            self.assertIn("dev-libs/A-3", vardb.cp_list("dev-libs/A"))
+            self.assertIn("dev-libs/A-3", vardb.cpv_all())
+
+            # Until a refresh picks both up again.
+            vardb._vdb_index_refresh()
+            misses = vdb_index.misses
+            self.assertIn("dev-libs/A-3", vardb.cpv_all())
+            metadata = vdb_index.metadata("dev-libs/A-2", os.stat(pkgdir).st_mtime_ns)
+            self.assertEqual(metadata["USE"], "baz")
+            self.assertEqual(vdb_index.misses, misses)
+        finally:
+            playground.cleanup()
+
+    def testUnknownFormatIgnored(self):
+        playground = ResolverPlayground(installed=self.installed)
+        try:
+            vardb = playground.trees[playground.eroot]["vartree"].dbapi
+            expected = self._snapshot(vardb)
+            vdb_index = self._attach(playground, vardb)
+            with open(vdb_index._path) as f:
+                content = f.read()
+            with open(vdb_index._path, "w") as f:
+                f.write(content.replace("#format=2", "#format=999", 1))
+            vardb._vdb_index = vdb_index = VdbIndex(vardb._dbroot, vdb_index._path)
+            self.assertEqual(self._snapshot(vardb), expected)
+            self.assertEqual(vdb_index.hits, 0)
+        finally:
+            playground.cleanup()
+
+    def testMetadataFieldsChanged(self):
+        playground = ResolverPlayground(installed=self.installed)
+        try:
+            vardb = playground.trees[playground.eroot]["vartree"].dbapi
+            expected = self._snapshot(vardb)
+            vdb_index = self._attach(playground, vardb)
+
+            # An index written for another set of metadata fields is not
+            # served, and the next refresh rebuilds it for the current one.
+            with mock.patch(
+                "portage.dbapi.vartree._METADATA_FILE_FIELDS",
+                frozenset(("EAPI", "SLOT")),
+            ):
+                vardb._vdb_index = vdb_index = VdbIndex(vardb._dbroot, vdb_index._path)
+                self.assertIsNone(
+                    vdb_index.categories(os.stat(vardb._dbroot).st_mtime_ns)
+                )
+                vardb._vdb_index_refresh()
+                with open(vdb_index._path) as f:
+                    self.assertEqual(f.readline().rstrip("\n"), _VdbIndex._header())
+                pkgdir = vardb.getpath("dev-libs/A-2")
+                metadata = vdb_index.metadata(
+                    "dev-libs/A-2", os.stat(pkgdir).st_mtime_ns
+                )
+                self.assertEqual(sorted(metadata), ["EAPI", "SLOT"])
+
+            # A snapshot that lacks a wanted field is a miss, not an empty
+            # value.
+            vardb._aux_cache_obj = None
+            self.assertEqual(self._snapshot(vardb), expected)
+        finally:
+            playground.cleanup()
+
+    def testFeature(self):
+        playground = ResolverPlayground(
+            installed=self.installed,
+            user_config={"make.conf": ('FEATURES="vdb-index"',)},
+        )
+        try:
+            vardb = playground.trees[playground.eroot]["vartree"].dbapi
+            self.assertIsNotNone(vardb._vdb_index)
+            vardb._vdb_index_refresh()
+            self.assertTrue(os.path.exists(vardb._vdb_index._path))
+        finally:
+            playground.cleanup()
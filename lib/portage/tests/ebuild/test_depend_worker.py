@@ -0,0 +1,123 @@
+# Copyright 2026 Gentoo Authors
+# Distributed under the terms of the GNU General Public License v2
+
+import os
+import shutil
+
+from portage.dbapi.porttree import portdbapi
+from portage.exception import PortageKeyError
+from portage.package.ebuild import _depend_worker
+from portage.tests import TestCase
+from portage.tests.resolver.ResolverPlayground import ResolverPlayground
+from portage.util._eventloop.global_event_loop import global_event_loop
+
+
+class DependWorkerTestCase(TestCase):
+    ebuilds = {
+        "dev-libs/A-1": {
+            "EAPI": "6",
+            "MISC_CONTENT": "inherit foo\nLEAK=A\nexport EXPORTED_LEAK=A\nleak() { :; }",
+        },
+        "dev-libs/B-1.2.3": {
+            "EAPI": "7",
+            "DESCRIPTION": "B $(ver_cut 1-2) ${LEAK:-none} ${EXPORTED_LEAK:-none}",
+            "MISC_CONTENT": "if declare -F leak >/dev/null; then die leaked; fi",
+        },
+        "dev-libs/C-1": {
+            "EAPI": "6",
+            "MISC_CONTENT": "if declare -F ver_cut >/dev/null; then die leaked; fi",
+        },
+        "dev-libs/D-1": {
+            "EAPI": "8",
+            "MISC_CONTENT": "die broken",
+        },
+        "dev-libs/E-1": {
+            "EAPI": "8",
+            "IUSE": "+foo",
+            "RDEPEND": "foo? ( dev-libs/A )",
+            "MISC_CONTENT": "inherit bar",
+        },
+    }
+
+    eclasses = {
+        "foo": ("inherit bar",),
+        "bar": (
+            "EXPORT_FUNCTIONS src_prepare",
+            'DEPEND="dev-libs/bar"',
+            "bar_src_prepare() { default; }",
+        ),
+    }
+
+    keys = ("DEFINED_PHASES", "DEPEND", "DESCRIPTION", "EAPI", "INHERITED", "IUSE")
+
+    def _metadata(self, features):
+        playground = ResolverPlayground(
+            ebuilds=self.ebuilds,
+            eclasses=self.eclasses,
+            user_config={"make.conf": (f'FEATURES="{features}"',)},
+        )
+        try:
+            # Drop the caches that egencache generated, so that the
+            # metadata is generated here.
+            repo_dir = playground.settings.repositories["test_repo"].location
+            shutil.rmtree(os.path.join(repo_dir, "metadata", "md5-cache"))
+            shutil.rmtree(playground.settings.depcachedir)
+            portdb = portdbapi(mysettings=playground.settings)
+            results = {}
+            for cpv in sorted(self.ebuilds):
+                try:
+                    results[cpv] = portdb.aux_get(cpv, self.keys)
+                except PortageKeyError:
+                    results[cpv] = None
+            return results
+        finally:
+            playground.cleanup()
+
+    def testDependWorker(self):
+        expected = self._metadata("-metadata-workers")
+        self.assertIsNone(expected["dev-libs/D-1"])
+        self.assertEqual(expected["dev-libs/B-1.2.3"][2], "B 1.2 none none")
+
+        try:
+            self.assertEqual(self._metadata("metadata-workers"), expected)
+            # The ebuilds were served one at a time, by a single worker.
+            self.assertEqual(len(_depend_worker._pool._workers), 1)
+        finally:
+            if _depend_worker._pool is not None:
+                global_event_loop().run_until_complete(
+                    _depend_worker._pool._close_at_exit()
+                )
+                _depend_worker._pool = None
+
+    def testWorkerKey(self):
+        key = _depend_worker.DependWorkerPool._key
+        stdio = (os.stat(os.devnull),) * 3
+        env = {
+            "EBUILD": "/repo/dev-libs/A/A-1.ebuild",
+            "PORTAGE_BUILDDIR": "/var/tmp/portage/dev-libs/A-1",
+            "PORTAGE_PIPE_FD": "9",
+            "PORTAGE_REPO_NAME": "test_repo",
+            "SANDBOX_LOG": "/var/tmp/portage/dev-libs/A-1/temp/sandbox.log",
+            "SANDBOX_WRITE": "/dev/null",
+        }
+        expected = key(None, env, {"fd_pipes": {}}, stdio)
+
+        # Variables of the request itself do not keep a worker from
+        # serving it.
+        other = dict(
+            env,
+            EBUILD="/repo/dev-libs/B/B-1.ebuild",
+            PORTAGE_BUILDDIR="/var/tmp/portage/dev-libs/B-1",
+            PORTAGE_PIPE_FD="10",
+            SANDBOX_LOG="/var/tmp/portage/dev-libs/B-1/temp/sandbox.log",
+        )
+        self.assertEqual(key(None, other, {"fd_pipes": {1: 1}}, stdio), expected)
+
+        # The sandbox and portage settings of a worker do.
+        for k, v in (
+            ("SANDBOX_WRITE", "/dev/null:/tmp"),
+            ("SANDBOX_ON", "0"),
+            ("PORTAGE_REPO_NAME", "other_repo"),
+        ):
+            with self.subTest(var=k):
+                self.assertNotEqual(key(None, dict(env, **{k: v}), {}, stdio), expected)
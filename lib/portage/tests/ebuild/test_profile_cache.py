@@ -0,0 +1,178 @@
+# Copyright 2026 Gentoo Authors
+# Distributed under the terms of the GNU General Public License v2
+
+import io
+import os
+import pickle
+import sys
+import time
+from unittest import mock
+
+from portage.const import CACHE_PATH
+from portage.package.ebuild._config import profile_cache
+from portage.package.ebuild._config.KeywordsManager import KeywordsManager
+from portage.package.ebuild._config.LicenseManager import LicenseManager
+from portage.package.ebuild._config.MaskManager import MaskManager
+from portage.package.ebuild._config.UseManager import UseManager
+from portage.tests import TestCase
+from portage.tests.resolver.ResolverPlayground import ResolverPlayground
+
+
+class ProfileCacheTestCase(TestCase):
+    profile = {
+        "use.mask": ["foo"],
+        "package.use.mask": ["dev-libs/A bar"],
+        "package.accept_keywords": ["dev-libs/B ~x86"],
+        "package.mask": [">=dev-libs/A-2"],
+    }
+    user_config = {
+        "make.conf": ('PORTAGE_PROFILE_CACHE="1"',),
+        "package.use": ["dev-libs/A baz"],
+        "package.license": ["dev-libs/A TEST"],
+    }
+
+    def _state(self, settings):
+        return (
+            settings.usemask,
+            settings.useforce,
+            settings._make_defaults,
+            settings["USE"],
+            settings["ACCEPT_LICENSE"],
+            dict(settings._use_manager._pusedict.iteritems()),
+            dict(settings._license_manager._plicensedict.iteritems()),
+            settings._keywords_manager._p_accept_keywords,
+            dict(settings._mask_manager._pmaskdict.iteritems()),
+        )
+
+    def testProfileCache(self):
+        playground = ResolverPlayground(
+            profile=self.profile, user_config=self.user_config
+        )
+        try:
+            cache_dir = os.path.join(playground.eroot, CACHE_PATH, "profile_cache")
+            # Freshly written profiles are not trusted to stay unchanged.
+            self.assertEqual(list(self._state(playground.settings)[-1]), ["dev-libs/A"])
+            self.assertFalse(os.path.exists(cache_dir))
+
+            with mock.patch.object(profile_cache, "_racy_ns", 0):
+                playground.reload_config()
+                expected = self._state(playground.settings)
+            self.assertEqual(
+                sorted(name.split(".", 1)[1] for name in os.listdir(cache_dir)),
+                [
+                    "keywords.pickle",
+                    "license.pickle",
+                    "make.defaults.pickle",
+                    "mask.pickle",
+                    "use.pickle",
+                ],
+            )
+
+            with (
+                mock.patch.object(UseManager, "__init__", side_effect=AssertionError),
+                mock.patch.object(
+                    LicenseManager, "__init__", side_effect=AssertionError
+                ),
+                mock.patch.object(
+                    KeywordsManager, "__init__", side_effect=AssertionError
+                ),
+                mock.patch.object(MaskManager, "__init__", side_effect=AssertionError),
+            ):
+                playground.reload_config()
+                settings = playground.settings
+                self.assertEqual(self._state(settings), expected)
+                self.assertIs(settings._use_manager._is_stable.__self__, settings)
+                self.assertIs(settings._use_manager.repositories, settings.repositories)
+
+            # A changed profile file is parsed again.
+            profile_dir = os.path.realpath(
+                os.path.join(playground.eroot, "etc", "portage", "make.profile")
+            )
+            use_mask = os.path.join(profile_dir, "use.mask")
+            with open(use_mask, "a") as f:
+                f.write("qux\n")
+            os.utime(use_mask, ns=(time.time_ns(), time.time_ns()))
+            playground.reload_config()
+            self.assertIn("qux", playground.settings.usemask)
+
+            # So is a new one.
+            os.mkdir(os.path.join(profile_dir, "package.unmask"))
+            with open(os.path.join(profile_dir, "package.unmask", "a"), "w") as f:
+                f.write(">=dev-libs/A-2\n")
+            playground.reload_config()
+            self.assertIn("dev-libs/A", playground.settings._mask_manager._punmaskdict)
+        finally:
+            playground.cleanup()
+
+    def testUntrustedCache(self):
+        playground = ResolverPlayground(
+            profile=self.profile,
+            user_config={"make.conf": ('PORTAGE_PROFILE_CACHE="1"',)},
+        )
+        try:
+            with mock.patch.object(profile_cache, "_racy_ns", 0):
+                playground.reload_config()
+            cache = playground.settings._profile_cache
+            self.assertIsNotNone(cache.load("use"))
+            path = cache._path("use")
+            with open(path, "wb") as f:
+                pickle.dump({"format": 1, "state": os.system}, f)
+            self.assertIsNone(cache.load("use"))
+            with open(path, "wb") as f:
+                f.write(b"garbage")
+            self.assertIsNone(cache.load("use"))
+            # Files that others may write to are not loaded.
+            self.assertIsNotNone(cache.load("license"))
+            os.chmod(cache._path("license"), 0o666)
+            self.assertIsNone(cache.load("license"))
+            self.assertIsNone(cache.load("use"))
+            # Parameters are part of the key.
+            self.assertIsNotNone(cache.load("mask", (False,)))
+            self.assertIsNone(cache.load("mask", (True,)))
+        finally:
+            playground.cleanup()
+
+    def testMessages(self):
+        profile = dict(self.profile)
+        profile["package.mask"] = ["not-an-atom"]
+        playground = ResolverPlayground(
+            profile=profile,
+            user_config={"make.conf": ('PORTAGE_PROFILE_CACHE="1"',)},
+        )
+        try:
+            # The messages shown while the profiles are parsed are shown
+            # again when the cache is loaded instead.
+            stderr = io.StringIO()
+            with (
+                mock.patch.object(profile_cache, "_racy_ns", 0),
+                mock.patch.object(sys, "stderr", stderr),
+            ):
+                playground.reload_config()
+                playground.settings._mask_manager
+            parsed = stderr.getvalue()
+            self.assertIn("not-an-atom", parsed)
+
+            stderr = io.StringIO()
+            with (
+                mock.patch.object(sys, "stderr", stderr),
+                mock.patch.object(MaskManager, "__init__", side_effect=AssertionError),
+            ):
+                playground.reload_config()
+                playground.settings._mask_manager
+            self.assertEqual(stderr.getvalue(), parsed)
+        finally:
+            playground.cleanup()
+
+    def testDisabled(self):
+        playground = ResolverPlayground(profile=self.profile)
+        try:
+            with mock.patch.object(profile_cache, "_racy_ns", 0):
+                playground.reload_config()
+            self.assertIsNone(playground.settings._profile_cache)
+            self.assertFalse(
+                os.path.exists(
+                    os.path.join(playground.eroot, CACHE_PATH, "profile_cache")
+                )
+            )
+        finally:
+            playground.cleanup()
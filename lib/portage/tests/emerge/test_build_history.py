@@ -0,0 +1,310 @@
+# Copyright 2026 Gentoo Authors
+# Distributed under the terms of the GNU General Public License v2
+
+import json
+import os
+import tempfile
+from types import SimpleNamespace
+from unittest import mock
+
+from _emerge import Scheduler as _scheduler_module
+from _emerge._build_history import BuildCost, BuildHistory, emerge_log_durations
+from _emerge.Scheduler import Scheduler
+
+from portage.tests import TestCase
+from portage.util.digraph import digraph
+from portage.versions import _pkg_str
+
+GiB = 1024 * 1024 * 1024
+
+
+class BuildHistoryTestCase(TestCase):
+    def test_record_and_estimate(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "edb", "build_history")
+            history = BuildHistory(path)
+            self.assertIsNone(history.estimate("dev-libs/foo-1"))
+            history.record(
+                "dev-libs/foo-1",
+                120.04,
+                {"cpu_usec": 5, "mem_peak": 2 * GiB, "io_read_bytes": 1},
+            )
+            history.record("dev-libs/bar-1", 3.0)
+            # Nothing known about the build is not worth a record.
+            history.record("dev-libs/baz-1", None, None)
+            history.save()
+
+            history = BuildHistory(path)
+            self.assertEqual(
+                history.estimate("dev-libs/foo-1"),
+                BuildCost(120.0, 5, 2 * GiB, None),
+            )
+            # Other versions are estimated from the last recorded one.
+            self.assertEqual(history.estimate("dev-libs/foo-2").mem_peak, 2 * GiB)
+            self.assertEqual(
+                history.estimate("dev-libs/bar-1"), BuildCost(3.0, None, None, None)
+            )
+            self.assertIsNone(history.estimate("dev-libs/baz-1"))
+
+    def test_save_merges_concurrent_records(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "build_history")
+            first = BuildHistory(path)
+            second = BuildHistory(path)
+            first.record("dev-libs/foo-1", 10.0)
+            second.record("dev-libs/bar-1", 20.0)
+            first.save()
+            second.save()
+            history = BuildHistory(path)
+            self.assertEqual(history.estimate("dev-libs/foo-1").elapsed, 10.0)
+            self.assertEqual(history.estimate("dev-libs/bar-1").elapsed, 20.0)
+
+    def test_old_versions_are_dropped(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "build_history")
+            history = BuildHistory(path)
+            for i in range(BuildHistory._max_versions + 2):
+                history.record(f"dev-libs/foo-{i}", float(i))
+                history._packages["dev-libs/foo"][str(i)]["time"] = i
+            history.save()
+            with open(path) as f:
+                versions = json.load(f)["packages"]["dev-libs/foo"]
+            self.assertEqual(
+                sorted(versions, key=int),
+                [str(i + 2) for i in range(BuildHistory._max_versions)],
+            )
+
+    def test_unknown_format_ignored(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "build_history")
+            for content in ("garbage", '{"format": 2, "packages": {}}', "[]"):
+                with open(path, "w") as f:
+                    f.write(content)
+                self.assertIsNone(BuildHistory(path).estimate("dev-libs/foo-1"))
+
+
+class _Pkg:
+    def __init__(self, cpv, built=False):
+        self.cpv = _pkg_str(cpv)
+        self.cp = self.cpv.cp
+        self.built = built
+        self.installed = False
+        self.operation = "merge"
+
+    def __repr__(self):
+        return self.cpv
+
+
+class EmergeLogDurationsTestCase(TestCase):
+    def test_durations(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "emerge.log")
+            with open(path, "w") as f:
+                f.write(
+                    "100:  >>> emerge (1 of 3) dev-libs/foo-1 to /\n"
+                    "110:  >>> emerge (2 of 3) dev-libs/bar-1 to /\n"
+                    "130:  === (1 of 3) Compiling/Merging (dev-libs/foo-1::gentoo)\n"
+                    "160:  ::: completed emerge (1 of 3) dev-libs/foo-1 to /\n"
+                    "200:  >>> emerge (1 of 1) dev-libs/foo-2 to /\n"
+                    "290:  ::: completed emerge (1 of 1) dev-libs/foo-2 to /\n"
+                    "300:  >>> emerge (3 of 3) app-misc/baz-1 to /\n"
+                    "310:  ::: completed emerge (3 of 3) app-misc/baz-1 to /\n"
+                    "garbage: ::: completed emerge (3 of 3)\n"
+                )
+            # The last completed emerge counts; bar never completed.
+            self.assertEqual(
+                emerge_log_durations(path, {"dev-libs/foo", "dev-libs/bar"}),
+                {"dev-libs/foo": 90},
+            )
+            self.assertEqual(
+                emerge_log_durations(os.path.join(tmp, "missing"), {"dev-libs/foo"}),
+                {},
+            )
+
+
+class _History:
+    def __init__(self, costs):
+        self._costs = costs
+
+    def estimate(self, cpv):
+        return self._costs.get(cpv)
+
+
+class ChooseByHistoryTestCase(TestCase):
+    def _scheduler(self, costs, running=(), mem_budget=8 * GiB):
+        sched = Scheduler.__new__(Scheduler)
+        sched._build_history = _History(costs)
+        sched._mem_budget = mem_budget
+        sched._running_costs = dict(enumerate(running))
+        sched._critical_path = {}
+        return sched
+
+    def test_longest_build_first(self):
+        a, b, c = (_Pkg(f"dev-libs/{x}-1") for x in "abc")
+        sched = self._scheduler(
+            {
+                "dev-libs/a-1": BuildCost(10.0, None, None, None),
+                "dev-libs/b-1": BuildCost(600.0, None, None, None),
+            }
+        )
+        self.assertIs(sched._choose_by_history([a, b, c]), b)
+
+    def test_merge_list_order_without_estimates(self):
+        a, b = (_Pkg(f"dev-libs/{x}-1") for x in "ab")
+        self.assertIs(self._scheduler({})._choose_by_history([a, b]), a)
+        # Binary packages are not built, so what their build took is moot.
+        a.built = True
+        sched = self._scheduler({"dev-libs/a-1": BuildCost(600.0, None, None, None)})
+        self.assertIs(sched._choose_by_history([b, a]), b)
+
+    def test_memory_budget(self):
+        heavy, light = _Pkg("dev-qt/heavy-1"), _Pkg("dev-libs/light-1")
+        costs = {
+            "dev-qt/heavy-1": BuildCost(900.0, None, 6 * GiB, None),
+            "dev-libs/light-1": BuildCost(10.0, None, 1 * GiB, None),
+        }
+        running = [BuildCost(900.0, None, 5 * GiB, None)]
+        sched = self._scheduler(costs, running)
+        self.assertIs(sched._choose_by_history([heavy, light]), light)
+        # Nothing fits until a running build finishes.
+        self.assertIsNone(sched._choose_by_history([heavy]))
+        # A build that does not fit on its own still starts when nothing
+        # else with a recorded cost is running.
+        self.assertIs(self._scheduler(costs)._choose_by_history([heavy]), heavy)
+        # Without a budget, only the duration counts.
+        sched = self._scheduler(costs, running, mem_budget=None)
+        self.assertIs(sched._choose_by_history([light, heavy]), heavy)
+
+
+class TmpdirReserveTestCase(TestCase):
+    def _required_free_bytes(self, running, jobs):
+        free = {}
+
+        def statvfs(path):
+            return SimpleNamespace(f_bsize=1, f_bavail=free["bytes"])
+
+        sched = Scheduler.__new__(Scheduler)
+        sched._max_jobs = 8
+        sched._max_load = None
+        sched._terminated_tasks = False
+        sched._jobs = jobs
+        sched._merge_wait_queue = []
+        sched._running_costs = dict(enumerate(running))
+        sched._jobs_tmpdir_require_free_gb = 1
+        sched._warned_tmpdir_free_space = True
+        sched.myopts = {}
+        sched.trees = {
+            "/": {
+                "root_config": SimpleNamespace(
+                    settings={"PORTAGE_TMPDIR": tempfile.gettempdir()}
+                )
+            }
+        }
+        with mock.patch("os.statvfs", statvfs):
+            # Find the smallest amount of free space that admits a job.
+            lo, hi = 0, 64 * GiB
+            while lo < hi:
+                free["bytes"] = mid = (lo + hi) // 2
+                if sched._can_add_job():
+                    hi = mid
+                else:
+                    lo = mid + 1
+        return lo
+
+    def test_recorded_writes_replace_the_default(self):
+        self.assertEqual(self._required_free_bytes([], 2), 3 * GiB)
+        self.assertEqual(
+            self._required_free_bytes([BuildCost(1.0, None, None, 5 * GiB)], 2),
+            7 * GiB,
+        )
+
+
+class CriticalPathTestCase(TestCase):
+    def _lengths(self, graph, costs, log_durations=None):
+        sched = Scheduler.__new__(Scheduler)
+        sched._digraph = graph
+        sched._build_history = _History(costs)
+        with (
+            mock.patch.object(_scheduler_module, "Package", _Pkg),
+            mock.patch.object(
+                _scheduler_module,
+                "emerge_log_durations",
+                lambda path, cps: {
+                    cp: t for cp, t in (log_durations or {}).items() if cp in cps
+                },
+            ),
+        ):
+            return sched._critical_path_lengths()
+
+    def test_longest_downstream_path(self):
+        # a <- b <- c, and d on its own: a is worth starting before d even
+        # though d takes longer to build on its own.
+        a, b, c, d = (_Pkg(f"dev-libs/{x}-1") for x in "abcd")
+        graph = digraph()
+        graph.add(a, b)
+        graph.add(b, c)
+        graph.add(d, None)
+        lengths = self._lengths(
+            graph,
+            {
+                "dev-libs/a-1": BuildCost(10.0, None, None, None),
+                "dev-libs/b-1": BuildCost(100.0, None, None, None),
+                "dev-libs/d-1": BuildCost(60.0, None, None, None),
+            },
+            {"dev-libs/c": 20},
+        )
+        self.assertEqual(lengths[a], 130.0)
+        self.assertEqual(lengths[c], 20)
+        self.assertEqual(lengths[d], 60.0)
+
+        sched = Scheduler.__new__(Scheduler)
+        sched._build_history = _History({})
+        sched._mem_budget = None
+        sched._running_costs = {}
+        sched._critical_path = lengths
+        self.assertIs(sched._choose_by_history([d, a]), a)
+
+    def test_unknown_builds_and_cycles(self):
+        # Without any estimate the longest chain of builds wins, and
+        # binary packages count for nothing.
+        a, b, c = (_Pkg(f"dev-libs/{x}-1") for x in "abc")
+        binary = _Pkg("dev-libs/bin-1", built=True)
+        graph = digraph()
+        graph.add(a, b)
+        graph.add(b, a)
+        graph.add(b, c)
+        graph.add(binary, None)
+        lengths = self._lengths(graph, {})
+        self.assertEqual(lengths[binary], 0)
+        self.assertEqual(lengths[c], 1)
+        self.assertIn(lengths[a], (2, 3))
+        self.assertIn(lengths[b], (2, 3))
+
+    def test_candidates_are_capped(self):
+        # The ready packages past the cap are not traversed, even though
+        # one of them has the longest chain.
+        pkgs = [_Pkg(f"dev-libs/p{i}-1") for i in range(100)]
+        graph = digraph()
+        for pkg in pkgs:
+            graph.add(pkg, None)
+        sched = Scheduler.__new__(Scheduler)
+        sched._choose_pkg_return_early = False
+        sched._digraph = graph
+        sched._pkg_queue = list(pkgs)
+        sched._completed_tasks = set()
+        sched._build_history = _History({})
+        sched._mem_budget = None
+        sched._running_costs = {}
+        sched._critical_path = {pkg: 1 for pkg in pkgs}
+        sched._critical_path[pkgs[-1]] = 100
+        sched._critical_path[pkgs[10]] = 50
+        sched._is_work_scheduled = lambda: True
+        sched._prune_digraph = lambda: None
+        with mock.patch.object(
+            Scheduler,
+            "_dependent_on_scheduled_merges",
+            autospec=True,
+            side_effect=Scheduler._dependent_on_scheduled_merges,
+        ) as dependent:
+            self.assertIs(sched._choose_pkg(), pkgs[10])
+        self.assertEqual(dependent.call_count, Scheduler._critical_path_candidates)
@@ -11,15 +11,21 @@ import tempfile
 import threading
 import time
 from types import SimpleNamespace
+from unittest import mock
 
+import _emerge.emergelog
 from _emerge import _observability
 from _emerge._observability import (
+    EVENT_LOG_NAME,
+    EventLog,
     ObservabilityMonitor,
     _BuildTimes,
     average_parallelism,
     build_snapshot,
     format_snapshots,
     missing_feature_hint,
+    note_resolver_phase,
+    read_event_log,
     read_snapshots,
     status_dir,
 )
@@ -805,6 +811,134 @@ class ObservabilitySnapshotTestCase(TestCase):
             self.assertEqual(read_snapshots(tmp), [])
 
 
+class ObservabilityEventTestCase(TestCase):
+    def test_events_are_streamed_between_snapshots(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            build = EbuildBuild(_Pkg("dev-libs/foo-1.2"), pid=99)
+            sched = _make_scheduler(eprefix=tmp, tasks=[build])
+            monitor = ObservabilityMonitor(sched)
+
+            async def exercise():
+                monitor.update(force=True)
+                for _ in range(100):
+                    if monitor._server is not None:
+                        break
+                    await asyncio.sleep(0.01)
+
+                reader, writer = await asyncio.open_unix_connection(
+                    monitor._socket_path
+                )
+                try:
+                    first = json.loads(await reader.readline())
+                    monitor.note_task_started(build)
+                    monitor.note_phase(build.pkg.cpv, "compile")
+                    monitor.note_phase(build.pkg.cpv, "install")
+                    build.returncode = 0
+                    monitor.note_task_finished(build)
+                    events = []
+                    while not events or events[-1]["type"] != "job_finished":
+                        line = json.loads(await asyncio.wait_for(reader.readline(), 10))
+                        if line["type"] != "snapshot":
+                            events.append(line)
+                finally:
+                    writer.close()
+                    await writer.wait_closed()
+
+                self.assertEqual(first["type"], "snapshot")
+                self.assertEqual(
+                    [e["type"] for e in events],
+                    ["job_started", "phase_changed", "phase_changed", "job_finished"],
+                )
+                seqs = [e["seq"] for e in events]
+                self.assertEqual(seqs, sorted(set(seqs)))
+                self.assertTrue(all(e["cpv"] == "dev-libs/foo-1.2" for e in events))
+                self.assertNotIn("previous_phase", events[1])
+                self.assertEqual(events[2]["previous_phase"], "compile")
+                self.assertGreaterEqual(events[2]["previous_phase_elapsed"], 0)
+                self.assertEqual(events[3]["phase"], "install")
+                self.assertEqual(events[3]["returncode"], 0)
+
+            try:
+                global_event_loop().run_until_complete(exercise())
+            finally:
+                monitor.close()
+
+    def test_nothing_is_emitted_while_disabled(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            sched = _make_scheduler(features=(), eprefix=tmp)
+            sched.settings["PORTAGE_OBSERVABILITY_EVENT_LOG_SIZE"] = "64"
+            with mock.patch.object(_emerge.emergelog, "_emerge_log_dir", tmp):
+                monitor = ObservabilityMonitor(sched)
+            monitor.note_task_started(EbuildBuild(_Pkg("dev-libs/foo-1.2")))
+            self.assertEqual(monitor._event_seq, 0)
+            self.assertFalse(os.path.exists(os.path.join(tmp, EVENT_LOG_NAME)))
+
+    def test_event_log(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            sched = _make_scheduler(eprefix=tmp)
+            sched.settings["PORTAGE_OBSERVABILITY_EVENT_LOG_SIZE"] = "64"
+            note_resolver_phase("calculate", 1.5, backtracks=0)
+            pkg = _Pkg("dev-libs/foo-1.2")
+            with mock.patch.object(_emerge.emergelog, "_emerge_log_dir", tmp):
+                monitor = ObservabilityMonitor(sched)
+            # Resolver timings are emitted once, by the first monitor.
+            self.assertEqual(_observability._resolver_timings, [])
+            monitor.note_fetch(pkg, total=2)
+            monitor.note_fetch(pkg, 0, 2)
+            monitor.close()
+
+            events = read_event_log(os.path.join(tmp, EVENT_LOG_NAME))
+            self.assertEqual(
+                [e["type"] for e in events],
+                ["resolver_phase_timing", "fetch_progress", "fetch_progress"],
+            )
+            self.assertEqual(events[0]["phase"], "calculate")
+            self.assertEqual(events[0]["elapsed"], 1.5)
+            self.assertEqual(events[0]["backtracks"], 0)
+            self.assertEqual(events[1]["state"], "started")
+            self.assertEqual(events[1]["completed"], 0)
+            self.assertEqual(events[2]["state"], "finished")
+            self.assertEqual(events[2]["completed"], 1)
+            self.assertEqual(events[2]["total"], 2)
+
+    def test_event_log_rotation(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "log", EVENT_LOG_NAME)
+            log = EventLog(path, 1024)
+            for i in range(100):
+                log.append(json.dumps({"type": "test", "seq": i}) + "\n")
+            log.close()
+            self.assertLessEqual(
+                os.path.getsize(path) + os.path.getsize(path + ".1"), 1024 + 64
+            )
+            # A line cut short by a crash is skipped.
+            with open(path, "a", encoding="utf_8") as f:
+                f.write('{"type": "te')
+            seqs = [e["seq"] for e in read_event_log(path)]
+            self.assertEqual(seqs, list(range(100 - len(seqs), 100)))
+            self.assertEqual(read_event_log(os.path.join(tmp, "missing")), [])
+
+    def test_event_log_shared(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, EVENT_LOG_NAME)
+            first = EventLog(path, 1024)
+            second = EventLog(path, 1024)
+            first.append(json.dumps({"type": "test", "seq": 0}) + "\n")
+            seq = 1
+            # The second writer rotates the file that the first one has
+            # open, and the first one follows it to the new file.
+            while not os.path.exists(path + ".1"):
+                second.append(json.dumps({"type": "test", "seq": seq}) + "\n")
+                seq += 1
+            first.append(json.dumps({"type": "test", "seq": seq}) + "\n")
+            first.close()
+            second.close()
+            with open(path, encoding="utf_8") as f:
+                self.assertEqual([json.loads(line)["seq"] for line in f], [seq])
+            seqs = [e["seq"] for e in read_event_log(path)]
+            self.assertEqual(seqs, list(range(seq + 1)))
+
+
 class SchedulerCgroupLogTestCase(TestCase):
     def _cgroup_finish(self, features, stats):
         """Run Scheduler._cgroup_finish() and return what it logged."""
@@ -954,6 +1088,7 @@ class KeepGoingTeardownTestCase(TestCase):
         sched.trees = {}
         sched._observability = monitor
         sched._cgroup = cgroup
+        sched._build_history = None
         sched._merge = fake_merge
         sched._background = False
         sched._build_opts = SimpleNamespace(fetchonly=False)
@@ -0,0 +1,105 @@
+# Copyright 2026 Gentoo Authors
+# Distributed under the terms of the GNU General Public License v2
+
+import json
+import os
+from unittest import mock
+
+import portage
+from portage.glsa import Glsa, GlsaIndex
+from portage.tests import TestCase
+from portage.tests.glsa.test_security_set import SecuritySetTestCase
+from portage.tests.resolver.ResolverPlayground import ResolverPlayground
+
+
+class GlsaIndexTestCase(TestCase):
+    def _glsa(self, glsa_id, cp, version, arch="*"):
+        return {
+            "glsa_id": glsa_id,
+            "pkgname": cp.split("/")[1],
+            "cp": cp,
+            "unaffected_range": "ge",
+            "affected_range": "lt",
+            "unaffected_version": version,
+            "affected_version": version,
+            "arch": arch,
+        }
+
+    def testGlsaIndex(self):
+        writer = SecuritySetTestCase()
+        writer._must_skip()
+
+        installed = {
+            "cat/A-2.1": {"KEYWORDS": "x86"},
+            "cat/B-4.4": {"KEYWORDS": "x86"},
+            "cat/C-1.0": {"KEYWORDS": "x86"},
+        }
+
+        glsas = (
+            self._glsa("201301-01", "cat/A", "2.2"),
+            self._glsa("201301-02", "cat/B", "4.4"),
+            self._glsa("201301-03", "cat/NotInstalled", "3.5"),
+            self._glsa("201301-04", "cat/C", "1.1", arch="amd64 sparc"),
+            self._glsa("201301-05", "cat/C", "1.1", arch="amd64,sparc"),
+        )
+
+        playground = ResolverPlayground(installed=installed, debug=False)
+        try:
+            settings = playground.settings
+            vardb = playground.trees[playground.eroot]["vartree"].dbapi
+            portdb = playground.trees[playground.eroot]["porttree"].dbapi
+            glsa_dir = os.path.join(
+                settings.repositories["test_repo"].location, "metadata", "glsa"
+            )
+            portage.util.ensure_dirs(glsa_dir)
+            for glsa in glsas:
+                writer.write_glsa_test_case(glsa_dir, glsa)
+            with open(
+                os.path.join(glsa_dir, "glsa-201301-06.xml"), "w", encoding="utf-8"
+            ) as f:
+                f.write("<glsa")
+            # Make the GLSA directory old enough for the index to be written.
+            past = os.stat(glsa_dir).st_mtime_ns - 10 * 10**9
+            os.utime(glsa_dir, ns=(past, past))
+
+            glsaindex = GlsaIndex(settings)
+            self.assertEqual(
+                sorted(glsaindex.glsas),
+                [f"201301-0{i}" for i in range(1, 7)],
+            )
+            self.assertIsNone(glsaindex.glsas["201301-06"])
+
+            # The invalid arch list and the invalid GLSA are returned, so
+            # that Glsa reports them.
+            self.assertEqual(
+                glsaindex.affected(vardb, sorted(glsaindex.glsas)),
+                ["201301-01", "201301-05", "201301-06"],
+            )
+            self.assertEqual(
+                glsaindex.affected(
+                    vardb, ["201301-04", "201301-01", "201301-02"], match_arch=False
+                ),
+                ["201301-04", "201301-01"],
+            )
+            for glsa_id in ("201301-01", "201301-02", "201301-03", "201301-04"):
+                myglsa = Glsa(glsa_id, settings, vardb, portdb)
+                self.assertEqual(
+                    myglsa.isVulnerable(),
+                    glsa_id in glsaindex.affected(vardb, [glsa_id]),
+                )
+
+            index_file = os.path.join(
+                settings["EROOT"], portage.const.CACHE_PATH, "glsa_index.json"
+            )
+            with open(index_file, encoding="utf-8") as f:
+                self.assertEqual(json.load(f)["glsas"], glsaindex.glsas)
+
+            # The index is used while the GLSA directory is unchanged.
+            with mock.patch.object(Glsa, "parse", autospec=True) as parse:
+                self.assertEqual(GlsaIndex(settings).glsas, glsaindex.glsas)
+                parse.assert_not_called()
+
+            os.unlink(os.path.join(glsa_dir, "glsa-201301-01.xml"))
+            self.assertNotIn("201301-01", GlsaIndex(settings).glsas)
+        finally:
+            playground.cleanup()
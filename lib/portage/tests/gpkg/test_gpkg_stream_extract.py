@@ -0,0 +1,101 @@
+# Copyright 2026 Gentoo Authors
+# Portage Unit Testing Functionality
+
+import os
+import shutil
+import tarfile
+import tempfile
+from os import urandom
+from unittest import mock
+
+from portage.exception import DigestException
+from portage.gpkg import checksum_reader, gpkg
+from portage.tests import TestCase
+from portage.tests.resolver.ResolverPlayground import ResolverPlayground
+
+
+class test_gpkg_stream_extract_case(TestCase):
+    def _playground(self, compression):
+        return ResolverPlayground(
+            user_config={
+                "make.conf": (
+                    'FEATURES="${FEATURES} -binpkg-signing '
+                    "-binpkg-request-signature -gpg-keepalive "
+                    'binpkg-stream-extract"',
+                    f'BINPKG_COMPRESS="{compression}"',
+                ),
+            }
+        )
+
+    def test_gpkg_stream_extract(self):
+        for compression in ("none", "gzip"):
+            with self.subTest(compression=compression):
+                playground = self._playground(compression)
+                tmpdir = tempfile.mkdtemp()
+                try:
+                    orig_full_path = os.path.join(tmpdir, "orig")
+                    os.makedirs(os.path.join(orig_full_path, "dir"))
+                    data = urandom(1048576)
+                    with open(os.path.join(orig_full_path, "dir", "data"), "wb") as f:
+                        f.write(data)
+                    os.symlink("dir/data", os.path.join(orig_full_path, "link"))
+
+                    gpkg_file = os.path.join(tmpdir, "test.gpkg.tar")
+                    binpkg = gpkg(playground.settings, "test", gpkg_file)
+                    binpkg.compress(orig_full_path, {"meta": "test"})
+
+                    binpkg = gpkg(playground.settings, "test", gpkg_file)
+                    dest_dir = os.path.join(tmpdir, "test")
+                    with mock.patch.object(
+                        gpkg,
+                        "_extract_image",
+                        autospec=True,
+                        side_effect=gpkg._extract_image,
+                    ) as extract_image:
+                        binpkg.decompress(dest_dir)
+
+                    # The image was extracted while it was verified.
+                    self.assertEqual(extract_image.call_count, 1)
+                    self.assertIsInstance(
+                        extract_image.call_args[0][1], checksum_reader
+                    )
+                    self.assertEqual(sorted(os.listdir(dest_dir)), ["dir", "link"])
+                    with open(os.path.join(dest_dir, "link"), "rb") as f:
+                        self.assertEqual(f.read(), data)
+                finally:
+                    shutil.rmtree(tmpdir)
+                    playground.cleanup()
+
+    def test_gpkg_stream_extract_corrupt(self):
+        for compression in ("none", "gzip"):
+            with self.subTest(compression=compression):
+                playground = self._playground(compression)
+                tmpdir = tempfile.mkdtemp()
+                try:
+                    orig_full_path = os.path.join(tmpdir, "orig")
+                    os.makedirs(orig_full_path)
+                    with open(os.path.join(orig_full_path, "data"), "wb") as f:
+                        f.write(urandom(1048576))
+
+                    gpkg_file = os.path.join(tmpdir, "test.gpkg.tar")
+                    binpkg = gpkg(playground.settings, "test", gpkg_file)
+                    binpkg.compress(orig_full_path, {"meta": "test"})
+
+                    # Flip a byte in the middle of the image.
+                    with tarfile.open(gpkg_file, "r") as container:
+                        image_tarinfo, _ = binpkg._get_inner_tarinfo(container, "image")
+                    offset = image_tarinfo.offset_data + image_tarinfo.size // 2
+                    with open(gpkg_file, "r+b") as f:
+                        f.seek(offset)
+                        byte = f.read(1)
+                        f.seek(offset)
+                        f.write(bytes([byte[0] ^ 0xFF]))
+
+                    binpkg = gpkg(playground.settings, "test", gpkg_file)
+                    dest_dir = os.path.join(tmpdir, "test")
+                    self.assertRaises(DigestException, binpkg.decompress, dest_dir)
+                    # Nothing is left behind.
+                    self.assertEqual(os.listdir(dest_dir), [])
+                finally:
+                    shutil.rmtree(tmpdir)
+                    playground.cleanup()
@@ -0,0 +1,111 @@
+# Copyright 2026 Gentoo Authors
+# Distributed under the terms of the GNU General Public License v2
+
+import os
+import textwrap
+from unittest import mock
+
+from portage import const
+from portage.news import NewsItem, NewsManager, count_unread_news
+from portage.tests import TestCase
+from portage.tests.resolver.ResolverPlayground import ResolverPlayground
+from portage.util import ensure_dirs
+
+
+class NewsCacheTestCase(TestCase):
+    def _write_item(self, news_dir, name, display_if_installed):
+        item_dir = os.path.join(news_dir, name)
+        ensure_dirs(item_dir)
+        with open(os.path.join(item_dir, f"{name}.en.txt"), "w", encoding="utf-8") as f:
+            f.write(textwrap.dedent(f"""\
+                Title: {name}
+                Author: Larry the Cow <larry@gentoo.org>
+                Posted: 2026-01-01
+                Revision: 1
+                News-Item-Format: 2.0
+                Display-If-Installed: {display_if_installed}
+
+                Body of {name}.
+                """))
+
+    def _age(self, *paths):
+        # Make the files old enough for the news cache to trust them.
+        for path in paths:
+            for parent, dirs, files in os.walk(path):
+                for name in dirs + files:
+                    os.utime(os.path.join(parent, name), ns=(0, 0))
+            os.utime(path, ns=(0, 0))
+
+    def testNewsCache(self):
+        installed = {
+            "dev-libs/A-1": {},
+        }
+
+        playground = ResolverPlayground(installed=installed)
+        try:
+            settings = playground.settings
+            eroot = settings["EROOT"]
+            portdb = playground.trees[eroot]["porttree"].dbapi
+            vardb = playground.trees[eroot]["vartree"].dbapi
+            news_dir = os.path.join(
+                settings.repositories["test_repo"].location, "metadata", "news"
+            )
+            unread_dir = os.path.join(eroot, const.NEWS_LIB_PATH, "news")
+            vdb_dir = os.path.join(eroot, const.VDB_PATH)
+            self._write_item(news_dir, "2026-01-01-a", "dev-libs/A")
+            self._write_item(news_dir, "2026-01-02-b", ">=dev-libs/B-2")
+            self._age(news_dir, vdb_dir)
+
+            parse = mock.patch.object(
+                NewsItem, "parse", autospec=True, side_effect=NewsItem.parse
+            )
+            match = mock.patch.object(
+                vardb, "match", autospec=True, side_effect=vardb.match
+            )
+
+            with parse as parse_mock, match as match_mock:
+                self.assertEqual(count_unread_news(portdb, vardb)["test_repo"], 1)
+                self.assertEqual(parse_mock.call_count, 2)
+                # dev-libs/B is not installed, so it is not matched.
+                self.assertEqual(
+                    [call.args[0] for call in match_mock.call_args_list],
+                    ["dev-libs/A"],
+                )
+
+            # The skip file was just written, so the items are evaluated
+            # again, but not parsed.
+            self._age(unread_dir)
+            with parse as parse_mock:
+                self.assertEqual(count_unread_news(portdb, vardb)["test_repo"], 1)
+                parse_mock.assert_not_called()
+
+            # Nothing changed, so the news directory is not listed.
+            with mock.patch.object(os, "listdir", side_effect=os.listdir) as listdir:
+                self.assertEqual(count_unread_news(portdb, vardb)["test_repo"], 1)
+                self.assertNotIn(
+                    mock.call(news_dir),
+                    listdir.call_args_list,
+                )
+
+            # Changes to the installed packages are noticed.
+            ensure_dirs(os.path.join(vdb_dir, "dev-libs", "B-2"))
+            with open(os.path.join(vdb_dir, "dev-libs", "B-2", "SLOT"), "w") as f:
+                f.write("0\n")
+            vardb._clear_cache()
+            self._age(vdb_dir)
+            # emerge bumps the mtime of the VDB for each merge.
+            os.utime(vdb_dir, ns=(10**9, 10**9))
+            with parse as parse_mock:
+                self.assertEqual(count_unread_news(portdb, vardb)["test_repo"], 2)
+                parse_mock.assert_not_called()
+
+            # So are new items.
+            self._write_item(news_dir, "2026-01-03-c", "dev-libs/A")
+            self.assertEqual(count_unread_news(portdb, vardb)["test_repo"], 3)
+
+            manager = NewsManager(
+                portdb, vardb, os.path.join("metadata", "news"), unread_dir
+            )
+            self.assertTrue(os.path.exists(manager._cache_filename("test_repo")))
+        finally:
+            playground.cleanup()
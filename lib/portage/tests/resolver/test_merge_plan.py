@@ -0,0 +1,204 @@
+# Copyright 2026 Gentoo Authors
+# Distributed under the terms of the GNU General Public License v2
+
+import os
+import tempfile
+
+from _emerge._merge_plan import (
+    export_merge_plan,
+    load_merge_plan,
+    merge_plan_differences,
+    merge_plan_fingerprint,
+)
+from _emerge.actions import _import_merge_plan
+from _emerge.create_depgraph_params import create_depgraph_params
+from _emerge.depgraph import backtrack_depgraph, plan_depgraph
+
+import portage
+from portage.const import WORLD_FILE
+from portage.tests import TestCase
+from portage.tests.resolver.ResolverPlayground import ResolverPlayground
+
+
+class MergePlanTestCase(TestCase):
+    ebuilds = {
+        "dev-libs/A-1": {"EAPI": "8", "RDEPEND": "dev-libs/B"},
+        "dev-libs/B-1": {"EAPI": "8", "RDEPEND": "dev-libs/C"},
+        "dev-libs/C-1": {"EAPI": "8"},
+    }
+
+    installed = {
+        "dev-libs/C-1": {"EAPI": "8"},
+    }
+
+    def _resolve(self, playground, options):
+        params = create_depgraph_params(options, None)
+        noiselimit = portage.util.noiselimit
+        portage.util.noiselimit = -2
+        try:
+            success, mydepgraph, favorites = backtrack_depgraph(
+                playground.settings,
+                playground.trees,
+                options,
+                params,
+                None,
+                ["dev-libs/A"],
+                None,
+            )
+        finally:
+            portage.util.noiselimit = noiselimit
+        self.assertTrue(success)
+        return mydepgraph, favorites, params
+
+    def _mergelist(self, mydepgraph):
+        return [x.cpv for x in mydepgraph.altlist() if x.operation == "merge"]
+
+    def testExportImport(self):
+        playground = ResolverPlayground(ebuilds=self.ebuilds, installed=self.installed)
+        try:
+            settings = playground.settings
+            trees = playground.trees
+            options = {"--pretend": True}
+            mydepgraph, favorites, params = self._resolve(playground, options)
+            self.assertEqual(
+                self._mergelist(mydepgraph), ["dev-libs/B-1", "dev-libs/A-1"]
+            )
+
+            with tempfile.TemporaryDirectory() as tmp:
+                plan_file = os.path.join(tmp, "plan.json")
+                export_merge_plan(
+                    plan_file,
+                    settings,
+                    trees,
+                    dict(options, **{"--export-plan": plan_file}),
+                    None,
+                    ["dev-libs/A"],
+                    favorites,
+                    mydepgraph.altlist(),
+                )
+                plan = load_merge_plan(plan_file)
+
+                plan_graph, plan_favorites = _import_merge_plan(
+                    settings,
+                    trees,
+                    dict(options, **{"--import-plan": plan_file}),
+                    params,
+                    None,
+                    ["dev-libs/A"],
+                    None,
+                )
+                self.assertEqual(plan_favorites, ["dev-libs/A"])
+                self.assertEqual(
+                    self._mergelist(plan_graph), ["dev-libs/B-1", "dev-libs/A-1"]
+                )
+
+            self.assertNotIn("--export-plan", plan["resume"]["myopts"])
+            self.assertEqual(plan["resume"]["favorites"], ["dev-libs/A"])
+
+            # Options that only affect output do not matter.
+            self.assertEqual(
+                merge_plan_differences(
+                    plan,
+                    merge_plan_fingerprint(
+                        settings,
+                        trees,
+                        {"--ask": True, "--verbose": True},
+                        None,
+                        ["dev-libs/A"],
+                    ),
+                ),
+                [],
+            )
+            self.assertEqual(
+                merge_plan_differences(
+                    plan,
+                    merge_plan_fingerprint(
+                        settings, trees, {"--update": True}, None, ["dev-libs/A"]
+                    ),
+                ),
+                ["command"],
+            )
+
+            success, plan_graph = plan_depgraph(
+                settings, trees, plan["resume"], options, params, None
+            )
+            self.assertTrue(success)
+            self.assertEqual(
+                self._mergelist(plan_graph), ["dev-libs/B-1", "dev-libs/A-1"]
+            )
+
+            world_file = os.path.join(playground.eroot, WORLD_FILE)
+            with open(world_file, "a") as f:
+                f.write("dev-libs/C\n")
+            self.assertEqual(
+                merge_plan_differences(
+                    plan,
+                    merge_plan_fingerprint(
+                        settings, trees, options, None, ["dev-libs/A"]
+                    ),
+                ),
+                ["world"],
+            )
+
+            # A plan with a package that is no longer available is rejected.
+            plan["resume"]["mergelist"].insert(
+                0, ["ebuild", playground.eroot, "dev-libs/B-2", "merge"]
+            )
+            success, plan_graph = plan_depgraph(
+                settings, trees, plan["resume"], options, params, None
+            )
+            self.assertFalse(success)
+        finally:
+            playground.cleanup()
+
+    def testInstalledFingerprint(self):
+        fingerprints = []
+        for installed in (self.installed, {"dev-libs/C-1": {"EAPI": "8"}}, {}):
+            playground = ResolverPlayground(ebuilds=self.ebuilds, installed=installed)
+            try:
+                fingerprints.append(
+                    merge_plan_fingerprint(
+                        playground.settings, playground.trees, {}, None, []
+                    )["installed"]
+                )
+            finally:
+                playground.cleanup()
+        self.assertEqual(fingerprints[0], fingerprints[1])
+        self.assertNotEqual(fingerprints[0], fingerprints[2])
+
+    def testEnvironmentFingerprint(self):
+        playground = ResolverPlayground(ebuilds=self.ebuilds, installed=self.installed)
+        try:
+            settings = playground.settings
+            trees = playground.trees
+            plan = {
+                "fingerprint": merge_plan_fingerprint(
+                    settings, trees, {}, None, ["dev-libs/A"]
+                )
+            }
+
+            # USE set in the environment overrides make.conf, so a plan
+            # resolved without it does not apply.
+            env = trees[playground.eroot]["vartree"].settings.configdict["env"]
+            use = env.get("USE")
+            env["USE"] = f"{use} foo" if use else "foo"
+            self.assertEqual(
+                merge_plan_differences(
+                    plan,
+                    merge_plan_fingerprint(settings, trees, {}, None, ["dev-libs/A"]),
+                ),
+                ["environment"],
+            )
+            if use is None:
+                del env["USE"]
+            else:
+                env["USE"] = use
+            self.assertEqual(
+                merge_plan_differences(
+                    plan,
+                    merge_plan_fingerprint(settings, trees, {}, None, ["dev-libs/A"]),
+                ),
+                [],
+            )
+        finally:
+            playground.cleanup()
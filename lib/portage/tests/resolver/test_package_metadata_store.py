@@ -0,0 +1,96 @@
+# Copyright 2026 Gentoo Authors
+# Distributed under the terms of the GNU General Public License v2
+
+import io
+
+from _emerge.Package import Package
+
+from portage.getbinpkg import PackageIndex
+from portage.tests import TestCase
+from portage.tests.resolver.ResolverPlayground import ResolverPlayground
+from portage.versions import _pkg_str
+
+
+class PackageMetadataStoreTestCase(TestCase):
+    def _package(self, playground, cpv):
+        root_config = playground.trees[playground.eroot]["root_config"]
+        portdb = root_config.trees["porttree"].dbapi
+        db_keys = list(portdb._aux_cache_keys)
+        return Package(
+            built=False,
+            cpv=_pkg_str(cpv, db=portdb),
+            installed=False,
+            metadata=zip(db_keys, portdb.aux_get(cpv, db_keys)),
+            root_config=root_config,
+            type_name="ebuild",
+        )
+
+    def testSharedMetadata(self):
+        ebuilds = {
+            "dev-libs/A-1": {
+                "EAPI": "8",
+                "IUSE": "+ssl",
+                "RDEPEND": "ssl? ( dev-libs/B[ssl?] ) dev-libs/C",
+            },
+            "dev-libs/A-2": {
+                "EAPI": "8",
+                "IUSE": "+ssl",
+                "RDEPEND": "ssl? ( dev-libs/B[ssl?] ) dev-libs/C",
+            },
+            "dev-libs/A-3": {
+                "EAPI": "8",
+                "RDEPEND": "ssl? ( dev-libs/B[ssl?] ) dev-libs/C",
+            },
+            "dev-libs/B-1": {"EAPI": "8", "IUSE": "ssl"},
+            "dev-libs/C-1": {"EAPI": "8"},
+        }
+
+        playground = ResolverPlayground(ebuilds=ebuilds)
+        try:
+            a1, a2, a3 = (
+                self._package(playground, cpv)
+                for cpv in ("dev-libs/A-1", "dev-libs/A-2", "dev-libs/A-3")
+            )
+            self.assertIs(a1._metadata["RDEPEND"], a2._metadata["RDEPEND"])
+            self.assertIs(a1.iuse.all, a2.iuse.all)
+            self.assertIs(a1.use.enabled, a2.use.enabled)
+            self.assertEqual(a1.use.enabled, frozenset(["ssl"]))
+
+            self.assertTrue(a1.visible)
+            self.assertEqual(
+                sorted(map(str, a1.validated_atoms)), ["dev-libs/B[ssl?]", "dev-libs/C"]
+            )
+            self.assertEqual(
+                {id(atom) for atom in a1.validated_atoms},
+                {id(atom) for atom in a2.validated_atoms},
+            )
+
+            # The atoms are shared, but IUSE is still validated for each
+            # package.
+            self.assertTrue(a3.invalid)
+            self.assertIn("IUSE.missing", a3.invalid)
+            self.assertFalse(a3.visible)
+        finally:
+            playground.cleanup()
+
+    def testPackageIndexValues(self):
+        entries = []
+        for version in range(1, 4):
+            entries.append(
+                f"CPV: dev-libs/A-{version}\n"
+                "KEYWORDS: ~amd64 ~x86\n"
+                "RDEPEND: dev-libs/B\n"
+                f"SIZE: {version}000\n"
+                "\n"
+            )
+        pkgindex = PackageIndex()
+        pkgindex.read(io.StringIO("TIMESTAMP: 1\n\n" + "".join(entries)))
+
+        self.assertEqual(len(pkgindex.packages), 3)
+        first = pkgindex.packages[0]
+        for d in pkgindex.packages[1:]:
+            self.assertIs(d["KEYWORDS"], first["KEYWORDS"])
+            self.assertIs(d["RDEPEND"], first["RDEPEND"])
+        self.assertEqual(
+            [d["SIZE"] for d in pkgindex.packages], ["1000", "2000", "3000"]
+        )
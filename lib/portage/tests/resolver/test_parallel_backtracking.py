@@ -0,0 +1,93 @@
+# Copyright 2026 Gentoo Authors
+# Distributed under the terms of the GNU General Public License v2
+
+from unittest import mock
+
+from _emerge.resolver.parallel_backtracking import (
+    BacktrackSpeculator,
+    parallel_backtracking_supported,
+)
+
+from portage.tests import TestCase
+from portage.tests.resolver.ResolverPlayground import (
+    ResolverPlayground,
+    ResolverPlaygroundTestCase,
+)
+
+
+class ParallelBacktrackingTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        if not parallel_backtracking_supported():
+            self.skipTest("requires the fork start method of multiprocessing")
+
+    def _run(self, playground, atoms, options):
+        outcomes = []
+        orig_evaluate = BacktrackSpeculator.evaluate
+
+        def evaluate(speculator, *args):
+            outcome = orig_evaluate(speculator, *args)
+            outcomes.append(outcome)
+            return outcome
+
+        with mock.patch.object(
+            BacktrackSpeculator,
+            "evaluate",
+            autospec=True,
+            side_effect=evaluate,
+        ):
+            result = playground.run(atoms, options)
+        return result, outcomes
+
+    def testSameResult(self):
+        ebuilds = {
+            "dev-libs/A-1": {},
+            "dev-libs/A-2": {},
+            "dev-libs/A-3": {},
+            "dev-libs/B-1": {"DEPEND": "<dev-libs/A-3"},
+            "dev-libs/B-2": {"DEPEND": ">=dev-libs/A-3"},
+            "dev-libs/C-1": {"DEPEND": "<dev-libs/A-2"},
+            "dev-libs/C-2": {"DEPEND": ">=dev-libs/A-3"},
+            "dev-libs/D-1": {"RDEPEND": "dev-libs/A dev-libs/E"},
+            "dev-libs/E-1": {"RDEPEND": "<dev-libs/A-3"},
+            "dev-libs/E-2": {"RDEPEND": "<dev-libs/A-2"},
+        }
+
+        playground = ResolverPlayground(ebuilds=ebuilds)
+        try:
+            for atoms in (
+                ["dev-libs/D", "dev-libs/B", "dev-libs/C"],
+                ["=dev-libs/B-2", "dev-libs/D"],
+            ):
+                with self.subTest(atoms=atoms):
+                    serial, _ = self._run(playground, atoms, {})
+                    parallel, outcomes = self._run(
+                        playground, atoms, {"--backtrack-jobs": 4}
+                    )
+                    self.assertEqual(parallel.success, serial.success)
+                    self.assertEqual(parallel.mergelist, serial.mergelist)
+                    self.assertTrue(any(x is not None for x in outcomes))
+        finally:
+            playground.cleanup()
+
+    def testTestCases(self):
+        ebuilds = {
+            "dev-libs/A-1": {},
+            "dev-libs/A-2": {},
+            "dev-libs/B-1": {"DEPEND": "dev-libs/A"},
+        }
+
+        test_case = ResolverPlaygroundTestCase(
+            ["=dev-libs/A-1", "dev-libs/B"],
+            all_permutations=True,
+            options={"--backtrack-jobs": 2},
+            mergelist=["dev-libs/A-1", "dev-libs/B-1"],
+            success=True,
+        )
+
+        playground = ResolverPlayground(ebuilds=ebuilds)
+        try:
+            playground.run_TestCase(test_case)
+            self.assertEqual(test_case.test_success, True, test_case.fail_msg)
+        finally:
+            playground.cleanup()
@@ -0,0 +1,69 @@
+# Copyright 2026 Gentoo Authors
+# Distributed under the terms of the GNU General Public License v2
+
+import json
+import os
+import tempfile
+from unittest import mock
+
+from _emerge import _observability, _resolver_profile
+from _emerge._resolver_profile import ResolverProfile
+
+from portage.tests import TestCase
+from portage.tests.resolver.ResolverPlayground import (
+    ResolverPlayground,
+    ResolverPlaygroundTestCase,
+)
+
+
+class ResolverProfileTestCase(TestCase):
+    ebuilds = {
+        "dev-libs/A-1": {"RDEPEND": "dev-libs/B"},
+        "dev-libs/B-1": {"RDEPEND": "dev-libs/C"},
+        "dev-libs/C-1": {},
+    }
+
+    def _run(self, options):
+        profile = ResolverProfile()
+        test_case = ResolverPlaygroundTestCase(
+            ["dev-libs/A"],
+            options=options,
+            success=True,
+            mergelist=["dev-libs/C-1", "dev-libs/B-1", "dev-libs/A-1"],
+        )
+        playground = ResolverPlayground(ebuilds=self.ebuilds)
+        try:
+            with mock.patch.object(_resolver_profile, "_profile", profile):
+                playground.run_TestCase(test_case)
+        finally:
+            playground.cleanup()
+        self.assertEqual(test_case.test_success, True, test_case.fail_msg)
+        return profile
+
+    def testProfile(self):
+        results = self._run({"--profile-resolver": True}).results()
+        stages = results["stages"]
+        self.assertEqual(stages["select_files"]["calls"], 1)
+        self.assertEqual(stages["_add_pkg_deps"]["calls"], 3)
+        self.assertGreaterEqual(results["elapsed"], stages["select_files"]["elapsed"])
+        highest_pkg = results["caches"]["highest_pkg"]
+        self.assertGreater(highest_pkg["hits"] + highest_pkg["misses"], 0)
+        self.assertLessEqual(highest_pkg["hit_rate"], 1)
+
+    def testDisabled(self):
+        self.assertEqual(self._run({}).results()["stages"], {})
+
+    def testPublishAndWrite(self):
+        profile = self._run({"--profile-resolver": True})
+        with mock.patch.object(_observability, "_resolver_timings", []) as timings:
+            profile.publish()
+            profile.publish()
+            phases = [timing["phase"] for timing in timings]
+        self.assertEqual(phases.count("select_files"), 1)
+        self.assertEqual(phases[-1], "total")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "profile.json")
+            profile.write(path)
+            with open(path) as f:
+                self.assertEqual(json.load(f)["stages"]["select_files"]["calls"], 1)
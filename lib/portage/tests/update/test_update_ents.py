@@ -0,0 +1,157 @@
+# Copyright 2026 Gentoo Authors
+# Distributed under the terms of the GNU General Public License v2
+
+import os
+import sys
+import textwrap
+from unittest import mock
+
+import portage
+from portage._global_updates import _do_global_updates
+from portage.const import SUPPORTED_GENTOO_BINPKG_FORMATS
+from portage.dbapi.bintree import bindbapi
+from portage.dep import Atom
+from portage.output import colorize
+from portage.tests import TestCase
+from portage.tests.resolver.ResolverPlayground import ResolverPlayground
+from portage.update import _dep_cp_candidates, parse_updates, update_dbentries
+from portage.util import ensure_dirs
+
+
+class UpdateEntsTestCase(TestCase):
+    updates = textwrap.dedent("""
+		move dev-libs/A dev-libs/B
+		move dev-libs/B dev-libs/C
+		slotmove dev-libs/C 0 1
+		move dev-libs/X-y dev-libs/Z
+	""")
+
+    def testDepCpCandidates(self):
+        depstr = ">=dev-libs/A-b-1.2*:0= || ( !!app-misc/C::test_repo ssl? ( D/e ) )"
+        candidates = _dep_cp_candidates(depstr)
+        for token in depstr.split():
+            try:
+                atom = Atom(token, allow_repo=True)
+            except portage.exception.InvalidAtom:
+                continue
+            self.assertIn(atom.cp, candidates)
+        self.assertNotIn("ssl?", candidates)
+
+    def testUpdateEnts(self):
+        depend = "dev-libs/A:0 >=dev-libs/A-1 dev-libs/X-y-z !dev-libs/X-y"
+        unaffected = "dev-libs/F"
+        installed = {
+            "dev-libs/D-1": {"EAPI": "8", "RDEPEND": depend},
+            "dev-libs/E-1": {"EAPI": "8", "RDEPEND": unaffected},
+        }
+        binpkgs = {
+            "dev-libs/D-1": {"EAPI": "8", "RDEPEND": depend},
+            "dev-libs/E-1": {"EAPI": "8", "RDEPEND": unaffected},
+        }
+
+        valid_updates, errors = parse_updates(self.updates)
+        self.assertEqual(errors, [])
+        expected = update_dbentries(valid_updates, {"RDEPEND": depend})["RDEPEND"]
+        self.assertEqual(
+            expected, "dev-libs/C:1 >=dev-libs/C-1 dev-libs/X-y-z !dev-libs/Z"
+        )
+
+        for binpkg_format in SUPPORTED_GENTOO_BINPKG_FORMATS:
+            with self.subTest(binpkg_format=binpkg_format):
+                print(colorize("HILITE", binpkg_format), end=" ... ")
+                sys.stdout.flush()
+                playground = ResolverPlayground(
+                    binpkgs=binpkgs,
+                    installed=installed,
+                    user_config={
+                        "make.conf": (
+                            f'BINPKG_FORMAT="{binpkg_format}"',
+                            'FEATURES="-binpkg-signing"',
+                        ),
+                    },
+                )
+
+                settings = playground.settings
+                trees = playground.trees
+                eroot = settings["EROOT"]
+                test_repo_location = settings.repositories["test_repo"].location
+                vardb = trees[eroot]["vartree"].dbapi
+                bindb = trees[eroot]["bintree"].dbapi
+                bintree = trees[eroot]["bintree"]
+
+                updates_dir = os.path.join(test_repo_location, "profiles", "updates")
+
+                try:
+                    ensure_dirs(updates_dir)
+                    with open(os.path.join(updates_dir, "1Q-2010"), "w") as f:
+                        f.write(self.updates)
+
+                    bintree.populate()
+                    unaffected_path = bintree.getname(bindb.match("=dev-libs/E-1")[0])
+                    unaffected_mtime = os.stat(unaffected_path).st_mtime_ns
+
+                    global_noiselimit = portage.util.noiselimit
+                    portage.util.noiselimit = -2
+                    try:
+                        _do_global_updates(trees._running_eroot, trees, {})
+                    finally:
+                        portage.util.noiselimit = global_noiselimit
+
+                    vardb._clear_cache()
+
+                    for db in (vardb, bindb):
+                        self.assertEqual(
+                            db.aux_get("dev-libs/D-1", ["RDEPEND"]), [expected]
+                        )
+                        self.assertEqual(
+                            db.aux_get("dev-libs/E-1", ["RDEPEND"]), [unaffected]
+                        )
+
+                    # Binary packages that no update applies to are not
+                    # rewritten.
+                    self.assertEqual(
+                        os.stat(unaffected_path).st_mtime_ns, unaffected_mtime
+                    )
+
+                    # The updated metadata is recorded in $PKGDIR/Packages.
+                    pkgindex = bintree._load_pkgindex()
+                    entries = {d["CPV"]: d for d in pkgindex.packages}
+                    self.assertEqual(entries["dev-libs/D-1"]["RDEPEND"], expected)
+                finally:
+                    playground.cleanup()
+
+    def testAuxUpdateManyError(self):
+        binpkgs = {
+            "dev-libs/A-1": {"EAPI": "8", "RDEPEND": "dev-libs/X"},
+            "dev-libs/B-1": {"EAPI": "8", "RDEPEND": "dev-libs/X"},
+        }
+        playground = ResolverPlayground(
+            binpkgs=binpkgs,
+            user_config={"make.conf": ('FEATURES="-binpkg-signing"',)},
+        )
+        try:
+            bintree = playground.trees[playground.eroot]["bintree"]
+            bindb = bintree.dbapi
+            bintree.populate()
+            update_binpkg = bindbapi._update_binpkg
+
+            def _update_binpkg(self, cpv, values):
+                if cpv == "dev-libs/A-1":
+                    raise RuntimeError(cpv)
+                return update_binpkg(self, cpv, values)
+
+            # The package that was rewritten is recorded even though the
+            # other one failed.
+            with mock.patch.object(bindbapi, "_update_binpkg", _update_binpkg):
+                with self.assertRaises(RuntimeError):
+                    bindb._aux_update_many(
+                        [
+                            (cpv, {"RDEPEND": "dev-libs/Y"})
+                            for cpv in sorted(bindb.cpv_all())
+                        ]
+                    )
+            entries = {d["CPV"]: d for d in bintree._load_pkgindex().packages}
+            self.assertEqual(entries["dev-libs/A-1"]["RDEPEND"], "dev-libs/X")
+            self.assertEqual(entries["dev-libs/B-1"]["RDEPEND"], "dev-libs/Y")
+        finally:
+            playground.cleanup()
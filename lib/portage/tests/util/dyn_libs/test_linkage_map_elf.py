@@ -0,0 +1,127 @@
+# Copyright 2026 Gentoo Authors
+# Distributed under the terms of the GNU General Public License v2
+
+import os
+import shutil
+from unittest import mock
+
+from portage.const import CACHE_PATH
+from portage.tests import TestCase
+from portage.tests.resolver.ResolverPlayground import ResolverPlayground
+from portage.util import write_atomic
+from portage.util._dyn_libs import NeededCache
+from portage.util._dyn_libs.LinkageMapELF import LinkageMapELF
+
+
+class LinkageMapELFTestCase(TestCase):
+    installed = {
+        "dev-libs/A-1": {"EAPI": "8"},
+        "dev-libs/B-1": {"EAPI": "8"},
+        "app-misc/C-1": {"EAPI": "8"},
+    }
+
+    needed = {
+        "dev-libs/A-1": (
+            "X86_64;/usr/lib64/libA.so.1;libA.so.1;;libc.so.6;x86_64",
+            "X86_64;/usr/lib64/A/libA-internal.so;;;libc.so.6;x86_64",
+        ),
+        "dev-libs/B-1": (
+            "X86_64;/usr/lib64/libB.so.1;libB.so.1;$ORIGIN;libA.so.1;x86_64",
+        ),
+        "app-misc/C-1": (
+            "X86_64;/usr/bin/c;;/usr/lib64;libA.so.1,libB.so.1;x86_64",
+            "bogus",
+        ),
+    }
+
+    def _write_needed(self, vardb, cpv, lines):
+        # Like vartree, replace the file, which also updates the mtime of
+        # the directory that vardbapi's aux cache depends on.
+        write_atomic(
+            vardb.getpath(cpv, filename=LinkageMapELF._needed_aux_key),
+            "".join(f"{line}\n" for line in lines),
+        )
+
+    def _graph(self, linkmap):
+        linkmap.rebuild()
+        return {
+            "consumers": linkmap.findConsumers("/usr/lib64/libA.so.1"),
+            "providers": linkmap.findProviders("/usr/bin/c"),
+            "libB": linkmap.findProviders("/usr/lib64/libB.so.1"),
+            "owners": linkmap.getOwners("/usr/bin/c"),
+            "broken": linkmap.listBrokenBinaries(),
+        }
+
+    def testNeededCache(self):
+        playground = ResolverPlayground(installed=self.installed)
+        try:
+            vardb = playground.trees[playground.eroot]["vartree"].dbapi
+            for cpv, lines in self.needed.items():
+                self._write_needed(vardb, cpv, lines)
+
+            with (
+                mock.patch.object(NeededCache, "_racy_ns", 0),
+                mock.patch(
+                    "portage.util._dyn_libs.LinkageMapELF.writemsg_level"
+                ) as writemsg_level,
+            ):
+                expected = self._graph(LinkageMapELF(vardb))
+            self.assertEqual(writemsg_level.call_count, 1)
+            self.assertEqual(
+                expected["consumers"], {"/usr/lib64/libB.so.1", "/usr/bin/c"}
+            )
+            self.assertEqual(
+                expected["providers"],
+                {
+                    "libA.so.1": {"/usr/lib64/libA.so.1"},
+                    "libB.so.1": {"/usr/lib64/libB.so.1"},
+                },
+            )
+            self.assertEqual(expected["owners"], ("app-misc/C-1",))
+            self.assertTrue(
+                os.path.exists(
+                    os.path.join(playground.eroot, CACHE_PATH, "linkage_map")
+                )
+            )
+
+            # Unchanged packages are not read again, by this or another
+            # instance.
+            with (
+                mock.patch.object(vardb, "aux_get", side_effect=AssertionError),
+                mock.patch(
+                    "portage.util._dyn_libs.LinkageMapELF.writemsg_level"
+                ) as writemsg_level,
+            ):
+                self.assertEqual(self._graph(LinkageMapELF(vardb)), expected)
+            self.assertEqual(writemsg_level.call_count, 0)
+
+            # Only a changed package is read again.
+            self._write_needed(
+                vardb,
+                "app-misc/C-1",
+                ("X86_64;/usr/bin/c;;/usr/lib64;libB.so.1;x86_64",),
+            )
+            linkmap = LinkageMapELF(vardb)
+            with (
+                mock.patch.object(NeededCache, "_racy_ns", 0),
+                mock.patch.object(vardb, "aux_get", wraps=vardb.aux_get) as aux_get,
+            ):
+                linkmap.rebuild()
+            self.assertEqual(
+                [call.args[0] for call in aux_get.call_args_list], ["app-misc/C-1"]
+            )
+            self.assertEqual(
+                linkmap.findConsumers("/usr/lib64/libA.so.1"), {"/usr/lib64/libB.so.1"}
+            )
+
+            # An unmerged package is dropped.
+            shutil.rmtree(vardb.getpath("dev-libs/B-1"))
+            vardb._clear_cache()
+            linkmap.rebuild()
+            self.assertEqual(linkmap.findProviders("/usr/bin/c"), {"libB.so.1": set()})
+            self.assertEqual(
+                sorted(linkmap._needed_cache._packages),
+                ["app-misc/C-1", "dev-libs/A-1"],
+            )
+        finally:
+            playground.cleanup()
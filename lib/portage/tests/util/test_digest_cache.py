@@ -0,0 +1,183 @@
+# Copyright 2026 Gentoo Authors
+# Distributed under the terms of the GNU General Public License v2
+
+import os
+import shutil
+import tempfile
+import types
+from unittest import mock
+
+from portage import checksum
+from portage.checksum import checksum_str, verify_all
+from portage.package.ebuild.config import config
+from portage.package.ebuild.fetch import fetch
+from portage.tests import TestCase
+from portage.tests.resolver.ResolverPlayground import ResolverPlayground
+from portage.util import _digest_cache
+from portage.util._digest_cache import (
+    DIGEST_CACHE_FILENAME,
+    DigestCache,
+    get_digest_cache,
+)
+
+
+class DigestCacheTestCase(TestCase):
+    content = b"distfile\n" * 100
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tempdir, "foo-1.tar.gz")
+        with open(self.path, "wb") as f:
+            f.write(self.content)
+        self.digests = {
+            "size": len(self.content),
+            "SHA512": checksum_str(self.content, "SHA512"),
+        }
+        self.patches = [
+            mock.patch.object(_digest_cache, "_MIN_SIZE", 0),
+            mock.patch.object(_digest_cache, "_racy_ns", 0),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        shutil.rmtree(self.tempdir)
+
+    def _verify(self, digests, digest_cache):
+        with mock.patch.object(
+            checksum,
+            "perform_multiple_checksums",
+            wraps=checksum.perform_multiple_checksums,
+        ) as hasher:
+            result = verify_all(self.path, digests, digest_cache=digest_cache)
+        return result, hasher.call_count
+
+    def testVerifyAll(self):
+        digest_cache = DigestCache(self.tempdir)
+        self.assertEqual(
+            self._verify(self.digests, digest_cache), ((True, "Reason unknown"), 1)
+        )
+        # Records are written by flush().
+        db_path = os.path.join(self.tempdir, DIGEST_CACHE_FILENAME)
+        self.assertFalse(os.path.exists(db_path))
+        self.assertEqual(self._verify(self.digests, digest_cache)[1], 0)
+        digest_cache.flush()
+        self.assertTrue(os.path.exists(db_path))
+
+        # Confirmed digests are not computed again, also not by another
+        # instance that reads the database.
+        for digest_cache in (digest_cache, DigestCache(self.tempdir)):
+            self.assertEqual(self._verify(self.digests, digest_cache)[1], 0)
+
+        # A digest that was not confirmed yet is.
+        digests = dict(self.digests, BLAKE2B=checksum_str(self.content, "BLAKE2B"))
+        self.assertEqual(self._verify(digests, digest_cache)[1], 1)
+        self.assertEqual(self._verify(digests, digest_cache)[1], 0)
+
+        # A mismatch is still reported.
+        (ok, reason), count = self._verify(
+            dict(self.digests, SHA512="0" * 128), digest_cache
+        )
+        self.assertFalse(ok)
+        self.assertEqual(reason[1], self.digests["SHA512"])
+
+        # A file that was changed in place is hashed again.
+        with open(self.path, "r+b") as f:
+            f.write(b"X")
+        (ok, reason), count = self._verify(self.digests, digest_cache)
+        self.assertEqual((ok, count), (False, 1))
+
+    def testNotRecorded(self):
+        digest_cache = DigestCache(self.tempdir)
+        with mock.patch.object(_digest_cache, "_racy_ns", 10**12):
+            self._verify(self.digests, digest_cache)
+        self.assertEqual(self._verify(self.digests, digest_cache)[1], 1)
+        digest_cache.flush()
+
+        # A database that others may have written is not trusted.
+        db_path = os.path.join(self.tempdir, DIGEST_CACHE_FILENAME)
+        os.chmod(db_path, 0o666)
+        self.assertEqual(self._verify(self.digests, DigestCache(self.tempdir))[1], 1)
+
+        # Files outside of the directory are not recorded.
+        other = DigestCache(os.path.join(self.tempdir, "other"))
+        self.assertEqual(self._verify(self.digests, other)[1], 1)
+        self.assertEqual(self._verify(self.digests, other)[1], 1)
+
+    def testFlush(self):
+        paths = [self.path]
+        for name in ("bar-1.tar.gz", "baz-1.tar.gz"):
+            paths.append(os.path.join(self.tempdir, name))
+            shutil.copy(self.path, paths[-1])
+        digest_cache = DigestCache(self.tempdir)
+        for path in paths[:2]:
+            digest_cache.add(path, os.stat(path), self.digests)
+        digest_cache.flush()
+
+        # Adding a record only looks at its own file, and a flush writes
+        # the database once.
+        digest_cache = DigestCache(self.tempdir)
+        os.unlink(paths[1])
+        st = os.stat(paths[2])
+        with (
+            mock.patch.object(
+                _digest_cache.os, "stat", wraps=_digest_cache.os.stat
+            ) as stat,
+            mock.patch.object(
+                _digest_cache, "atomic_ofstream", wraps=_digest_cache.atomic_ofstream
+            ) as ofstream,
+        ):
+            digest_cache.add(paths[2], st, self.digests)
+            self.assertEqual([call.args[0] for call in stat.call_args_list], [paths[2]])
+            digest_cache.flush()
+            digest_cache.flush()
+        self.assertEqual(ofstream.call_count, 1)
+
+        # The record of the removed file is dropped.
+        digest_cache = DigestCache(self.tempdir)
+        digest_cache._load()
+        self.assertEqual(sorted(digest_cache._files), ["baz-1.tar.gz", "foo-1.tar.gz"])
+
+    def testFeature(self):
+        self.assertIsNone(
+            get_digest_cache(types.SimpleNamespace(features=set()), self.tempdir)
+        )
+        settings = types.SimpleNamespace(features={"digest-cache"})
+        try:
+            self.assertIs(
+                get_digest_cache(settings, self.tempdir),
+                get_digest_cache(settings, self.tempdir + "/"),
+            )
+        finally:
+            _digest_cache._caches.clear()
+
+    def testFetch(self):
+        playground = ResolverPlayground()
+        try:
+            settings = config(clone=playground.settings)
+            distfile = os.path.join(settings["DISTDIR"], "foo-1.tar.gz")
+            os.makedirs(settings["DISTDIR"], exist_ok=True)
+            shutil.copy(self.path, distfile)
+            with mock.patch.object(
+                checksum,
+                "perform_multiple_checksums",
+                wraps=checksum.perform_multiple_checksums,
+            ) as hasher:
+                for i in range(3):
+                    self.assertEqual(
+                        fetch(
+                            {"foo-1.tar.gz": ()},
+                            settings,
+                            digests={"foo-1.tar.gz": self.digests},
+                        ),
+                        1,
+                    )
+            # The first fetch adjusts the permissions of the file after it
+            # was hashed, which changes its ctime, so only the last one
+            # finds its digests in the cache.
+            self.assertEqual(hasher.call_count, 2)
+        finally:
+            _digest_cache._caches.clear()
+            playground.cleanup()
@@ -2,9 +2,16 @@
 # Distributed under the terms of the GNU General Public License v2
 
 # ~ from portage.util import noiselimit
+import random
+
+from unittest import mock
+
+from _emerge.DepPriority import DepPriority
+from _emerge.DepPrioritySatisfiedRange import DepPrioritySatisfiedRange
+
 import portage.util
 from portage.tests import TestCase
-from portage.util.digraph import digraph
+from portage.util.digraph import _DegreeIndex, digraph
 
 
 class DigraphTest(TestCase):
@@ -326,3 +333,87 @@ class DigraphTest(TestCase):
                 list(g.child_nodes_iter("A", ignore_priority=ip)),
                 g.child_nodes("A", ignore_priority=ip),
             )
+
+    def testIndexed(self):
+        # An indexed graph must answer exactly like a scanning one, through
+        # any sequence of mutations.
+        def ignore_odd(priority):
+            return priority % 2 == 1
+
+        def always_true(dummy):
+            return True
+
+        tracked = (ignore_odd, always_true, 0, 2)
+        rng = random.Random(0)
+        nodes = [chr(ord("A") + i) for i in range(12)]
+        g = digraph()
+        ref = digraph()
+        g.enable_index(tracked)
+
+        def check():
+            self.assertEqual(g.order, ref.order)
+            for ip in (None, ignore_odd, always_true, 0, 2, 1):
+                self.assertEqual(
+                    g.leaf_nodes(ignore_priority=ip), ref.leaf_nodes(ignore_priority=ip)
+                )
+                self.assertEqual(
+                    g.root_nodes(ignore_priority=ip), ref.root_nodes(ignore_priority=ip)
+                )
+                self.assertEqual(
+                    g.hasallzeros(ignore_priority=ip),
+                    ref.hasallzeros(ignore_priority=ip),
+                )
+            self.assertEqual(g.firstzero(), ref.firstzero())
+
+        for step in range(400):
+            op = rng.random()
+            if op < 0.6:
+                node = rng.choice(nodes)
+                parent = rng.choice(nodes + [None])
+                priority = rng.randint(-1, 3)
+                g.add(node, parent, priority=priority)
+                ref.add(node, parent, priority=priority)
+            elif op < 0.75 and ref.order:
+                node = rng.choice(ref.order)
+                g.remove(node)
+                ref.remove(node)
+            elif op < 0.85 and ref.order:
+                doomed = rng.sample(ref.order, min(3, len(ref.order)))
+                g.difference_update(doomed)
+                ref.difference_update(doomed)
+            elif op < 0.95:
+                edges = [(c, p) for p in ref.order for c in ref.child_nodes(p)]
+                if edges:
+                    child, parent = rng.choice(edges)
+                    g.remove_edge(child, parent)
+                    ref.remove_edge(child, parent)
+            else:
+                g = g.clone()
+                ref = ref.clone()
+            check()
+
+        g.clear()
+        ref.clear()
+        check()
+        g.add("A", "B", priority=1)
+        ref.add("A", "B", priority=1)
+        check()
+
+    def testIndexedClassmethod(self):
+        # Each access to a classmethod creates a new bound method, which
+        # must still find the level that enable_index() set up for it.
+        g = digraph()
+        g.add("A", "B", priority=DepPriority(buildtime=True))
+        g.add("B", "C", priority=DepPriority(runtime_post=True))
+        g.enable_index((DepPrioritySatisfiedRange.ignore_medium_soft,))
+        self.assertIsNone(g._index.level(DepPrioritySatisfiedRange.ignore_soft))
+        with mock.patch.object(
+            _DegreeIndex, "roots", autospec=True, side_effect=_DegreeIndex.roots
+        ) as roots:
+            self.assertEqual(
+                g.root_nodes(
+                    ignore_priority=DepPrioritySatisfiedRange.ignore_medium_soft
+                ),
+                ["B", "C"],
+            )
+        self.assertEqual(roots.call_count, 1)
@@ -0,0 +1,277 @@
+# Copyright 2026 Gentoo Authors
+# Distributed under the terms of the GNU General Public License v2
+
+import functools
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from portage.checksum import checksum_str
+from portage.package.ebuild.config import config
+from portage.package.ebuild import fetch as _fetch_module
+from portage.package.ebuild.fetch import _want_builtin_fetch, fetch
+from portage.tests import TestCase
+from portage.tests.resolver.ResolverPlayground import ResolverPlayground
+from portage.util import _http_pool
+from portage.util._http_pool import HttpFetchError, HttpPool
+from portage.util.futures import asyncio
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def __init__(self, server_state, *args, **kwargs):
+        self.server_state = server_state
+        BaseHTTPRequestHandler.__init__(self, *args, **kwargs)
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        with self.server_state["lock"]:
+            self.server_state["connections"] += 1
+
+    def do_GET(self):
+        state = self.server_state
+        with state["lock"]:
+            state["requests"].append((self.path, self.headers.get("Range")))
+        if self.headers.get("Range") in state["errors"]:
+            self.send_error(503, "Service Unavailable")
+            return
+        if self.path in state["redirects"]:
+            self.send_response(302)
+            self.send_header("Location", state["redirects"][self.path])
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        doc = state["content"].get(self.path)
+        if doc is None:
+            self.send_error(404, "File not found")
+            return
+
+        start, end = 0, len(doc)
+        match = re.match(r"^bytes=(\d+)-(\d*)$", self.headers.get("Range") or "")
+        if match is not None and state["ranges"]:
+            start = int(match.group(1))
+            if match.group(2):
+                end = min(end, int(match.group(2)) + 1)
+            if start >= len(doc):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(doc)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end - 1}/{len(doc)}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(end - start))
+        self.send_header("Last-Modified", self.date_time_string(state["mtime"]))
+        self.end_headers()
+        self.wfile.write(doc[start:end])
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+class HttpPoolTestCase(TestCase):
+    def setUp(self):
+        self.state = {
+            "lock": threading.Lock(),
+            "connections": 0,
+            "requests": [],
+            "content": {
+                "/a.tar": b"a" * 1000,
+                "/b.tar": bytes(range(256)) * 40,
+            },
+            "redirects": {"/moved.tar": "/b.tar"},
+            "errors": set(),
+            "ranges": True,
+            "mtime": 1000000000,
+        }
+        self.server = ThreadingHTTPServer(
+            ("127.0.0.1", 0), functools.partial(_Handler, self.state)
+        )
+        self.server.daemon_threads = True
+        self.server_thread = threading.Thread(
+            target=self.server.serve_forever, daemon=True
+        )
+        self.server_thread.start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+        self.tempdir = tempfile.mkdtemp()
+        self.pool = HttpPool()
+
+    def tearDown(self):
+        self.pool.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.server_thread.join()
+        shutil.rmtree(self.tempdir)
+
+    def _fetch(self, name, resume=False, pool=None):
+        path = os.path.join(self.tempdir, os.path.basename(name))
+        asyncio.run((pool or self.pool).fetch(self.base_url + name, path, resume))
+        with open(path, "rb") as f:
+            return f.read()
+
+    def testKeepAlive(self):
+        self.assertEqual(self._fetch("/a.tar"), self.state["content"]["/a.tar"])
+        self.assertEqual(self._fetch("/b.tar"), self.state["content"]["/b.tar"])
+        self.assertEqual(self._fetch("/moved.tar"), self.state["content"]["/b.tar"])
+        self.assertEqual(self.state["connections"], 1)
+        self.assertEqual(
+            os.stat(os.path.join(self.tempdir, "a.tar")).st_mtime,
+            self.state["mtime"],
+        )
+
+        self.assertRaises(HttpFetchError, self._fetch, "/missing.tar")
+        self.assertEqual(self._fetch("/a.tar"), self.state["content"]["/a.tar"])
+
+    def testResume(self):
+        content = self.state["content"]["/b.tar"]
+        path = os.path.join(self.tempdir, "b.tar")
+        with open(path, "wb") as f:
+            f.write(content[:1000])
+        self.assertEqual(self._fetch("/b.tar", resume=True), content)
+        self.assertEqual(self.state["requests"][-1], ("/b.tar", "bytes=1000-"))
+
+        # A complete file is left alone.
+        self.assertEqual(self._fetch("/b.tar", resume=True), content)
+
+        # Without range support, the whole file is fetched again.
+        self.state["ranges"] = False
+        with open(path, "r+b") as f:
+            f.truncate(1000)
+            f.write(b"x" * 1000)
+        self.assertEqual(self._fetch("/b.tar", resume=True), content)
+
+    def testSegments(self):
+        content = self.state["content"]["/b.tar"]
+        with mock.patch.object(_http_pool, "_SEGMENT_MIN_SIZE", 1000):
+            self.assertEqual(self._fetch("/b.tar"), content)
+            ranges = sorted(r for path, r in self.state["requests"] if path == "/b.tar")
+            self.assertEqual(
+                ranges,
+                ["bytes=0-", "bytes=2560-5119", "bytes=5120-7679", "bytes=7680-10239"],
+            )
+
+            # With a single connection per host, the file is fetched in
+            # one piece.
+            del self.state["requests"][:]
+            self.assertEqual(
+                self._fetch("/b.tar", pool=HttpPool(connections=1)), content
+            )
+            self.assertEqual(self.state["requests"], [("/b.tar", "bytes=0-")])
+
+            # When a range fails, the file keeps the part before it, which
+            # can be resumed.
+            self.state["errors"].add("bytes=5120-7679")
+            self.assertRaises(HttpFetchError, self._fetch, "/b.tar")
+            self.state["errors"].clear()
+            path = os.path.join(self.tempdir, "b.tar")
+            with open(path, "rb") as f:
+                partial = f.read()
+            self.assertIn(len(partial), (0, 2560, 5120))
+            self.assertEqual(partial, content[: len(partial)])
+            self.assertEqual(self._fetch("/b.tar", resume=True), content)
+
+    def testRateLimit(self):
+        sleeps = []
+        with mock.patch.object(_http_pool.time, "sleep", side_effect=sleeps.append):
+            pool = HttpPool(rate_limit=500)
+            self.assertEqual(
+                self._fetch("/b.tar", pool=pool), self.state["content"]["/b.tar"]
+            )
+        # 10240 bytes at 500 bytes per second take about 20 seconds,
+        # the first of which need no delay.
+        self.assertGreater(sum(sleeps), 15)
+        self.assertLess(sum(sleeps), 21)
+
+
+class BuiltinFetchTestCase(TestCase):
+    def testFetch(self):
+        content = b"distfile\n" * 100
+        state = {
+            "lock": threading.Lock(),
+            "connections": 0,
+            "requests": [],
+            "content": {"/distfiles/foo-1.tar.gz": content},
+            "redirects": {},
+            "errors": set(),
+            "ranges": True,
+            "mtime": time.time(),
+        }
+        playground = ResolverPlayground(
+            user_config={
+                "make.conf": (
+                    'FEATURES="builtin-fetch -userfetch"',
+                    # Only the built-in downloader can succeed.
+                    'FETCHCOMMAND="false \\${FILE}"',
+                    'RESUMECOMMAND="false \\${FILE}"',
+                ),
+            },
+        )
+        server = server_thread = None
+        try:
+            server = ThreadingHTTPServer(
+                ("127.0.0.1", 0), functools.partial(_Handler, state)
+            )
+            server.daemon_threads = True
+            server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+            server_thread.start()
+            settings = config(clone=playground.settings)
+            uri = f"http://127.0.0.1:{server.server_port}/distfiles/foo-1.tar.gz"
+            self.assertEqual(
+                fetch(
+                    {"foo-1.tar.gz": (uri,)},
+                    settings,
+                    try_mirrors=0,
+                    digests={
+                        "foo-1.tar.gz": {
+                            "size": len(content),
+                            "SHA512": checksum_str(content, "SHA512"),
+                        }
+                    },
+                ),
+                1,
+            )
+            with open(os.path.join(settings["DISTDIR"], "foo-1.tar.gz"), "rb") as f:
+                self.assertEqual(f.read(), content)
+        finally:
+            for pool in _http_pool._pools.values():
+                pool.close()
+            _http_pool._pools.clear()
+            playground.cleanup()
+            if server_thread is not None:
+                server.shutdown()
+                server_thread.join()
+            if server is not None:
+                server.server_close()
+
+    def testUserfetch(self):
+        playground = ResolverPlayground(
+            user_config={"make.conf": ('FEATURES="builtin-fetch userfetch"',)},
+        )
+        try:
+            settings = config(clone=playground.settings)
+            uri = "http://127.0.0.1/distfiles/foo-1.tar.gz"
+            self.assertTrue(_want_builtin_fetch(settings, uri))
+            # As root, userfetch would drop privileges for the fetch, which
+            # the built-in downloader cannot do, and this is reported once.
+            with (
+                mock.patch.object(_fetch_module.os, "getuid", return_value=0),
+                mock.patch.object(_fetch_module, "portage_uid", 250),
+                mock.patch.object(_fetch_module, "portage_gid", 250),
+                mock.patch.object(
+                    _fetch_module, "_builtin_fetch_userfetch_warned", False
+                ),
+                mock.patch.object(_fetch_module, "writemsg_level") as writemsg_level,
+            ):
+                self.assertFalse(_want_builtin_fetch(settings, uri))
+                self.assertFalse(_want_builtin_fetch(settings, uri))
+                self.assertEqual(writemsg_level.call_count, 1)
+        finally:
+            playground.cleanup()
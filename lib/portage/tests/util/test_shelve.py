@@ -1,4 +1,4 @@
-# Copyright 2020-2023 Gentoo Authors
+# Copyright 2020-2026 Gentoo Authors
 # Distributed under the terms of the GNU General Public License v2
 
 import argparse
@@ -6,9 +6,12 @@ import os
 import shutil
 import tempfile
 import time
+from unittest import mock
 
+from portage._emirrordist.ContentDB import ContentDB
+from portage.package.ebuild.fetch import DistfileName
 from portage.tests import TestCase
-from portage.util.shelve import dump, open_shelve, restore
+from portage.util.shelve import SqliteShelf, dump, migrate, open_shelve, restore
 
 
 class ShelveUtilsTestCase(TestCase):
@@ -28,6 +31,17 @@ class ShelveUtilsTestCase(TestCase):
             "portage-2.3.89.tar.bz2": (0, time.time()),
             "portage-2.3.99.tar.bz2": (0, time.time()),
         },
+        # content_db
+        {
+            "filename:bar": {
+                (("BLAKE2B", "aaaa"), ("SHA512", "bbbb")),
+                (("BLAKE2B", "cccc"), ("SHA512", "dddd")),
+            },
+            "digest:SHA512:bbbb": {"bar"},
+            "digest:SHA512:dddd": {"bar", "foo"},
+            "empty": set(),
+            "mixed": {frozenset(("x",)), "y"},
+        },
     )
 
     def test_dump_restore(self):
@@ -56,3 +70,131 @@ class ShelveUtilsTestCase(TestCase):
                 db.close()
             finally:
                 shutil.rmtree(tmpdir)
+
+    def test_migrate(self):
+        for data in self.TEST_DATA:
+            tmpdir = tempfile.mkdtemp()
+            try:
+                args = argparse.Namespace(
+                    src=os.path.join(tmpdir, "shelve_file"),
+                    dest=os.path.join(tmpdir, "content.db"),
+                )
+                db = open_shelve(args.src, flag="c")
+                for k, v in data.items():
+                    db[k] = v
+                db.close()
+                migrate(args)
+                self.assertRaises(FileExistsError, migrate, args)
+
+                # The sqlite database is recognized by its content.
+                db = open_shelve(args.dest, flag="r")
+                self.assertIsInstance(db, SqliteShelf)
+                self.assertEqual(len(db), len(data))
+                self.assertEqual(dict(db.items()), data)
+                for k, v in data.items():
+                    self.assertIn(k, db)
+                    self.assertEqual(db[k], v)
+                db.close()
+            finally:
+                shutil.rmtree(tmpdir)
+
+    def test_sqlite_shelf(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            db_file = os.path.join(tmpdir, "db.sqlite")
+            db = open_shelve(db_file, flag="c")
+            self.assertIsInstance(db, SqliteShelf)
+            db.add_member("key", ("SHA512", "aaaa"))
+            db.add_member("key", ("SHA512", "bbbb"))
+            db.add_member("key", ("SHA512", "aaaa"))
+            db["other"] = 1.5
+            self.assertEqual(db["key"], {("SHA512", "aaaa"), ("SHA512", "bbbb")})
+            self.assertEqual(sorted(db), ["key", "other"])
+
+            # A value replaces a set, and the other way around.
+            db["key"] = "value"
+            self.assertEqual(db["key"], "value")
+            db.add_member("key", "member")
+            self.assertEqual(db["key"], {"member"})
+
+            # The key is gone along with its last member.
+            db.discard_member("key", "member")
+            self.assertNotIn("key", db)
+            self.assertRaises(KeyError, db.__getitem__, "key")
+            self.assertRaises(KeyError, db.__delitem__, "key")
+            db.close()
+
+            db = open_shelve(db_file, flag="r")
+            self.assertEqual(dict(db.items()), {"other": 1.5})
+            db.close()
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_sqlite_shelf_new(self):
+        import sqlite3
+
+        sqlite3_connect = sqlite3.connect
+        tmpdir = tempfile.mkdtemp()
+        try:
+            db_file = os.path.join(tmpdir, "db.sqlite")
+            db = open_shelve(db_file, flag="c")
+            db["old"] = 1
+            db.close()
+            side_files = (db_file + "-wal", db_file + "-shm")
+            for path in side_files:
+                with open(path, "wb") as f:
+                    f.write(b"stale")
+
+            # Nothing of the old database is left when the new one is
+            # opened.
+            def connect(*args, **kwargs):
+                for path in (db_file,) + side_files:
+                    self.assertFalse(os.path.exists(path), path)
+                return sqlite3_connect(*args, **kwargs)
+
+            with mock.patch("sqlite3.connect", side_effect=connect) as connect_mock:
+                db = open_shelve(db_file, flag="n")
+            self.assertEqual(connect_mock.call_count, 1)
+            self.assertEqual(len(db), 0)
+            db.close()
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_content_db(self):
+        bar = DistfileName("bar", digests={"SHA512": "aaaa", "BLAKE2B": "bbbb"})
+        foo = DistfileName("foo", digests={"SHA512": "aaaa", "BLAKE2B": "bbbb"})
+        bar2 = DistfileName("bar", digests={"SHA512": "cccc", "BLAKE2B": "dddd"})
+        tmpdir = tempfile.mkdtemp()
+        try:
+            results = []
+            for db_file in ("shelve_file", "content.sqlite"):
+                content_db = ContentDB(
+                    open_shelve(os.path.join(tmpdir, db_file), flag="c")
+                )
+                for filename in (bar, foo, bar2):
+                    content_db.add(filename)
+                translated = sorted(
+                    (str(x), sorted(x.digests.items()))
+                    for x in content_db.get_filenames_translate(
+                        DistfileName("aaaa", digests={"SHA512": "aaaa"})
+                    )
+                )
+                content_db.remove(bar)
+                results.append((translated, dict(content_db.items())))
+                content_db.close()
+
+            self.assertEqual(results[0], results[1])
+            translated, items = results[1]
+            self.assertEqual(
+                translated,
+                [
+                    ("bar", [("BLAKE2B", "bbbb"), ("SHA512", "aaaa")]),
+                    ("foo", [("BLAKE2B", "bbbb"), ("SHA512", "aaaa")]),
+                ],
+            )
+            self.assertEqual(items["digest:SHA512:aaaa"], {"foo"})
+            self.assertEqual(
+                items["filename:bar"], {(("BLAKE2B", "dddd"), ("SHA512", "cccc"))}
+            )
+        finally:
+            shutil.rmtree(tmpdir)
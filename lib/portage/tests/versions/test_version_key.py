@@ -0,0 +1,111 @@
+# Copyright 2026 Gentoo Authors
+# Distributed under the terms of the GNU General Public License v2
+
+import itertools
+
+from portage.tests import TestCase
+from portage.versions import _pkg_str, _py_version_key, best, vercmp
+
+try:
+    import portage.dep._parser as _c_dep_parser
+except ImportError:
+    _c_dep_parser = None
+
+
+# Listed in ascending order; each group holds versions that compare equal.
+_ordered_versions = [
+    ("0",),
+    ("0.0",),
+    ("0.0.0",),
+    ("0.00001",),
+    ("0.01", "0.010"),
+    ("0.1",),
+    ("0.2",),
+    ("0.10",),
+    ("0.10.0",),
+    ("1_alpha",),
+    ("1_alpha1",),
+    ("1_beta",),
+    ("1_pre1",),
+    ("1_rc",),
+    ("1", "01", "1-r0"),
+    ("1-r1", "1-r01"),
+    ("1_p", "1_p0"),
+    ("1_p1",),
+    ("1a",),
+    ("1b_alpha",),
+    ("1b",),
+    ("1b_p1",),
+    ("1.0_alpha_beta",),
+    ("1.0_alpha",),
+    ("1.0", "1.00"),
+    ("1.0_p1_alpha",),
+    ("1.0_p1",),
+    ("1.0_p1_p1",),
+    ("1.0a",),
+    ("1.0.0",),
+    ("1.001000000000000000001",),
+    ("1.001000000000000000002",),
+    ("1.01",),
+    ("1.1",),
+    ("1.1b",),
+    ("1.2",),
+    ("1.10",),
+    ("12.2b",),
+    ("12.2.5",),
+    ("999999999999999999999999999998",),
+    ("999999999999999999999999999999",),
+    ("1" + "0" * 300,),
+    ("1" + "0" * 300 + ".1",),
+]
+
+
+class VersionKeyTestCase(TestCase):
+    def _check_key_order(self, version_key):
+        flat = [(i, v) for i, group in enumerate(_ordered_versions) for v in group]
+        for (i1, v1), (i2, v2) in itertools.product(flat, repeat=2):
+            expected = (i1 > i2) - (i1 < i2)
+            k1 = version_key(v1)
+            k2 = version_key(v2)
+            self.assertEqual((k1 > k2) - (k1 < k2), expected, msg=f"{v1} vs {v2}")
+            result = vercmp(v1, v2)
+            self.assertEqual((result > 0) - (result < 0), expected, msg=f"{v1} vs {v2}")
+
+    def testPyVersionKey(self):
+        self._check_key_order(_py_version_key)
+
+    def testInvalid(self):
+        for ver in (
+            "",
+            "a",
+            "1.",
+            ".1",
+            "1_foo",
+            "1-r",
+            "1-rc1",
+            "1.0\n",
+            "1_alphabet",
+        ):
+            self.assertIsNone(_py_version_key(ver), msg=ver)
+            if _c_dep_parser is not None:
+                self.assertIsNone(_c_dep_parser.version_key(ver), msg=ver)
+                self.assertIsNone(_c_dep_parser.vercmp(ver, "1"), msg=ver)
+
+    def testNativeVersionKey(self):
+        if _c_dep_parser is None:
+            self.skipTest("_parser extension not available")
+        self._check_key_order(_c_dep_parser.version_key)
+        for group in _ordered_versions:
+            for ver in group:
+                self.assertEqual(
+                    _c_dep_parser.version_key(ver), _py_version_key(ver), msg=ver
+                )
+
+    def testPkgStrVersionKey(self):
+        cpvs = ["sys-apps/foo-1.0", "sys-apps/foo-1.0-r1", "sys-apps/foo-1.0_p1"]
+        pkgs = [_pkg_str(cpv) for cpv in cpvs]
+        self.assertEqual(sorted(pkgs, key=lambda x: x.version_key), pkgs)
+        self.assertEqual(best(list(reversed(pkgs))), "sys-apps/foo-1.0_p1")
+        self.assertEqual(best(list(reversed(cpvs))), "sys-apps/foo-1.0_p1")
+        # The first of several equal versions wins.
+        self.assertIs(best([pkgs[0], _pkg_str("sys-apps/foo-1.0-r0")]), pkgs[0])
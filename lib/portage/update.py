@@ -1,4 +1,4 @@
-# Copyright 1999-2025 Gentoo Authors
+# Copyright 1999-2026 Gentoo Authors
 # Distributed under the terms of the GNU General Public License v2
 
 import os
@@ -105,6 +105,42 @@ def update_dbentry(update_cmd, mycontent, eapi=None, parent=None):
     return mycontent
 
 
+def _update_cmd_cp(update_cmd):
+    """
+    Return the package key of the atoms that update_dbentry() may modify
+    for update_cmd, or None if it never modifies any.
+    """
+    if update_cmd[0] == "move":
+        return str(update_cmd[1])
+    if (
+        update_cmd[0] == "slotmove"
+        and update_cmd[1].operator is None
+        and update_cmd[1].version is None
+    ):
+        return update_cmd[1].cp
+    return None
+
+
+def _dep_cp_candidates(mycontent):
+    """
+    Return a set of strings that includes the package key of every atom
+    in mycontent, for an index of the entries that update_dbentry() may
+    modify. It may include other strings, such as the cpv of a versioned
+    atom, since versions are not parsed here.
+    """
+    candidates = set()
+    for token in mycontent.split():
+        if "/" not in token:
+            continue
+        cpv = re.split(r"[:\[]", token.lstrip("!<>=~"), maxsplit=1)[0].rstrip("*")
+        candidates.add(cpv)
+        pos = cpv.find("-", cpv.find("/"))
+        while pos != -1:
+            candidates.add(cpv[:pos])
+            pos = cpv.find("-", pos + 1)
+    return candidates
+
+
 def update_dbentries(update_iter, mydata, eapi=None, parent=None):
     """Performs update commands and returns a
     dict containing only the updated items."""
@@ -0,0 +1,200 @@
+# Copyright 2026 Gentoo Authors
+# Distributed under the terms of the GNU General Public License v2
+
+import json
+import time
+
+import portage
+from portage import os
+from portage.exception import PortageException
+from portage.util import atomic_ofstream, normalize_path
+
+_FORMAT_VERSION = 1
+
+DIGEST_CACHE_FILENAME = ".verified-digests"
+
+# Files smaller than this are hashed about as fast as the database is
+# read, so they are not recorded.
+_MIN_SIZE = 1024 * 1024
+
+# Files modified this shortly (in nanoseconds) before they were hashed
+# are not recorded, since a second change within the same timestamp tick
+# would go unnoticed.
+_racy_ns = 2 * 10**9
+
+_caches = {}
+
+
+def get_digest_cache(settings, directory):
+    """
+    Return the DigestCache of directory, or None if FEATURES="digest-cache"
+    is disabled. Records that the callers did not flush are written when
+    the process exits.
+    """
+    if "digest-cache" not in settings.features or not directory:
+        return None
+    directory = normalize_path(directory)
+    cache = _caches.get(directory)
+    if cache is None:
+        cache = _caches[directory] = DigestCache(directory)
+        portage.process.atexit_register(cache.flush)
+    return cache
+
+
+def _stat_key(st):
+    return [st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, st.st_ctime_ns]
+
+
+class DigestCache:
+    """
+    The digests that were confirmed for the files of a directory, like
+    DISTDIR or PKGDIR, kept in a .verified-digests file within it. A file
+    is recorded together with its (device, inode, size, mtime, ctime), and
+    its digests are only taken from the cache while all of these are
+    unchanged. Since the ctime of a file can not be set, any change to
+    its content or any replacement of the file invalidates the record.
+
+    The database is only trusted if it is owned by root, by the portage
+    user or by the current user, and is not writable by anyone else, so
+    that users who can write to the directory can not forge records.
+
+    New records are kept in memory until flush() is called, which callers
+    do once they have verified all the files of a fetch or a check.
+    """
+
+    def __init__(self, directory):
+        """
+        @param directory: absolute path of the directory
+        @type directory: str
+        """
+        self._directory = directory
+        self._filename = os.path.join(directory, DIGEST_CACHE_FILENAME)
+        self._files = {}
+        self._db_key = None
+        self._pending = {}
+        self._pruned = False
+
+    def _relpath(self, path):
+        path = normalize_path(path)
+        if not path.startswith(self._directory + os.sep):
+            return None
+        return path[len(self._directory) + 1 :]
+
+    def _load(self):
+        """Read the database again if it changed since it was read."""
+        try:
+            f = open(self._filename, encoding="utf-8")
+        except OSError:
+            self._files = {}
+            self._db_key = None
+            return
+        with f:
+            st = os.fstat(f.fileno())
+            db_key = _stat_key(st)
+            if db_key == self._db_key:
+                return
+            self._files = {}
+            self._db_key = db_key
+            if st.st_uid not in (
+                0,
+                os.geteuid(),
+                portage.data.portage_uid,
+            ) or (st.st_mode & 0o022):
+                return
+            try:
+                data = json.load(f)
+            except (OSError, ValueError):
+                return
+        if not isinstance(data, dict) or data.get("format") != _FORMAT_VERSION:
+            return
+        files = data.get("files")
+        if isinstance(files, dict):
+            self._files = files
+
+    def get(self, path, st):
+        """
+        Return a dict of the digests that were confirmed for the file at
+        path, which has the given stat result. The dict is empty unless
+        the file is unchanged since its digests were recorded.
+        """
+        relpath = self._relpath(path)
+        if relpath is None or st.st_size < _MIN_SIZE:
+            return {}
+        record = self._pending.get(relpath)
+        if record is None:
+            self._load()
+            record = self._files.get(relpath)
+        if not isinstance(record, list) or record[0] != _stat_key(st):
+            return {}
+        return dict(record[1])
+
+    def add(self, path, st, digests):
+        """
+        Record digests that were confirmed for the file at path, which had
+        the given stat result when it was hashed. Nothing is recorded if
+        the file changed since then, or changed shortly before. The record
+        is written by the next flush().
+        """
+        relpath = self._relpath(path)
+        if relpath is None or st.st_size < _MIN_SIZE:
+            return
+        try:
+            if _stat_key(os.stat(path)) != _stat_key(st):
+                return
+        except OSError:
+            return
+        if max(st.st_mtime_ns, st.st_ctime_ns) >= time.time_ns() - _racy_ns:
+            return
+
+        confirmed = self.get(path, st)
+        confirmed.update(digests)
+        confirmed.pop("size", None)
+        self._pending[relpath] = [_stat_key(st), confirmed]
+
+    def flush(self):
+        """
+        Write the records added since the last flush() to the database,
+        along with those that it already holds. The first flush() of a
+        process drops the records of files that were removed or changed
+        since they were recorded. Failure to write the database is not an
+        error, the files are simply hashed again next time.
+        """
+        if not self._pending:
+            return
+        self._load()
+        files = {}
+        for name, record in self._files.items():
+            if name in self._pending or not isinstance(record, list):
+                continue
+            if not self._pruned:
+                try:
+                    st = os.stat(os.path.join(self._directory, name))
+                except OSError:
+                    continue
+                if _stat_key(st) != record[0]:
+                    continue
+            files[name] = record
+        files.update(self._pending)
+        self._pending = {}
+
+        content = json.dumps(
+            {"format": _FORMAT_VERSION, "files": files},
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+        f = None
+        try:
+            f = atomic_ofstream(self._filename, mode="w", encoding="utf-8")
+            os.fchmod(f.fileno(), 0o644)
+            f.write(content + "\n")
+            f.close()
+        except (OSError, PortageException):
+            if f is not None:
+                f.abort()
+            return
+        self._pruned = True
+        self._files = files
+        try:
+            self._db_key = _stat_key(os.stat(self._filename))
+        except OSError:
+            self._db_key = None
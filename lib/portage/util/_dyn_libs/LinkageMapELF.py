@@ -9,7 +9,7 @@ import os
 import subprocess
 
 from portage.cache.mappings import slot_dict_class
-from portage.const import EPREFIX
+from portage.const import CACHE_PATH, EPREFIX
 from portage.dep.soname.multilib_category import compute_multilib_category
 from portage.dep.soname.SonameAtom import SonameAtom
 from portage.exception import CommandNotFound, InvalidData
@@ -21,6 +21,7 @@ from portage.util import (
     varexpand,
     writemsg_level,
 )
+from portage.util._dyn_libs.NeededCache import NeededCache, needed_stamp
 from portage.util._dyn_libs.NeededEntry import NeededEntry
 from portage.util.elf.header import ELFHeader
 
@@ -80,6 +81,9 @@ class LinkageMapELF:
         self._obj_key_cache = {}
         self._defpath = set()
         self._path_key_cache = {}
+        self._needed_cache = NeededCache(
+            os.path.join(self._dbapi.settings["EROOT"], CACHE_PATH, "linkage_map")
+        )
 
     def _clear_cache(self):
         self._libs.clear()
@@ -177,11 +181,84 @@ class LinkageMapELF:
         def __str__(self):
             return str(sorted(self.alt_paths))
 
+    def _parse_needed_line(self, location, l, frozensets):
+        """
+        Parse and normalize one NEEDED.ELF.2 line. Returns None, after
+        showing a message for invalid lines, if there is no entry.
+        """
+        l = l.rstrip("\n")
+        if not l:
+            return None
+        if "\0" in l:
+            # os.stat() will raise "TypeError: must be encoded string
+            # without NULL bytes, not str" in this case.
+            writemsg_level(
+                _("\nLine contains null byte(s) " "in %s: %s\n\n") % (location, l),
+                level=logging.ERROR,
+                noiselevel=-1,
+            )
+            return None
+        try:
+            entry = NeededEntry.parse(location, l)
+        except InvalidData as e:
+            writemsg_level(f"\n{e}\n\n", level=logging.ERROR, noiselevel=-1)
+            return None
+
+        # If NEEDED.ELF.2 contains the new multilib category field,
+        # then use that for categorization. Otherwise, if a mapping
+        # exists, map e_machine (entry.arch) to an approximate
+        # multilib category. If all else fails, use e_machine, just
+        # as older versions of portage did.
+        if entry.multilib_category is None:
+            entry.multilib_category = _approx_multilib_categories.get(
+                entry.arch, entry.arch
+            )
+
+        entry.filename = normalize_path(entry.filename)
+        expand = {"ORIGIN": os.path.dirname(entry.filename)}
+        entry.runpaths = frozenset(
+            normalize_path(varexpand(x, expand, error_leader=lambda: f"{location}: "))
+            for x in entry.runpaths
+        )
+        entry.runpaths = frozensets.setdefault(entry.runpaths, entry.runpaths)
+        return entry
+
+    @staticmethod
+    def _needed_entry_to_cache(entry):
+        return (
+            entry.arch,
+            entry.filename,
+            entry.soname,
+            sorted(entry.runpaths),
+            list(entry.needed),
+            entry.multilib_category,
+        )
+
+    @staticmethod
+    def _needed_entry_from_cache(cached, frozensets):
+        entry = NeededEntry()
+        (
+            entry.arch,
+            entry.filename,
+            entry.soname,
+            runpaths,
+            needed,
+            entry.multilib_category,
+        ) = cached
+        runpaths = frozenset(runpaths)
+        entry.runpaths = frozensets.setdefault(runpaths, runpaths)
+        entry.needed = tuple(needed)
+        return entry
+
     def rebuild(self, exclude_pkgs=None, include_file=None, preserve_paths=None):
         """
         Raises CommandNotFound if there are preserved libs
         and the scanelf binary is not available.
 
+        The NEEDED.ELF.2 entries of installed packages are taken from the
+        NeededCache, so only the files of packages that were merged since
+        the last rebuild, by this or another process, are read and parsed.
+
         @param exclude_pkgs: A set of packages that should be excluded from
                 the LinkageMap, since they are being unmerged and their NEEDED
                 entries are therefore irrelevant and would only serve to corrupt
@@ -207,29 +284,54 @@ class LinkageMapELF:
         libs = self._libs
         obj_properties = self._obj_properties
 
-        lines = []
+        # Share identical frozenset instances when available,
+        # in order to conserve memory.
+        frozensets = {}
 
-        # Data from include_file is processed first so that it
-        # overrides any data from previously installed files.
+        # Entries for a package which is currently being merged.
+        include_entries = []
         if include_file is not None:
             for line in grabfile(include_file):
-                lines.append((None, include_file, line))
+                entry = self._parse_needed_line(include_file, line, frozensets)
+                if entry is not None:
+                    include_entries.append(entry)
 
+        pkg_entries = []
+        needed_cache = self._needed_cache
         aux_keys = [self._needed_aux_key]
         can_lock = os.access(os.path.dirname(self._dbapi._dbroot), os.W_OK)
         if can_lock:
             self._dbapi.lock()
         try:
-            for cpv in self._dbapi.cpv_all():
+            cpv_all = self._dbapi.cpv_all()
+            for cpv in cpv_all:
                 if exclude_pkgs is not None and cpv in exclude_pkgs:
                     continue
                 needed_file = self._dbapi.getpath(cpv, filename=self._needed_aux_key)
-                for line in self._dbapi.aux_get(cpv, aux_keys)[0].splitlines():
-                    lines.append((cpv, needed_file, line))
+                stamp = needed_stamp(needed_file)
+                cached = needed_cache.get(cpv, stamp)
+                if cached is not None:
+                    entries = [
+                        self._needed_entry_from_cache(x, frozensets) for x in cached
+                    ]
+                else:
+                    entries = []
+                    for line in self._dbapi.aux_get(cpv, aux_keys)[0].splitlines():
+                        entry = self._parse_needed_line(needed_file, line, frozensets)
+                        if entry is not None:
+                            entries.append(entry)
+                    needed_cache.set(
+                        cpv, stamp, [self._needed_entry_to_cache(x) for x in entries]
+                    )
+                pkg_entries.append((cpv, entries))
+            needed_cache.prune(cpv_all)
+            if can_lock:
+                needed_cache.save()
         finally:
             if can_lock:
                 self._dbapi.unlock()
 
+        lines = []
         # have to call scanelf for preserved libs here as they aren't
         # registered in NEEDED.ELF.2 files
         plibs = {}
@@ -333,54 +435,17 @@ class LinkageMapELF:
             for x, cpv in plibs.items():
                 lines.append((cpv, "plibs", ";".join(["", x, "", "", ""])))
 
-        # Share identical frozenset instances when available,
-        # in order to conserve memory.
-        frozensets = {}
+        # Group the entries by owner, in reverse order of their source:
+        # preserved libraries, installed packages, then include_file.
         owner_entries = collections.defaultdict(list)
-
-        while True:
-            try:
-                owner, location, l = lines.pop()
-            except IndexError:
-                break
-            l = l.rstrip("\n")
-            if not l:
-                continue
-            if "\0" in l:
-                # os.stat() will raise "TypeError: must be encoded string
-                # without NULL bytes, not str" in this case.
-                writemsg_level(
-                    _("\nLine contains null byte(s) " "in %s: %s\n\n") % (location, l),
-                    level=logging.ERROR,
-                    noiselevel=-1,
-                )
-                continue
-            try:
-                entry = NeededEntry.parse(location, l)
-            except InvalidData as e:
-                writemsg_level(f"\n{e}\n\n", level=logging.ERROR, noiselevel=-1)
-                continue
-
-            # If NEEDED.ELF.2 contains the new multilib category field,
-            # then use that for categorization. Otherwise, if a mapping
-            # exists, map e_machine (entry.arch) to an approximate
-            # multilib category. If all else fails, use e_machine, just
-            # as older versions of portage did.
-            if entry.multilib_category is None:
-                entry.multilib_category = _approx_multilib_categories.get(
-                    entry.arch, entry.arch
-                )
-
-            entry.filename = normalize_path(entry.filename)
-            expand = {"ORIGIN": os.path.dirname(entry.filename)}
-            entry.runpaths = frozenset(
-                normalize_path(
-                    varexpand(x, expand, error_leader=lambda: f"{location}: ")
-                )
-                for x in entry.runpaths
-            )
-            entry.runpaths = frozensets.setdefault(entry.runpaths, entry.runpaths)
-            owner_entries[owner].append(entry)
+        for owner, location, l in reversed(lines):
+            entry = self._parse_needed_line(location, l, frozensets)
+            if entry is not None:
+                owner_entries[owner].append(entry)
+        for cpv, entries in reversed(pkg_entries):
+            owner_entries[cpv].extend(reversed(entries))
+        if include_entries:
+            owner_entries[None].extend(reversed(include_entries))
 
         # In order to account for internal library resolution which a package
         # may implement (useful at least for handling of bundled libraries),
@@ -0,0 +1,120 @@
+# Copyright 2026 Gentoo Authors
+# Distributed under the terms of the GNU General Public License v2
+
+import json
+import time
+
+from portage import os
+from portage.exception import PortageException
+from portage.util import ensure_dirs, write_atomic
+
+_FORMAT_VERSION = 1
+
+# NEEDED.ELF.2 files modified this shortly (in nanoseconds) before their
+# entries are stored are not trusted to stay unchanged, since a second
+# change within the same mtime tick would go unnoticed.
+_racy_ns = 2 * 10**9
+
+
+def needed_stamp(path):
+    """
+    Return the stamp of the NEEDED.ELF.2 file at path, or None if it
+    does not exist. The file is replaced whenever it is rewritten, so the
+    stamp of a changed file differs at least in its inode.
+    """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size, st.st_ino]
+
+
+class NeededCache:
+    """
+    Parsed NEEDED.ELF.2 entries of the installed packages, which
+    LinkageMapELF assembles its soname graph from. The entries are kept
+    in $EROOT/var/cache/edb/linkage_map together with the stamp of the
+    NEEDED.ELF.2 file they were parsed from, so that a rebuild of the
+    graph only has to read and parse the files of the packages that were
+    merged since, and simply drops the packages that were unmerged.
+
+    An entry is a (arch, filename, soname, runpaths, needed,
+    multilib_category) tuple, as LinkageMapELF has normalized it. Messages
+    about invalid lines are shown when a file is parsed, and not again
+    while its entries come from the cache.
+    """
+
+    def __init__(self, filename):
+        """
+        @param filename: absolute path of the cache file
+        @type filename: str
+        """
+        self._filename = filename
+        self._packages = None
+        self._modified = False
+
+    def _load(self):
+        self._packages = {}
+        try:
+            with open(self._filename, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not isinstance(data, dict) or data.get("format") != _FORMAT_VERSION:
+            return
+        packages = data.get("packages")
+        if isinstance(packages, dict):
+            self._packages = packages
+
+    def get(self, cpv, stamp):
+        """
+        Return the entries stored for cpv, or None unless they were parsed
+        from a NEEDED.ELF.2 file with the given stamp.
+        """
+        if self._packages is None:
+            self._load()
+        record = self._packages.get(str(cpv))
+        if record is None or stamp is None or record[0] != stamp:
+            return None
+        return [tuple(entry) for entry in record[1]]
+
+    def set(self, cpv, stamp, entries):
+        """Store the entries parsed from the NEEDED.ELF.2 file of cpv."""
+        if self._packages is None:
+            self._load()
+        cpv = str(cpv)
+        if stamp is None or stamp[0] >= time.time_ns() - _racy_ns:
+            if self._packages.pop(cpv, None) is not None:
+                self._modified = True
+            return
+        self._packages[cpv] = [stamp, [list(entry) for entry in entries]]
+        self._modified = True
+
+    def prune(self, cpvs):
+        """Drop the entries of packages other than cpvs."""
+        if self._packages is None:
+            self._load()
+        cpvs = {str(cpv) for cpv in cpvs}
+        for cpv in list(self._packages):
+            if cpv not in cpvs:
+                del self._packages[cpv]
+                self._modified = True
+
+    def save(self):
+        """
+        Write the cache file if anything changed. Failure to write it is
+        not an error, the files are simply parsed again next time.
+        """
+        if not self._modified:
+            return
+        content = json.dumps(
+            {"format": _FORMAT_VERSION, "packages": self._packages},
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+        try:
+            ensure_dirs(os.path.dirname(self._filename))
+            write_atomic(self._filename, content + "\n", mode="w", encoding="utf-8")
+        except (OSError, PortageException):
+            return
+        self._modified = False
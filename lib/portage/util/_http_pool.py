@@ -0,0 +1,511 @@
+# Copyright 2026 Gentoo Authors
+# Distributed under the terms of the GNU General Public License v2
+
+"""
+In-process HTTP downloader for FEATURES=builtin-fetch.
+
+HttpPool downloads http and https URIs to files. It keeps the connections
+to each host alive between requests, so that fetching many small files
+from one mirror or binhost does not pay for a TCP and TLS handshake per
+file. Partial files are resumed with a range request, large files are
+split into ranges that are fetched in parallel over several connections
+to the same host, and the number of connections per host and the total
+bandwidth are limited.
+
+The transfers themselves are done by http.client in worker threads, and
+HttpPool.fetch is the coroutine that the event loop waits for.
+"""
+
+__all__ = ("HttpFetchError", "HttpPool", "builtin_fetch_supported", "get_pool")
+
+import base64
+import concurrent.futures
+import http.client
+import re
+import ssl
+import threading
+import time
+import urllib.parse as urllib_parse
+import urllib.request as urllib_request
+
+from portage import os
+from portage.exception import PortageException
+from portage.util._urlopen import http_to_timestamp
+from portage.util.futures import asyncio
+
+_USER_AGENT = "Gentoo Portage"
+_TIMEOUT = 60
+_TRIES = 3
+_MAX_REDIRECTS = 10
+_MAX_WORKERS = 16
+_CHUNK_SIZE = 65536
+
+# Files with at least this many bytes left to fetch per connection are
+# split into ranges.
+_SEGMENT_MIN_SIZE = 16 * 1024 * 1024
+
+_RETRY_ERRORS = (OSError, http.client.HTTPException)
+
+_pools = {}
+
+
+class HttpFetchError(PortageException):
+    """A download failed."""
+
+
+class _Stopped(Exception):
+    """Another part of the same download failed."""
+
+
+def _parse_rate(value):
+    """Parse a number of bytes per second, with an optional K, M or G
+    suffix like PORTAGE_FETCH_RESUME_MIN_SIZE."""
+    match = re.match(r"^\s*(\d+)\s*([KMG]?)\s*$", value or "0", re.IGNORECASE)
+    if match is None:
+        return 0
+    return int(match.group(1)) * 1024 ** " KMG".index(match.group(2).upper() or " ")
+
+
+def builtin_fetch_supported(settings, uri):
+    """
+    Return True if uri is to be fetched with HttpPool rather than with
+    FETCHCOMMAND. The commands remain in charge where they run in an
+    SELinux context of their own.
+    """
+    return (
+        "builtin-fetch" in settings.features
+        and uri.partition("://")[0] in ("http", "https")
+        and not settings.selinux_enabled()
+    )
+
+
+def get_pool(settings):
+    """
+    Return the HttpPool of this process for the limits configured by
+    PORTAGE_FETCH_CONNECTIONS and PORTAGE_FETCH_RATE_LIMIT.
+    """
+    try:
+        connections = max(1, int(settings.get("PORTAGE_FETCH_CONNECTIONS") or 4))
+    except ValueError:
+        connections = 4
+    rate_limit = _parse_rate(settings.get("PORTAGE_FETCH_RATE_LIMIT"))
+    proxies = {}
+    for scheme in ("http", "https", "no"):
+        value = settings.get(f"{scheme}_proxy") or settings.get(
+            f"{scheme.upper()}_PROXY"
+        )
+        if value:
+            proxies[scheme] = value
+    key = (connections, rate_limit, tuple(sorted(proxies.items())))
+    pool = _pools.get(key)
+    if pool is None:
+        pool = _pools[key] = HttpPool(
+            connections=connections, rate_limit=rate_limit, proxies=proxies
+        )
+    return pool
+
+
+def _forget_pools():
+    # The connections and worker threads belong to the parent process.
+    _pools.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_pools)
+
+
+class _RateLimiter:
+    """Delay the threads that read from the network so that together
+    they stay below the given number of bytes per second."""
+
+    def __init__(self, rate):
+        self._rate = rate
+        self._lock = threading.Lock()
+        self._next = time.monotonic()
+
+    def consume(self, size):
+        with self._lock:
+            now = time.monotonic()
+            self._next = max(self._next, now) + size / self._rate
+            delay = self._next - now
+        # A burst of up to a second is fine.
+        if delay > 1:
+            time.sleep(delay - 1)
+
+
+class _Target:
+    """Where a request goes: the host of the URL, or its proxy."""
+
+    def __init__(self, url, proxies):
+        parsed = urllib_parse.urlsplit(url)
+        self.scheme = parsed.scheme
+        self.host = parsed.hostname
+        self.port = parsed.port or (443 if self.scheme == "https" else 80)
+        self.path = urllib_parse.urlunsplit(
+            ("", "", parsed.path or "/", parsed.query, "")
+        )
+        self.headers = {"Host": parsed.netloc.rpartition("@")[2]}
+        if parsed.username is not None:
+            self.headers["Authorization"] = _basic_auth(
+                parsed.username, parsed.password
+            )
+        self.proxy = None
+        self.proxy_headers = {}
+        proxy = proxies.get(self.scheme)
+        if proxy and not urllib_request.proxy_bypass_environment(
+            self.host, proxies=proxies
+        ):
+            if "://" not in proxy:
+                proxy = "http://" + proxy
+            proxy = urllib_parse.urlsplit(proxy)
+            self.proxy = (proxy.hostname, proxy.port or 80)
+            proxy_headers = {}
+            if proxy.username is not None:
+                proxy_headers["Proxy-Authorization"] = _basic_auth(
+                    proxy.username, proxy.password
+                )
+            if self.scheme == "http":
+                # Plain requests go to the proxy with the absolute URL.
+                self.path = urllib_parse.urlunsplit(
+                    (self.scheme, self.headers["Host"], self.path, "", "")
+                )
+                self.headers.update(proxy_headers)
+            else:
+                self.proxy_headers = proxy_headers
+        self.key = (self.scheme, self.host, self.port, self.proxy)
+
+
+def _basic_auth(username, password):
+    credentials = (
+        f"{urllib_parse.unquote(username)}:{urllib_parse.unquote(password or '')}"
+    )
+    return "Basic " + base64.b64encode(credentials.encode("utf-8")).decode("ascii")
+
+
+class _Download:
+    """State of one file that is being downloaded."""
+
+    def __init__(self, fd, cancelled):
+        self.fd = fd
+        self.cancelled = cancelled
+        self.last_modified = None
+
+
+class HttpPool:
+    """
+    Pool of keep-alive connections, used to download files.
+
+    @param connections: maximum number of concurrent connections per host
+    @type connections: int
+    @param rate_limit: maximum total bytes per second, or 0 for no limit
+    @type rate_limit: int
+    @param proxies: proxy URLs by scheme, and hosts that bypass them
+            under "no", as in the http_proxy, https_proxy and no_proxy
+            variables
+    @type proxies: dict
+    """
+
+    def __init__(self, connections=4, rate_limit=0, proxies=None):
+        self._connections = connections
+        self._limiter = _RateLimiter(rate_limit) if rate_limit else None
+        self._proxies = proxies or {}
+        self._lock = threading.Lock()
+        self._idle = {}
+        self._slots = {}
+        self._executor = None
+        self._ssl_context = None
+
+    async def fetch(self, url, path, resume=False):
+        """
+        Download url to path. With resume, an existing file at path is
+        assumed to hold the beginning of the content, and only the rest
+        is requested. This method is a coroutine.
+
+        @raises HttpFetchError: if the download fails
+        """
+        loop = asyncio.get_event_loop()
+        with self._lock:
+            if self._executor is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=_MAX_WORKERS, thread_name_prefix="portage-fetch"
+                )
+        cancelled = threading.Event()
+        try:
+            await loop.run_in_executor(
+                self._executor, self._fetch, url, path, resume, cancelled
+            )
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    def close(self):
+        """Close the idle connections and stop the worker threads."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+            executor, self._executor = self._executor, None
+        for connections in idle.values():
+            for conn in connections:
+                conn.close()
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def _slot(self, key):
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None:
+                slot = self._slots[key] = threading.BoundedSemaphore(self._connections)
+            return slot
+
+    def _connect(self, target):
+        with self._lock:
+            idle = self._idle.get(target.key)
+            if idle:
+                return idle.pop(), True
+        host, port = target.proxy or (target.host, target.port)
+        if target.scheme == "https":
+            if self._ssl_context is None:
+                self._ssl_context = ssl.create_default_context()
+            conn = http.client.HTTPSConnection(
+                host, port, timeout=_TIMEOUT, context=self._ssl_context
+            )
+            if target.proxy is not None:
+                conn.set_tunnel(target.host, target.port, headers=target.proxy_headers)
+        else:
+            conn = http.client.HTTPConnection(host, port, timeout=_TIMEOUT)
+        return conn, False
+
+    def _release(self, target, conn):
+        with self._lock:
+            idle = self._idle.setdefault(target.key, [])
+            if len(idle) < self._connections:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def _request(self, target, headers):
+        """Send a GET request, on an idle connection if there is one.
+        A server may have closed an idle connection in the meantime, in
+        which case the request is sent again on a new one."""
+        headers = dict(target.headers, **headers)
+        headers["User-Agent"] = _USER_AGENT
+        while True:
+            conn, reused = self._connect(target)
+            try:
+                conn.request("GET", target.path, headers=headers)
+                return conn, conn.getresponse()
+            except _RETRY_ERRORS:
+                conn.close()
+                if not reused:
+                    raise
+
+    def _fetch(self, url, path, resume, cancelled):
+        offset = 0
+        flags = os.O_WRONLY | os.O_CREAT
+        if resume:
+            try:
+                offset = os.stat(path).st_size
+            except FileNotFoundError:
+                pass
+        else:
+            flags |= os.O_TRUNC
+        fd = os.open(path, flags, 0o644)
+        try:
+            download = _Download(fd, cancelled)
+            for tries in range(_TRIES, 0, -1):
+                try:
+                    self._fetch_from(url, download, offset)
+                except _RETRY_ERRORS as e:
+                    if tries == 1 or cancelled.is_set():
+                        raise HttpFetchError(f"{url}: {e}") from e
+                    # Resume where the last attempt stopped.
+                    offset = os.fstat(fd).st_size
+                else:
+                    break
+        finally:
+            os.close(fd)
+        if download.last_modified is not None:
+            try:
+                mtime = int(http_to_timestamp(download.last_modified))
+                os.utime(path, (mtime, mtime))
+            except (OSError, TypeError, ValueError, OverflowError):
+                pass
+
+    def _fetch_from(self, url, download, offset):
+        """Fetch the content of url starting at offset, following
+        redirects. When an exception is raised, the file holds the
+        beginning of the content that was received."""
+        for _ in range(_MAX_REDIRECTS + 1):
+            target = _Target(url, self._proxies)
+            slot = self._slot(target.key)
+            with slot:
+                # Servers that support ranges say so by responding with a
+                # part, even from the beginning.
+                conn, response = self._request(target, {"Range": f"bytes={offset}-"})
+                location = None
+                try:
+                    if response.status in (301, 302, 303, 307, 308):
+                        location = response.getheader("Location")
+                        if not location:
+                            raise HttpFetchError(f"{url}: redirect without location")
+                        response.read()
+                    elif response.status == 416:
+                        # The partial file is already complete, or the
+                        # content is empty.
+                        response.read()
+                        return
+                    elif response.status == 200:
+                        os.ftruncate(download.fd, 0)
+                        download.last_modified = response.getheader("Last-Modified")
+                        self._read(response, download, 0, response.length)
+                        return
+                    elif response.status == 206:
+                        download.last_modified = response.getheader("Last-Modified")
+                        self._read_partial(target, slot, response, download, offset)
+                        return
+                    else:
+                        response.read()
+                        raise HttpFetchError(
+                            f"{url}: HTTP error {response.status} {response.reason}"
+                        )
+                finally:
+                    if response.isclosed() and not response.will_close:
+                        self._release(target, conn)
+                    else:
+                        conn.close()
+            url = urllib_parse.urljoin(url, location)
+        raise HttpFetchError(f"{url}: too many redirects")
+
+    def _read_partial(self, target, slot, response, download, offset):
+        match = re.match(
+            r"^bytes\s+(\d+)-(\d+)/(\d+|\*)$",
+            (response.getheader("Content-Range") or "").strip(),
+        )
+        if match is None or int(match.group(1)) != offset:
+            raise HttpFetchError("unexpected Content-Range in response")
+        end = int(match.group(2)) + 1
+        remaining = end - offset
+
+        # Fetch ranges at the end of the file over additional connections,
+        # as far as the per-host limit allows.
+        stop = threading.Event()
+        threads = []
+        segments = []
+        while len(segments) + 1 < remaining // _SEGMENT_MIN_SIZE and slot.acquire(
+            blocking=False
+        ):
+            segments.append(None)
+        if segments:
+            size = remaining // (len(segments) + 1)
+            bounds = [offset + size * i for i in range(len(segments) + 2)]
+            bounds[-1] = end
+            for i in range(len(segments)):
+                segments[i] = {
+                    "start": bounds[i + 1],
+                    "end": bounds[i + 2],
+                    "done": bounds[i + 1],
+                    "error": None,
+                }
+                thread = threading.Thread(
+                    target=self._fetch_segment,
+                    args=(target, slot, download, segments[i], stop),
+                    daemon=True,
+                )
+                thread.start()
+                threads.append(thread)
+            end_first = bounds[1]
+        else:
+            end_first = end
+
+        done = offset
+        try:
+            done = self._read(response, download, offset, end_first - offset, stop)
+        except _Stopped:
+            # A segment failed, its error is raised below.
+            pass
+        except BaseException:
+            stop.set()
+            raise
+        finally:
+            for thread in threads:
+                thread.join()
+            # Keep only the beginning of the file that is contiguous, so
+            # that it can be resumed. The rest of the first response is
+            # left unread, so its connection is not reused.
+            complete = done == end_first
+            for segment in segments:
+                if not complete:
+                    break
+                done = segment["done"]
+                complete = done == segment["end"]
+            os.ftruncate(download.fd, done)
+        for segment in segments:
+            if segment["error"] is not None:
+                raise segment["error"]
+
+    def _fetch_segment(self, target, slot, download, segment, stop):
+        try:
+            for tries in range(_TRIES, 0, -1):
+                try:
+                    conn, response = self._request(
+                        target,
+                        {"Range": f"bytes={segment['done']}-{segment['end'] - 1}"},
+                    )
+                    try:
+                        if response.status != 206:
+                            response.read()
+                            raise HttpFetchError(
+                                f"HTTP error {response.status} {response.reason}"
+                            )
+                        segment["done"] = self._read(
+                            response,
+                            download,
+                            segment["done"],
+                            segment["end"] - segment["done"],
+                            stop,
+                            segment,
+                        )
+                        response.read()
+                    finally:
+                        if response.isclosed() and not response.will_close:
+                            self._release(target, conn)
+                        else:
+                            conn.close()
+                except _RETRY_ERRORS:
+                    if tries == 1 or stop.is_set() or download.cancelled.is_set():
+                        raise
+                else:
+                    return
+        except _Stopped:
+            pass
+        except BaseException as e:
+            segment["error"] = e
+            stop.set()
+        finally:
+            slot.release()
+
+    def _read(self, response, download, offset, length, stop=None, segment=None):
+        """Write length bytes of response to the file at offset, or all
+        of it if length is None, and return the offset after them."""
+        while length is None or length > 0:
+            if download.cancelled.is_set():
+                raise HttpFetchError("download cancelled")
+            if stop is not None and stop.is_set():
+                raise _Stopped()
+            size = _CHUNK_SIZE if length is None else min(_CHUNK_SIZE, length)
+            data = response.read(size)
+            if not data:
+                if length is None:
+                    break
+                raise http.client.IncompleteRead(b"", length)
+            if self._limiter is not None:
+                self._limiter.consume(len(data))
+            view = memoryview(data)
+            while view:
+                written = os.pwrite(download.fd, view, offset)
+                view = view[written:]
+                offset += written
+                if segment is not None:
+                    segment["done"] = offset
+            if length is not None:
+                length -= len(data)
+        return offset
@@ -17,6 +17,7 @@ _compressors = {
     "gzip": {
         "compress": "gzip ${BINPKG_COMPRESS_FLAGS}",
         "decompress": "gzip -d",
+        "decompress_parallel": "pigz -d -p {JOBS}",
         "package": "app-arch/gzip",
     },
     "lz4": {
@@ -27,6 +28,7 @@ _compressors = {
     "lzip": {
         "compress": "lzip ${BINPKG_COMPRESS_FLAGS}",
         "decompress": "lzip -d",
+        "decompress_parallel": "plzip -d -n {JOBS}",
         "package": "app-arch/lzip",
     },
     "lzop": {
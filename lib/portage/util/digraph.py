@@ -9,6 +9,165 @@ from collections import deque
 from portage.util import writemsg
 
 
+def _level_key(ignore_priority):
+    # Callables and priority values are both told apart by equality, so
+    # that each access to a classmethod filter, which creates a new bound
+    # method, finds the same level. The flag keeps a callable from
+    # matching a priority value.
+    return (callable(ignore_priority), ignore_priority)
+
+
+class _DegreeIndex:
+    """
+    Per-node counts of the children and parents that an ignore_priority
+    filter leaves in place, with the set of nodes whose count is zero,
+    for each of a fixed list of filters (levels). Level 0 is the None
+    filter, which keeps every edge.
+
+    Each edge has a bitmask of the levels it survives. Adding an edge or
+    a priority to it can only set more bits, and removing an edge or a
+    node clears all of them, so the counts are kept up to date at the
+    cost of the edges that change. Leaves and roots are kept in sets and
+    sorted into the graph's order on demand, by a sequence number that
+    only grows as nodes are added, like their position in digraph.order.
+    """
+
+    __slots__ = (
+        "_filters",
+        "_level_of",
+        "_seq",
+        "_next_seq",
+        "_edge_mask",
+        "_child_counts",
+        "_parent_counts",
+        "_leaves",
+        "_roots",
+    )
+
+    def __init__(self, graph, ignore_priorities):
+        filters = [None]
+        level_of = {_level_key(None): 0}
+        for ignore_priority in ignore_priorities:
+            key = _level_key(ignore_priority)
+            if key not in level_of:
+                level_of[key] = len(filters)
+                filters.append(ignore_priority)
+        self._filters = tuple(filters)
+        self._level_of = level_of
+        self._seq = {}
+        self._next_seq = 0
+        # (child, parent) -> bitmask of the levels the edge survives
+        self._edge_mask = {}
+        self._child_counts = {}
+        self._parent_counts = {}
+        self._leaves = [set() for _ in filters]
+        self._roots = [set() for _ in filters]
+
+        for node in graph.order:
+            self.add_node(node)
+        for node in graph.order:
+            for child, priorities in graph.nodes[node][0].items():
+                self.update_edge(child, node, priorities)
+
+    @property
+    def ignore_priorities(self):
+        return self._filters[1:]
+
+    def level(self, ignore_priority):
+        """Return the level of ignore_priority, or None if not indexed."""
+        return self._level_of.get(_level_key(ignore_priority))
+
+    def _mask(self, priorities):
+        mask = 1
+        for level, ignore_priority in enumerate(self._filters):
+            if not level:
+                continue
+            if callable(ignore_priority):
+                for priority in reversed(priorities):
+                    if not ignore_priority(priority):
+                        mask |= 1 << level
+                        break
+            elif ignore_priority < priorities[-1]:
+                mask |= 1 << level
+        return mask
+
+    def add_node(self, node):
+        if node in self._seq:
+            return
+        self._seq[node] = self._next_seq
+        self._next_seq += 1
+        nlevels = len(self._filters)
+        self._child_counts[node] = [0] * nlevels
+        self._parent_counts[node] = [0] * nlevels
+        for level in range(nlevels):
+            self._leaves[level].add(node)
+            self._roots[level].add(node)
+
+    def update_edge(self, child, parent, priorities):
+        """Account for an edge that was added, or gained a priority."""
+        key = (child, parent)
+        old_mask = self._edge_mask.get(key, 0)
+        mask = self._mask(priorities)
+        if mask == old_mask:
+            return
+        self._edge_mask[key] = mask
+        child_counts = self._child_counts[parent]
+        parent_counts = self._parent_counts[child]
+        added = mask & ~old_mask
+        level = 0
+        while added:
+            if added & 1:
+                child_counts[level] += 1
+                parent_counts[level] += 1
+                self._leaves[level].discard(parent)
+                self._roots[level].discard(child)
+            added >>= 1
+            level += 1
+
+    def remove_edge(self, child, parent):
+        mask = self._edge_mask.pop((child, parent), 0)
+        child_counts = self._child_counts[parent]
+        parent_counts = self._parent_counts[child]
+        level = 0
+        while mask:
+            if mask & 1:
+                child_counts[level] -= 1
+                if not child_counts[level]:
+                    self._leaves[level].add(parent)
+                parent_counts[level] -= 1
+                if not parent_counts[level]:
+                    self._roots[level].add(child)
+            mask >>= 1
+            level += 1
+
+    def remove_node(self, node, children, parents):
+        """Account for node and its edges being removed from the graph."""
+        for parent in parents:
+            self.remove_edge(node, parent)
+        for child in children:
+            self.remove_edge(child, node)
+        del self._seq[node]
+        del self._child_counts[node]
+        del self._parent_counts[node]
+        for level in range(len(self._filters)):
+            self._leaves[level].discard(node)
+            self._roots[level].discard(node)
+
+    def leaves(self, level):
+        return sorted(self._leaves[level], key=self._seq.__getitem__)
+
+    def roots(self, level):
+        return sorted(self._roots[level], key=self._seq.__getitem__)
+
+    def first_leaf(self):
+        if not self._leaves[0]:
+            return None
+        return min(self._leaves[0], key=self._seq.__getitem__)
+
+    def leaf_count(self, level):
+        return len(self._leaves[level])
+
+
 class digraph:
     """
     A directed graph object.
@@ -20,6 +179,23 @@ class digraph:
         # { node : ( { child : priority } , { parent : priority } ) }
         self.nodes = {}
         self.order = []
+        self._index = None
+
+    def enable_index(self, ignore_priorities=()):
+        """
+        Keep per-node child and parent counts for the None filter and for
+        each of the given ignore_priority filters, so that leaf_nodes(),
+        root_nodes(), firstzero() and hasallzeros() cost time in the size
+        of their result rather than in the size of the graph. Filters are
+        matched by equality, so a classmethod may be looked up afresh for
+        each query. Any other ignore_priority falls back to a scan.
+
+        The graph must only be modified through its methods from here on,
+        and its order must not be rearranged. The index costs memory and
+        time on every edge change, so it pays off for graphs that are
+        queried repeatedly as they shrink.
+        """
+        self._index = _DegreeIndex(self, ignore_priorities)
 
     def add(self, node, parent, priority=0):
         """Adds the specified node with the specified parent.
@@ -27,9 +203,12 @@ class digraph:
         If the dep is a soft-dep and the node already has a hard
         relationship to the parent, the relationship is left as hard."""
 
+        index = self._index
         if node not in self.nodes:
             self.nodes[node] = ({}, {}, node)
             self.order.append(node)
+            if index is not None:
+                index.add_node(node)
 
         if not parent:
             return
@@ -37,6 +216,8 @@ class digraph:
         if parent not in self.nodes:
             self.nodes[parent] = ({}, {}, parent)
             self.order.append(parent)
+            if index is not None:
+                index.add_node(parent)
 
         priorities = self.nodes[node][1].get(parent)
         if priorities is None:
@@ -46,6 +227,8 @@ class digraph:
 
         if not priorities or priorities[-1] is not priority:
             bisect.insort(priorities, priority)
+            if index is not None:
+                index.update_edge(node, parent, priorities)
 
     def discard(self, node):
         """
@@ -65,6 +248,8 @@ class digraph:
         if node not in self.nodes:
             raise KeyError(node)
 
+        if self._index is not None:
+            self._index.remove_node(node, self.nodes[node][0], self.nodes[node][1])
         for parent in self.nodes[node][1]:
             del self.nodes[parent][0][node]
         for child in self.nodes[node][0]:
@@ -92,6 +277,8 @@ class digraph:
         """
         self.nodes.clear()
         del self.order[:]
+        if self._index is not None:
+            self._index = _DegreeIndex(self, self._index.ignore_priorities)
 
     def difference_update(self, t):
         """
@@ -100,11 +287,14 @@ class digraph:
         """
         if isinstance(t, (list, tuple)) or not hasattr(t, "__contains__"):
             t = frozenset(t)
+        index = self._index
         order = []
         for node in self.order:
             if node not in t:
                 order.append(node)
                 continue
+            if index is not None:
+                index.remove_node(node, self.nodes[node][0], self.nodes[node][1])
             for parent in self.nodes[node][1]:
                 del self.nodes[parent][0][node]
             for child in self.nodes[node][0]:
@@ -140,6 +330,8 @@ class digraph:
             raise KeyError(parent)
 
         # Remove the edge.
+        if self._index is not None:
+            self._index.remove_edge(child, parent)
         del self.nodes[child][1][parent]
         del self.nodes[parent][0][child]
 
@@ -216,6 +408,11 @@ class digraph:
         If ignore_soft_deps is True, soft deps are not counted as
         children in calculations."""
 
+        if self._index is not None:
+            level = self._index.level(ignore_priority)
+            if level is not None:
+                return self._index.leaves(level)
+
         leaf_nodes = []
         if ignore_priority is None:
             for node in self.order:
@@ -250,6 +447,11 @@ class digraph:
         If ignore_soft_deps is True, soft deps are not counted as
         parents in calculations."""
 
+        if self._index is not None:
+            level = self._index.level(ignore_priority)
+            if level is not None:
+                return self._index.roots(level)
+
         root_nodes = []
         if ignore_priority is None:
             for node in self.order:
@@ -329,6 +531,8 @@ class digraph:
                 parents_clone[parent] = priorities_clone
             clone.nodes[node] = (children_clone, parents_clone, node)
         clone.order = self.order[:]
+        if self._index is not None:
+            clone.enable_index(self._index.ignore_priorities)
         return clone
 
     def delnode(self, node):
@@ -338,12 +542,18 @@ class digraph:
             pass
 
     def firstzero(self):
+        if self._index is not None:
+            return self._index.first_leaf()
         leaf_nodes = self.leaf_nodes()
         if leaf_nodes:
             return leaf_nodes[0]
         return None
 
     def hasallzeros(self, ignore_priority=None):
+        if self._index is not None:
+            level = self._index.level(ignore_priority)
+            if level is not None:
+                return self._index.leaf_count(level) == len(self.order)
         return len(self.leaf_nodes(ignore_priority=ignore_priority)) == len(self.order)
 
     def debug_print(self):
@@ -1,7 +1,7 @@
 # Copyright 2026 Gentoo Authors
 # Distributed under the terms of the GNU General Public License v2
 
-__all__ = ["NoGlobalsUnpickler"]
+__all__ = ["AllowedGlobalsUnpickler", "NoGlobalsUnpickler"]
 
 import pickle
 
@@ -20,3 +20,24 @@ class NoGlobalsUnpickler(pickle.Unpickler):
         raise pickle.UnpicklingError(
             f"pickle global reference '{module}.{name}' is forbidden"
         )
+
+
+class AllowedGlobalsUnpickler(pickle.Unpickler):
+    """
+    An Unpickler subclass that only resolves the pickle global references
+    listed in allowed, a collection of (module, name) pairs, and rejects
+    any other.
+
+    https://docs.python.org/3/library/pickle.html#restricting-globals
+    """
+
+    def __init__(self, file, allowed, **kwargs):
+        super().__init__(file, **kwargs)
+        self._allowed = frozenset(allowed)
+
+    def find_class(self, module, name):
+        if (module, name) not in self._allowed:
+            raise pickle.UnpicklingError(
+                f"pickle global reference '{module}.{name}' is forbidden"
+            )
+        return super().find_class(module, name)
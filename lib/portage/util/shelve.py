@@ -1,18 +1,230 @@
-# Copyright 2020-2021 Gentoo Authors
+# Copyright 2020-2026 Gentoo Authors
 # Distributed under the terms of the GNU General Public License v2
 
+import json
 import logging
+import os
 import pickle
 import shelve
+from collections.abc import MutableMapping
 
 logger = logging.getLogger(__name__)
 
+_sqlite_header = b"SQLite format 3\0"
+
+_sqlite_suffixes = (".sqlite", ".sqlite3")
+
+
+def is_sqlite_shelf(db_file):
+    """
+    Return True if db_file is a SqliteShelf, or is to be created as one
+    since it does not exist yet and its name ends with .sqlite or .sqlite3.
+    """
+    try:
+        with open(db_file, "rb") as f:
+            return f.read(len(_sqlite_header)) == _sqlite_header
+    except FileNotFoundError:
+        return db_file.endswith(_sqlite_suffixes)
+    except OSError:
+        return False
+
+
+def _encode_member(member):
+    if isinstance(member, tuple):
+        if not all(isinstance(x, (str, int, float, tuple)) for x in member):
+            raise TypeError(member)
+    elif not isinstance(member, (str, int, float)):
+        raise TypeError(member)
+    return json.dumps(member, ensure_ascii=False, separators=(",", ":"))
+
+
+def _decode_member(value):
+    def to_tuple(x):
+        return tuple(to_tuple(y) for y in x) if isinstance(x, list) else x
+
+    return to_tuple(json.loads(value))
+
+
+class SqliteShelf(MutableMapping):
+    """
+    A persistent mapping like shelve.Shelf, kept in an indexed SQLite
+    database. Values are pickled, except for sets of strings, numbers and
+    tuples, which are kept as one row per member, so that add_member and
+    discard_member change a large set without reading and rewriting it.
+
+    Writes are batched into transactions of batch_size changes, which
+    are committed by sync() and close() as well. The database uses
+    write-ahead logging, so that readers are not blocked by a transaction.
+    """
+
+    def __init__(self, db_file, flag="c", batch_size=1000):
+        """
+        The optional flag parameter has the same interpretation as the flag
+        parameter of dbm.open()
+        """
+        import sqlite3
+
+        self._batch_size = batch_size
+        self._pending = 0
+        if flag == "r":
+            self._connection = sqlite3.connect(
+                f"file:{os.path.abspath(db_file)}?mode=ro", uri=True
+            )
+            return
+        if flag == "n":
+            # A write-ahead log left next to the old database would be
+            # replayed into the new one.
+            for path in (db_file, db_file + "-wal", db_file + "-shm"):
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+        self._connection = sqlite3.connect(db_file, timeout=15)
+        self._connection.execute("PRAGMA journal_mode = WAL")
+        self._connection.execute("PRAGMA synchronous = NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS items "
+            "(key TEXT PRIMARY KEY NOT NULL, value BLOB NOT NULL) WITHOUT ROWID"
+        )
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS members "
+            "(key TEXT NOT NULL, member TEXT NOT NULL, PRIMARY KEY (key, member)) "
+            "WITHOUT ROWID"
+        )
+        self._connection.commit()
+
+    def _write(self, sql, parameters):
+        cursor = self._connection.execute(sql, parameters)
+        self._pending += 1
+        if self._pending >= self._batch_size:
+            self.sync()
+        return cursor
+
+    def __getitem__(self, key):
+        row = self._connection.execute(
+            "SELECT value FROM items WHERE key = ?", (key,)
+        ).fetchone()
+        if row is not None:
+            return pickle.loads(row[0])
+        members = self.members(key)
+        if not members:
+            raise KeyError(key)
+        return members
+
+    def __setitem__(self, key, value):
+        if isinstance(value, (set, frozenset)) and value:
+            try:
+                members = [_encode_member(x) for x in value]
+            except TypeError:
+                pass
+            else:
+                self._write("DELETE FROM items WHERE key = ?", (key,))
+                self._write("DELETE FROM members WHERE key = ?", (key,))
+                for member in members:
+                    self._write(
+                        "INSERT INTO members (key, member) VALUES (?, ?)",
+                        (key, member),
+                    )
+                return
+        self._write("DELETE FROM members WHERE key = ?", (key,))
+        self._write(
+            "INSERT OR REPLACE INTO items (key, value) VALUES (?, ?)",
+            (key, pickle.dumps(value)),
+        )
+
+    def __delitem__(self, key):
+        count = self._write("DELETE FROM items WHERE key = ?", (key,)).rowcount
+        count += self._write("DELETE FROM members WHERE key = ?", (key,)).rowcount
+        if not count:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        return (
+            self._connection.execute(
+                "SELECT 1 FROM items WHERE key = ? "
+                "UNION ALL SELECT 1 FROM members WHERE key = ? LIMIT 1",
+                (key, key),
+            ).fetchone()
+            is not None
+        )
+
+    def __iter__(self):
+        for (key,) in self._connection.execute(
+            "SELECT key FROM items UNION SELECT DISTINCT key FROM members"
+        ).fetchall():
+            yield key
+
+    def __len__(self):
+        return self._connection.execute(
+            "SELECT COUNT(*) FROM "
+            "(SELECT key FROM items UNION SELECT DISTINCT key FROM members)"
+        ).fetchone()[0]
+
+    def items(self):
+        """Return all items, reading the sets in a single pass."""
+        result = {}
+        for key, value in self._connection.execute("SELECT key, value FROM items"):
+            result[key] = pickle.loads(value)
+        for key, member in self._connection.execute(
+            "SELECT key, member FROM members ORDER BY key"
+        ):
+            result.setdefault(key, set()).add(_decode_member(member))
+        return result.items()
+
+    def members(self, key):
+        """Return the set stored for key, or an empty set."""
+        return {
+            _decode_member(member)
+            for (member,) in self._connection.execute(
+                "SELECT member FROM members WHERE key = ?", (key,)
+            )
+        }
+
+    def add_member(self, key, member):
+        """Add member to the set stored for key, creating the set if needed."""
+        if self._connection.execute(
+            "SELECT 1 FROM items WHERE key = ?", (key,)
+        ).fetchone():
+            value = self[key]
+            value = set(value) if isinstance(value, (set, frozenset)) else set()
+            value.add(member)
+            self[key] = value
+            return
+        self._write(
+            "INSERT OR IGNORE INTO members (key, member) VALUES (?, ?)",
+            (key, _encode_member(member)),
+        )
+
+    def discard_member(self, key, member):
+        """
+        Remove member from the set stored for key, if present. The key is
+        removed along with the last member of its set.
+        """
+        self._write(
+            "DELETE FROM members WHERE key = ? AND member = ?",
+            (key, _encode_member(member)),
+        )
+
+    def sync(self):
+        """Commit the current transaction."""
+        self._connection.commit()
+        self._pending = 0
+
+    def close(self):
+        if self._connection is not None:
+            self.sync()
+            self._connection.close()
+            self._connection = None
+
 
 def open_shelve(db_file, flag="r"):
     """
     The optional flag parameter has the same interpretation as the flag
-    parameter of dbm.open()
+    parameter of dbm.open(). A SqliteShelf is returned if is_sqlite_shelf()
+    is True for db_file.
     """
+    if is_sqlite_shelf(db_file):
+        return SqliteShelf(db_file, flag=flag)
     try:
         db = shelve.open(db_file, flag=flag)
     except ImportError as e:
@@ -45,6 +257,30 @@ def dump(args):
         src.close()
 
 
+def migrate(args):
+    """
+    Copy a shelve database to a new SqliteShelf, which emirrordist
+    uses in place of the shelve database once it is given its path.
+    """
+    if os.path.exists(args.dest):
+        raise FileExistsError(f"{args.dest} already exists")
+    src = open_shelve(args.src, flag="r")
+    try:
+        dest = SqliteShelf(args.dest, flag="n", batch_size=10000)
+        try:
+            for key in src:
+                try:
+                    value = src[key]
+                except KeyError:
+                    logger.exception(key)
+                    continue
+                dest[key] = value
+        finally:
+            dest.close()
+    finally:
+        src.close()
+
+
 def restore(args):
     dest = open_shelve(args.dest, flag="c")
     try:
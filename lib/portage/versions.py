@@ -15,6 +15,7 @@ __all__ = [
     "ververify",
 ]
 
+import os
 import re
 import typing
 import warnings
@@ -139,6 +140,11 @@ def vercmp(ver1: str, ver2: str, silent: int = 1) -> Optional[int]:
     if ver1 == ver2:
         return 0
 
+    if _c_vercmp is not None:
+        rval = _c_vercmp(ver1, ver2)
+        if rval is not None or silent:
+            return rval
+
     match1 = ver_regexp.match(ver1)
     match2 = ver_regexp.match(ver2)
 
@@ -259,6 +265,52 @@ def vercmp(ver1: str, ver2: str, silent: int = 1) -> Optional[int]:
     return rval
 
 
+def _key_int(digits: str) -> bytes:
+    digits = digits.lstrip("0")
+    if len(digits) < 0xFF:
+        return bytes((len(digits),)) + digits.encode()
+    return b"\xff" + len(digits).to_bytes(4, "big") + digits.encode()
+
+
+_suffix_key_tag = {
+    "alpha": b"\x01",
+    "beta": b"\x02",
+    "pre": b"\x03",
+    "rc": b"\x04",
+    "p": b"\x06",
+}
+
+
+@lru_cache(10240)
+def _py_version_key(ver: str) -> Optional[bytes]:
+    """
+    Pure-Python version of portage.dep._parser.version_key(), used when
+    the extension is unavailable. The two must produce identical keys; see
+    version_key() in src/dep_parser_core.c for the layout.
+    """
+    if not ver.isascii():
+        return None
+    match = ver_regexp.fullmatch(ver)
+    if match is None:
+        return None
+
+    key = [_key_int(match.group(1))]
+    if match.group(2):
+        for comp in match.group(2)[1:].split("."):
+            if comp[0] == "0":
+                key.append(b"\x02" + comp.rstrip("0").encode())
+            else:
+                key.append(b"\x03" + _key_int(comp))
+    key.append(b"\x01")
+    key.append(match.group(4).encode() or b"\x00")
+    for suffix in match.group(5).split("_")[1:]:
+        name, num = suffix_regexp.match(suffix).groups()
+        key.append(_suffix_key_tag[name] + _key_int(num))
+    key.append(b"\x05")
+    key.append(_key_int(match.group(9) or ""))
+    return b"".join(key)
+
+
 def pkgcmp(pkg1: tuple[str, str, str], pkg2: tuple[str, str, str]) -> Optional[int]:
     """
     Compare 2 package versions created in pkgsplit format.
@@ -480,6 +532,19 @@ class _pkg_str(str):
                     var = default
         return var
 
+    @property
+    def version_key(self) -> bytes:
+        """
+        A bytes object that sorts in vercmp() order, so that comparing the
+        versions of two cpvs is a single comparison of their keys.
+        """
+        try:
+            return self._version_key
+        except AttributeError:
+            key = _version_key(self.version)
+            self.__dict__["_version_key"] = key
+            return key
+
     @property
     def stable(self) -> bool:
         try:
@@ -600,7 +665,9 @@ def cpv_sort_key(eapi: Any = None) -> Any:
         if split1 is None or split2 is None or split1.cp != split2.cp:
             return (cpv1 > cpv2) - (cpv1 < cpv2)
 
-        return vercmp(split1.version, split2.version)
+        key1 = split1.version_key
+        key2 = split2.version_key
+        return (key1 > key2) - (key1 < key2)
 
     return cmp_sort_key(cmp_cpv)
 
@@ -618,17 +685,31 @@ def best(mymatches: Sequence[Any], eapi: Any = None) -> Any:
         return ""
     if len(mymatches) == 1:
         return mymatches[0]
-    bestmatch = mymatches[0]
-    try:
-        v2 = bestmatch.version
-    except AttributeError:
-        v2 = _pkg_str(bestmatch, eapi=eapi).version
-    for x in mymatches[1:]:
+    bestmatch = None
+    bestkey = None
+    for x in mymatches:
         try:
-            v1 = x.version
+            key = x.cpv.version_key
         except AttributeError:
-            v1 = _pkg_str(x, eapi=eapi).version
-        if vercmp(v1, v2) > 0:
+            try:
+                version = x.version
+            except AttributeError:
+                version = _pkg_str(x, eapi=eapi).version
+            key = _version_key(version)
+        if bestkey is None or key > bestkey:
             bestmatch = x
-            v2 = v1
+            bestkey = key
     return bestmatch
+
+
+# portage.dep imports this module, so the extension can only be loaded once
+# everything above is defined.  PORTAGE_NATIVE_DEP_PARSER=0 forces the
+# pure-Python path, as it does for portage.dep.
+_c_vercmp = None
+_version_key = _py_version_key
+if os.environ.get("PORTAGE_NATIVE_DEP_PARSER") != "0":
+    try:
+        from portage.dep._parser import vercmp as _c_vercmp
+        from portage.dep._parser import version_key as _version_key
+    except ImportError:
+        pass
@@ -5,6 +5,7 @@
 #include "dep_atom.h"
 #include "dep_parser_core.h"
 #include <assert.h>
+#include <limits.h>
 #include <string.h>
 
 #define MODULE_NAME "portage.dep._parser"
@@ -663,6 +664,99 @@ py_scan_atom(UNUSED PyObject *self, PyObject *arg)
     return build_atom_obj(&info, s, (int)n);
 }
 
+/* Fill *buf with the version key for s, using the caller's stack buffer when
+ * it is large enough.  Returns the key length, -1 for an invalid version, or
+ * -2 with an exception set. */
+static Py_ssize_t version_key_buf(PyObject *s_obj, unsigned char *stack,
+                                  size_t stack_len, unsigned char **buf)
+{
+    Py_ssize_t  n;
+    const char *s = PyUnicode_AsUTF8AndSize(s_obj, &n);
+    if (!s)
+        return -2;
+    if (n > INT_MAX / 4) {
+        PyErr_SetString(PyExc_OverflowError, "version string too long");
+        return -2;
+    }
+
+    *buf = stack;
+    if (VERSION_KEY_MAX(n) > stack_len) {
+        *buf = PyMem_Malloc(VERSION_KEY_MAX(n));
+        if (!*buf) {
+            PyErr_NoMemory();
+            return -2;
+        }
+    }
+    return version_key(s, (int)n, *buf);
+}
+
+/*
+ * version_key(s) -> bytes or None
+ *
+ * Return a byte string that sorts in the same order as vercmp(), or None if
+ * s is not a valid version.
+ */
+static PyObject *
+py_version_key(UNUSED PyObject *self, PyObject *arg)
+{
+    unsigned char  stack[256];
+    unsigned char *buf;
+    Py_ssize_t     len = version_key_buf(arg, stack, sizeof(stack), &buf);
+    PyObject      *result;
+
+    if (len == -2)
+        return NULL;
+    if (len < 0)
+        result = Py_NewRef(Py_None);
+    else
+        result = PyBytes_FromStringAndSize((const char *)buf, len);
+    if (buf != stack)
+        PyMem_Free(buf);
+    return result;
+}
+
+/*
+ * vercmp(ver1, ver2) -> int or None
+ *
+ * Compare two versions: negative, zero or positive like portage.versions.vercmp,
+ * or None if either one is invalid.
+ */
+static PyObject *
+py_vercmp(UNUSED PyObject *self, PyObject *const *args, Py_ssize_t nargs)
+{
+    if (nargs != 2) {
+        PyErr_Format(PyExc_TypeError,
+                     "vercmp() takes exactly 2 arguments (%zd given)", nargs);
+        return NULL;
+    }
+
+    unsigned char  stack1[128], stack2[128];
+    unsigned char *buf1, *buf2 = stack2;
+    PyObject      *result = NULL;
+    Py_ssize_t     len1 = version_key_buf(args[0], stack1, sizeof(stack1), &buf1);
+    if (len1 == -2)
+        return NULL;
+    Py_ssize_t     len2 = version_key_buf(args[1], stack2, sizeof(stack2), &buf2);
+    if (len2 == -2)
+        goto out;
+
+    if (len1 < 0 || len2 < 0) {
+        result = Py_NewRef(Py_None);
+    } else {
+        int c = memcmp(buf1, buf2, len1 < len2 ? len1 : len2);
+        if (c == 0)
+            c = (len1 > len2) - (len1 < len2);
+        result = PyLong_FromLong((c > 0) - (c < 0));
+    }
+
+out:
+    if (buf1 != stack1)
+        PyMem_Free(buf1);
+    if (buf2 != stack2)
+        PyMem_Free(buf2);
+    return result;
+}
+
 static PyMethodDef methods[] = {
     {
         .ml_name  = "parse",
@@ -696,6 +790,25 @@ static PyMethodDef methods[] = {
             "missing_enabled_fs, missing_disabled_fs, conditional_dict_or_None,\n"
             "required_fs). Raises ValueError if a token cannot be classified."
     },
+    {
+        .ml_name  = "version_key",
+        .ml_meth  = py_version_key,
+        .ml_flags = METH_O,
+        .ml_doc   =
+            "version_key(s) -> bytes or None\n"
+            "Return a byte string that sorts like vercmp(), so that comparing\n"
+            "two keys gives the same answer as comparing the two versions.\n"
+            "Returns None if s is not a valid version.",
+    },
+    {
+        .ml_name  = "vercmp",
+        .ml_meth  = (PyCFunction)(void (*)(void))py_vercmp,
+        .ml_flags = METH_FASTCALL,
+        .ml_doc   =
+            "vercmp(ver1, ver2) -> int or None\n"
+            "Compare two versions. Returns -1, 0 or 1, or None if either\n"
+            "version is invalid.",
+    },
     { NULL, NULL, 0, NULL },
 };
 
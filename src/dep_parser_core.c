@@ -663,4 +663,139 @@ int scan_dep_list(DepScanner *p, DepVisitor *v)
     return 1;
 }
 
+/* Append a decimal integer to a version key: the digit count followed by the
+ * digits, leading zeros dropped so that "01" and "1" encode the same.  Counts
+ * below 0xff take one byte; longer numbers get 0xff and a 4-byte big-endian
+ * count, which still sorts after every shorter number. */
+static unsigned char *put_key_int(unsigned char *out, const char *d, int len)
+{
+    while (len > 0 && *d == '0') {
+        d++;
+        len--;
+    }
+
+    if (len < 0xff) {
+        *out++ = (unsigned char)len;
+    } else {
+        *out++ = 0xff;
+        *out++ = (unsigned char)(len >> 24);
+        *out++ = (unsigned char)(len >> 16);
+        *out++ = (unsigned char)(len >> 8);
+        *out++ = (unsigned char)len;
+    }
+    memcpy(out, d, len);
+    return out + len;
+}
+
+/* PMS 3.3 version comparison, expressed as a byte string that sorts with
+ * memcmp() in the same order portage.versions.vercmp() gives.  The layout is
+ *
+ *   INT(first) COMP... VK_COMP_END LETTER SUFFIX... VK_SUFFIX_END INT(rev)
+ *
+ * where a COMP is VK_COMP_INT INT(n) for a component without a leading zero,
+ * and VK_COMP_ZERO followed by its digits minus trailing zeros otherwise, so
+ * that "1.01" < "1.1" and "1.0" == "1.00".  Every tag sorts below '0', which
+ * lets the unprefixed zero-led digits end wherever the next tag starts.  A
+ * missing letter is VK_NO_LETTER, and a SUFFIX is its type tag and INT(n).
+ * VK_SUFFIX_END sits between _rc and _p, which is where vercmp() places the
+ * implicit "_p-1" it pads the shorter suffix list with.
+ *
+ *   "1.0"     -> 01 '1' 02 01 00 05 00
+ *   "1.2b_p3" -> 01 '1' 03 01 '2' 01 'b' 06 01 '3' 05 00
+ *
+ * Returns the key length, or -1 if s is not a valid version.  buf must have
+ * room for VERSION_KEY_MAX(n) bytes. */
+int version_key(const char *s, int n, unsigned char *buf)
+{
+    static const struct {
+        const char   *str;
+        int           len;
+        unsigned char tag;
+    } sfx[] = {
+#define SFX(s, t) { s, (int)(sizeof(s) - 1), t }
+        /* "pre" must be tried before "p" */
+        SFX("alpha", VK_SUFFIX_ALPHA), SFX("beta", VK_SUFFIX_BETA),
+        SFX("pre", VK_SUFFIX_PRE), SFX("rc", VK_SUFFIX_RC),
+        SFX("p", VK_SUFFIX_P),
+#undef SFX
+    };
+
+    const char    *p   = s;
+    const char    *end = s + n;
+    const char    *d;
+    unsigned char *out = buf;
+
+    d = p;
+    while (p < end && is_digit_c(*p)) {
+        p++;
+    }
+    if (p == d)
+        return -1;
+    out = put_key_int(out, d, (int)(p - d));
+
+    while (p < end && *p == '.') {
+        d = ++p;
+        while (p < end && is_digit_c(*p)) {
+            p++;
+        }
+        if (p == d)
+            return -1;
+
+        int len = (int)(p - d);
+        if (*d == '0') {
+            while (len > 0 && d[len - 1] == '0') {
+                len--;
+            }
+            *out++ = VK_COMP_ZERO;
+            memcpy(out, d, len);
+            out += len;
+        } else {
+            *out++ = VK_COMP_INT;
+            out = put_key_int(out, d, len);
+        }
+    }
+    *out++ = VK_COMP_END;
+
+    if (p < end && is_lower_c(*p)) {
+        *out++ = (unsigned char)*p++;
+    } else {
+        *out++ = VK_NO_LETTER;
+    }
+
+    while (p < end && *p == '_') {
+        p++;
+        int i;
+        for (i = 0; i < ARRAY_SIZE(sfx); i++) {
+            if (end - p >= sfx[i].len && memcmp(p, sfx[i].str, sfx[i].len) == 0)
+                break;
+        }
+        if (i == ARRAY_SIZE(sfx))
+            return -1;
+
+        p += sfx[i].len;
+        d = p;
+        while (p < end && is_digit_c(*p)) {
+            p++;
+        }
+        *out++ = sfx[i].tag;
+        out = put_key_int(out, d, (int)(p - d));
+    }
+    *out++ = VK_SUFFIX_END;
+
+    d = p;
+    if (p < end) {
+        if (end - p < 3 || p[0] != '-' || p[1] != 'r')
+            return -1;
+        d = p += 2;
+        while (p < end && is_digit_c(*p)) {
+            p++;
+        }
+        if (p == d || p != end)
+            return -1;
+    }
+    out = put_key_int(out, d, (int)(p - d));
+
+    return (int)(out - buf);
+}
+
 /* vim: set ts=4 sw=4 et: */
@@ -84,4 +84,23 @@ typedef struct {
 
 int scan_dep_list(DepScanner *p, DepVisitor *v);
 
+/* Tags used by version_key().  Each one sorts below '0' (see there). */
+enum {
+    VK_NO_LETTER    = 0x00,
+    VK_COMP_END     = 0x01,
+    VK_COMP_ZERO    = 0x02,
+    VK_COMP_INT     = 0x03,
+    VK_SUFFIX_ALPHA = 0x01,
+    VK_SUFFIX_BETA  = 0x02,
+    VK_SUFFIX_PRE   = 0x03,
+    VK_SUFFIX_RC    = 0x04,
+    VK_SUFFIX_END   = 0x05,
+    VK_SUFFIX_P     = 0x06,
+};
+
+/* Upper bound on the key length for an n-byte version string. */
+#define VERSION_KEY_MAX(n) (2 * (size_t)(n) + 16)
+
+int version_key(const char *s, int n, unsigned char *buf);
+
 /* vim: set ts=4 sw=4 et: */
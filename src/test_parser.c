@@ -323,6 +323,69 @@ static void test_scan_use_flag(void)
     }
 }
 
+/* Compare two versions through their keys, as portage.versions does. */
+static int key_cmp(const char *a, const char *b)
+{
+    unsigned char ka[256], kb[256];
+    int la = version_key(a, (int)strlen(a), ka);
+    int lb = version_key(b, (int)strlen(b), kb);
+    if (la < 0 || lb < 0)
+        return 2;
+
+    int c = memcmp(ka, kb, la < lb ? la : lb);
+    if (c == 0)
+        c = (la > lb) - (la < lb);
+    return (c > 0) - (c < 0);
+}
+
+static void test_version_key(void)
+{
+    static const struct {
+        const char *a;
+        const char *b;
+        int cmp;
+    } cases[] = {
+        { "1.0",        "1.0",        0 },
+        { "1.0",        "1.00",       0 },
+        { "01",         "1",          0 },
+        { "1.0-r0",     "1.0",        0 },
+        { "1_p",        "1_p0",       0 },
+        { "1.01",       "1.1",       -1 },
+        { "1.1",        "1.10",      -1 },
+        { "1.0",        "1.0.0",     -1 },
+        { "1a",         "1.0",       -1 },
+        { "12.2b",      "12.2.5",    -1 },
+        { "1_alpha",    "1_beta",    -1 },
+        { "1_beta",     "1_pre",     -1 },
+        { "1_pre",      "1_rc",      -1 },
+        { "1_rc",       "1",         -1 },
+        { "1",          "1-r1",      -1 },
+        { "1-r1",       "1_p",       -1 },
+        { "1.0_alpha",  "1.0",       -1 },
+        { "1.0_p1",     "1.0_p1_p1", -1 },
+        { "1.0_p1_alpha", "1.0_p1",  -1 },
+        { "2",          "10",        -1 },
+        /* invalid */
+        { "",           "1",          2 },
+        { "1.",         "1",          2 },
+        { "1_foo",      "1",          2 },
+        { "1-r",        "1",          2 },
+        { "1_alphabet", "1",          2 },
+    };
+
+    for (int i = 0; i < ARRAY_SIZE(cases); i++) {
+        int got = key_cmp(cases[i].a, cases[i].b);
+        int rev = key_cmp(cases[i].b, cases[i].a);
+        int want_rev = cases[i].cmp == 2 ? 2 : -cases[i].cmp;
+        if (got != cases[i].cmp || rev != want_rev) {
+            FAIL("version_key(%s, %s): got %d/%d, want %d",
+                 cases[i].a, cases[i].b, got, rev, cases[i].cmp);
+        } else {
+            PASS();
+        }
+    }
+}
+
 int main(void)
 {
     init_cc_table();
@@ -336,6 +399,7 @@ int main(void)
     test_scan_atom_invalid();
     test_scan_slot();
     test_scan_use_flag();
+    test_version_key();
 
     if (failures) {
         fprintf(stderr, "%d/%d tests failed\n", failures, failures + passes);